@@ -2,26 +2,32 @@
 API路由定义
 """
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import StreamingResponse, Response
+from fastapi.responses import StreamingResponse
 from models.schemas import (
     VulnerabilityRequest, PocResponse, ScanRequest,
     LLMConfigRequest, LLMConfigResponse,
     OOBConfigRequest, OOBConfigResponse,
+    RetentionConfigRequest, RetentionConfigResponse,
+    PocProcessPoolConfigRequest, PocProcessPoolConfigResponse,
     AssetSourceConfigRequest, AssetSourceConfigResponse, AssetSourceImportRequest,
     NucleiScanRequest, NucleiScanResponse, NucleiStatusResponse, NucleiTaskCreateRequest,
-    BatchTaskCreateRequest, BatchTaskActionResponse
+    BatchTaskCreateRequest, BatchTaskRescanRequest, BatchTaskActionResponse,
+    WorkerLeaseRequest, WorkerHeartbeatRequest, WorkerCompleteRequest, WorkerReleaseRequest
 )
 from services.asset_source_service import asset_source_service
 from services.llm_service import llm_service
 from services.oob_service import oob_service
 from services.poc_library_service import poc_library_service
+from services.poc_process_pool import poc_process_pool
 from services.nuclei_service import nuclei_service
 from services.batch_task_service import batch_task_service
+from services.retention_service import retention_service
 from config import settings
 import logging
 import json
 import asyncio
 from pathlib import Path
+from typing import Optional
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -90,8 +96,10 @@ async def generate_poc(request: VulnerabilityRequest):
 
             verifiable = result.get("verifiable", True)
             dependency_check = None
+            lint_report = None
             if verifiable and result.get("poc_code"):
                 dependency_check = poc_library_service.check_poc_dependencies(result.get("poc_code"))
+                lint_report = poc_library_service.lint_poc_code(result.get("poc_code"))
 
             # 保存到POC库
             try:
@@ -139,6 +147,7 @@ async def generate_poc(request: VulnerabilityRequest):
                 review_model=review_model,
                 review_error=review_error,
                 dependency_check=dependency_check,
+                lint_report=lint_report,
                 error=None,
                 warning=settings.SECURITY_WARNING,
             )
@@ -162,6 +171,7 @@ async def generate_poc(request: VulnerabilityRequest):
                 review_model=llm_service.review_model if request.enable_second_review else None,
                 review_error=None,
                 dependency_check=None,
+                lint_report=None,
                 error=str(e),
                 warning=settings.SECURITY_WARNING,
             )
@@ -286,6 +296,26 @@ async def delete_poc(poc_id: int):
     return {"success": True, "message": "POC删除成功"}
 
 
+@router.get("/pocs/{poc_id}/performance", summary="获取POC执行性能统计")
+async def get_poc_performance(poc_id: int, slowest_limit: int = 10):
+    """
+    获取指定POC在批量任务中的累计执行开销
+
+    - **poc_id**: POC记录ID
+    - **slowest_limit**: 返回最慢子任务的条数
+
+    包含执行次数、墙钟/CPU 耗时、HTTP 请求数与字节数、OOB 轮询等待时间及峰值内存
+    """
+    if not poc_library_service.get_poc_by_id(poc_id):
+        raise HTTPException(status_code=404, detail="POC不存在")
+    try:
+        performance = await asyncio.to_thread(batch_task_service.get_poc_performance, poc_id, slowest_limit)
+        return {"success": True, "performance": performance}
+    except Exception as e:
+        logger.error(f"获取POC性能统计失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/pocs/{poc_id}/code", summary="获取POC文件内容")
 async def get_poc_code(poc_id: int):
     """
@@ -337,6 +367,18 @@ async def create_batch_task(request: BatchTaskCreateRequest):
             target_urls=request.target_urls,
             poc_ids=request.poc_ids,
             concurrency=request.concurrency,
+            host_failure_threshold=request.host_failure_threshold,
+            host_recovery_probe=request.host_recovery_probe,
+            pre_probe=request.pre_probe,
+            dead_target_policy=request.dead_target_policy,
+            use_result_cache=request.use_result_cache,
+            result_cache_max_age_hours=request.result_cache_max_age_hours,
+            prioritize=request.prioritize,
+            stop_on_host_hit=request.stop_on_host_hit,
+            stop_on_poc_hit=request.stop_on_poc_hit,
+            max_hits=request.max_hits,
+            time_budget_seconds=request.time_budget_seconds,
+            dispatch_mode=request.dispatch_mode,
         )
         return BatchTaskActionResponse(
             success=True,
@@ -387,16 +429,16 @@ async def get_batch_task(task_id: int):
 
 
 @router.get("/batch-tasks/{task_id}/export", summary="导出批量任务报告")
-async def export_batch_task_report(task_id: int, format: str = "html"):
-    """导出批量任务报告，支持 html/json/txt。"""
+async def export_batch_task_report(task_id: int, format: str = "html", gzip: bool = False):
+    """流式导出批量任务报告，支持 html/json/jsonl/txt/csv，可选 gzip 压缩。"""
     task = batch_task_service.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="批量任务不存在")
 
     try:
-        filename, content_type, content = batch_task_service.export_task_report(task_id, format)
-        return Response(
-            content=content,
+        filename, content_type, chunks = batch_task_service.stream_task_report(task_id, format, compress=gzip)
+        return StreamingResponse(
+            chunks,
             media_type=content_type,
             headers={"Content-Disposition": f'attachment; filename="{filename}"'},
         )
@@ -434,6 +476,36 @@ async def get_batch_task_items(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/batch-tasks/{task_id}/targets", summary="获取批量任务目标存活探测结果")
+async def get_batch_task_targets(task_id: int):
+    """获取批量任务派发前的目标存活预探测结果"""
+    task = batch_task_service.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+
+    try:
+        targets = batch_task_service.get_task_targets(task_id)
+        return {"success": True, "targets": targets, "total": len(targets)}
+    except Exception as e:
+        logger.error(f"获取批量任务目标探测结果失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/batch-tasks/{task_id}/summaries", summary="获取批量任务压实后的子任务汇总")
+async def get_batch_task_summaries(task_id: int):
+    """获取保留策略压实后按 POC/状态汇总的子任务统计"""
+    task = batch_task_service.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+
+    try:
+        summaries = batch_task_service.get_task_item_summaries(task_id)
+        return {"success": True, "summaries": summaries, "compacted_at": task.get("compacted_at")}
+    except Exception as e:
+        logger.error(f"获取批量任务汇总失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/batch-tasks/{task_id}/items/{item_id}/detail", summary="获取批量任务子任务详情")
 async def get_batch_task_item_detail(task_id: int, item_id: int):
     """获取单个批量子任务的详细结果"""
@@ -467,6 +539,34 @@ async def cancel_batch_task(task_id: int):
     )
 
 
+@router.post("/batch-tasks/{task_id}/rescan", summary="差异重扫批量任务", response_model=BatchTaskActionResponse)
+async def rescan_batch_task(task_id: int, request: Optional[BatchTaskRescanRequest] = None):
+    """基于历史任务创建差异重扫任务：只执行新目标、新增/变化的POC或模板及上次未成功的子任务"""
+    task = batch_task_service.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="批量任务不存在")
+
+    request = request or BatchTaskRescanRequest()
+    try:
+        new_task = batch_task_service.create_rescan_task(
+            task_id,
+            target_urls=request.target_urls,
+            poc_ids=request.poc_ids,
+            template_paths=request.template_paths,
+            concurrency=request.concurrency,
+        )
+        return BatchTaskActionResponse(
+            success=True,
+            message="差异重扫任务已创建并开始执行",
+            task=new_task,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"创建差异重扫任务失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 
 # ==================== LLM配置管理API ====================
 
@@ -614,6 +714,139 @@ async def get_oob_config():
         raise HTTPException(status_code=500, detail=f"获取OOB配置失败: {str(e)}")
 
 
+@router.post("/config/retention", summary="更新批量任务结果保留策略", response_model=RetentionConfigResponse)
+async def update_retention_config(config: RetentionConfigRequest):
+    """更新批量任务结果保留与压实策略"""
+    try:
+        retention_service.update_config(
+            enabled=config.enabled,
+            keep_days=config.keep_days,
+            keep_hits=config.keep_hits,
+            summarize_misses=config.summarize_misses,
+            interval_hours=config.interval_hours,
+            vacuum_pages=config.vacuum_pages,
+        )
+        return RetentionConfigResponse(
+            success=True,
+            message="结果保留策略已更新并永久保存",
+            current_config=retention_service.get_current_config(),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("更新结果保留策略失败: %s", e)
+        raise HTTPException(status_code=500, detail=f"更新结果保留策略失败: {str(e)}")
+
+
+@router.get("/config/retention", summary="获取批量任务结果保留策略")
+async def get_retention_config():
+    """获取当前结果保留策略与最近一次压实统计"""
+    return {"success": True, "config": retention_service.get_current_config()}
+
+
+@router.post("/config/process-pool", summary="更新Python POC隔离执行进程池配置", response_model=PocProcessPoolConfigResponse)
+async def update_process_pool_config(config: PocProcessPoolConfigRequest):
+    """更新 Python POC 隔离执行进程池，已启动的工作进程空闲后按新配置重建"""
+    try:
+        await asyncio.to_thread(
+            poc_process_pool.update_config,
+            enabled=config.enabled,
+            pool_size=config.pool_size,
+            max_runs_per_worker=config.max_runs_per_worker,
+            memory_limit_mb=config.memory_limit_mb,
+            timeout_seconds=config.timeout_seconds,
+        )
+        return PocProcessPoolConfigResponse(
+            success=True,
+            message="隔离执行进程池配置已更新并永久保存",
+            current_config=poc_process_pool.get_current_config(),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("更新隔离执行进程池配置失败: %s", e)
+        raise HTTPException(status_code=500, detail=f"更新隔离执行进程池配置失败: {str(e)}")
+
+
+@router.get("/config/process-pool", summary="获取Python POC隔离执行进程池配置")
+async def get_process_pool_config():
+    """获取当前进程池配置、工作进程数与超时/崩溃统计"""
+    return {"success": True, "config": poc_process_pool.get_current_config()}
+
+
+@router.post("/maintenance/compact", summary="立即执行批量任务结果压实")
+async def run_retention_compaction(dry_run: bool = False):
+    """按当前保留策略立即压实超期任务结果，dry_run 只统计不修改"""
+    try:
+        stats = await asyncio.to_thread(retention_service.run_compaction, dry_run)
+        return {"success": True, "stats": stats}
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"执行结果压实失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workers/lease", summary="工作进程领取批量子任务")
+async def lease_worker_items(request: WorkerLeaseRequest):
+    """
+    外部工作进程从派发模式为 workers 的运行中任务领取子任务
+
+    领取遵循任务的并发上限与主机熔断（熔断主机暂停领取，冷却后只放行恢复探测），存活预探测判定失活的目标排在最后
+    """
+    try:
+        items = await asyncio.to_thread(
+            batch_task_service.lease_items, request.worker_id, request.limit, request.lease_seconds
+        )
+        return {"success": True, "items": items}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"工作进程领取子任务失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workers/heartbeat", summary="工作进程续约批量子任务")
+async def heartbeat_worker_items(request: WorkerHeartbeatRequest):
+    """续约工作进程持有的子任务，返回仍由其持有的子任务ID"""
+    try:
+        item_ids = await asyncio.to_thread(
+            batch_task_service.heartbeat_items, request.worker_id, request.item_ids, request.lease_seconds
+        )
+        return {"success": True, "item_ids": item_ids}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"工作进程续约失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workers/complete", summary="工作进程回报批量子任务结果")
+async def complete_worker_item(request: WorkerCompleteRequest):
+    """回报子任务执行结果，租约已失效的迟到结果会被丢弃（accepted=false）"""
+    try:
+        accepted = await asyncio.to_thread(
+            batch_task_service.complete_leased_item, request.worker_id, request.item_id, request.outcome
+        )
+        return {"success": True, "accepted": accepted}
+    except Exception as e:
+        logger.error(f"工作进程回报结果失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/workers/release", summary="工作进程归还未执行的批量子任务")
+async def release_worker_items(request: WorkerReleaseRequest):
+    """工作进程退出前归还已领取但尚未开始执行的子任务"""
+    try:
+        released = await asyncio.to_thread(
+            batch_task_service.release_leased_items, request.worker_id, request.item_ids
+        )
+        return {"success": True, "released": released}
+    except Exception as e:
+        logger.error(f"工作进程归还子任务失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/config/asset-sources", summary="更新空间测绘配置", response_model=AssetSourceConfigResponse)
 async def update_asset_source_config(config: AssetSourceConfigRequest):
     """更新空间测绘平台配置"""
@@ -816,6 +1049,18 @@ async def create_nuclei_task(request: NucleiTaskCreateRequest):
             target_urls=request.target_urls,
             template_paths=template_paths,
             concurrency=request.concurrency,
+            host_failure_threshold=request.host_failure_threshold,
+            host_recovery_probe=request.host_recovery_probe,
+            pre_probe=request.pre_probe,
+            dead_target_policy=request.dead_target_policy,
+            use_result_cache=request.use_result_cache,
+            result_cache_max_age_hours=request.result_cache_max_age_hours,
+            prioritize=request.prioritize,
+            stop_on_host_hit=request.stop_on_host_hit,
+            stop_on_poc_hit=request.stop_on_poc_hit,
+            max_hits=request.max_hits,
+            time_budget_seconds=request.time_budget_seconds,
+            dispatch_mode=request.dispatch_mode,
         )
         return BatchTaskActionResponse(
             success=True,
@@ -1658,6 +1658,10 @@ async function viewBatchTaskDetails(taskId) {
                                 <i class="fas fa-file-lines"></i>
                                 <span>TXT</span>
                             </button>
+                            <button class="btn-poc-action" onclick="exportBatchTaskReport(${task.id}, 'csv')">
+                                <i class="fas fa-file-csv"></i>
+                                <span>CSV</span>
+                            </button>
                         </div>
                     </div>
                     <div class="detail-section">
@@ -1816,6 +1820,7 @@ function getBatchItemStatusLabel(status) {
         pending: '待执行',
         running: '执行中',
         success: '执行完成',
+        cached: '复用缓存',
         failed: '失败',
         cancelled: '已取消',
         skipped: '已跳过'
@@ -1825,14 +1830,14 @@ function getBatchItemStatusLabel(status) {
 
 function getBatchItemDisplayStatus(item) {
     if (item.vulnerable) return '命中';
-    if (item.status === 'success') return '未命中';
+    if (item.status === 'success' || item.status === 'cached') return '未命中';
     if (item.status === 'failed') return '异常';
     return getBatchItemStatusLabel(item.status);
 }
 
 function getBatchItemDisplayClass(item) {
     if (item.vulnerable) return 'success';
-    if (item.status === 'success') return 'cancelled';
+    if (item.status === 'success' || item.status === 'cached') return 'cancelled';
     if (item.status === 'failed') return 'failed';
     return item.status || 'pending';
 }
@@ -1877,6 +1882,7 @@ function getFailureCategoryLabel(category) {
         environment_error: '环境异常',
         oob_error: 'OOB 异常',
         nuclei_error: 'Nuclei 异常',
+        early_stop: '提前终止',
         unknown: '未分类'
     };
     return labels[category] || category || '-';
@@ -9,6 +9,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from api.routes import router
+from services.retention_service import retention_service
+from services.poc_process_pool import poc_process_pool
+from services.poc_runtime import async_poc_runner
 from config import settings
 import uvicorn
 import logging
@@ -90,6 +93,21 @@ app.add_middleware(
 # 注册API路由
 app.include_router(router, prefix="/api", tags=["POC Generator"])
 
+@app.on_event("startup")
+async def start_background_jobs():
+    """启动批量任务结果保留的后台压实线程，并预先启动 POC 隔离执行进程"""
+    retention_service.start_scheduler()
+    if poc_process_pool.enabled:
+        poc_process_pool.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    retention_service.stop_scheduler()
+    poc_process_pool.shutdown()
+    async_poc_runner.shutdown()
+
+
 # 获取前端静态文件路径
 frontend_dir = Path(__file__).parent / "frontend"
 
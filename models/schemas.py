@@ -38,6 +38,7 @@ class PocResponse(BaseModel):
     review_model: Optional[str] = Field(None, description="二次审核所用模型")
     review_error: Optional[str] = Field(None, description="二次审核失败原因")
     dependency_check: Optional[Dict[str, Any]] = Field(None, description="生成结果的依赖预检信息")
+    lint_report: Optional[Dict[str, Any]] = Field(None, description="静态检查发现的性能隐患与执行开销估算")
     error: Optional[str] = Field(None, description="错误信息")
     warning: str = Field(..., description="安全警告")
 
@@ -150,6 +151,39 @@ class OOBConfigResponse(BaseModel):
     current_config: Dict[str, Any] = Field(..., description="当前配置（隐藏敏感信息）")
 
 
+class RetentionConfigRequest(BaseModel):
+    """批量任务结果保留策略更新请求"""
+    enabled: bool = Field(False, description="是否启用后台定时压实")
+    keep_days: int = Field(30, description="原始子任务结果保留天数")
+    keep_hits: bool = Field(True, description="命中子任务是否永久保留")
+    summarize_misses: bool = Field(True, description="超期未命中子任务是否汇总后删除")
+    interval_hours: float = Field(24, description="后台压实间隔（小时）")
+    vacuum_pages: int = Field(2000, description="每次增量 VACUUM 回收的最大页数")
+
+
+class RetentionConfigResponse(BaseModel):
+    """批量任务结果保留策略响应"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(..., description="响应消息")
+    current_config: Dict[str, Any] = Field(..., description="当前保留策略")
+
+
+class PocProcessPoolConfigRequest(BaseModel):
+    """Python POC 隔离执行进程池配置更新请求"""
+    enabled: bool = Field(False, description="是否在隔离工作进程中执行 Python POC")
+    pool_size: int = Field(2, description="工作进程数量")
+    max_runs_per_worker: int = Field(50, description="单个工作进程执行多少次后回收重建")
+    memory_limit_mb: int = Field(512, description="单个工作进程可额外使用的内存上限（MB），0 表示不限制")
+    timeout_seconds: float = Field(120, description="单次 POC 执行的硬超时（秒），超时直接终止工作进程")
+
+
+class PocProcessPoolConfigResponse(BaseModel):
+    """Python POC 隔离执行进程池配置响应"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(..., description="响应消息")
+    current_config: Dict[str, Any] = Field(..., description="当前进程池配置与运行统计")
+
+
 class AssetSourceConfigRequest(BaseModel):
     """空间测绘配置更新请求"""
     provider: str = Field(..., description="平台：fofa/hunter/quake")
@@ -210,6 +244,18 @@ class NucleiTaskCreateRequest(BaseModel):
     template_paths: Optional[List[str]] = Field(None, description="要使用的模板相对路径列表")
     folder: Optional[str] = Field(None, description="要扫描的文件夹")
     concurrency: Optional[int] = Field(3, description="并发数，默认3")
+    host_failure_threshold: Optional[int] = Field(3, description="同一主机连续网络异常多少次后熔断，0 表示不熔断")
+    host_recovery_probe: bool = Field(True, description="熔断后是否在冷却时间后放行一个探测子任务尝试恢复")
+    pre_probe: bool = Field(False, description="派发前是否对所有目标做存活预探测（DNS/TCP/HEAD）")
+    dead_target_policy: str = Field("skip", description="预探测判定失活的目标处理策略：skip 直接跳过 / deprioritize 延后执行")
+    use_result_cache: bool = Field(False, description="是否复用有效期内相同目标+POC+参数的历史结果")
+    result_cache_max_age_hours: Optional[float] = Field(None, description="结果缓存有效期（小时），默认 24")
+    prioritize: bool = Field(True, description="派发前是否按严重程度/EPSS/KEV/历史命中率/目标指纹评分，高价值子任务先执行")
+    stop_on_host_hit: bool = Field(False, description="同一主机确认命中后是否跳过该主机剩余子任务")
+    stop_on_poc_hit: bool = Field(False, description="同一 POC/模板在任一目标确认命中后是否跳过其在其他目标上的子任务")
+    max_hits: Optional[int] = Field(None, description="全局命中预算，命中数达到后任务停止派发")
+    time_budget_seconds: Optional[float] = Field(None, description="时间预算（秒），开始派发后超过预算任务停止派发")
+    dispatch_mode: str = Field("local", description="派发模式：local 在 API 进程内执行 / workers 由外部工作进程领取执行")
 
     class Config:
         json_schema_extra = {
@@ -279,6 +325,18 @@ class BatchTaskCreateRequest(BaseModel):
     target_urls: List[str] = Field(..., description="目标URL列表")
     poc_ids: List[int] = Field(..., description="POC ID列表")
     concurrency: Optional[int] = Field(3, description="并发数，默认3")
+    host_failure_threshold: Optional[int] = Field(3, description="同一主机连续网络异常多少次后熔断，0 表示不熔断")
+    host_recovery_probe: bool = Field(True, description="熔断后是否在冷却时间后放行一个探测子任务尝试恢复")
+    pre_probe: bool = Field(False, description="派发前是否对所有目标做存活预探测（DNS/TCP/HEAD）")
+    dead_target_policy: str = Field("skip", description="预探测判定失活的目标处理策略：skip 直接跳过 / deprioritize 延后执行")
+    use_result_cache: bool = Field(False, description="是否复用有效期内相同目标+POC+参数的历史结果")
+    result_cache_max_age_hours: Optional[float] = Field(None, description="结果缓存有效期（小时），默认 24")
+    prioritize: bool = Field(True, description="派发前是否按严重程度/EPSS/KEV/历史命中率/目标指纹评分，高价值子任务先执行")
+    stop_on_host_hit: bool = Field(False, description="同一主机确认命中后是否跳过该主机剩余子任务")
+    stop_on_poc_hit: bool = Field(False, description="同一 POC/模板在任一目标确认命中后是否跳过其在其他目标上的子任务")
+    max_hits: Optional[int] = Field(None, description="全局命中预算，命中数达到后任务停止派发")
+    time_budget_seconds: Optional[float] = Field(None, description="时间预算（秒），开始派发后超过预算任务停止派发")
+    dispatch_mode: str = Field("local", description="派发模式：local 在 API 进程内执行 / workers 由外部工作进程领取执行")
 
     class Config:
         json_schema_extra = {
@@ -290,6 +348,41 @@ class BatchTaskCreateRequest(BaseModel):
         }
 
 
+class BatchTaskRescanRequest(BaseModel):
+    """批量任务差异重扫请求，未指定的字段沿用原任务配置"""
+    target_urls: Optional[List[str]] = Field(None, description="新的目标URL列表（例如当天资产清单）")
+    poc_ids: Optional[List[int]] = Field(None, description="新的POC ID列表，仅POC批量任务使用")
+    template_paths: Optional[List[str]] = Field(None, description="新的模板路径列表，仅Nuclei任务使用")
+    concurrency: Optional[int] = Field(None, description="并发数，默认沿用原任务")
+
+
+class WorkerLeaseRequest(BaseModel):
+    """工作进程领取子任务请求"""
+    worker_id: str = Field(..., description="工作进程标识")
+    limit: int = Field(1, description="本次最多领取的子任务数")
+    lease_seconds: Optional[float] = Field(None, description="租约时长（秒），默认 60")
+
+
+class WorkerHeartbeatRequest(BaseModel):
+    """工作进程续约请求"""
+    worker_id: str = Field(..., description="工作进程标识")
+    item_ids: List[int] = Field(..., description="需要续约的子任务ID列表")
+    lease_seconds: Optional[float] = Field(None, description="租约时长（秒），默认 60")
+
+
+class WorkerCompleteRequest(BaseModel):
+    """工作进程回报执行结果请求"""
+    worker_id: str = Field(..., description="工作进程标识")
+    item_id: int = Field(..., description="子任务ID")
+    outcome: Dict[str, Any] = Field(..., description="执行结果，结构与 execute_poc 返回值一致")
+
+
+class WorkerReleaseRequest(BaseModel):
+    """工作进程归还未执行子任务请求"""
+    worker_id: str = Field(..., description="工作进程标识")
+    item_ids: List[int] = Field(..., description="归还的子任务ID列表")
+
+
 class BatchTaskActionResponse(BaseModel):
     """批量任务通用响应"""
     success: bool = Field(..., description="是否成功")
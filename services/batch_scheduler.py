@@ -0,0 +1,153 @@
+"""
+批量任务主机亲和调度
+
+按主机把子任务划分到固定数量的执行通道（lane）：
+1. 每个通道同一时间只处理一个主机，该主机的子任务全部由同一通道串行执行
+2. 通道持有该主机的 keep-alive 会话，TCP/TLS 握手每主机只付出一次
+3. 不同主机分散到不同通道并行；主机数少于通道数时，空闲通道分担剩余最多的主机
+4. 子任务来源可以是生成器，只按窗口大小预取，内存占用不随任务规模增长
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.host_health import extract_host_key
+from services.http_runtime import create_keepalive_session
+
+
+class HostLaneScheduler:
+    """
+    主机亲和的子任务队列
+
+    仅在批量任务调度线程内使用，不做加锁；会话在通道切换主机或任务结束时关闭。
+    len() 与迭代只反映已预取到窗口内的子任务。
+    """
+
+    BUFFER_PER_LANE = 64
+
+    def __init__(
+        self,
+        items: Iterable[Dict],
+        lane_count: int,
+        session_factory: Optional[Callable[[], object]] = None,
+        buffer_size: Optional[int] = None,
+    ):
+        self.lane_count = max(int(lane_count or 1), 1)
+        self.session_factory = session_factory or create_keepalive_session
+        self.buffer_size = max(int(buffer_size or self.lane_count * self.BUFFER_PER_LANE), 1)
+        self._source: Optional[Iterator[Dict]] = iter(items)
+        self._buffered = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._lane_hosts: Dict[int, Optional[str]] = {lane: None for lane in range(self.lane_count)}
+        self._lane_sessions: Dict[int, Tuple[str, object]] = {}
+        self._free_lanes = deque(range(self.lane_count))
+        self._fill()
+
+    def __len__(self) -> int:
+        return self._buffered
+
+    def __bool__(self) -> bool:
+        self._fill()
+        return self._buffered > 0
+
+    def __iter__(self):
+        for queue in self._queues.values():
+            yield from queue
+
+    def append(self, item: Dict):
+        self._queues.setdefault(extract_host_key(item["target_url"]), deque()).append(item)
+        self._buffered += 1
+
+    def extendleft(self, items: Iterable[Dict]):
+        """将子任务放回其主机队列队首（与 deque.extendleft 一致，传入顺序会被反转）。"""
+        for item in items:
+            host = extract_host_key(item["target_url"])
+            queue = self._queues.get(host)
+            if queue is None:
+                queue = deque()
+                self._queues[host] = queue
+                self._queues.move_to_end(host, last=False)
+            queue.appendleft(item)
+            self._buffered += 1
+
+    def acquire_lane(self) -> Optional[int]:
+        return self._free_lanes.popleft() if self._free_lanes else None
+
+    def release_lane(self, lane: int):
+        if lane not in self._free_lanes:
+            self._free_lanes.appendleft(lane)
+
+    def pop_for_lane(self, lane: int) -> Optional[Dict]:
+        """优先取通道当前主机的子任务，主机耗尽后再认领新的主机。"""
+        self._fill()
+        host = self._lane_hosts.get(lane)
+        if not host or not self._queues.get(host):
+            host = self._claim_host(lane)
+            if host is None:
+                return None
+        self._buffered -= 1
+        return self._queues[host].popleft()
+
+    def session_for(self, lane: int, host: str):
+        """返回通道绑定到该主机的会话，切换主机时关闭旧会话。"""
+        current = self._lane_sessions.get(lane)
+        if current and current[0] == host:
+            return current[1]
+        if current:
+            self._close_session(current[1])
+        session = self.session_factory()
+        self._lane_sessions[lane] = (host, session)
+        return session
+
+    def lane_assignments(self) -> Dict[int, Optional[str]]:
+        return dict(self._lane_hosts)
+
+    def close(self):
+        close_source = getattr(self._source, "close", None)
+        if callable(close_source):
+            close_source()
+        self._source = None
+        for _, session in self._lane_sessions.values():
+            self._close_session(session)
+        self._lane_sessions.clear()
+
+    def _claim_host(self, lane: int) -> Optional[str]:
+        self._lane_hosts[lane] = None
+        for host, queue in list(self._queues.items()):
+            if not queue:
+                self._queues.pop(host)
+
+        claimed = set(self._lane_hosts.values())
+        for host in self._queues:
+            if host not in claimed:
+                self._lane_hosts[lane] = host
+                return host
+
+        # 所有主机都已有通道负责时，空闲通道分担剩余子任务最多的主机，避免并发度退化
+        busiest = self._busiest_hosts()
+        if not busiest:
+            return None
+        self._lane_hosts[lane] = busiest[0]
+        return busiest[0]
+
+    def _fill(self):
+        while self._source is not None and self._buffered < self.buffer_size:
+            try:
+                item = next(self._source)
+            except StopIteration:
+                self._source = None
+                break
+            self.append(item)
+
+    def _busiest_hosts(self) -> List[str]:
+        return sorted(self._queues, key=lambda host: len(self._queues[host]), reverse=True)
+
+    def _close_session(self, session):
+        close = getattr(session, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
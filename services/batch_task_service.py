@@ -8,23 +8,58 @@
 4. 批量任务取消
 """
 
+import csv
+import io
 import json
 import logging
+import queue
 import sqlite3
 import threading
+import time
+import zlib
+from collections import deque
 from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from contextlib import contextmanager
 from html import escape
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
+from services.batch_scheduler import HostLaneScheduler
+from services.cancellation import CancellationToken, bind_token
+from services.detail_store import DetailSegmentStore, DetailStoreError, get_detail_store, is_segment_locator
+from services.early_stop import EarlyStopController
+from services.http_runtime import bind_session, create_keepalive_session
 from services.nuclei_service import nuclei_service
-from services.failure_classifier import classify_execution_outcome
-from services.poc_library_service import poc_library_service
+from services.failure_classifier import build_skip_classification, classify_execution_outcome
+from services.host_health import HostCircuitBreaker, extract_host_key
+from services.item_priority import fingerprint_tokens, poc_profile, score_item, smoothed_hit_rate, template_profile
+from services.poc_library_service import poc_library_service, poc_supports_scan_many, prepare_python_poc
+from services.poc_process_pool import poc_process_pool
+from services.result_cache import build_cache_key, file_fingerprint, normalize_cache_url, params_fingerprint
+from services.target_probe import TargetProber
 
 logger = logging.getLogger(__name__)
 
 
+class LeaseLostError(RuntimeError):
+    """工作进程回报结果时子任务租约已被回收或转给其他工作进程。"""
+
+
+class TaskItemCursor:
+    """可重复迭代的子任务游标：每次迭代都重新按键集分页读取，len() 走 COUNT 查询。"""
+
+    def __init__(self, service: "BatchTaskService", task_id: int, status: Optional[str] = None):
+        self.service = service
+        self.task_id = task_id
+        self.status = status
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.service.iter_task_items(self.task_id, status=self.status)
+
+    def __len__(self) -> int:
+        return self.service.count_task_items(self.task_id, status=self.status)
+
+
 class BatchTaskService:
     """批量任务编排服务"""
 
@@ -33,6 +68,39 @@ class BatchTaskService:
     MAX_TASK_ITEMS = 2000
     DEFAULT_CONCURRENCY = 3
     MAX_CONCURRENCY = 5
+    HOST_FAILURE_THRESHOLD = 3
+    HOST_RECOVERY_INTERVAL = 30
+    HOST_RECOVERY_PROBES = 1
+    DEAD_TARGET_POLICIES = ("skip", "deprioritize")
+    CANCEL_GRACE_SECONDS = 5
+    ITEM_PAGE_SIZE = 500
+    REPORT_CHUNK_SIZE = 64 * 1024
+    DICTIONARY_MIN_SAMPLES = 32
+    DICTIONARY_MAX_SAMPLES = 512
+    RESULT_CACHE_MAX_AGE_HOURS = 24
+    RESULT_CACHE_LOOKUP_CHUNK = 400
+    PRIORITY_HISTORY_STATUSES = ("success",)
+    DISPATCH_MODES = ("local", "workers")
+    WORKER_LEASE_SECONDS = 60
+    WORKER_MAX_LEASE_SECONDS = 600
+    WORKER_MAX_LEASE_BATCH = 50
+    WORKER_MAX_LEASE_ATTEMPTS = 3
+    WORKER_POLL_INTERVAL = 1.0
+    # 领取时多取的候选倍数，用于在任务并发上限与主机额度过滤后仍能凑满 limit
+    WORKER_LEASE_CANDIDATE_FACTOR = 4
+    SCAN_MANY_CHUNK_SIZE = 100
+    SCAN_MANY_MIN_TARGETS = 2
+    # 分块最多跨越优先级流中的这么多子任务，超过即提前成块，稀疏分布的 POC 不会被攒到任务末尾
+    SCAN_MANY_MAX_SPAN = 2000
+    # scan_many 分块最多占用的并发槽位比例，其余槽位始终留给逐项子任务
+    SCAN_MANY_SLOT_RATIO = 0.5
+    REPORT_FORMATS = {
+        "html": ("html", "text/html; charset=utf-8", "_iter_html_report"),
+        "json": ("json", "application/json; charset=utf-8", "_iter_json_report"),
+        "jsonl": ("jsonl", "application/x-ndjson; charset=utf-8", "_iter_jsonl_report"),
+        "txt": ("txt", "text/plain; charset=utf-8", "_iter_text_report"),
+        "csv": ("csv", "text/csv; charset=utf-8", "_iter_csv_report"),
+    }
 
     def __init__(self):
         self.base_dir = Path(__file__).parent.parent
@@ -105,14 +173,139 @@ class BatchTaskService:
                 )
                 """
             )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS batch_task_targets (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id INTEGER NOT NULL,
+                    target_url TEXT NOT NULL,
+                    host TEXT,
+                    alive INTEGER,
+                    probe_json TEXT,
+                    probed_at TIMESTAMP,
+                    UNIQUE(task_id, target_url),
+                    FOREIGN KEY(task_id) REFERENCES batch_tasks(id)
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS batch_task_summaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id INTEGER NOT NULL,
+                    poc_id INTEGER NOT NULL,
+                    engine_type TEXT NOT NULL DEFAULT 'poc',
+                    status TEXT NOT NULL,
+                    failure_category TEXT NOT NULL DEFAULT '',
+                    vulnerable INTEGER NOT NULL DEFAULT 0,
+                    item_count INTEGER NOT NULL DEFAULT 0,
+                    first_finished_at TIMESTAMP,
+                    last_finished_at TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY(task_id) REFERENCES batch_tasks(id)
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS batch_task_pocs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id INTEGER NOT NULL,
+                    poc_id INTEGER NOT NULL,
+                    engine_type TEXT NOT NULL DEFAULT 'poc',
+                    template_path TEXT NOT NULL DEFAULT '',
+                    vuln_name TEXT,
+                    vuln_type TEXT,
+                    content_hash TEXT,
+                    UNIQUE(task_id, poc_id, template_path),
+                    FOREIGN KEY(task_id) REFERENCES batch_tasks(id)
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS batch_result_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    target_url TEXT NOT NULL,
+                    engine_type TEXT NOT NULL DEFAULT 'poc',
+                    poc_id INTEGER NOT NULL DEFAULT 0,
+                    template_path TEXT NOT NULL DEFAULT '',
+                    vulnerable INTEGER NOT NULL DEFAULT 0,
+                    reason TEXT,
+                    source_task_id INTEGER,
+                    source_item_id INTEGER,
+                    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS poc_performance_stats (
+                    poc_id INTEGER PRIMARY KEY,
+                    executions INTEGER NOT NULL DEFAULT 0,
+                    total_wall_ms REAL NOT NULL DEFAULT 0,
+                    max_wall_ms REAL NOT NULL DEFAULT 0,
+                    total_cpu_ms REAL NOT NULL DEFAULT 0,
+                    total_http_requests INTEGER NOT NULL DEFAULT 0,
+                    total_http_bytes INTEGER NOT NULL DEFAULT 0,
+                    total_oob_wait_ms REAL NOT NULL DEFAULT 0,
+                    max_peak_memory_kb INTEGER,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            self._ensure_task_search_index(cursor)
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_tasks_status ON batch_tasks(status)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_tasks_created_at ON batch_tasks(created_at)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_task_items_task_id ON batch_task_items(task_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_task_items_status ON batch_task_items(status)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_task_summaries_task_id ON batch_task_summaries(task_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_task_targets_url ON batch_task_targets(target_url)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_task_pocs_poc_id ON batch_task_pocs(poc_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_result_cache_cached_at ON batch_result_cache(cached_at)")
             self._ensure_batch_task_item_columns(cursor)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_tasks_leases_open ON batch_tasks(leases_open)")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_task_items_task_status_id ON batch_task_items(task_id, status, id)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_task_items_task_vulnerable ON batch_task_items(task_id, vulnerable)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_task_items_task_target ON batch_task_items(task_id, target_url)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_batch_task_items_task_poc ON batch_task_items(task_id, poc_id)")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_task_items_poc_metrics "
+                "ON batch_task_items(poc_id) WHERE metrics_json IS NOT NULL"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_batch_task_items_task_status_priority "
+                "ON batch_task_items(task_id, status, priority DESC, id)"
+            )
             self._backfill_batch_task_item_summaries(cursor)
+            self._backfill_task_search_index(cursor)
 
-    def create_task(self, target_urls: List[str], poc_ids: List[int], concurrency: Optional[int] = None) -> Dict:
-        """创建批量任务并启动后台执行"""
+    def create_task(
+        self,
+        target_urls: List[str],
+        poc_ids: List[int],
+        concurrency: Optional[int] = None,
+        host_failure_threshold: Optional[int] = None,
+        host_recovery_probe: Optional[bool] = None,
+        pre_probe: bool = False,
+        dead_target_policy: Optional[str] = None,
+        use_result_cache: bool = False,
+        result_cache_max_age_hours: Optional[float] = None,
+        rescan_of: Optional[int] = None,
+        prioritize: bool = True,
+        stop_on_host_hit: bool = False,
+        stop_on_poc_hit: bool = False,
+        max_hits: Optional[int] = None,
+        time_budget_seconds: Optional[float] = None,
+        dispatch_mode: Optional[str] = None,
+    ) -> Dict:
+        """创建批量任务并启动后台执行；rescan_of 指定时复用该任务中未变化的结果"""
         urls = self._normalize_urls(target_urls)
         unique_poc_ids = self._normalize_poc_ids(poc_ids)
         selected_pocs = self._validate_pocs(unique_poc_ids)
@@ -140,6 +333,21 @@ class BatchTaskService:
             "poc_names": {str(p["id"]): p.get("vuln_name") for p in selected_pocs},
             "url_count": len(urls),
             "poc_count": len(selected_pocs),
+            "execution_policy": self._build_execution_policy(
+                host_failure_threshold,
+                host_recovery_probe,
+                pre_probe,
+                dead_target_policy,
+                use_result_cache,
+                result_cache_max_age_hours,
+                prioritize,
+                stop_on_host_hit=stop_on_host_hit,
+                stop_on_poc_hit=stop_on_poc_hit,
+                max_hits=max_hits,
+                time_budget_seconds=time_budget_seconds,
+                dispatch_mode=dispatch_mode,
+            ),
+            "rescan_of": rescan_of,
         }
 
         with self.get_db_connection() as conn:
@@ -165,6 +373,13 @@ class BatchTaskService:
                 """,
                 item_rows,
             )
+            self._index_task_search(
+                cursor,
+                task_id,
+                "poc_batch",
+                urls,
+                [{**poc, "content_hash": self._poc_fingerprint(poc)} for poc in selected_pocs],
+            )
 
         self.start_task(task_id)
         return self.get_task(task_id)
@@ -174,8 +389,21 @@ class BatchTaskService:
         target_urls: List[str],
         template_paths: List[str],
         concurrency: Optional[int] = None,
+        host_failure_threshold: Optional[int] = None,
+        host_recovery_probe: Optional[bool] = None,
+        pre_probe: bool = False,
+        dead_target_policy: Optional[str] = None,
+        use_result_cache: bool = False,
+        result_cache_max_age_hours: Optional[float] = None,
+        rescan_of: Optional[int] = None,
+        prioritize: bool = True,
+        stop_on_host_hit: bool = False,
+        stop_on_poc_hit: bool = False,
+        max_hits: Optional[int] = None,
+        time_budget_seconds: Optional[float] = None,
+        dispatch_mode: Optional[str] = None,
     ) -> Dict:
-        """创建 Nuclei 批量任务并启动后台执行"""
+        """创建 Nuclei 批量任务并启动后台执行；rescan_of 指定时复用该任务中未变化的结果"""
         urls = self._normalize_urls(target_urls)
         templates = self._normalize_template_paths(template_paths)
 
@@ -201,6 +429,21 @@ class BatchTaskService:
             "url_count": len(urls),
             "template_count": len(templates),
             "poc_count": len(templates),
+            "execution_policy": self._build_execution_policy(
+                host_failure_threshold,
+                host_recovery_probe,
+                pre_probe,
+                dead_target_policy,
+                use_result_cache,
+                result_cache_max_age_hours,
+                prioritize,
+                stop_on_host_hit=stop_on_host_hit,
+                stop_on_poc_hit=stop_on_poc_hit,
+                max_hits=max_hits,
+                time_budget_seconds=time_budget_seconds,
+                dispatch_mode=dispatch_mode,
+            ),
+            "rescan_of": rescan_of,
         }
 
         with self.get_db_connection() as conn:
@@ -226,10 +469,66 @@ class BatchTaskService:
                 """,
                 item_rows,
             )
+            self._index_task_search(
+                cursor,
+                task_id,
+                "nuclei_scan",
+                urls,
+                [
+                    {"id": 0, "template_path": template_path, "content_hash": self._template_fingerprint(template_path)}
+                    for template_path in templates
+                ],
+            )
 
         self.start_task(task_id)
         return self.get_task(task_id)
 
+    def create_rescan_task(
+        self,
+        task_id: int,
+        target_urls: Optional[List[str]] = None,
+        poc_ids: Optional[List[int]] = None,
+        template_paths: Optional[List[str]] = None,
+        concurrency: Optional[int] = None,
+    ) -> Dict:
+        """
+        基于历史任务创建差异重扫任务
+
+        未指定的目标/POC/模板沿用原任务配置，执行策略沿用原任务；新任务只实际执行变化部分，
+        其余子任务在派发前直接沿用原任务结果。
+        """
+        previous = self.get_task(task_id)
+        if not previous:
+            raise ValueError("批量任务不存在")
+        if previous["status"] in ("pending", "running"):
+            raise ValueError("原任务仍在执行中，无法发起差异重扫")
+
+        config = previous.get("config_json") if isinstance(previous.get("config_json"), dict) else {}
+        policy = self._get_execution_policy(previous)
+        options = {
+            "target_urls": target_urls if target_urls else config.get("target_urls") or [],
+            "concurrency": concurrency or previous.get("concurrency"),
+            "host_failure_threshold": policy["host_failure_threshold"],
+            "host_recovery_probe": policy["host_recovery_probe"],
+            "pre_probe": policy["pre_probe"],
+            "dead_target_policy": policy["dead_target_policy"],
+            "use_result_cache": policy["use_result_cache"],
+            "result_cache_max_age_hours": policy["result_cache_max_age_hours"],
+            "prioritize": policy["prioritize"],
+            "stop_on_host_hit": policy["stop_on_host_hit"],
+            "stop_on_poc_hit": policy["stop_on_poc_hit"],
+            "max_hits": policy["max_hits"],
+            "time_budget_seconds": policy["time_budget_seconds"],
+            "dispatch_mode": policy["dispatch_mode"],
+            "rescan_of": task_id,
+        }
+        if previous.get("task_type") == "nuclei_scan":
+            return self.create_nuclei_task(
+                template_paths=template_paths if template_paths else config.get("template_paths") or [],
+                **options,
+            )
+        return self.create_task(poc_ids=poc_ids if poc_ids else config.get("poc_ids") or [], **options)
+
     def start_task(self, task_id: int):
         """启动后台任务线程"""
         with self._lock:
@@ -237,7 +536,7 @@ class BatchTaskService:
             if thread and thread.is_alive():
                 return
 
-            cancel_event = self._cancel_events.get(task_id) or threading.Event()
+            cancel_event = self._cancel_events.get(task_id) or CancellationToken()
             self._cancel_events[task_id] = cancel_event
 
             worker = threading.Thread(
@@ -285,10 +584,10 @@ class BatchTaskService:
         elif result_filter == "clean":
             query += " AND status = 'completed' AND vulnerable_items = 0 AND failed_items = 0"
 
-        if keyword:
-            pattern = f"%{keyword.strip()}%"
-            query += " AND (CAST(id AS TEXT) LIKE ? OR config_json LIKE ?)"
-            params.extend([pattern, pattern])
+        if keyword and keyword.strip():
+            keyword_clause, keyword_params = self._build_task_keyword_filter(keyword.strip())
+            query += f" AND {keyword_clause}"
+            params.extend(keyword_params)
 
         count_query = f"SELECT COUNT(*) FROM ({query})"
         query += f" ORDER BY {sort_field} {sort_direction}, id DESC LIMIT ? OFFSET ?"
@@ -332,9 +631,24 @@ class BatchTaskService:
             params.append(status)
 
         if keyword:
-            query += " AND (i.target_url LIKE ? OR p.vuln_name LIKE ? OR p.vuln_type LIKE ?)"
+            # 关键字先在本任务的目标/POC 归一化表（几百行以内）中匹配，再走 (task_id, target_url|poc_id) 索引取子任务
             pattern = f"%{keyword}%"
-            params.extend([pattern, pattern, pattern])
+            query += """
+                AND (
+                    i.target_url IN (
+                        SELECT target_url FROM batch_task_targets WHERE task_id = ? AND target_url LIKE ?
+                    )
+                    OR i.poc_id IN (
+                        SELECT poc_id FROM batch_task_pocs
+                        WHERE task_id = ? AND engine_type = 'poc' AND (vuln_name LIKE ? OR vuln_type LIKE ?)
+                    )
+                    OR i.template_path IN (
+                        SELECT template_path FROM batch_task_pocs
+                        WHERE task_id = ? AND engine_type = 'nuclei' AND template_path LIKE ?
+                    )
+                )
+            """
+            params.extend([task_id, pattern, task_id, pattern, pattern, task_id, pattern])
 
         count_params = list(params)
         count_query = f"SELECT COUNT(*) FROM ({query})"
@@ -350,6 +664,62 @@ class BatchTaskService:
 
         return {"total": total, "items": rows}
 
+    def iter_task_items(
+        self,
+        task_id: int,
+        status: Optional[str] = None,
+        page_size: Optional[int] = None,
+        include_poc: bool = True,
+        after_id: int = 0,
+    ) -> Iterator[Dict]:
+        """
+        按 id 键集分页逐页读取子任务
+
+        每页单独取连接并立即释放，不持有长事务；内存占用只与页大小有关。
+        """
+        page_size = max(int(page_size or self.ITEM_PAGE_SIZE), 1)
+        if include_poc:
+            query = """
+                SELECT i.*, p.vuln_name, p.vuln_type, p.poc_type
+                FROM batch_task_items i
+                LEFT JOIN poc_records p ON p.id = i.poc_id
+                WHERE i.task_id = ? AND i.id > ?
+            """
+        else:
+            query = """
+                SELECT i.*
+                FROM batch_task_items i
+                WHERE i.task_id = ? AND i.id > ?
+            """
+        filters: List = []
+        if status:
+            query += " AND i.status = ?"
+            filters.append(status)
+        query += " ORDER BY i.id ASC LIMIT ?"
+
+        last_id = after_id
+        while True:
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, [task_id, last_id, *filters, page_size])
+                rows = [dict(row) for row in cursor.fetchall()]
+            for row in rows:
+                yield self._serialize_item_row(row)
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def count_task_items(self, task_id: int, status: Optional[str] = None) -> int:
+        query = "SELECT COUNT(*) FROM batch_task_items WHERE task_id = ?"
+        params: List = [task_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchone()[0]
+
     def get_task_item_detail(self, task_id: int, item_id: int) -> Optional[Dict]:
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
@@ -368,7 +738,14 @@ class BatchTaskService:
 
             item = self._serialize_item_row(dict(row))
             detail_file = item.get("detail_file")
-            if detail_file:
+            if is_segment_locator(detail_file):
+                try:
+                    item["detail"] = self._detail_store.read(detail_file, item_id)
+                except (OSError, ValueError, DetailStoreError) as exc:
+                    logger.warning(f"读取批量任务详情记录失败: item={item_id}, error={exc}")
+                    item["detail"] = {"success": False, "error": f"读取详情记录失败: {exc}"}
+            elif detail_file:
+                # 兼容旧版逐条 JSON 详情文件
                 detail_path = Path(detail_file)
                 if detail_path.exists():
                     try:
@@ -392,7 +769,7 @@ class BatchTaskService:
             return False
 
         with self._lock:
-            event = self._cancel_events.get(task_id) or threading.Event()
+            event = self._cancel_events.get(task_id) or CancellationToken()
             event.set()
             self._cancel_events[task_id] = event
 
@@ -419,145 +796,1497 @@ class BatchTaskService:
         self._refresh_task_stats(task_id)
         return True
 
-    def _run_task(self, task_id: int, cancel_event: threading.Event):
-        try:
-            task = self.get_task(task_id)
-            if not task:
-                return
+    def _run_task(self, task_id: int, cancel_event: threading.Event):
+        try:
+            task = self.get_task(task_id)
+            if not task:
+                return
+
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE batch_tasks
+                    SET status = 'running', started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+                    WHERE id = ? AND status IN ('pending', 'running')
+                    """,
+                    (task_id,),
+                )
+
+            policy = self._get_execution_policy(task)
+            fingerprints: Dict[Tuple[str, str], Optional[str]] = {}
+            config = task.get("config_json") if isinstance(task.get("config_json"), dict) else {}
+            if config.get("rescan_of") and not cancel_event.is_set():
+                self._apply_rescan_carry_over(task_id, config["rescan_of"])
+            if policy["use_result_cache"] and not cancel_event.is_set():
+                self._apply_result_cache(task_id, policy, fingerprints)
+            if not cancel_event.is_set():
+                try:
+                    self._prepare_task_pocs(task_id)
+                except Exception as exc:
+                    logger.warning(f"批量任务 POC 预检失败，按原流程逐项执行: task={task_id}, error={exc}")
+            deprioritized_urls = set()
+            if policy["pre_probe"] and not cancel_event.is_set():
+                deprioritized_urls = self._apply_liveness_probe(task_id, task)
+            if policy["prioritize"] and not cancel_event.is_set():
+                try:
+                    self._prioritize_pending_items(task_id)
+                except Exception as exc:
+                    logger.warning(f"子任务优先级评分失败，按创建顺序执行: task={task_id}, error={exc}")
+            early_stop = self._build_early_stop(task)
+            if early_stop.enabled and not cancel_event.is_set():
+                self._seed_early_stop(task_id, early_stop)
+            early_stop.start()
+            if policy["dispatch_mode"] == "workers":
+                self._coordinate_workers(task_id, cancel_event, early_stop)
+            else:
+                self._dispatch_locally(task_id, task, cancel_event, deprioritized_urls, fingerprints, early_stop)
+            self._finalize_task(task_id, cancel_event.is_set())
+            try:
+                self._maybe_train_detail_dictionary(task_id, task.get("task_type"))
+            except Exception as exc:
+                logger.warning(f"训练详情压缩字典失败: task={task_id}, error={exc}")
+        finally:
+            with self._lock:
+                self._worker_threads.pop(task_id, None)
+                self._cancel_events.pop(task_id, None)
+
+    def _prepare_task_pocs(self, task_id: int) -> int:
+        """
+        派发前预检任务涉及的 Python POC：编译、依赖检查与入口调用方式解析各做一次并写入编译缓存，
+        启用隔离进程池时同时让工作进程预编译。预检失败的 POC 不再逐个目标执行，
+        其待执行子任务直接以同一失败结果结束，返回这样结束的子任务数。
+        """
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT DISTINCT poc_id
+                FROM batch_task_items
+                WHERE task_id = ? AND status = 'pending' AND COALESCE(engine_type, 'poc') = 'poc'
+                """,
+                (task_id,),
+            )
+            poc_ids = [row["poc_id"] for row in cursor.fetchall()]
+
+        failed_items = 0
+        prepared_paths = []
+        for poc_id in poc_ids:
+            record = poc_library_service.get_poc_by_id(poc_id)
+            failure = prepare_python_poc(record)
+            if failure is not None:
+                logger.warning(f"POC 预检未通过，跳过逐目标执行: task={task_id}, poc={poc_id}, error={failure.get('error')}")
+                failed_items += self._fail_pending_poc_items(task_id, poc_id, failure)
+            elif record and record.get("poc_type") == "python" and record.get("poc_file_path"):
+                prepared_paths.append(record["poc_file_path"])
+
+        if prepared_paths and poc_process_pool.enabled:
+            poc_process_pool.preload(prepared_paths)
+        if failed_items:
+            self._refresh_task_stats(task_id)
+        return failed_items
+
+    def _fail_pending_poc_items(self, task_id: int, poc_id: int, outcome: Dict) -> int:
+        """以同一失败结果批量结束某个 POC 的待执行子任务，不写逐条详情文件，详情取自 result_json。"""
+        result = outcome.get("result") or {}
+        classification = outcome.get("classification") or classify_execution_outcome(outcome)
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE batch_task_items
+                SET status = 'failed', vulnerable = 0, reason = ?, error = ?, result_json = ?, detail_file = NULL,
+                    failure_category = ?, failure_code = ?, failure_stage = ?, retryable = ?,
+                    started_at = COALESCE(started_at, CURRENT_TIMESTAMP), finished_at = CURRENT_TIMESTAMP
+                WHERE task_id = ? AND poc_id = ? AND status = 'pending' AND COALESCE(engine_type, 'poc') = 'poc'
+                """,
+                (
+                    result.get("reason") or outcome.get("error"),
+                    outcome.get("error"),
+                    json.dumps(outcome, ensure_ascii=False, default=str),
+                    classification.get("failure_category"),
+                    classification.get("failure_code"),
+                    classification.get("failure_stage"),
+                    int(bool(classification.get("retryable"))),
+                    task_id,
+                    poc_id,
+                ),
+            )
+            return cursor.rowcount
+
+    def _dispatch_locally(
+        self,
+        task_id: int,
+        task: Dict,
+        cancel_event: threading.Event,
+        deprioritized_urls: set,
+        fingerprints: Dict[Tuple[str, str], Optional[str]],
+        early_stop: EarlyStopController,
+    ):
+        """
+        在 API 进程内按主机通道并发执行待执行子任务
+
+        支持 scan_many 的 POC 的子任务在同一优先级流中攒成分块，与逐项子任务交替派发：
+        分块最多占用 SCAN_MANY_SLOT_RATIO 的并发槽位，熔断主机的子任务交回逐项派发处理，
+        每个结果同样计入主机熔断与提前终止规则。
+        """
+        concurrency = task.get("concurrency") or self.DEFAULT_CONCURRENCY
+        chunk_slots = max(int(concurrency * self.SCAN_MANY_SLOT_RATIO), 1)
+        breaker = self._build_host_breaker(task)
+        deferred_items: Dict[str, deque] = {}
+        ready_chunks: deque = deque()
+        lanes = HostLaneScheduler(self._iter_dispatch_units(task_id, deprioritized_urls, ready_chunks), concurrency)
+        host_state = (lanes, deferred_items, breaker)
+
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"batch-task-{task_id}")
+        futures = {}
+        chunk_results: "queue.Queue[Tuple[int, Optional[Dict], Optional[Dict]]]" = queue.Queue()
+        active_chunks: Dict[int, Dict] = {}
+        cancellation_requested = False
+        try:
+            while True:
+                if cancel_event.is_set():
+                    cancellation_requested = True
+                    break
+                if early_stop.check_time_budget():
+                    self._release_blocked_chunk_items(active_chunks, early_stop)
+                    self._apply_early_stop(task_id, early_stop, {"task": early_stop.stop_reason})
+
+                while len(futures) + len(active_chunks) < concurrency and not early_stop.stopped:
+                    if len(active_chunks) < chunk_slots:
+                        chunk_items = self._next_dispatchable_chunk(ready_chunks, lanes, breaker, early_stop)
+                        if chunk_items:
+                            self._start_scan_many_chunk(chunk_items, executor, cancel_event, active_chunks, chunk_results)
+                            continue
+
+                    lane = lanes.acquire_lane()
+                    if lane is None:
+                        break
+                    item = self._next_dispatchable_item(task_id, lanes, lane, deferred_items, breaker, early_stop)
+                    if item is None:
+                        lanes.release_lane(lane)
+                        break
+
+                    self._mark_item_running(item["id"])
+                    session = lanes.session_for(lane, extract_host_key(item["target_url"]))
+                    future = executor.submit(self._execute_in_lane, item, session, cancel_event)
+                    futures[future] = (item, lane)
+
+                if not futures and not active_chunks:
+                    if not deferred_items or early_stop.stopped:
+                        break
+                    # 仅剩熔断主机的待探测子任务，等待冷却时间到达
+                    wait_seconds = min(breaker.seconds_until_probe(host) for host in deferred_items)
+                    cancel_event.wait(min(max(wait_seconds, 0.05), 0.5))
+                    continue
+
+                received = []
+                if futures:
+                    # 有分块在执行时缩短等待，分块回传的结果（提前终止）不被逐项子任务拖住
+                    done, _ = wait(list(futures.keys()), return_when=FIRST_COMPLETED, timeout=0.05 if active_chunks else 0.5)
+                else:
+                    done = set()
+                    try:
+                        received.append(chunk_results.get(timeout=0.5))
+                    except queue.Empty:
+                        pass
+                while True:
+                    try:
+                        received.append(chunk_results.get_nowait())
+                    except queue.Empty:
+                        break
+                for chunk_id, item, outcome in received:
+                    self._handle_chunk_result(
+                        task_id, chunk_id, item, outcome, active_chunks, host_state, fingerprints, early_stop
+                    )
+
+                for future in done:
+                    item, lane = futures.pop(future)
+                    item_id = item["id"]
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logger.error(f"批量子任务执行失败: task={task_id}, item={item_id}, error={e}")
+                        outcome = {
+                            "success": False,
+                            "error": str(e),
+                            "target_url": None,
+                            "result": {
+                                "vulnerable": False,
+                                "reason": "批量任务执行异常",
+                                "details": str(e)
+                            }
+                        }
+                    classification = self._store_item_result(item_id, outcome)
+                    if classification is not None and outcome.get("success"):
+                        self._remember_item_result(item, outcome, fingerprints)
+                        triggered = early_stop.record(item, bool((outcome.get("result") or {}).get("vulnerable")))
+                        if triggered:
+                            self._release_blocked_chunk_items(active_chunks, early_stop)
+                            self._apply_early_stop(task_id, early_stop, triggered)
+                    self._record_host_outcome(task_id, item, classification, lanes, deferred_items, breaker)
+                    lanes.release_lane(lane)
+                    self._refresh_task_stats(task_id)
+
+            if cancellation_requested and futures:
+                self._drain_cancelled_futures(task_id, futures)
+        finally:
+            # 分块中的子任务已由 cancel_task 标记，通知工作线程停止迭代 scan_many 即可
+            for chunk in active_chunks.values():
+                chunk["stop"].set()
+            # 取消时不等待仍卡住的线程（其结果会因任务已取消被丢弃），避免占住调度线程
+            executor.shutdown(wait=not cancellation_requested, cancel_futures=True)
+
+        lanes.close()
+
+    def _iter_dispatch_units(self, task_id: int, deprioritized_urls: Optional[set], ready_chunks: deque) -> Iterator[Dict]:
+        """
+        在 _iter_pending_items 的优先级流上分出 scan_many 分块
+
+        逐项执行的子任务照常产出；支持 scan_many 的 POC 的子任务按 POC 攒块，攒满或跨度超过
+        SCAN_MANY_MAX_SPAN 时放入 ready_chunks。被延后的目标在第二轮单独成块，排在其余分块之后。
+        """
+        deprioritized_urls = deprioritized_urls or set()
+        supports: Dict[int, bool] = {}
+        live_items = (
+            item for item in self._iter_pending_by_priority(task_id) if item["target_url"] not in deprioritized_urls
+        )
+        yield from self._group_scan_many_items(live_items, ready_chunks, supports)
+        if deprioritized_urls:
+            dead_items = (
+                item for item in self._iter_pending_by_priority(task_id) if item["target_url"] in deprioritized_urls
+            )
+            yield from self._group_scan_many_items(dead_items, ready_chunks, supports)
+
+    def _group_scan_many_items(self, items: Iterator[Dict], ready_chunks: deque, supports: Dict[int, bool]) -> Iterator[Dict]:
+        if self.SCAN_MANY_CHUNK_SIZE < self.SCAN_MANY_MIN_TARGETS:
+            yield from items
+            return
+
+        buffers: Dict[int, Tuple[int, List[Dict]]] = {}
+        chunked_pocs: set = set()
+        for position, item in enumerate(items):
+            poc_id = item.get("poc_id")
+            if (item.get("engine_type") or "poc") != "poc" or not self._supports_scan_many(poc_id, supports):
+                yield item
+            else:
+                buffer = buffers.setdefault(poc_id, (position, []))[1]
+                buffer.append(item)
+                if len(buffer) >= self.SCAN_MANY_CHUNK_SIZE:
+                    ready_chunks.append(buffers.pop(poc_id)[1])
+                    chunked_pocs.add(poc_id)
+
+            for buffered_poc, (first_position, buffer) in list(buffers.items()):
+                if position - first_position >= self.SCAN_MANY_MAX_SPAN:
+                    del buffers[buffered_poc]
+                    if len(buffer) >= self.SCAN_MANY_MIN_TARGETS or buffered_poc in chunked_pocs:
+                        ready_chunks.append(buffer)
+                        chunked_pocs.add(buffered_poc)
+                    else:
+                        yield from buffer
+
+        for poc_id, (_, buffer) in buffers.items():
+            # 不足最小目标数的 POC 逐项执行；已成过块的 POC 的尾块照常走 scan_many
+            if len(buffer) >= self.SCAN_MANY_MIN_TARGETS or poc_id in chunked_pocs:
+                ready_chunks.append(buffer)
+            else:
+                yield from buffer
+
+    def _supports_scan_many(self, poc_id: int, supports: Dict[int, bool]) -> bool:
+        if poc_id not in supports:
+            try:
+                supports[poc_id] = poc_supports_scan_many(poc_library_service.get_poc_by_id(poc_id))
+            except Exception as exc:
+                logger.warning(f"检查 POC 是否支持 scan_many 失败，按逐项执行: poc={poc_id}, error={exc}")
+                supports[poc_id] = False
+        return supports[poc_id]
+
+    def _next_dispatchable_chunk(
+        self,
+        ready_chunks: deque,
+        lanes: HostLaneScheduler,
+        breaker: HostCircuitBreaker,
+        early_stop: EarlyStopController,
+    ) -> Optional[List[Dict]]:
+        """
+        取下一个可派发的 scan_many 分块
+
+        已被提前终止的子任务直接丢弃（数据库中已标记跳过）；熔断主机的子任务交回逐项派发，
+        由 _next_dispatchable_item 延后到恢复探测或跳过。
+        """
+        while ready_chunks:
+            items = []
+            for item in ready_chunks.popleft():
+                if early_stop.blocks(item):
+                    continue
+                if breaker.allows(extract_host_key(item["target_url"])):
+                    items.append(item)
+                else:
+                    lanes.append(item)
+            if items:
+                return items
+        return None
+
+    def _start_scan_many_chunk(
+        self,
+        items: List[Dict],
+        executor: ThreadPoolExecutor,
+        cancel_event: threading.Event,
+        active_chunks: Dict[int, Dict],
+        chunk_results: "queue.Queue",
+    ):
+        chunk_id = items[0]["id"]
+        for item in items:
+            self._mark_item_running(item["id"])
+        stop_event = threading.Event()
+        active_chunks[chunk_id] = {"remaining": {item["id"]: item for item in items}, "stop": stop_event}
+        token = cancel_event.child() if isinstance(cancel_event, CancellationToken) else None
+        executor.submit(self._execute_scan_many_chunk, chunk_id, items, token, stop_event, chunk_results)
+
+    def _handle_chunk_result(
+        self,
+        task_id: int,
+        chunk_id: int,
+        item: Optional[Dict],
+        outcome: Optional[Dict],
+        active_chunks: Dict[int, Dict],
+        host_state: Tuple[HostLaneScheduler, Dict[str, deque], HostCircuitBreaker],
+        fingerprints: Dict[Tuple[str, str], Optional[str]],
+        early_stop: EarlyStopController,
+    ):
+        """落库分块回传的单个结果；item 为 None 表示分块结束，未返回结果的子任务交回逐项派发。"""
+        lanes, deferred_items, breaker = host_state
+        chunk = active_chunks.get(chunk_id)
+        if item is None:
+            if chunk is not None:
+                self._finish_scan_many_chunk(task_id, active_chunks.pop(chunk_id), lanes)
+            return
+        if chunk is None or chunk["remaining"].pop(item["id"], None) is None:
+            # 已因提前终止被放回待执行的子任务，丢弃迟到的结果
+            return
+
+        classification = self._store_item_result(item["id"], outcome)
+        if classification is not None and outcome.get("success"):
+            self._remember_item_result(item, outcome, fingerprints)
+            triggered = early_stop.record(item, bool((outcome.get("result") or {}).get("vulnerable")))
+            if triggered:
+                self._release_blocked_chunk_items(active_chunks, early_stop)
+                self._apply_early_stop(task_id, early_stop, triggered)
+        self._record_host_outcome(task_id, item, classification, lanes, deferred_items, breaker)
+        self._refresh_task_stats(task_id)
+
+    def _execute_scan_many_chunk(
+        self,
+        chunk_id: int,
+        items: List[Dict],
+        token: Optional[CancellationToken],
+        stop_event: threading.Event,
+        results: "queue.Queue",
+    ):
+        """
+        在工作线程内执行一个分块，结果逐个放入队列，结束时放入 (chunk_id, None, None)。
+
+        目标按主机聚拢后交给 scan_many，分块绑定一个按主机保持连接的 keep-alive 会话。
+        """
+        items_by_host: Dict[str, List[Dict]] = {}
+        for item in items:
+            items_by_host.setdefault(extract_host_key(item["target_url"]), []).append(item)
+        items_by_url = {item["target_url"]: item for host_items in items_by_host.values() for item in host_items}
+        session = create_keepalive_session(host_count=len(items_by_host))
+        try:
+            with bind_session(session), bind_token(token):
+                logger.info(f"执行 scan_many 分块: poc={items[0]['poc_id']}, targets={len(items)}")
+                outcomes = poc_library_service.execute_poc_many(items[0]["poc_id"], list(items_by_url))
+                try:
+                    for target_url, outcome in outcomes:
+                        results.put((chunk_id, items_by_url[target_url], outcome))
+                        if stop_event.is_set():
+                            break
+                finally:
+                    outcomes.close()
+        except Exception as e:
+            logger.error(f"scan_many 分块执行失败: chunk={chunk_id}, error={e}")
+        finally:
+            session.close()
+            if token is not None:
+                token.close()
+            results.put((chunk_id, None, None))
+
+    def _release_blocked_chunk_items(self, active: Dict[int, Dict], early_stop: EarlyStopController):
+        """
+        提前终止触发时，把进行中分块里被新规则拦下的子任务放回待执行，随后由 _apply_early_stop 统一跳过；
+        整块都被拦下时通知工作线程停止迭代 scan_many。
+        """
+        for chunk in active.values():
+            blocked = [item_id for item_id, item in chunk["remaining"].items() if early_stop.blocks(item)]
+            for item_id in blocked:
+                chunk["remaining"].pop(item_id)
+            self._reset_items_pending(blocked)
+            if not chunk["remaining"]:
+                chunk["stop"].set()
+
+    def _finish_scan_many_chunk(self, task_id: int, chunk: Dict, lanes: HostLaneScheduler):
+        leftover = list(chunk["remaining"].values())
+        if leftover:
+            logger.warning(f"scan_many 分块未返回全部结果，剩余子任务改为逐项执行: task={task_id}, items={len(leftover)}")
+            self._reset_items_pending([item["id"] for item in leftover])
+            lanes.extendleft(reversed(leftover))
+
+    def _reset_items_pending(self, item_ids: List[int]):
+        if not item_ids:
+            return
+        with self.get_db_connection() as conn:
+            conn.executemany(
+                "UPDATE batch_task_items SET status = 'pending', started_at = NULL WHERE id = ? AND status = 'running'",
+                [(item_id,) for item_id in item_ids],
+            )
+
+    def _coordinate_workers(self, task_id: int, cancel_event: threading.Event, early_stop: EarlyStopController):
+        """
+        外部工作进程模式的协调循环
+
+        开放租约后子任务由工作进程领取执行，本线程只负责回收过期租约、应用提前终止规则与主机熔断、刷新统计，
+        直到没有待执行/执行中的子任务或任务被取消。任务并发上限与存活预探测的延后顺序由 lease_items 执行。
+        """
+        self._set_task_leases_open(task_id, True)
+        seen_hits: set = set()
+        breaker = self._build_host_breaker(self.get_task(task_id) or {})
+        host_feed = {"watermark": "", "seen": set(), "blocked": set()}
+        try:
+            while not cancel_event.is_set():
+                if early_stop.check_time_budget():
+                    self._apply_early_stop(task_id, early_stop, {"task": early_stop.stop_reason})
+                    self._set_task_leases_open(task_id, False)
+                self.reclaim_expired_leases(task_id)
+                if early_stop.enabled and not early_stop.stopped:
+                    self._feed_worker_hits(task_id, early_stop, seen_hits)
+                if breaker.enabled:
+                    self._feed_worker_host_outcomes(task_id, breaker, host_feed)
+                self._refresh_task_stats(task_id)
+                if not self._has_unfinished_items(task_id):
+                    break
+                cancel_event.wait(self.WORKER_POLL_INTERVAL)
+        finally:
+            self._set_task_leases_open(task_id, False)
+
+    def _feed_worker_hits(self, task_id: int, early_stop: EarlyStopController, seen_hits: set):
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, target_url, engine_type, poc_id, template_path
+                FROM batch_task_items
+                WHERE task_id = ? AND status = 'success' AND vulnerable = 1
+                ORDER BY id ASC
+                """,
+                (task_id,),
+            )
+            hits = [dict(row) for row in cursor.fetchall() if row["id"] not in seen_hits]
+        for item in hits:
+            seen_hits.add(item["id"])
+            triggered = early_stop.record(item, True)
+            if triggered:
+                self._apply_early_stop(task_id, early_stop, triggered)
+
+    def _feed_worker_host_outcomes(self, task_id: int, breaker: HostCircuitBreaker, host_feed: Dict):
+        """
+        把工作进程回报的结果计入主机熔断
+
+        熔断主机的 lease_quota 置 0 暂停领取；冷却到期时放行一个恢复探测，恢复后取消限制；
+        没有恢复机会的主机直接跳过其待执行子任务。
+        """
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, target_url, failure_category, failure_code, finished_at
+                FROM batch_task_items
+                WHERE task_id = ? AND lease_owner IS NOT NULL AND status IN ('success', 'failed')
+                  AND lease_expires_at IS NULL AND finished_at >= ?
+                ORDER BY finished_at ASC, id ASC
+                """,
+                (task_id, host_feed["watermark"]),
+            )
+            rows = [dict(row) for row in cursor.fetchall() if row["id"] not in host_feed["seen"]]
+
+        blocked: set = host_feed["blocked"]
+        for row in rows:
+            if row["finished_at"] > host_feed["watermark"]:
+                host_feed["watermark"] = row["finished_at"]
+                host_feed["seen"] = set()
+            host_feed["seen"].add(row["id"])
+            if row["failure_code"] == "worker_lease_expired":
+                # 工作进程失联与目标主机健康无关
+                continue
+            host = extract_host_key(row["target_url"])
+            host_state = breaker.record(host, {"failure_category": row["failure_category"]})
+            if host_state != "open":
+                if host in blocked:
+                    blocked.discard(host)
+                    self._set_host_lease_quota(task_id, host, None)
+                continue
+            if host not in blocked:
+                logger.warning(f"目标主机熔断，暂停工作进程领取: task={task_id}, host={host}")
+                blocked.add(host)
+            # 恢复探测失败时同样收回剩余额度
+            self._set_host_lease_quota(task_id, host, 0)
+            if not breaker.can_recover(host):
+                blocked.discard(host)
+                self._update_items_skipped(
+                    """
+                    task_id = ? AND status = 'pending'
+                    AND target_url IN (SELECT target_url FROM batch_task_targets WHERE task_id = ? AND host = ?)
+                    """,
+                    (task_id, task_id, host),
+                    breaker.skip_reason(host),
+                    build_skip_classification("network_error", "host_circuit_open"),
+                )
+                self._refresh_task_stats(task_id)
+
+        for host in list(blocked):
+            if breaker.try_acquire_probe(host):
+                logger.info(f"熔断主机恢复探测: task={task_id}, host={host}")
+                self._set_host_lease_quota(task_id, host, 1)
+
+    def _set_host_lease_quota(self, task_id: int, host: str, quota: Optional[int]):
+        with self.get_db_connection() as conn:
+            conn.execute(
+                "UPDATE batch_task_targets SET lease_quota = ? WHERE task_id = ? AND host = ?",
+                (quota, task_id, host),
+            )
+
+    def _set_task_leases_open(self, task_id: int, leases_open: bool):
+        with self.get_db_connection() as conn:
+            conn.execute("UPDATE batch_tasks SET leases_open = ? WHERE id = ?", (int(leases_open), task_id))
+
+    def _has_unfinished_items(self, task_id: int) -> bool:
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT 1 FROM batch_task_items WHERE task_id = ? AND status IN ('pending', 'running') LIMIT 1",
+                (task_id,),
+            )
+            return cursor.fetchone() is not None
+
+    def _resolve_lease_seconds(self, lease_seconds: Optional[float]) -> float:
+        seconds = self.WORKER_LEASE_SECONDS if lease_seconds is None else float(lease_seconds)
+        if seconds <= 0:
+            raise ValueError("租约时长必须大于 0 秒")
+        return min(seconds, self.WORKER_MAX_LEASE_SECONDS)
+
+    def lease_items(self, worker_id: str, limit: int = 1, lease_seconds: Optional[float] = None) -> List[Dict]:
+        """
+        工作进程领取待执行子任务
+
+        只从已开放租约的运行中任务领取，按任务创建顺序、存活预探测结果（失活目标延后）、优先级排序；
+        每个任务执行中的子任务不超过其 concurrency，熔断主机按 batch_task_targets.lease_quota 暂停领取
+        或只放行恢复探测。领取与标记在同一个 IMMEDIATE 事务内完成，多个工作进程并发领取不会拿到同一个子任务。
+        """
+        if not worker_id:
+            raise ValueError("worker_id 不能为空")
+        limit = max(1, min(int(limit or 1), self.WORKER_MAX_LEASE_BATCH))
+        expires_at = time.time() + self._resolve_lease_seconds(lease_seconds)
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                """
+                SELECT i.id, i.task_id, i.poc_id, i.target_url, i.engine_type, i.template_path, i.priority,
+                       t.concurrency, tt.host, tt.lease_quota,
+                       (SELECT COUNT(*) FROM batch_task_items r WHERE r.task_id = i.task_id AND r.status = 'running')
+                           AS running_items
+                FROM batch_task_items i
+                JOIN batch_tasks t ON t.id = i.task_id
+                LEFT JOIN batch_task_targets tt ON tt.task_id = i.task_id AND tt.target_url = i.target_url
+                WHERE t.leases_open = 1 AND t.status = 'running' AND i.status = 'pending'
+                  AND (tt.lease_quota IS NULL OR tt.lease_quota > 0)
+                  AND (SELECT COUNT(*) FROM batch_task_items r WHERE r.task_id = i.task_id AND r.status = 'running')
+                      < t.concurrency
+                ORDER BY i.task_id ASC, COALESCE(tt.alive, 1) DESC, i.priority DESC, i.id ASC
+                LIMIT ?
+                """,
+                (limit * self.WORKER_LEASE_CANDIDATE_FACTOR,),
+            )
+            candidates = [dict(row) for row in cursor.fetchall()]
+
+            items = []
+            task_slots: Dict[int, int] = {}
+            host_quotas: Dict[Tuple[int, str], int] = {}
+            for row in candidates:
+                if len(items) >= limit:
+                    break
+                task_id = row["task_id"]
+                slots = task_slots.setdefault(task_id, row["concurrency"] - row["running_items"])
+                if slots <= 0:
+                    continue
+                quota_key = (task_id, row["host"])
+                if row["lease_quota"] is not None:
+                    quota = host_quotas.setdefault(quota_key, row["lease_quota"])
+                    if quota <= 0:
+                        continue
+                    host_quotas[quota_key] = quota - 1
+                task_slots[task_id] = slots - 1
+                items.append(
+                    {key: row[key] for key in ("id", "task_id", "poc_id", "target_url", "engine_type", "template_path", "priority")}
+                )
+            cursor.executemany(
+                "UPDATE batch_task_targets SET lease_quota = ? WHERE task_id = ? AND host = ?",
+                [(quota, task_id, host) for (task_id, host), quota in host_quotas.items()],
+            )
+            cursor.executemany(
+                """
+                UPDATE batch_task_items
+                SET status = 'running', started_at = CURRENT_TIMESTAMP,
+                    lease_owner = ?, lease_expires_at = ?, lease_attempts = lease_attempts + 1
+                WHERE id = ? AND status = 'pending'
+                """,
+                [(worker_id, expires_at, item["id"]) for item in items],
+            )
+        for item in items:
+            item["lease_expires_at"] = expires_at
+        if items:
+            logger.info(f"工作进程领取子任务: worker={worker_id}, count={len(items)}")
+        return items
+
+    def heartbeat_items(self, worker_id: str, item_ids: List[int], lease_seconds: Optional[float] = None) -> List[int]:
+        """续约工作进程持有的子任务，返回仍由其持有的子任务；未返回的已被取消或回收，应停止执行。"""
+        ids = [int(item_id) for item_id in item_ids or []]
+        if not ids:
+            return []
+        expires_at = time.time() + self._resolve_lease_seconds(lease_seconds)
+        held: List[int] = []
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(ids), self.RESULT_CACHE_LOOKUP_CHUNK):
+                chunk = ids[start:start + self.RESULT_CACHE_LOOKUP_CHUNK]
+                placeholders = ", ".join("?" for _ in chunk)
+                condition = f"id IN ({placeholders}) AND lease_owner = ? AND status = 'running'"
+                cursor.execute(
+                    f"UPDATE batch_task_items SET lease_expires_at = ? WHERE {condition}",
+                    (expires_at, *chunk, worker_id),
+                )
+                cursor.execute(f"SELECT id FROM batch_task_items WHERE {condition}", (*chunk, worker_id))
+                held.extend(row["id"] for row in cursor.fetchall())
+        return held
+
+    def complete_leased_item(self, worker_id: str, item_id: int, outcome: Dict) -> bool:
+        """
+        工作进程回报执行结果
+
+        租约已过期被回收或转给其他工作进程时丢弃该结果并返回 False；任务已取消时结果按取消记录。
+        落库的 UPDATE 同样以租约归属为条件，检查之后才被回收转租的子任务不会被迟到结果覆盖。
+        """
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM batch_task_items WHERE id = ? AND lease_owner = ?",
+                (item_id, worker_id),
+            )
+            row = cursor.fetchone()
+        item = dict(row) if row else None
+        if item is None or item["status"] not in ("running", "cancelled"):
+            logger.warning(f"丢弃租约已失效的工作进程结果: worker={worker_id}, item={item_id}")
+            return False
+
+        try:
+            classification = self._store_item_result(item_id, outcome or {}, lease_owner=worker_id)
+        except LeaseLostError:
+            logger.warning(f"丢弃租约已失效的工作进程结果: worker={worker_id}, item={item_id}")
+            return False
+        if classification is not None and (outcome or {}).get("success"):
+            self._remember_item_result(item, outcome, {})
+        self._refresh_task_stats(item["task_id"])
+        return classification is not None
+
+    def release_leased_items(self, worker_id: str, item_ids: List[int]) -> int:
+        """工作进程退出前归还未开始执行的子任务，不计入租约次数。"""
+        ids = [int(item_id) for item_id in item_ids or []]
+        if not ids:
+            return 0
+        placeholders = ", ".join("?" for _ in ids)
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                UPDATE batch_task_items
+                SET status = 'pending', started_at = NULL, lease_owner = NULL, lease_expires_at = NULL,
+                    lease_attempts = MAX(lease_attempts - 1, 0)
+                WHERE id IN ({placeholders}) AND lease_owner = ? AND status = 'running'
+                """,
+                (*ids, worker_id),
+            )
+            return cursor.rowcount
+
+    def reclaim_expired_leases(self, task_id: Optional[int] = None, now: Optional[float] = None) -> int:
+        """
+        回收过期租约（工作进程崩溃或失联）
+
+        未超过最大租约次数的子任务重新置为待执行，超过的直接记为失败，避免毒丸子任务反复拖垮工作进程。
+        """
+        now = time.time() if now is None else now
+        scope = "" if task_id is None else " AND task_id = ?"
+        scope_params: Tuple = () if task_id is None else (task_id,)
+        expired = f"status = 'running' AND lease_expires_at IS NOT NULL AND lease_expires_at < ?{scope}"
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                UPDATE batch_task_items
+                SET status = 'failed', vulnerable = 0, lease_expires_at = NULL,
+                    reason = '工作进程多次失联，子任务放弃执行', error = '工作进程多次失联，子任务放弃执行',
+                    failure_category = 'environment_error', failure_code = 'worker_lease_expired',
+                    failure_stage = 'scheduling', retryable = 1, finished_at = CURRENT_TIMESTAMP
+                WHERE {expired} AND lease_attempts >= ?
+                """,
+                (now, *scope_params, self.WORKER_MAX_LEASE_ATTEMPTS),
+            )
+            abandoned = cursor.rowcount
+            cursor.execute(
+                f"""
+                UPDATE batch_task_items
+                SET status = 'pending', started_at = NULL, lease_owner = NULL, lease_expires_at = NULL
+                WHERE {expired}
+                """,
+                (now, *scope_params),
+            )
+            reclaimed = cursor.rowcount
+        if reclaimed or abandoned:
+            logger.warning(f"回收过期租约: task={task_id}, reclaimed={reclaimed}, abandoned={abandoned}")
+        return reclaimed + abandoned
+
+    def _execute_in_lane(self, item: Dict, session, cancel_event: Optional[threading.Event] = None) -> Dict:
+        """在通道绑定的主机会话内执行子任务，同一主机的 POC 复用 keep-alive 连接。"""
+        token = cancel_event.child() if isinstance(cancel_event, CancellationToken) else None
+        try:
+            return self.execute_item(item, session, token)
+        finally:
+            if token is not None:
+                token.close()
+
+    def execute_item(self, item: Dict, session=None, token: Optional[CancellationToken] = None) -> Dict:
+        """在给定主机会话与取消令牌下执行单个子任务，调度线程与外部工作进程共用。"""
+        with bind_session(session), bind_token(token):
+            return self._execute_task_item(item)
+
+    def _drain_cancelled_futures(self, task_id: int, futures: Dict):
+        """取消后最多等待宽限时间收尾进行中的子任务，超时未结束的直接标记为已取消。"""
+        done, not_done = wait(list(futures.keys()), timeout=self.CANCEL_GRACE_SECONDS)
+        for future, (item, _) in futures.items():
+            item_id = item["id"]
+            if future in not_done:
+                logger.warning(f"子任务未在取消宽限时间内结束，放弃等待: task={task_id}, item={item_id}")
+                self._store_item_cancelled(item_id, {"error": "任务已取消，子任务被强制中断"})
+                continue
+            try:
+                outcome = future.result()
+            except Exception as e:
+                logger.warning(f"取消中的子任务收尾失败: task={task_id}, item={item_id}, error={e}")
+                outcome = {
+                    "success": False,
+                    "error": str(e),
+                    "result": {
+                        "vulnerable": False,
+                        "reason": "任务已取消",
+                        "details": str(e),
+                    },
+                }
+            self._store_item_cancelled(item_id, outcome)
+        futures.clear()
+        self._refresh_task_stats(task_id)
+
+    def _execute_task_item(self, item: Dict) -> Dict:
+        item_id = item["id"]
+        target_url = item["target_url"]
+        engine_type = item.get("engine_type") or "poc"
+
+        if engine_type == "nuclei":
+            template_path = item.get("template_path")
+            logger.info(f"执行 Nuclei 批量子任务: item={item_id}, template={template_path}, url={target_url}")
+            return self._execute_nuclei_task_item(target_url, template_path)
+
+        poc_id = item["poc_id"]
+        logger.info(f"执行批量子任务: item={item_id}, poc={poc_id}, url={target_url}")
+        return poc_library_service.execute_poc(poc_id, target_url)
+
+    def _execute_nuclei_task_item(self, target_url: str, template_path: str) -> Dict:
+        outcome = nuclei_service.scan_single(target_url, template_path, timeout=60)
+        if not outcome.get("success"):
+            return {
+                "success": False,
+                "error": outcome.get("error") or "Nuclei 扫描失败",
+                "target_url": target_url,
+                "result": {
+                    "vulnerable": False,
+                    "reason": outcome.get("error") or "Nuclei 扫描失败",
+                    "details": outcome,
+                },
+            }
+
+        vulnerable = bool(outcome.get("vulnerable"))
+        total_findings = int(outcome.get("total_findings") or 0)
+        reason = (
+            f"Nuclei 命中 {total_findings} 条结果"
+            if vulnerable
+            else "Nuclei 未发现漏洞"
+        )
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {
+                "vulnerable": vulnerable,
+                "reason": reason,
+                "details": {
+                    "engine_type": "nuclei",
+                    "template_path": template_path,
+                    "findings": outcome.get("findings") or [],
+                    "total_findings": total_findings,
+                    "errors": outcome.get("errors"),
+                },
+            },
+        }
+
+    def _build_execution_policy(
+        self,
+        host_failure_threshold: Optional[int] = None,
+        host_recovery_probe: Optional[bool] = None,
+        pre_probe: bool = False,
+        dead_target_policy: Optional[str] = None,
+        use_result_cache: bool = False,
+        result_cache_max_age_hours: Optional[float] = None,
+        prioritize: bool = True,
+        stop_on_host_hit: bool = False,
+        stop_on_poc_hit: bool = False,
+        max_hits: Optional[int] = None,
+        time_budget_seconds: Optional[float] = None,
+        dispatch_mode: Optional[str] = None,
+    ) -> Dict:
+        threshold = self.HOST_FAILURE_THRESHOLD if host_failure_threshold is None else host_failure_threshold
+        resolved_dead_policy = (dead_target_policy or "skip").lower()
+        if resolved_dead_policy not in self.DEAD_TARGET_POLICIES:
+            raise ValueError(f"不支持的失活目标处理策略: {dead_target_policy}，仅支持 skip/deprioritize")
+        max_age = self.RESULT_CACHE_MAX_AGE_HOURS if result_cache_max_age_hours is None else float(result_cache_max_age_hours)
+        if max_age <= 0:
+            raise ValueError("结果缓存有效期必须大于 0 小时")
+        if max_hits is not None and int(max_hits) < 1:
+            raise ValueError("命中预算必须大于 0")
+        if time_budget_seconds is not None and float(time_budget_seconds) <= 0:
+            raise ValueError("时间预算必须大于 0 秒")
+        resolved_dispatch_mode = (dispatch_mode or "local").lower()
+        if resolved_dispatch_mode not in self.DISPATCH_MODES:
+            raise ValueError(f"不支持的派发模式: {dispatch_mode}，仅支持 local/workers")
+        return {
+            "host_failure_threshold": max(int(threshold), 0),
+            "host_recovery_probe": True if host_recovery_probe is None else bool(host_recovery_probe),
+            "host_recovery_interval": self.HOST_RECOVERY_INTERVAL,
+            "pre_probe": bool(pre_probe),
+            "dead_target_policy": resolved_dead_policy,
+            "use_result_cache": bool(use_result_cache),
+            "result_cache_max_age_hours": max_age,
+            "prioritize": bool(prioritize),
+            "stop_on_host_hit": bool(stop_on_host_hit),
+            "stop_on_poc_hit": bool(stop_on_poc_hit),
+            "max_hits": None if max_hits is None else int(max_hits),
+            "time_budget_seconds": None if time_budget_seconds is None else float(time_budget_seconds),
+            "dispatch_mode": resolved_dispatch_mode,
+        }
+
+    def _get_execution_policy(self, task: Dict) -> Dict:
+        config = task.get("config_json") if isinstance(task.get("config_json"), dict) else {}
+        policy = self._build_execution_policy()
+        policy.update(config.get("execution_policy") or {})
+        return policy
+
+    def _iter_pending_items(self, task_id: int, deprioritized_urls: Optional[set] = None) -> Iterator[Dict]:
+        """按优先级（同分按 id）流式产出待执行子任务，被延后的目标在其余目标之后再读取一轮。"""
+        deprioritized_urls = deprioritized_urls or set()
+        for item in self._iter_pending_by_priority(task_id):
+            if item["target_url"] not in deprioritized_urls:
+                yield item
+        if deprioritized_urls:
+            for item in self._iter_pending_by_priority(task_id):
+                if item["target_url"] in deprioritized_urls:
+                    yield item
+
+    def _iter_pending_by_priority(self, task_id: int) -> Iterator[Dict]:
+        """按 (priority DESC, id ASC) 键集分页读取待执行子任务，评分在派发前已写定，分页期间不变。"""
+        page_size = self.ITEM_PAGE_SIZE
+        query = """
+            SELECT *
+            FROM batch_task_items
+            WHERE task_id = ? AND status = 'pending'
+              AND (priority < ? OR (priority = ? AND id > ?))
+            ORDER BY priority DESC, id ASC
+            LIMIT ?
+        """
+        last_priority, last_id = None, 0
+        while True:
+            bound = (1 << 62) if last_priority is None else last_priority
+            with self.get_db_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (task_id, bound, bound, last_id, page_size))
+                rows = [dict(row) for row in cursor.fetchall()]
+            for row in rows:
+                yield self._serialize_item_row(row)
+            if len(rows) < page_size:
+                return
+            last_priority, last_id = rows[-1]["priority"], rows[-1]["id"]
+
+    def _prioritize_pending_items(self, task_id: int) -> int:
+        """
+        派发前为待执行子任务评分并写入 priority
+
+        严重程度、EPSS/KEV、历史命中率按 POC/模板计算一次；目标指纹按 (目标, POC) 逐项匹配。
+        """
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT engine_type, poc_id, template_path, vuln_name, vuln_type
+                FROM batch_task_pocs
+                WHERE task_id = ?
+                """,
+                (task_id,),
+            )
+            task_pocs = [dict(row) for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT target_url, probe_json FROM batch_task_targets WHERE task_id = ? AND probe_json IS NOT NULL",
+                (task_id,),
+            )
+            target_tokens = {
+                row["target_url"]: fingerprint_tokens(self._safe_load_json(row["probe_json"]))
+                for row in cursor.fetchall()
+            }
+            history = self._get_poc_hit_history(cursor, task_id)
+
+        profiles: Dict[Tuple[str, int, str], Dict] = {}
+        for poc in task_pocs:
+            engine_type = poc["engine_type"] or "poc"
+            template_path = poc["template_path"] or ""
+            if engine_type == "nuclei":
+                profile = template_profile(nuclei_service.templates_dir / template_path, template_path)
+            else:
+                record = dict(poc_library_service.get_poc_by_id(poc["poc_id"]) or {})
+                record.setdefault("vuln_name", poc["vuln_name"])
+                record.setdefault("vuln_type", poc["vuln_type"])
+                profile = poc_profile(record)
+            hits, runs = history.get((engine_type, poc["poc_id"], template_path), (0, 0))
+            profile["hit_rate"] = smoothed_hit_rate(hits, runs)
+            profiles[(engine_type, poc["poc_id"], template_path)] = profile
+        if not profiles:
+            return 0
+
+        updates: List[Tuple[int, int]] = []
+        for item in self.iter_task_items(task_id, status="pending", include_poc=False):
+            key = (item.get("engine_type") or "poc", item["poc_id"], item.get("template_path") or "")
+            profile = profiles.get(key)
+            if profile is None:
+                continue
+            priority = score_item(profile, profile["hit_rate"], target_tokens.get(item["target_url"], ()))
+            if priority != (item.get("priority") or 0):
+                updates.append((priority, item["id"]))
+
+        with self.get_db_connection() as conn:
+            conn.executemany("UPDATE batch_task_items SET priority = ? WHERE id = ?", updates)
+        logger.info(f"子任务优先级评分完成: task={task_id}, pocs={len(profiles)}, updated={len(updates)}")
+        return len(updates)
+
+    def _get_poc_hit_history(self, cursor: sqlite3.Cursor, task_id: int) -> Dict[Tuple[str, int, str], Tuple[int, int]]:
+        """统计本任务所用 POC/模板在其他任务中的 (命中数, 有效执行数)，含保留策略压实后的汇总行。"""
+        placeholders = ", ".join("?" for _ in self.PRIORITY_HISTORY_STATUSES)
+        cursor.execute(
+            f"""
+            SELECT i.engine_type, i.poc_id, COALESCE(i.template_path, '') AS template_path,
+                   SUM(i.vulnerable) AS hits, COUNT(*) AS runs
+            FROM batch_task_items i
+            JOIN batch_task_pocs p
+              ON p.task_id = ? AND p.engine_type = i.engine_type AND p.poc_id = i.poc_id
+             AND p.template_path = COALESCE(i.template_path, '')
+            WHERE i.task_id != ? AND i.status IN ({placeholders})
+            GROUP BY i.engine_type, i.poc_id, COALESCE(i.template_path, '')
+            """,
+            (task_id, task_id, *self.PRIORITY_HISTORY_STATUSES),
+        )
+        history = {
+            (row["engine_type"] or "poc", row["poc_id"], row["template_path"]): (row["hits"] or 0, row["runs"])
+            for row in cursor.fetchall()
+        }
+        # 汇总行不含模板路径，只能补充 POC 引擎的历史
+        cursor.execute(
+            f"""
+            SELECT s.poc_id, SUM(CASE WHEN s.vulnerable THEN s.item_count ELSE 0 END) AS hits,
+                   SUM(s.item_count) AS runs
+            FROM batch_task_summaries s
+            JOIN batch_task_pocs p ON p.task_id = ? AND p.poc_id = s.poc_id AND p.engine_type = 'poc'
+            WHERE s.engine_type = 'poc' AND s.status IN ({placeholders})
+            GROUP BY s.poc_id
+            """,
+            (task_id, *self.PRIORITY_HISTORY_STATUSES),
+        )
+        for row in cursor.fetchall():
+            key = ("poc", row["poc_id"], "")
+            hits, runs = history.get(key, (0, 0))
+            history[key] = (hits + (row["hits"] or 0), runs + (row["runs"] or 0))
+        return history
+
+    def _apply_liveness_probe(self, task_id: int, task: Dict) -> set:
+        """
+        派发前探测所有待执行目标的存活状态
+
+        skip 策略直接把失活目标的子任务标记为跳过；deprioritize 策略返回需要延后执行的目标集合。
+        """
+        policy = self._get_execution_policy(task)
+        urls = self._get_pending_target_urls(task_id)
+        if not urls:
+            return set()
+        try:
+            liveness = TargetProber().probe_urls(urls)
+        except Exception as exc:
+            logger.warning(f"目标存活预探测失败，按原顺序执行: task={task_id}, error={exc}")
+            return set()
+
+        self._store_target_liveness(task_id, liveness)
+        dead_urls = {url for url, outcome in liveness.items() if not outcome.get("alive")}
+        logger.info(f"目标存活预探测完成: task={task_id}, total={len(urls)}, dead={len(dead_urls)}")
+        if not dead_urls or policy["dead_target_policy"] == "deprioritize":
+            return dead_urls
+
+        classification = build_skip_classification("network_error", "target_unreachable")
+        for url in dead_urls:
+            probe = liveness[url]
+            reason = f"存活预探测判定目标不可达: {probe.get('error') or probe.get('stage')}"
+            self._update_items_skipped(
+                "task_id = ? AND target_url = ? AND status = 'pending'",
+                (task_id, url),
+                reason,
+                classification,
+            )
+        self._refresh_task_stats(task_id)
+        return set()
+
+    def _get_pending_target_urls(self, task_id: int) -> List[str]:
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT target_url
+                FROM batch_task_items
+                WHERE task_id = ? AND status = 'pending'
+                GROUP BY target_url
+                ORDER BY MIN(id) ASC
+                """,
+                (task_id,),
+            )
+            return [row["target_url"] for row in cursor.fetchall()]
+
+    def _store_target_liveness(self, task_id: int, liveness: Dict[str, Dict]):
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO batch_task_targets (task_id, target_url, host, alive, probe_json, probed_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(task_id, target_url) DO UPDATE SET
+                    host = excluded.host,
+                    alive = excluded.alive,
+                    probe_json = excluded.probe_json,
+                    probed_at = excluded.probed_at
+                """,
+                [
+                    (
+                        task_id,
+                        url,
+                        extract_host_key(url),
+                        int(bool(outcome.get("alive"))),
+                        json.dumps(outcome, ensure_ascii=False),
+                    )
+                    for url, outcome in liveness.items()
+                ],
+            )
+
+    def get_task_targets(self, task_id: int) -> List[Dict]:
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT target_url, host, alive, probe_json, probed_at
+                FROM batch_task_targets
+                WHERE task_id = ?
+                ORDER BY id ASC
+                """,
+                (task_id,),
+            )
+            rows = []
+            for row in cursor.fetchall():
+                target = dict(row)
+                target["alive"] = None if target["alive"] is None else bool(target["alive"])
+                target["probe"] = self._safe_load_json(target.pop("probe_json"))
+                rows.append(target)
+        return rows
+
+    def _item_cache_key(self, item: Dict, fingerprints: Dict[Tuple[str, str], Optional[str]]) -> Optional[str]:
+        """计算子任务的结果缓存键；POC 文件/模板不可读时返回 None（不参与缓存）。"""
+        engine_type = item.get("engine_type") or "poc"
+        if engine_type == "nuclei":
+            poc_ref = item.get("template_path") or ""
+            fingerprint_key = ("nuclei", poc_ref)
+            if fingerprint_key not in fingerprints:
+                fingerprints[fingerprint_key] = self._template_fingerprint(poc_ref)
+        else:
+            poc_ref = str(item["poc_id"])
+            fingerprint_key = ("poc", poc_ref)
+            if fingerprint_key not in fingerprints:
+                fingerprints[fingerprint_key] = self._poc_fingerprint(poc_library_service.get_poc_by_id(item["poc_id"]))
+
+        content_hash = fingerprints[fingerprint_key]
+        if not content_hash:
+            return None
+        return build_cache_key(item["target_url"], engine_type, poc_ref, content_hash, params_fingerprint(None))
+
+    def _apply_result_cache(
+        self,
+        task_id: int,
+        policy: Dict,
+        fingerprints: Dict[Tuple[str, str], Optional[str]],
+    ) -> int:
+        """派发前用有效期内的历史结果填充待执行子任务（状态记为 cached），返回复用数量。"""
+        reused = 0
+        batch: List[Tuple[str, Dict]] = []
+        for item in self.iter_task_items(task_id, status="pending", include_poc=False):
+            cache_key = self._item_cache_key(item, fingerprints)
+            if cache_key:
+                batch.append((cache_key, item))
+            if len(batch) >= self.RESULT_CACHE_LOOKUP_CHUNK:
+                reused += self._reuse_cached_results(task_id, batch, policy["result_cache_max_age_hours"])
+                batch = []
+        if batch:
+            reused += self._reuse_cached_results(task_id, batch, policy["result_cache_max_age_hours"])
+
+        if reused:
+            logger.info(f"复用跨任务缓存结果: task={task_id}, reused={reused}")
+            self._refresh_task_stats(task_id)
+        return reused
+
+    def _reuse_cached_results(self, task_id: int, batch: List[Tuple[str, Dict]], max_age_hours: float) -> int:
+        placeholders = ",".join("?" for _ in batch)
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT c.cache_key, c.vulnerable, c.reason, c.source_task_id, c.source_item_id, c.cached_at, i.detail_file
+                FROM batch_result_cache c
+                LEFT JOIN batch_task_items i ON i.id = c.source_item_id
+                WHERE c.cache_key IN ({placeholders}) AND c.cached_at >= datetime('now', ?)
+                """,
+                [cache_key for cache_key, _ in batch] + [f"-{float(max_age_hours)} hours"],
+            )
+            entries = {row["cache_key"]: dict(row) for row in cursor.fetchall()}
+
+        reusable = []
+        for cache_key, item in batch:
+            entry = entries.get(cache_key)
+            if entry:
+                source = {"task_id": entry["source_task_id"], "item_id": entry["source_item_id"], "cached_at": entry["cached_at"]}
+                reusable.append((item, entry, source))
+        return self._mark_items_reused(task_id, reusable)
+
+    def _mark_items_reused(self, task_id: int, reusable: List[Tuple[Dict, Dict, Dict]]) -> int:
+        """
+        把子任务标记为复用历史结果（cached）
 
+        reusable 中每项为 (待执行子任务, 历史结果行, 来源说明)；命中结果必须带上原始证据，
+        源详情已被清理或不可读时该子任务保持待执行。
+        """
+        updates = []
+        for item, previous, source in reusable:
+            detail_file = None
+            if previous["vulnerable"]:
+                if not is_segment_locator(previous.get("detail_file")):
+                    continue
+                try:
+                    detail = dict(self._detail_store.read(previous["detail_file"], source["item_id"]))
+                except (OSError, ValueError, DetailStoreError) as exc:
+                    logger.warning(f"历史结果详情不可读，重新执行: item={item['id']}, error={exc}")
+                    continue
+                detail["cached_from"] = source
+                detail_file = self._detail_store.append(task_id, item["id"], detail, item.get("engine_type") or "poc")
+            updates.append((int(bool(previous["vulnerable"])), previous.get("reason"), detail_file, item["id"]))
+
+        if updates:
             with self.get_db_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute(
+                cursor.executemany(
                     """
-                    UPDATE batch_tasks
-                    SET status = 'running', started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
-                    WHERE id = ? AND status IN ('pending', 'running')
+                    UPDATE batch_task_items
+                    SET status = 'cached', vulnerable = ?, reason = ?, detail_file = ?, error = NULL,
+                        started_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND status = 'pending'
                     """,
-                    (task_id,),
+                    updates,
                 )
+        return len(updates)
 
-            items = self.get_task_items(task_id, limit=self.MAX_TASK_ITEMS)["items"]
-            pending_items = [item for item in items if item["status"] == "pending"]
-            concurrency = task.get("concurrency") or self.DEFAULT_CONCURRENCY
-
-            with ThreadPoolExecutor(max_workers=concurrency) as executor:
-                futures = {}
-                item_iter = iter(pending_items)
-                cancellation_requested = False
+    def _apply_rescan_carry_over(self, task_id: int, previous_task_id: int) -> int:
+        """
+        差异重扫：沿用上一任务中目标与 POC/模板内容均未变化且执行成功的结果
 
-                while True:
-                    if cancel_event.is_set():
-                        cancellation_requested = True
-                        break
+        新目标、新增或内容变化的 POC/模板、以及上次失败/跳过/取消的子任务保持待执行。
+        """
+        previous_hashes = self._get_task_poc_fingerprints(previous_task_id)
+        unchanged_refs = {
+            ref
+            for ref, content_hash in self._get_task_poc_fingerprints(task_id).items()
+            if content_hash and previous_hashes.get(ref) == content_hash
+        }
+        if not unchanged_refs:
+            return 0
+
+        previous_results: Dict[Tuple[str, Tuple[int, str]], Dict] = {}
+        for item in self.iter_task_items(previous_task_id, include_poc=False):
+            ref = (item["poc_id"], item.get("template_path") or "")
+            if ref in unchanged_refs and item["status"] in ("success", "cached"):
+                previous_results[(normalize_cache_url(item["target_url"]), ref)] = item
+
+        reusable = []
+        for item in self.iter_task_items(task_id, status="pending", include_poc=False):
+            ref = (item["poc_id"], item.get("template_path") or "")
+            previous = previous_results.get((normalize_cache_url(item["target_url"]), ref))
+            if previous:
+                reusable.append((item, previous, {"task_id": previous_task_id, "item_id": previous["id"]}))
+
+        carried = self._mark_items_reused(task_id, reusable)
+        logger.info(f"差异重扫沿用历史结果: task={task_id}, previous={previous_task_id}, carried={carried}")
+        if carried:
+            self._refresh_task_stats(task_id)
+        return carried
+
+    def _get_task_poc_fingerprints(self, task_id: int) -> Dict[Tuple[int, str], Optional[str]]:
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT poc_id, template_path, content_hash FROM batch_task_pocs WHERE task_id = ?",
+                (task_id,),
+            )
+            return {(row["poc_id"], row["template_path"] or ""): row["content_hash"] for row in cursor.fetchall()}
 
-                    while len(futures) < concurrency:
-                        try:
-                            item = next(item_iter)
-                        except StopIteration:
-                            break
+    def _poc_fingerprint(self, poc: Optional[Dict]) -> Optional[str]:
+        poc_file_path = (poc or {}).get("poc_file_path")
+        return file_fingerprint(Path(poc_file_path)) if poc_file_path else None
 
-                        self._mark_item_running(item["id"])
-                        future = executor.submit(self._execute_task_item, item)
-                        futures[future] = item["id"]
+    def _template_fingerprint(self, template_path: Optional[str]) -> Optional[str]:
+        return file_fingerprint(nuclei_service.templates_dir / template_path) if template_path else None
 
-                    if not futures:
-                        break
+    def _remember_item_result(self, item: Dict, outcome: Dict, fingerprints: Dict[Tuple[str, str], Optional[str]]):
+        """执行成功的子任务写入跨任务结果缓存，失败结果（多为网络/环境问题）不缓存。"""
+        try:
+            cache_key = self._item_cache_key(item, fingerprints)
+        except Exception as exc:
+            logger.warning(f"计算结果缓存键失败: item={item['id']}, error={exc}")
+            return
+        if not cache_key:
+            return
 
-                    done, _ = wait(list(futures.keys()), return_when=FIRST_COMPLETED, timeout=0.5)
-                    for future in done:
-                        item_id = futures.pop(future)
-                        try:
-                            outcome = future.result()
-                            self._store_item_result(item_id, outcome)
-                        except Exception as e:
-                            logger.error(f"批量子任务执行失败: task={task_id}, item={item_id}, error={e}")
-                            self._store_item_result(item_id, {
-                                "success": False,
-                                "error": str(e),
-                                "target_url": None,
-                                "result": {
-                                    "vulnerable": False,
-                                    "reason": "批量任务执行异常",
-                                    "details": str(e)
-                                }
-                            })
-                        self._refresh_task_stats(task_id)
-
-                if cancellation_requested and futures:
-                    for future, item_id in list(futures.items()):
-                        try:
-                            outcome = future.result()
-                        except Exception as e:
-                            logger.warning(f"取消中的子任务收尾失败: task={task_id}, item={item_id}, error={e}")
-                            outcome = {
-                                "success": False,
-                                "error": str(e),
-                                "result": {
-                                    "vulnerable": False,
-                                    "reason": "任务已取消",
-                                    "details": str(e),
-                                },
-                            }
-                        self._store_item_cancelled(item_id, outcome)
-                    futures.clear()
-                    self._refresh_task_stats(task_id)
+        result = outcome.get("result") or {}
+        vulnerable = bool(result.get("vulnerable"))
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO batch_result_cache (
+                    cache_key, target_url, engine_type, poc_id, template_path,
+                    vulnerable, reason, source_task_id, source_item_id, cached_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                    vulnerable = excluded.vulnerable,
+                    reason = excluded.reason,
+                    source_task_id = excluded.source_task_id,
+                    source_item_id = excluded.source_item_id,
+                    cached_at = excluded.cached_at
+                """,
+                (
+                    cache_key,
+                    item["target_url"],
+                    item.get("engine_type") or "poc",
+                    item.get("poc_id") or 0,
+                    item.get("template_path") or "",
+                    int(vulnerable),
+                    result.get("reason") or ("检测到漏洞" if vulnerable else "未发现漏洞"),
+                    item.get("task_id"),
+                    item["id"],
+                ),
+            )
 
-            self._finalize_task(task_id, cancel_event.is_set())
-        finally:
-            with self._lock:
-                self._worker_threads.pop(task_id, None)
-                self._cancel_events.pop(task_id, None)
+    def get_task_item_summaries(self, task_id: int) -> List[Dict]:
+        """获取保留策略压实后留下的子任务汇总行。"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT s.poc_id, s.engine_type, s.status, s.failure_category, s.vulnerable,
+                       s.item_count, s.first_finished_at, s.last_finished_at, p.vuln_name
+                FROM batch_task_summaries s
+                LEFT JOIN poc_records p ON p.id = s.poc_id
+                WHERE s.task_id = ?
+                ORDER BY s.id ASC
+                """,
+                (task_id,),
+            )
+            rows = []
+            for row in cursor.fetchall():
+                summary = dict(row)
+                summary["vulnerable"] = bool(summary["vulnerable"])
+                summary["failure_category"] = summary["failure_category"] or None
+                rows.append(summary)
+        return rows
+
+    def _build_host_breaker(self, task: Dict) -> HostCircuitBreaker:
+        policy = self._get_execution_policy(task)
+        return HostCircuitBreaker(
+            failure_threshold=policy["host_failure_threshold"],
+            recovery_probe=policy["host_recovery_probe"],
+            recovery_interval=policy["host_recovery_interval"],
+            max_recovery_probes=self.HOST_RECOVERY_PROBES,
+        )
 
-    def _execute_task_item(self, item: Dict) -> Dict:
-        item_id = item["id"]
-        target_url = item["target_url"]
-        engine_type = item.get("engine_type") or "poc"
+    def _next_dispatchable_item(
+        self,
+        task_id: int,
+        pending_items: HostLaneScheduler,
+        lane: int,
+        deferred_items: Dict[str, deque],
+        breaker: HostCircuitBreaker,
+        early_stop: Optional[EarlyStopController] = None,
+    ) -> Optional[Dict]:
+        """
+        取下一个可派发子任务：优先放行到期的恢复探测，熔断主机的子任务延后或跳过。
 
-        if engine_type == "nuclei":
-            template_path = item.get("template_path")
-            logger.info(f"执行 Nuclei 批量子任务: item={item_id}, template={template_path}, url={target_url}")
-            return self._execute_nuclei_task_item(target_url, template_path)
+        命中提前终止规则的子任务已在数据库中批量标记为跳过，这里只需从内存队列中丢弃。
+        """
+        if early_stop is not None and (early_stop.stopped_hosts or early_stop.stopped_pocs):
+            for host in list(deferred_items.keys()):
+                remaining = deque(item for item in deferred_items[host] if not early_stop.blocks(item))
+                if remaining:
+                    deferred_items[host] = remaining
+                else:
+                    deferred_items.pop(host)
+
+        for host in list(deferred_items.keys()):
+            if breaker.try_acquire_probe(host):
+                queue = deferred_items[host]
+                item = queue.popleft()
+                if not queue:
+                    deferred_items.pop(host)
+                logger.info(f"熔断主机恢复探测: task={task_id}, host={host}, item={item['id']}")
+                return item
+
+        while True:
+            item = pending_items.pop_for_lane(lane)
+            if item is None:
+                return None
+            if early_stop is not None and early_stop.blocks(item):
+                continue
+            host = extract_host_key(item["target_url"])
+            if breaker.allows(host):
+                return item
+            if breaker.can_recover(host):
+                deferred_items.setdefault(host, deque()).append(item)
+            else:
+                self._skip_items_for_host(task_id, [item], breaker.skip_reason(host))
 
-        poc_id = item["poc_id"]
-        logger.info(f"执行批量子任务: item={item_id}, poc={poc_id}, url={target_url}")
-        return poc_library_service.execute_poc(poc_id, target_url)
+    def _record_host_outcome(
+        self,
+        task_id: int,
+        item: Dict,
+        classification: Optional[Dict],
+        pending_items: HostLaneScheduler,
+        deferred_items: Dict[str, deque],
+        breaker: HostCircuitBreaker,
+    ):
+        host = extract_host_key(item["target_url"])
+        previous_allows = breaker.allows(host)
+        host_state = breaker.record(host, classification)
+        if host_state == "open" and previous_allows:
+            logger.warning(f"目标主机熔断: task={task_id}, host={host}")
+
+        if host not in deferred_items:
+            return
+        if host_state == "closed":
+            # 探测成功，延后的子任务放回队首继续执行
+            pending_items.extendleft(reversed(deferred_items.pop(host)))
+        elif host_state == "open" and not breaker.can_recover(host):
+            self._skip_items_for_host(task_id, list(deferred_items.pop(host)), breaker.skip_reason(host))
+
+    def _build_early_stop(self, task: Dict) -> EarlyStopController:
+        policy = self._get_execution_policy(task)
+        return EarlyStopController(
+            stop_on_host_hit=policy["stop_on_host_hit"],
+            stop_on_poc_hit=policy["stop_on_poc_hit"],
+            max_hits=policy["max_hits"],
+            time_budget_seconds=policy["time_budget_seconds"],
+        )
 
-    def _execute_nuclei_task_item(self, target_url: str, template_path: str) -> Dict:
-        outcome = nuclei_service.scan_single(target_url, template_path, timeout=60)
-        if not outcome.get("success"):
-            return {
-                "success": False,
-                "error": outcome.get("error") or "Nuclei 扫描失败",
-                "target_url": target_url,
-                "result": {
-                    "vulnerable": False,
-                    "reason": outcome.get("error") or "Nuclei 扫描失败",
-                    "details": outcome,
-                },
-            }
+    def _seed_early_stop(self, task_id: int, early_stop: EarlyStopController):
+        """派发前已有的命中（结果缓存/差异重扫沿用）同样计入提前终止规则。"""
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, target_url, engine_type, poc_id, template_path
+                FROM batch_task_items
+                WHERE task_id = ? AND status IN ('success', 'cached') AND vulnerable = 1
+                ORDER BY id ASC
+                """,
+                (task_id,),
+            )
+            hits = [dict(row) for row in cursor.fetchall()]
+        for item in hits:
+            triggered = early_stop.record(item, True)
+            if triggered:
+                self._apply_early_stop(task_id, early_stop, triggered)
+
+    def _apply_early_stop(self, task_id: int, early_stop: EarlyStopController, triggered: Dict):
+        """按新触发的提前终止规则批量跳过数据库中的待执行子任务。"""
+        if "host" in triggered:
+            host = triggered["host"]
+            logger.info(f"主机已确认命中，跳过其剩余子任务: task={task_id}, host={host}")
+            self._update_items_skipped(
+                """
+                task_id = ? AND status = 'pending'
+                AND target_url IN (SELECT target_url FROM batch_task_targets WHERE task_id = ? AND host = ?)
+                """,
+                (task_id, task_id, host),
+                f"主机 {host} 已确认命中，提前终止该主机剩余子任务",
+                build_skip_classification("early_stop", "host_hit"),
+            )
+        if "poc" in triggered:
+            engine_type, poc_id, template_path = triggered["poc"]
+            logger.info(f"POC 已确认命中，跳过其在其他目标上的子任务: task={task_id}, poc={poc_id}, template={template_path}")
+            self._update_items_skipped(
+                """
+                task_id = ? AND status = 'pending'
+                AND engine_type = ? AND poc_id = ? AND COALESCE(template_path, '') = ?
+                """,
+                (task_id, engine_type, poc_id, template_path),
+                "该 POC 已在其他目标确认命中，提前终止剩余子任务",
+                build_skip_classification("early_stop", "poc_hit"),
+            )
+        if "task" in triggered:
+            logger.info(f"批量任务提前终止: task={task_id}, reason={early_stop.stop_reason}")
+            self._update_items_skipped(
+                "task_id = ? AND status = 'pending'",
+                (task_id,),
+                early_stop.stop_reason,
+                build_skip_classification("early_stop", early_stop.stop_code),
+            )
+            with self.get_db_connection() as conn:
+                conn.execute("UPDATE batch_tasks SET stop_reason = ? WHERE id = ?", (early_stop.stop_reason, task_id))
+        self._refresh_task_stats(task_id)
 
-        vulnerable = bool(outcome.get("vulnerable"))
-        total_findings = int(outcome.get("total_findings") or 0)
-        reason = (
-            f"Nuclei 命中 {total_findings} 条结果"
-            if vulnerable
-            else "Nuclei 未发现漏洞"
-        )
-        return {
-            "success": True,
-            "target_url": target_url,
-            "result": {
-                "vulnerable": vulnerable,
-                "reason": reason,
-                "details": {
-                    "engine_type": "nuclei",
-                    "template_path": template_path,
-                    "findings": outcome.get("findings") or [],
-                    "total_findings": total_findings,
-                    "errors": outcome.get("errors"),
-                },
-            },
-        }
+    def _skip_items_for_host(self, task_id: int, items: List[Dict], reason: str):
+        classification = build_skip_classification("network_error", "host_circuit_open")
+        for item in items:
+            self._store_item_skipped(item["id"], reason, classification)
+        self._refresh_task_stats(task_id)
 
     def _mark_item_running(self, item_id: int):
         with self.get_db_connection() as conn:
@@ -571,10 +2300,15 @@ class BatchTaskService:
                 (item_id,),
             )
 
-    def _store_item_result(self, item_id: int, outcome: Dict):
+    def _store_item_result(self, item_id: int, outcome: Dict, lease_owner: Optional[str] = None) -> Optional[Dict]:
+        """
+        写入子任务结果，返回失败分类；任务已取消时按取消记录并返回 None
+
+        传入 lease_owner 时只在该工作进程仍持有租约时落库，否则抛出 LeaseLostError。
+        """
         if self._should_preserve_cancelled(item_id):
-            self._store_item_cancelled(item_id, outcome)
-            return
+            self._store_item_cancelled(item_id, outcome, lease_owner)
+            return None
 
         success = bool(outcome.get("success"))
         status = "success" if success else "failed"
@@ -583,15 +2317,17 @@ class BatchTaskService:
         reason = result.get("reason") or outcome.get("error") or ("检测到漏洞" if vulnerable else "未发现漏洞")
         error = outcome.get("error")
         classification = outcome.get("classification") or classify_execution_outcome(outcome)
+        metrics = outcome.get("metrics") if isinstance(outcome.get("metrics"), dict) else None
         detail_file = self._write_detail_file(item_id, status, vulnerable, outcome)
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """
+                f"""
                 UPDATE batch_task_items
                 SET status = ?, result_json = NULL, vulnerable = ?, reason = ?, detail_file = ?, error = ?,
-                    failure_category = ?, failure_code = ?, failure_stage = ?, retryable = ?, finished_at = CURRENT_TIMESTAMP
-                WHERE id = ?
+                    failure_category = ?, failure_code = ?, failure_stage = ?, retryable = ?, metrics_json = ?,
+                    finished_at = CURRENT_TIMESTAMP, lease_expires_at = NULL
+                WHERE id = ?{self._lease_guard(lease_owner)}
                 """,
                 (
                     status,
@@ -603,24 +2339,132 @@ class BatchTaskService:
                     classification.get("failure_code"),
                     classification.get("failure_stage"),
                     int(bool(classification.get("retryable"))),
+                    json.dumps(metrics, ensure_ascii=False) if metrics else None,
                     item_id,
+                    *self._lease_guard_params(lease_owner),
                 ),
             )
+            if lease_owner is not None and cursor.rowcount == 0:
+                raise LeaseLostError(f"子任务租约已失效: item={item_id}, worker={lease_owner}")
+            if metrics:
+                self._accumulate_poc_performance(cursor, item_id, metrics)
+        return classification
+
+    @staticmethod
+    def _lease_guard(lease_owner: Optional[str]) -> str:
+        return "" if lease_owner is None else " AND lease_owner = ? AND status IN ('running', 'cancelled')"
+
+    @staticmethod
+    def _lease_guard_params(lease_owner: Optional[str]) -> Tuple:
+        return () if lease_owner is None else (lease_owner,)
+
+    def _accumulate_poc_performance(self, cursor: sqlite3.Cursor, item_id: int, metrics: Dict):
+        wall_ms = float(metrics.get("wall_ms") or 0)
+        peak_memory_kb = metrics.get("peak_memory_kb")
+        cursor.execute(
+            """
+            INSERT INTO poc_performance_stats (
+                poc_id, executions, total_wall_ms, max_wall_ms, total_cpu_ms,
+                total_http_requests, total_http_bytes, total_oob_wait_ms, max_peak_memory_kb
+            )
+            SELECT poc_id, 1, ?, ?, ?, ?, ?, ?, ?
+            FROM batch_task_items
+            WHERE id = ? AND engine_type = 'poc'
+            ON CONFLICT(poc_id) DO UPDATE SET
+                executions = executions + 1,
+                total_wall_ms = total_wall_ms + excluded.total_wall_ms,
+                max_wall_ms = MAX(max_wall_ms, excluded.max_wall_ms),
+                total_cpu_ms = total_cpu_ms + excluded.total_cpu_ms,
+                total_http_requests = total_http_requests + excluded.total_http_requests,
+                total_http_bytes = total_http_bytes + excluded.total_http_bytes,
+                total_oob_wait_ms = total_oob_wait_ms + excluded.total_oob_wait_ms,
+                max_peak_memory_kb = MAX(COALESCE(max_peak_memory_kb, 0), COALESCE(excluded.max_peak_memory_kb, 0)),
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (
+                wall_ms,
+                wall_ms,
+                float(metrics.get("cpu_ms") or 0),
+                int(metrics.get("http_requests") or 0),
+                int(metrics.get("http_bytes_sent") or 0) + int(metrics.get("http_bytes_received") or 0),
+                float(metrics.get("oob_wait_ms") or 0),
+                int(peak_memory_kb) if peak_memory_kb is not None else None,
+                item_id,
+            ),
+        )
 
-    def _store_item_cancelled(self, item_id: int, outcome: Optional[Dict] = None):
+    def get_poc_performance(self, poc_id: int, slowest_limit: int = 10) -> Dict:
+        """返回 POC 在批量任务中的累计执行开销与最近最慢的子任务。"""
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute("SELECT * FROM poc_performance_stats WHERE poc_id = ?", (poc_id,))
+            row = cursor.fetchone()
+            stats = dict(row) if row else {"poc_id": poc_id, "executions": 0}
+            executions = int(stats.get("executions") or 0)
+            for field_name in ("wall_ms", "cpu_ms", "http_requests", "http_bytes", "oob_wait_ms"):
+                total = stats.get(f"total_{field_name}") or 0
+                stats[f"avg_{field_name}"] = round(total / executions, 2) if executions else 0
             cursor.execute(
                 """
+                SELECT id, task_id, target_url, status, vulnerable, finished_at, metrics_json
+                FROM batch_task_items
+                WHERE poc_id = ? AND engine_type = 'poc' AND metrics_json IS NOT NULL
+                ORDER BY CAST(json_extract(metrics_json, '$.wall_ms') AS REAL) DESC
+                LIMIT ?
+                """,
+                (poc_id, max(int(slowest_limit), 1)),
+            )
+            slowest = []
+            for item in cursor.fetchall():
+                item = dict(item)
+                item["vulnerable"] = bool(item["vulnerable"])
+                item["metrics"] = self._safe_load_json(item.pop("metrics_json"))
+                slowest.append(item)
+        stats["slowest_items"] = slowest
+        return stats
+
+    def _store_item_skipped(self, item_id: int, reason: str, classification: Dict):
+        self._update_items_skipped("id = ? AND status IN ('pending', 'running')", (item_id,), reason, classification)
+
+    def _update_items_skipped(self, condition: str, params: Tuple, reason: str, classification: Dict):
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                UPDATE batch_task_items
+                SET status = 'skipped', vulnerable = 0, reason = ?, error = ?,
+                    failure_category = ?, failure_code = ?, failure_stage = ?, retryable = ?,
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE {condition}
+                """,
+                (
+                    reason,
+                    reason,
+                    classification.get("failure_category"),
+                    classification.get("failure_code"),
+                    classification.get("failure_stage"),
+                    int(bool(classification.get("retryable"))),
+                    *params,
+                ),
+            )
+
+    def _store_item_cancelled(self, item_id: int, outcome: Optional[Dict] = None, lease_owner: Optional[str] = None):
+        with self.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
                 UPDATE batch_task_items
                 SET status = 'cancelled',
                     reason = COALESCE(reason, '任务已取消'),
                     error = COALESCE(error, ?),
-                    finished_at = COALESCE(finished_at, CURRENT_TIMESTAMP)
-                WHERE id = ?
+                    finished_at = COALESCE(finished_at, CURRENT_TIMESTAMP),
+                    lease_expires_at = NULL
+                WHERE id = ?{self._lease_guard(lease_owner)}
                 """,
-                ((outcome or {}).get("error"), item_id),
+                ((outcome or {}).get("error"), item_id, *self._lease_guard_params(lease_owner)),
             )
+            if lease_owner is not None and cursor.rowcount == 0:
+                raise LeaseLostError(f"子任务租约已失效: item={item_id}, worker={lease_owner}")
 
     def _should_preserve_cancelled(self, item_id: int) -> bool:
         with self.get_db_connection() as conn:
@@ -646,8 +2490,9 @@ class BatchTaskService:
                 """
                 SELECT
                     COUNT(*) AS total_count,
-                    SUM(CASE WHEN status IN ('success', 'failed', 'cancelled', 'skipped') THEN 1 ELSE 0 END) AS completed_count,
-                    SUM(CASE WHEN status = 'success' THEN 1 ELSE 0 END) AS success_count,
+                    SUM(CASE WHEN status IN ('success', 'cached', 'failed', 'cancelled', 'skipped') THEN 1 ELSE 0 END) AS completed_count,
+                    SUM(CASE WHEN status IN ('success', 'cached') THEN 1 ELSE 0 END) AS success_count,
+                    SUM(CASE WHEN status = 'cached' THEN 1 ELSE 0 END) AS cached_count,
                     SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS failed_count,
                     SUM(CASE WHEN vulnerable = 1 THEN 1 ELSE 0 END) AS vulnerable_count
                 FROM batch_task_items
@@ -663,7 +2508,8 @@ class BatchTaskService:
                     completed_items = ?,
                     success_items = ?,
                     failed_items = ?,
-                    vulnerable_items = ?
+                    vulnerable_items = ?,
+                    cached_items = ?
                 WHERE id = ?
                 """,
                 (
@@ -672,6 +2518,7 @@ class BatchTaskService:
                     row["success_count"] or 0,
                     row["failed_count"] or 0,
                     row["vulnerable_count"] or 0,
+                    row["cached_count"] or 0,
                     task_id,
                 ),
             )
@@ -771,16 +2618,142 @@ class BatchTaskService:
                 row["result_json"] = json.loads(result_json)
             except json.JSONDecodeError:
                 pass
+        if "metrics_json" in row:
+            row["metrics"] = self._safe_load_json(row.pop("metrics_json"))
         row["has_detail"] = bool(row.get("detail_file") or row.get("result_json"))
         row["vulnerable"] = bool(row.get("vulnerable"))
         row["retryable"] = bool(row.get("retryable"))
         return row
 
+    def _ensure_task_search_index(self, cursor: sqlite3.Cursor):
+        """创建任务全文索引（FTS5 trigram，支持任意子串匹配）；SQLite 不支持时退回归一化表 LIKE 查询。"""
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS batch_task_search USING fts5(content, tokenize = 'trigram')"
+            )
+        except sqlite3.OperationalError as exc:
+            logger.warning(f"当前 SQLite 不支持 FTS5 trigram，任务搜索退回 LIKE 查询: {exc}")
+
+    def _has_task_search_index(self, cursor: sqlite3.Cursor) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'batch_task_search'")
+        return cursor.fetchone() is not None
+
+    def _index_task_search(
+        self,
+        cursor: sqlite3.Cursor,
+        task_id: int,
+        task_type: str,
+        urls: List[str],
+        pocs: List[Dict],
+    ):
+        """写入任务的目标/POC 归一化行与全文索引文档，与任务创建在同一事务内。"""
+        engine_type = "nuclei" if task_type == "nuclei_scan" else "poc"
+        cursor.executemany(
+            "INSERT OR IGNORE INTO batch_task_targets (task_id, target_url, host) VALUES (?, ?, ?)",
+            [(task_id, url, extract_host_key(url)) for url in urls],
+        )
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO batch_task_pocs (
+                task_id, poc_id, engine_type, template_path, vuln_name, vuln_type, content_hash
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    task_id,
+                    int(poc.get("id") or 0),
+                    engine_type,
+                    poc.get("template_path") or "",
+                    poc.get("vuln_name"),
+                    poc.get("vuln_type"),
+                    poc.get("content_hash"),
+                )
+                for poc in pocs
+            ],
+        )
+        if self._has_task_search_index(cursor):
+            terms = [task_type, *urls]
+            for poc in pocs:
+                terms.extend(value for value in (poc.get("vuln_name"), poc.get("vuln_type"), poc.get("template_path")) if value)
+            cursor.execute(
+                "INSERT OR REPLACE INTO batch_task_search (rowid, content) VALUES (?, ?)",
+                (task_id, "\n".join(terms)),
+            )
+
+    def _backfill_task_search_index(self, cursor: sqlite3.Cursor):
+        """为升级前创建的任务从 config_json 补建搜索索引。"""
+        cursor.execute(
+            """
+            SELECT id, task_type, config_json
+            FROM batch_tasks t
+            WHERE NOT EXISTS (SELECT 1 FROM batch_task_pocs p WHERE p.task_id = t.id)
+            """
+        )
+        for row in cursor.fetchall():
+            config = self._safe_load_json(row["config_json"]) or {}
+            if row["task_type"] == "nuclei_scan":
+                pocs = [{"id": 0, "template_path": path} for path in config.get("template_paths") or []]
+            else:
+                poc_names = config.get("poc_names") or {}
+                pocs = [{"id": poc_id, "vuln_name": poc_names.get(str(poc_id))} for poc_id in config.get("poc_ids") or []]
+            self._index_task_search(cursor, row["id"], row["task_type"], config.get("target_urls") or [], pocs)
+
+    def _build_task_keyword_filter(self, keyword: str) -> Tuple[str, List]:
+        """
+        生成任务列表关键字过滤条件
+
+        纯数字关键字同时按任务 ID 精确匹配；不少于 3 个字符时走 trigram 全文索引，
+        否则（或 FTS5 不可用时）在目标/POC 归一化表上 LIKE 匹配。
+        """
+        clauses: List[str] = []
+        params: List = []
+        if keyword.isdigit():
+            clauses.append("id = ?")
+            params.append(int(keyword))
+
+        with self.get_db_connection() as conn:
+            use_fts = len(keyword) >= 3 and self._has_task_search_index(conn.cursor())
+
+        if use_fts:
+            clauses.append("id IN (SELECT rowid FROM batch_task_search WHERE batch_task_search MATCH ?)")
+            params.append('"' + keyword.replace('"', '""') + '"')
+        else:
+            pattern = f"%{keyword}%"
+            clauses.append(
+                """
+                id IN (
+                    SELECT task_id FROM batch_task_targets WHERE target_url LIKE ?
+                    UNION
+                    SELECT task_id FROM batch_task_pocs WHERE vuln_name LIKE ? OR vuln_type LIKE ? OR template_path LIKE ?
+                )
+                """
+            )
+            params.extend([pattern, pattern, pattern, pattern])
+        return f"({' OR '.join(clauses)})", params
+
     def _ensure_batch_task_item_columns(self, cursor: sqlite3.Cursor):
         cursor.execute("PRAGMA table_info(batch_tasks)")
         task_columns = {row["name"] for row in cursor.fetchall()}
         if "task_type" not in task_columns:
             cursor.execute("ALTER TABLE batch_tasks ADD COLUMN task_type TEXT NOT NULL DEFAULT 'poc_batch'")
+        if "compacted_at" not in task_columns:
+            cursor.execute("ALTER TABLE batch_tasks ADD COLUMN compacted_at TIMESTAMP")
+        if "cached_items" not in task_columns:
+            cursor.execute("ALTER TABLE batch_tasks ADD COLUMN cached_items INTEGER NOT NULL DEFAULT 0")
+        if "stop_reason" not in task_columns:
+            cursor.execute("ALTER TABLE batch_tasks ADD COLUMN stop_reason TEXT")
+        if "leases_open" not in task_columns:
+            cursor.execute("ALTER TABLE batch_tasks ADD COLUMN leases_open INTEGER NOT NULL DEFAULT 0")
+
+        cursor.execute("PRAGMA table_info(batch_task_targets)")
+        if "lease_quota" not in {row["name"] for row in cursor.fetchall()}:
+            # 工作进程模式下熔断主机的可领取额度：NULL 不限，0 暂停领取，正数为放行的恢复探测数
+            cursor.execute("ALTER TABLE batch_task_targets ADD COLUMN lease_quota INTEGER")
+
+        cursor.execute("PRAGMA table_info(batch_task_pocs)")
+        if "content_hash" not in {row["name"] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE batch_task_pocs ADD COLUMN content_hash TEXT")
 
         cursor.execute("PRAGMA table_info(batch_task_items)")
         existing_columns = {row["name"] for row in cursor.fetchall()}
@@ -800,6 +2773,16 @@ class BatchTaskService:
             cursor.execute("ALTER TABLE batch_task_items ADD COLUMN failure_stage TEXT")
         if "retryable" not in existing_columns:
             cursor.execute("ALTER TABLE batch_task_items ADD COLUMN retryable INTEGER NOT NULL DEFAULT 0")
+        if "priority" not in existing_columns:
+            cursor.execute("ALTER TABLE batch_task_items ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+        if "lease_owner" not in existing_columns:
+            cursor.execute("ALTER TABLE batch_task_items ADD COLUMN lease_owner TEXT")
+        if "lease_expires_at" not in existing_columns:
+            cursor.execute("ALTER TABLE batch_task_items ADD COLUMN lease_expires_at REAL")
+        if "lease_attempts" not in existing_columns:
+            cursor.execute("ALTER TABLE batch_task_items ADD COLUMN lease_attempts INTEGER NOT NULL DEFAULT 0")
+        if "metrics_json" not in existing_columns:
+            cursor.execute("ALTER TABLE batch_task_items ADD COLUMN metrics_json TEXT")
 
     def _backfill_batch_task_item_summaries(self, cursor: sqlite3.Cursor):
         cursor.execute(
@@ -863,25 +2846,37 @@ class BatchTaskService:
 
         return {"vulnerable": int(vulnerable), "reason": reason}
 
+    @property
+    def _detail_store(self) -> DetailSegmentStore:
+        return get_detail_store(self.batch_results_dir)
+
     def _write_detail_file(self, item_id: int, status: str, vulnerable: bool, outcome: Dict) -> Optional[str]:
+        """失败/命中子任务的详情追加写入任务段文件，返回写入 detail_file 的定位串。"""
         if status != "failed" and not vulnerable:
             return None
 
-        item_dir = self.batch_results_dir / f"task_{self._get_task_id_for_item(item_id)}"
-        item_dir.mkdir(parents=True, exist_ok=True)
-        detail_path = item_dir / f"item_{item_id}.json"
-        with open(detail_path, "w", encoding="utf-8") as f:
-            json.dump(outcome, f, ensure_ascii=False, indent=2)
-        return str(detail_path)
+        task_id, engine_type = self._get_item_storage_key(item_id)
+        return self._detail_store.append(task_id, item_id, outcome, engine_type)
 
-    def _get_task_id_for_item(self, item_id: int) -> int:
+    def _get_item_storage_key(self, item_id: int) -> Tuple[int, str]:
         with self.get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT task_id FROM batch_task_items WHERE id = ?", (item_id,))
+            cursor.execute("SELECT task_id, engine_type FROM batch_task_items WHERE id = ?", (item_id,))
             row = cursor.fetchone()
             if not row:
                 raise ValueError(f"批量子任务不存在: {item_id}")
-            return row["task_id"]
+            return row["task_id"], row["engine_type"] or "poc"
+
+    def _maybe_train_detail_dictionary(self, task_id: int, task_type: Optional[str]):
+        """引擎类型尚无压缩字典且本任务详情样本足够时，用本任务记录训练一份。"""
+        engine_type = "nuclei" if task_type == "nuclei_scan" else "poc"
+        store = self._detail_store
+        if store.codec.has_dictionary(engine_type):
+            return
+        samples = list(store.iter_raw_records(task_id, limit=self.DICTIONARY_MAX_SAMPLES))
+        if len(samples) < self.DICTIONARY_MIN_SAMPLES:
+            return
+        store.train_dictionary(engine_type, samples)
 
     def _safe_load_json(self, raw_value: Optional[str]) -> Optional[Dict]:
         if not raw_value:
@@ -910,7 +2905,7 @@ class BatchTaskService:
         if not task:
             raise ValueError("批量任务不存在")
 
-        items = self.get_task_items(task_id=task_id, limit=self.MAX_TASK_ITEMS)["items"]
+        items = TaskItemCursor(self, task_id)
         hit_count = task.get("vulnerable_items", 0) or 0
         exception_count = task.get("failed_items", 0) or 0
         miss_count = max((task.get("success_items", 0) or 0) - hit_count, 0)
@@ -940,36 +2935,58 @@ class BatchTaskService:
         }
 
     def export_task_report(self, task_id: int, report_format: str) -> Tuple[str, str, bytes]:
-        payload = self.build_task_report_payload(task_id)
-        normalized_format = (report_format or "html").lower()
+        filename, content_type, chunks = self.stream_task_report(task_id, report_format)
+        return filename, content_type, b"".join(chunks)
 
-        if normalized_format == "json":
-            content = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
-            return (
-                f"batch_task_{task_id}_report.json",
-                "application/json; charset=utf-8",
-                content,
-            )
-
-        if normalized_format == "txt":
-            content = self._render_text_report(payload).encode("utf-8")
-            return (
-                f"batch_task_{task_id}_report.txt",
-                "text/plain; charset=utf-8",
-                content,
-            )
+    def stream_task_report(
+        self,
+        task_id: int,
+        report_format: str,
+        compress: bool = False,
+    ) -> Tuple[str, str, Iterator[bytes]]:
+        """
+        流式导出批量任务报告
 
-        if normalized_format == "html":
-            content = self._render_html_report(payload).encode("utf-8")
-            return (
-                f"batch_task_{task_id}_report.html",
-                "text/html; charset=utf-8",
-                content,
-            )
+        任务与格式在调用时立即校验（便于接口返回 400/404），子任务则在迭代返回的
+        分块时才按键集分页读取，导出首字节不必等待全部子任务渲染完成。
+        """
+        normalized_format = (report_format or "html").lower()
+        if normalized_format not in self.REPORT_FORMATS:
+            raise ValueError(f"不支持的报告格式，仅支持 {'/'.join(self.REPORT_FORMATS)}")
 
-        raise ValueError("不支持的报告格式，仅支持 html/json/txt")
+        payload = self.build_task_report_payload(task_id)
+        extension, content_type, renderer = self.REPORT_FORMATS[normalized_format]
+        filename = f"batch_task_{task_id}_report.{extension}"
+        chunks = self._encode_report_chunks(getattr(self, renderer)(payload))
+        if compress:
+            return f"{filename}.gz", "application/gzip", self._gzip_report_chunks(chunks)
+        return filename, content_type, chunks
+
+    def _encode_report_chunks(self, parts: Iterator[str]) -> Iterator[bytes]:
+        buffer: List[bytes] = []
+        size = 0
+        for part in parts:
+            encoded = part.encode("utf-8")
+            buffer.append(encoded)
+            size += len(encoded)
+            if size >= self.REPORT_CHUNK_SIZE:
+                yield b"".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b"".join(buffer)
+
+    def _gzip_report_chunks(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
 
     def _render_text_report(self, payload: Dict) -> str:
+        return "".join(self._iter_text_report(payload))
+
+    def _iter_text_report(self, payload: Dict) -> Iterator[str]:
         summary = payload["summary"]
         task = payload["task"]
         lines = [
@@ -992,10 +3009,11 @@ class BatchTaskService:
             "子任务结果",
             "-" * 72,
         ]
+        yield "\n".join(lines)
 
         for item in payload["items"]:
             target_name = item.get("template_path") or item.get("vuln_name") or f"POC-{item.get('poc_id')}"
-            lines.extend([
+            yield "\n" + "\n".join([
                 f"[{self._get_item_status_label(item)}] {item.get('target_url')}",
                 f"{'模板' if item.get('engine_type') == 'nuclei' else 'POC'}: {target_name}",
                 f"命中: {'是' if item.get('vulnerable') else '否'}",
@@ -1004,27 +3022,68 @@ class BatchTaskService:
                 "-" * 72,
             ])
 
-        return "\n".join(lines)
+    def _iter_json_report(self, payload: Dict) -> Iterator[str]:
+        """逐条编码子任务，输出与 json.dumps(payload, indent=2) 等价的报告。"""
+        head = json.dumps({key: value for key, value in payload.items() if key != "items"}, ensure_ascii=False, indent=2)
+        yield head[:-2]
+        yield ',\n  "items": ['
+        written = False
+        for item in payload["items"]:
+            encoded = json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n    ")
+            yield f"{',' if written else ''}\n    {encoded}"
+            written = True
+        yield "\n  ]\n}" if written else "]\n}"
+
+    def _iter_jsonl_report(self, payload: Dict) -> Iterator[str]:
+        """JSON Lines：首行为任务摘要，其后每行一个子任务。"""
+        yield json.dumps(
+            {"type": "summary", "task": payload["task"], "summary": payload["summary"]},
+            ensure_ascii=False,
+        ) + "\n"
+        for item in payload["items"]:
+            yield json.dumps({"type": "item", "item": item}, ensure_ascii=False) + "\n"
+
+    def _iter_csv_report(self, payload: Dict) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush() -> str:
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return value
+
+        # 带 BOM，Excel 直接打开时中文不乱码
+        writer.writerow([
+            "id", "target_url", "engine_type", "poc_or_template", "status", "status_label", "vulnerable",
+            "reason", "error", "failure_category", "failure_code", "started_at", "finished_at",
+        ])
+        yield "\ufeff" + flush()
+        for item in payload["items"]:
+            writer.writerow([
+                item.get("id"),
+                item.get("target_url"),
+                item.get("engine_type") or "poc",
+                item.get("template_path") or item.get("vuln_name") or f"POC-{item.get('poc_id')}",
+                item.get("status"),
+                self._get_item_status_label(item),
+                "1" if item.get("vulnerable") else "0",
+                item.get("reason") or "",
+                item.get("error") or "",
+                item.get("failure_category") or "",
+                item.get("failure_code") or "",
+                item.get("started_at") or "",
+                item.get("finished_at") or "",
+            ])
+            yield flush()
 
     def _render_html_report(self, payload: Dict) -> str:
+        return "".join(self._iter_html_report(payload))
+
+    def _iter_html_report(self, payload: Dict) -> Iterator[str]:
         summary = payload["summary"]
         task = payload["task"]
-        rows = []
-        for item in payload["items"]:
-            rows.append(
-                f"""
-                <tr>
-                    <td>{escape(str(item.get('target_url') or '-'))}</td>
-                    <td>{escape(str(item.get('template_path') or item.get('vuln_name') or f"POC-{item.get('poc_id')}"))}</td>
-                    <td>{escape(self._get_item_status_label(item))}</td>
-                    <td>{"是" if item.get("vulnerable") else "否"}</td>
-                    <td>{escape(str(item.get('reason') or '-'))}</td>
-                    <td>{escape(str(item.get('error') or '-'))}</td>
-                </tr>
-                """
-            )
-
-        return f"""<!DOCTYPE html>
+        yield f"""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -1064,7 +3123,19 @@ class BatchTaskService:
             </tr>
         </thead>
         <tbody>
-            {''.join(rows)}
+"""
+        for item in payload["items"]:
+            yield f"""
+                <tr>
+                    <td>{escape(str(item.get('target_url') or '-'))}</td>
+                    <td>{escape(str(item.get('template_path') or item.get('vuln_name') or f"POC-{item.get('poc_id')}"))}</td>
+                    <td>{escape(self._get_item_status_label(item))}</td>
+                    <td>{"是" if item.get("vulnerable") else "否"}</td>
+                    <td>{escape(str(item.get('reason') or '-'))}</td>
+                    <td>{escape(str(item.get('error') or '-'))}</td>
+                </tr>
+                """
+        yield """
         </tbody>
     </table>
 </body>
@@ -1075,10 +3146,12 @@ class BatchTaskService:
             return "异常"
         if item.get("vulnerable"):
             return "命中"
-        if item.get("status") == "success":
+        if item.get("status") in ("success", "cached"):
             return "未命中"
         if item.get("status") == "cancelled":
             return "已取消"
+        if item.get("status") == "skipped":
+            return "已跳过"
         return str(item.get("status") or "未知")
 
 
@@ -0,0 +1,223 @@
+"""
+批量任务外部工作进程
+
+以派发模式 workers 创建的批量任务由 API 节点开放租约，工作进程可部署在同一主机或其他主机：
+1. 按批领取子任务，同一主机的子任务在一个线程内串行执行并复用 keep-alive 会话
+2. 后台心跳定期续约；续约失败（任务取消或租约被回收）的子任务立即通过取消令牌中断
+3. 执行结果回报 API 节点统一落库，过期租约的迟到结果由服务端丢弃
+4. 退出时归还已领取但尚未开始执行的子任务
+
+其他主机上的工作进程需要同步一份 pocs/ 目录（POC 库、POC 文件与 Nuclei 模板）。
+
+用法：python -m services.batch_worker --api-url http://api-node:8000 --concurrency 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from services.cancellation import CancellationToken
+from services.host_health import extract_host_key
+from services.http_runtime import create_keepalive_session
+from services.work_queue import WORK_QUEUE_FACTORIES, create_work_queue
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWorker:
+    """从工作队列领取并执行批量子任务的工作者，run() 阻塞直到 stop()。"""
+
+    DEFAULT_CONCURRENCY = 3
+    LEASE_SECONDS = 60
+    POLL_INTERVAL = 2.0
+    LEASE_BATCH_PER_SLOT = 2
+
+    def __init__(
+        self,
+        queue,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        poll_interval: Optional[float] = None,
+        executor: Optional[Callable[[Dict, object, CancellationToken], Dict]] = None,
+        session_factory: Optional[Callable[[], object]] = None,
+    ):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.concurrency = max(int(concurrency or self.DEFAULT_CONCURRENCY), 1)
+        self.lease_seconds = float(lease_seconds or self.LEASE_SECONDS)
+        self.poll_interval = float(self.POLL_INTERVAL if poll_interval is None else poll_interval)
+        self.executor = executor
+        self.session_factory = session_factory or create_keepalive_session
+        self._stop_event = threading.Event()
+        self._held: Dict[int, CancellationToken] = {}
+        self._held_lock = threading.Lock()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self, max_batches: Optional[int] = None) -> int:
+        """循环领取执行，返回已执行的子任务数；max_batches 限制领取批次（主要用于测试）。"""
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name=f"worker-heartbeat-{self.worker_id}", daemon=True)
+        heartbeat.start()
+        executed = 0
+        batches = 0
+        logger.info(f"批量任务工作进程启动: worker={self.worker_id}, concurrency={self.concurrency}")
+        try:
+            while not self._stop_event.is_set():
+                if max_batches is not None and batches >= max_batches:
+                    break
+                count = self.run_once()
+                batches += 1
+                executed += count
+                if count == 0:
+                    self._stop_event.wait(self.poll_interval)
+        finally:
+            self._stop_event.set()
+            heartbeat.join(timeout=5)
+            logger.info(f"批量任务工作进程退出: worker={self.worker_id}, executed={executed}")
+        return executed
+
+    def run_once(self) -> int:
+        """领取一批子任务并执行完毕，返回实际执行的子任务数。"""
+        try:
+            items = self.queue.lease(self.worker_id, self.concurrency * self.LEASE_BATCH_PER_SLOT, self.lease_seconds)
+        except Exception as exc:
+            logger.warning(f"领取子任务失败: worker={self.worker_id}, error={exc}")
+            return 0
+        if not items:
+            return 0
+
+        groups: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        with self._held_lock:
+            for item in items:
+                self._held[item["id"]] = CancellationToken()
+                groups.setdefault(extract_host_key(item["target_url"]), []).append(item)
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(groups)), thread_name_prefix="batch-worker") as pool:
+            executed = sum(pool.map(self._run_host_group, groups.values()))
+
+        with self._held_lock:
+            unstarted = list(self._held)
+            self._held.clear()
+        if unstarted:
+            try:
+                self.queue.release(self.worker_id, unstarted)
+            except Exception as exc:
+                logger.warning(f"归还未执行子任务失败，等待租约过期回收: worker={self.worker_id}, error={exc}")
+        return executed
+
+    def _run_host_group(self, items: List[Dict]) -> int:
+        executed = 0
+        session = self.session_factory()
+        try:
+            for item in items:
+                if self._stop_event.is_set():
+                    break
+                with self._held_lock:
+                    token = self._held.get(item["id"])
+                if token is None or token.is_set():
+                    # 租约已失效（任务取消或被回收），不再执行
+                    self._forget(item["id"])
+                    continue
+                outcome = self._execute(item, session, token)
+                self._report(item, outcome)
+                self._forget(item["id"])
+                executed += 1
+        finally:
+            close = getattr(session, "close", None)
+            if callable(close):
+                close()
+        return executed
+
+    def _execute(self, item: Dict, session, token: CancellationToken) -> Dict:
+        try:
+            return self._resolve_executor()(item, session, token)
+        except Exception as exc:
+            logger.error(f"工作进程执行子任务失败: worker={self.worker_id}, item={item['id']}, error={exc}")
+            return {
+                "success": False,
+                "error": str(exc),
+                "target_url": item.get("target_url"),
+                "result": {"vulnerable": False, "reason": "批量任务执行异常", "details": str(exc)},
+            }
+
+    def _report(self, item: Dict, outcome: Dict):
+        # 执行结果可能含不可 JSON 序列化的对象，回报前统一转换
+        payload = json.loads(json.dumps(outcome, ensure_ascii=False, default=str))
+        try:
+            accepted = self.queue.complete(self.worker_id, item["id"], payload)
+        except Exception as exc:
+            logger.warning(f"回报子任务结果失败，等待租约过期后重新执行: item={item['id']}, error={exc}")
+            return
+        if not accepted:
+            logger.info(f"子任务结果未被接收（任务已取消或租约已失效）: item={item['id']}")
+
+    def _forget(self, item_id: int):
+        with self._held_lock:
+            token = self._held.pop(item_id, None)
+        if token is not None:
+            token.close()
+
+    def _heartbeat_loop(self):
+        interval = max(self.lease_seconds / 3, 0.05)
+        while not self._stop_event.wait(interval):
+            with self._held_lock:
+                held_ids = list(self._held)
+            if not held_ids:
+                continue
+            try:
+                still_held = set(self.queue.heartbeat(self.worker_id, held_ids, self.lease_seconds))
+            except Exception as exc:
+                logger.warning(f"子任务续约失败: worker={self.worker_id}, error={exc}")
+                continue
+            with self._held_lock:
+                lost = [self._held[item_id] for item_id in held_ids if item_id not in still_held and item_id in self._held]
+            for token in lost:
+                token.set()
+
+    def _resolve_executor(self) -> Callable[[Dict, object, CancellationToken], Dict]:
+        if self.executor is None:
+            from services.batch_task_service import batch_task_service
+
+            self.executor = batch_task_service.execute_item
+        return self.executor
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量任务外部工作进程")
+    parser.add_argument("--queue", default="http", choices=sorted(WORK_QUEUE_FACTORIES), help="工作队列后端，默认 http")
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000", help="API 节点地址（http 后端）")
+    parser.add_argument("--worker-id", help="工作进程标识，默认 主机名-进程号-随机后缀")
+    parser.add_argument("--concurrency", type=int, default=BatchWorker.DEFAULT_CONCURRENCY, help="并发执行的主机通道数")
+    parser.add_argument("--lease-seconds", type=float, default=BatchWorker.LEASE_SECONDS, help="子任务租约时长（秒）")
+    parser.add_argument("--poll-interval", type=float, default=BatchWorker.POLL_INTERVAL, help="队列为空时的轮询间隔（秒）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    queue_options = {"api_url": args.api_url} if args.queue == "http" else {}
+    worker = BatchWorker(
+        create_work_queue(args.queue, **queue_options),
+        worker_id=args.worker_id,
+        concurrency=args.concurrency,
+        lease_seconds=args.lease_seconds,
+        poll_interval=args.poll_interval,
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: worker.stop())
+    worker.run()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
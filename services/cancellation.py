@@ -0,0 +1,109 @@
+"""
+批量任务取消令牌
+
+在 threading.Event 基础上增加取消回调：
+1. 令牌置位时依次执行已注册回调（终止 Nuclei 子进程、中断 HTTP 连接、结束隔离执行进程）
+2. 子任务持有子令牌，执行结束即解除与任务令牌的关联，回调不会随子任务累积
+3. 通过 contextvar 绑定到当前执行上下文，底层运行时无需逐层传参
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+_current_token: ContextVar[Optional["CancellationToken"]] = ContextVar("batch_cancellation_token", default=None)
+
+
+class TaskCancelledError(RuntimeError):
+    """执行过程中检测到任务已取消。"""
+
+
+class CancellationToken(threading.Event):
+    """可注册取消回调的事件，兼容 threading.Event 的 set/is_set/wait 用法。"""
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks: List[Callable[[], None]] = []
+        self._callbacks_lock = threading.Lock()
+        self._detach: Optional[Callable[[], None]] = None
+
+    def set(self):
+        with self._callbacks_lock:
+            if self.is_set():
+                return
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """注册取消回调，返回解除注册的函数；已取消时立即执行。"""
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+
+                def remove():
+                    with self._callbacks_lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return remove
+        self._run_callback(callback)
+        return lambda: None
+
+    def child(self) -> "CancellationToken":
+        """创建随当前令牌一起取消的子令牌，用完后调用 close() 解除关联。"""
+        token = CancellationToken()
+        token._detach = self.add_callback(token.set)
+        return token
+
+    def close(self):
+        if self._detach:
+            self._detach()
+            self._detach = None
+        with self._callbacks_lock:
+            self._callbacks = []
+
+    def raise_if_cancelled(self):
+        if self.is_set():
+            raise TaskCancelledError("任务已取消")
+
+    def _run_callback(self, callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as exc:
+            logger.warning(f"执行取消回调失败: {exc}")
+
+
+def get_current_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+def on_cancel(callback: Callable[[], None]) -> Callable[[], None]:
+    """为当前上下文的令牌注册取消回调；未绑定令牌时不做任何事。"""
+    token = _current_token.get()
+    if token is None:
+        return lambda: None
+    return token.add_callback(callback)
+
+
+def raise_if_cancelled():
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def bind_token(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
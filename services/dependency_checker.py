@@ -73,10 +73,15 @@ def check_python_code_dependencies(code: str) -> Dict[str, Any]:
             "parse_error": f"{type(exc).__name__}: {exc}",
         }
 
+    return check_import_roots(imports)
+
+
+def check_import_roots(imports: List[str]) -> Dict[str, Any]:
+    """对已提取的 import 根模块做可用性检查，供缓存了 AST 解析结果的调用方复用。"""
     missing = [name for name in imports if not _is_module_available(name)]
     return {
         "ok": len(missing) == 0,
-        "imports": imports,
+        "imports": list(imports),
         "missing": missing,
         "summary": "依赖检查通过" if not missing else f"缺少依赖: {', '.join(missing)}",
     }
@@ -0,0 +1,182 @@
+"""
+批量任务详情压缩编码
+
+1. 优先使用 zstandard（可选依赖），未安装时回退到标准库 zlib
+2. 支持按引擎类型（poc / nuclei）训练预置字典，Nuclei finding 结构、HTTP 错误文本等
+   重复片段在字典中只存一份，小记录也能获得较高压缩率
+3. 字典以内容 CRC32 作为编号写入记录，历史记录在字典更新后仍可解码
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 取决于运行环境
+    zstandard = None
+
+
+logger = logging.getLogger(__name__)
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZLIB_DICT = 2
+CODEC_ZSTD = 3
+CODEC_ZSTD_DICT = 4
+
+COMPRESS_MIN_BYTES = 256
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+ZLIB_DICTIONARY_SIZE = 32 * 1024
+ZSTD_DICTIONARY_SIZE = 64 * 1024
+MANIFEST_FILENAME = "manifest.json"
+DICT_ID = struct.Struct(">I")
+_FRAGMENT_SPLIT = re.compile(rb'(?<=[,{\[])')
+
+
+def zstd_available() -> bool:
+    return zstandard is not None
+
+
+def build_zlib_dictionary(samples: List[bytes], size: int = ZLIB_DICTIONARY_SIZE) -> bytes:
+    """
+    从样本中挑选高频 JSON 片段拼成 zlib 预置字典
+
+    zlib 没有字典训练能力，这里按出现次数选片段，最常见的放在字典末尾（回溯距离最短）。
+    """
+    counter: Counter = Counter()
+    for sample in samples:
+        for fragment in _FRAGMENT_SPLIT.split(sample):
+            if 8 <= len(fragment) <= 512:
+                counter[fragment] += 1
+
+    chosen: List[bytes] = []
+    total = 0
+    for fragment, count in counter.most_common():
+        if count < 2 or total + len(fragment) > size:
+            continue
+        chosen.append(fragment)
+        total += len(fragment)
+    return b"".join(reversed(chosen))
+
+
+class DetailCodec:
+    """详情记录压缩器，线程安全；字典目录为空时只做无字典压缩。"""
+
+    def __init__(self, dictionary_dir: Optional[Path] = None, use_zstd: Optional[bool] = None):
+        self.dictionary_dir = Path(dictionary_dir) if dictionary_dir else None
+        self.use_zstd = zstd_available() if use_zstd is None else bool(use_zstd and zstd_available())
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Dict[str, int]]] = None
+        self._dictionaries: Dict[int, bytes] = {}
+
+    @property
+    def backend(self) -> str:
+        return "zstd" if self.use_zstd else "zlib"
+
+    def encode(self, raw: bytes, engine_type: Optional[str] = None) -> Tuple[int, bytes]:
+        if len(raw) < COMPRESS_MIN_BYTES:
+            return CODEC_RAW, raw
+
+        dict_id = self._current_dictionary_id(engine_type)
+        if self.use_zstd:
+            if dict_id is not None:
+                compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._zstd_dict(dict_id))
+                return CODEC_ZSTD_DICT, DICT_ID.pack(dict_id) + compressor.compress(raw)
+            return CODEC_ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+
+        if dict_id is not None:
+            compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, 15, zdict=self._load_dictionary(dict_id))
+            return CODEC_ZLIB_DICT, DICT_ID.pack(dict_id) + compressor.compress(raw) + compressor.flush()
+        return CODEC_ZLIB, zlib.compress(raw, ZLIB_LEVEL)
+
+    def decode(self, codec: int, payload: bytes) -> bytes:
+        if codec == CODEC_RAW:
+            return payload
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(payload)
+        if codec == CODEC_ZLIB_DICT:
+            (dict_id,) = DICT_ID.unpack_from(payload)
+            decompressor = zlib.decompressobj(15, zdict=self._load_dictionary(dict_id))
+            return decompressor.decompress(payload[DICT_ID.size:]) + decompressor.flush()
+        if codec in (CODEC_ZSTD, CODEC_ZSTD_DICT):
+            if zstandard is None:
+                raise ValueError("该详情记录使用 zstd 压缩，当前环境未安装 zstandard")
+            if codec == CODEC_ZSTD:
+                return zstandard.ZstdDecompressor().decompress(payload)
+            (dict_id,) = DICT_ID.unpack_from(payload)
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict(dict_id))
+            return decompressor.decompress(payload[DICT_ID.size:])
+        raise ValueError(f"未知的详情编码: {codec}")
+
+    def has_dictionary(self, engine_type: Optional[str]) -> bool:
+        return self._current_dictionary_id(engine_type) is not None
+
+    def train(self, engine_type: str, samples: List[bytes]) -> Optional[int]:
+        """用样本训练当前后端的字典并设为该引擎的默认字典，样本不足时返回 None。"""
+        if not self.dictionary_dir or not samples:
+            return None
+
+        if self.use_zstd:
+            try:
+                dictionary = zstandard.train_dictionary(ZSTD_DICTIONARY_SIZE, samples).as_bytes()
+            except zstandard.ZstdError as exc:
+                logger.info(f"zstd 字典训练失败（样本可能不足）: engine={engine_type}, error={exc}")
+                return None
+        else:
+            dictionary = build_zlib_dictionary(samples)
+        if not dictionary:
+            return None
+
+        dict_id = zlib.crc32(dictionary) & 0xFFFFFFFF
+        with self._lock:
+            self.dictionary_dir.mkdir(parents=True, exist_ok=True)
+            (self.dictionary_dir / f"{dict_id:08x}.{self.backend}.dict").write_bytes(dictionary)
+            self._dictionaries[dict_id] = dictionary
+            manifest = self._read_manifest()
+            manifest.setdefault(engine_type, {})[self.backend] = dict_id
+            (self.dictionary_dir / MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        logger.info(f"详情压缩字典已更新: engine={engine_type}, backend={self.backend}, id={dict_id:08x}")
+        return dict_id
+
+    def _current_dictionary_id(self, engine_type: Optional[str]) -> Optional[int]:
+        if not engine_type or not self.dictionary_dir:
+            return None
+        with self._lock:
+            return self._read_manifest().get(engine_type, {}).get(self.backend)
+
+    def _read_manifest(self) -> Dict[str, Dict[str, int]]:
+        if self._manifest is None:
+            manifest_path = self.dictionary_dir / MANIFEST_FILENAME if self.dictionary_dir else None
+            self._manifest = {}
+            if manifest_path and manifest_path.exists():
+                try:
+                    self._manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                except (OSError, json.JSONDecodeError) as exc:
+                    logger.warning(f"读取详情压缩字典清单失败: {exc}")
+        return self._manifest
+
+    def _load_dictionary(self, dict_id: int) -> bytes:
+        dictionary = self._dictionaries.get(dict_id)
+        if dictionary is not None:
+            return dictionary
+        if not self.dictionary_dir:
+            raise ValueError(f"缺少详情压缩字典: {dict_id:08x}")
+        matches = list(self.dictionary_dir.glob(f"{dict_id:08x}.*.dict"))
+        if not matches:
+            raise ValueError(f"缺少详情压缩字典: {dict_id:08x}")
+        dictionary = matches[0].read_bytes()
+        self._dictionaries[dict_id] = dictionary
+        return dictionary
+
+    def _zstd_dict(self, dict_id: int):
+        return zstandard.ZstdCompressionDict(self._load_dictionary(dict_id))
@@ -0,0 +1,151 @@
+"""
+批量任务详情存储迁移工具
+
+把旧版逐条 JSON 详情文件（batch_results/task_N/item_M.json）与数据库中内联的
+result_json 迁入压缩分段存储，并回写 detail_file 定位串。
+
+用法：
+    python -m services.detail_migration [--dry-run] [--keep-legacy] [--no-train]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.detail_store import is_segment_locator
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_PAGE_SIZE = 200
+TRAIN_SAMPLE_LIMIT = 512
+
+
+def _iter_legacy_rows(service, page_size: int = MIGRATION_PAGE_SIZE) -> Iterator[Dict]:
+    last_id = 0
+    while True:
+        with service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, task_id, engine_type, detail_file, result_json
+                FROM batch_task_items
+                WHERE id > ?
+                  AND ((detail_file IS NOT NULL AND detail_file NOT LIKE 'seg:%') OR result_json IS NOT NULL)
+                ORDER BY id ASC
+                LIMIT ?
+                """,
+                (last_id, page_size),
+            )
+            rows = [dict(row) for row in cursor.fetchall()]
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1]["id"]
+
+
+def _load_legacy_detail(row: Dict) -> Tuple[Optional[Dict], Optional[Path]]:
+    detail_file = row.get("detail_file")
+    if detail_file and not is_segment_locator(detail_file):
+        detail_path = Path(detail_file)
+        if detail_path.exists():
+            try:
+                with open(detail_path, "r", encoding="utf-8") as f:
+                    return json.load(f), detail_path
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning(f"旧版详情文件无法读取，跳过: item={row['id']}, error={exc}")
+                return None, None
+    if row.get("result_json"):
+        try:
+            return json.loads(row["result_json"]), None
+        except json.JSONDecodeError:
+            logger.warning(f"result_json 无法解析，跳过: item={row['id']}")
+    return None, None
+
+
+def migrate_detail_storage(
+    service=None,
+    dry_run: bool = False,
+    keep_legacy: bool = False,
+    train: bool = True,
+) -> Dict[str, int]:
+    """
+    迁移旧版详情存储
+
+    先从旧数据中按引擎类型抽样训练压缩字典（该引擎尚无字典且样本足够时），再逐条追加到分段存储，
+    迁移成功后清空 result_json 并删除旧文件。
+    """
+    if service is None:
+        from services.batch_task_service import batch_task_service as service
+
+    store = service._detail_store
+    stats = {"migrated": 0, "legacy_files": 0, "result_json": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0}
+
+    if train and not dry_run:
+        samples: Dict[str, List[bytes]] = {}
+        for row in _iter_legacy_rows(service):
+            engine_type = row.get("engine_type") or "poc"
+            if store.codec.has_dictionary(engine_type) or len(samples.get(engine_type, [])) >= TRAIN_SAMPLE_LIMIT:
+                continue
+            detail, _ = _load_legacy_detail(row)
+            if detail is not None:
+                samples.setdefault(engine_type, []).append(
+                    json.dumps(detail, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                )
+        for engine_type, engine_samples in samples.items():
+            if len(engine_samples) < service.DICTIONARY_MIN_SAMPLES:
+                continue
+            store.train_dictionary(engine_type, engine_samples)
+
+    for row in _iter_legacy_rows(service):
+        detail, legacy_path = _load_legacy_detail(row)
+        if detail is None:
+            stats["skipped"] += 1
+            continue
+
+        before = legacy_path.stat().st_size if legacy_path else len(row["result_json"].encode("utf-8"))
+        stats["bytes_before"] += before
+        stats["legacy_files" if legacy_path else "result_json"] += 1
+        if dry_run:
+            _, payload = store.encode(detail, row.get("engine_type") or "poc")
+            stats["bytes_after"] += len(payload)
+            stats["migrated"] += 1
+            continue
+
+        locator = store.append(row["task_id"], row["id"], detail, row.get("engine_type") or "poc")
+        stats["bytes_after"] += int(locator.rsplit(":", 1)[1])
+        with service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE batch_task_items SET detail_file = ?, result_json = NULL WHERE id = ?",
+                (locator, row["id"]),
+            )
+        if legacy_path and not keep_legacy:
+            try:
+                legacy_path.unlink()
+            except OSError as exc:
+                logger.warning(f"删除旧版详情文件失败: {legacy_path}, error={exc}")
+        stats["migrated"] += 1
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="迁移批量任务详情到压缩分段存储")
+    parser.add_argument("--dry-run", action="store_true", help="只统计迁移前后大小，不写入")
+    parser.add_argument("--keep-legacy", action="store_true", help="迁移后保留旧版 JSON 文件")
+    parser.add_argument("--no-train", action="store_true", help="不训练压缩字典")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    stats = migrate_detail_storage(dry_run=args.dry_run, keep_legacy=args.keep_legacy, train=not args.no_train)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
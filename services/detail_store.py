@@ -0,0 +1,334 @@
+"""
+批量任务详情分段存储
+
+替代“每个失败/命中子任务一个 JSON 文件”的落盘方式：
+1. 每个任务一个只追加的段文件 task_N/details.seg，记录为 [头部 + 压缩后的 JSON]
+2. 同目录 details.idx 保存定长偏移索引，可在数据库定位信息丢失时重建
+3. 数据库 detail_file 字段保存定位串 seg:task_N/details.seg:<offset>:<size>，读取为一次 seek
+4. 读取带 LRU 缓存，重复查看同一子任务详情不再访问磁盘
+5. 记录负载经 DetailCodec 压缩（zstd/zlib，可按引擎类型使用训练字典）
+6. 压实写入下一代段文件 details.<n>.seg / details.<n>.idx，新定位串提交后才删除旧代文件
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.detail_codec import DetailCodec
+
+
+LOCATOR_PREFIX = "seg:"
+SEGMENT_FILENAME = "details.seg"
+INDEX_FILENAME = "details.idx"
+GENERATION_PATTERN = re.compile(r"^details(?:\.(\d+))?\.(?:seg|idx)$")
+RECORD_MAGIC = b"PDR1"
+# magic, item_id, payload_length, codec
+RECORD_HEADER = struct.Struct(">4sIIB")
+# item_id, offset, record_size, codec
+INDEX_ENTRY = struct.Struct(">IQIB")
+
+DICTIONARY_DIRNAME = "_dictionaries"
+DEFAULT_CACHE_SIZE = 256
+
+
+class DetailStoreError(RuntimeError):
+    """段文件记录损坏或定位信息无效。"""
+
+
+def _generation_filename(filename: str, generation: int) -> str:
+    """第 0 代沿用 details.seg / details.idx，之后为 details.<n>.seg / details.<n>.idx。"""
+    if not generation:
+        return filename
+    stem, suffix = filename.rsplit(".", 1)
+    return f"{stem}.{generation}.{suffix}"
+
+
+def is_segment_locator(value: Optional[str]) -> bool:
+    return bool(value) and str(value).startswith(LOCATOR_PREFIX)
+
+
+def parse_locator(locator: str) -> Tuple[str, int, int]:
+    try:
+        relative_path, offset, size = locator[len(LOCATOR_PREFIX):].rsplit(":", 2)
+        return relative_path, int(offset), int(size)
+    except ValueError as exc:
+        raise DetailStoreError(f"无效的详情定位信息: {locator}") from exc
+
+
+class DetailSegmentStore:
+    """按任务分段的只追加详情存储，线程安全。"""
+
+    def __init__(
+        self,
+        root_dir: Path,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        codec: Optional[DetailCodec] = None,
+    ):
+        self.root_dir = Path(root_dir)
+        self.cache_size = max(int(cache_size or 0), 0)
+        self.codec = codec or DetailCodec(self.root_dir / DICTIONARY_DIRNAME)
+        self._cache: "OrderedDict[str, Tuple[int, Dict]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._task_locks: Dict[int, threading.Lock] = {}
+        self._task_locks_guard = threading.Lock()
+        self._generations: Dict[int, int] = {}
+
+    def segment_path(self, task_id: int, generation: Optional[int] = None) -> Path:
+        """当前（或指定）代的段文件路径，追加总是写入当前代。"""
+        if generation is None:
+            generation = self._generation(task_id)
+        return self._task_dir(task_id) / _generation_filename(SEGMENT_FILENAME, generation)
+
+    def index_path(self, task_id: int, generation: Optional[int] = None) -> Path:
+        if generation is None:
+            generation = self._generation(task_id)
+        return self._task_dir(task_id) / _generation_filename(INDEX_FILENAME, generation)
+
+    def append(self, task_id: int, item_id: int, detail: Dict, engine_type: Optional[str] = None) -> str:
+        """追加一条详情记录并返回定位串。"""
+        codec, payload = self.encode(detail, engine_type)
+        header = RECORD_HEADER.pack(RECORD_MAGIC, item_id, len(payload), codec)
+        record_size = len(header) + len(payload)
+
+        with self._task_lock(task_id):
+            generation = self._generation(task_id)
+            segment_path = self.segment_path(task_id, generation)
+            segment_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(segment_path, "ab") as segment:
+                offset = segment.tell()
+                segment.write(header)
+                segment.write(payload)
+            with open(self.index_path(task_id, generation), "ab") as index:
+                index.write(INDEX_ENTRY.pack(item_id, offset, record_size, codec))
+
+        locator = self._locator(task_id, generation, offset, record_size)
+        self._cache_put(locator, (item_id, detail))
+        return locator
+
+    def read(self, locator: str, item_id: Optional[int] = None) -> Dict:
+        """
+        按定位串读取详情
+
+        传入 item_id 时校验记录头中的子任务 ID，定位串过期或错配时抛出 DetailStoreError，
+        而不是返回其他子任务的详情。
+        """
+        cached = self._cache_get(locator)
+        if cached is None:
+            relative_path, offset, size = parse_locator(locator)
+            with open(self.root_dir / relative_path, "rb") as segment:
+                segment.seek(offset)
+                record = segment.read(size)
+            cached = self._decode_record(record)
+            self._cache_put(locator, cached)
+
+        record_item_id, detail = cached
+        if item_id is not None and record_item_id != item_id:
+            raise DetailStoreError(f"详情记录属于子任务 {record_item_id}，而不是 {item_id}: {locator}")
+        return detail
+
+    def iter_index(self, task_id: int) -> Iterator[Tuple[int, str]]:
+        """按写入顺序产出当前代的 (item_id, 定位串)，同一子任务多次写入时以最后一条为准。"""
+        generation = self._generation(task_id)
+        index_path = self.index_path(task_id, generation)
+        if not index_path.exists():
+            return
+        with open(index_path, "rb") as index:
+            while True:
+                raw = index.read(INDEX_ENTRY.size)
+                if len(raw) < INDEX_ENTRY.size:
+                    return
+                item_id, offset, record_size, _ = INDEX_ENTRY.unpack(raw)
+                yield item_id, self._locator(task_id, generation, offset, record_size)
+
+    def iter_raw_records(self, task_id: int, limit: Optional[int] = None) -> Iterator[bytes]:
+        """按写入顺序产出解压后的原始 JSON 字节，用于训练压缩字典。"""
+        segment_path = self.segment_path(task_id)
+        if not segment_path.exists():
+            return
+        count = 0
+        with open(segment_path, "rb") as segment:
+            while limit is None or count < limit:
+                header = segment.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                magic, _, length, codec = RECORD_HEADER.unpack(header)
+                payload = segment.read(length)
+                if magic != RECORD_MAGIC or len(payload) != length:
+                    return
+                yield self.codec.decode(codec, payload)
+                count += 1
+
+    @contextmanager
+    def compaction(self, task_id: int, keep_locators: Dict[int, str]) -> Iterator[Dict[int, str]]:
+        """
+        只保留指定子任务的记录写入下一代段文件与索引，产出 {item_id: 新定位串}
+
+        调用方须在 with 块内提交新定位串：块正常结束后才删除旧代文件；块内抛出异常时删除新文件，
+        旧文件原样保留，数据库回滚后的旧定位串仍然有效。提交前其他连接读到的旧定位串同样可读。
+        记录按原样拷贝（不重新压缩）；没有需要保留的记录时不写新文件，块结束后直接删除旧文件。
+        整个过程持有任务锁，期间的追加会等待压实结束。
+        """
+        with self._task_lock(task_id):
+            old_paths = self._generation_files(task_id)
+            generation = self._generation(task_id) + 1
+            new_paths = [self.segment_path(task_id, generation), self.index_path(task_id, generation)]
+            relocated: Dict[int, str] = {}
+            try:
+                if keep_locators:
+                    relocated = self._write_generation(task_id, generation, keep_locators)
+                yield relocated
+            except BaseException:
+                for path in new_paths:
+                    path.unlink(missing_ok=True)
+                self.invalidate(task_id)
+                raise
+
+            for path in old_paths:
+                path.unlink(missing_ok=True)
+            self.invalidate(task_id)
+
+    def _write_generation(self, task_id: int, generation: int, keep_locators: Dict[int, str]) -> Dict[int, str]:
+        task_prefix = f"task_{task_id}/"
+        relocated: Dict[int, str] = {}
+        sources = {}
+        try:
+            with open(self.segment_path(task_id, generation), "wb") as target, \
+                    open(self.index_path(task_id, generation), "wb") as index:
+                for item_id, locator in sorted(keep_locators.items()):
+                    relative_path, offset, size = parse_locator(locator)
+                    filename = relative_path[len(task_prefix):]
+                    if (
+                        not relative_path.startswith(task_prefix)
+                        or not filename.endswith(".seg")
+                        or not GENERATION_PATTERN.match(filename)
+                    ):
+                        raise DetailStoreError(f"定位信息不属于任务 {task_id}: {locator}")
+                    source = sources.get(filename)
+                    if source is None:
+                        source = sources[filename] = open(self.root_dir / relative_path, "rb")
+                    source.seek(offset)
+                    record = source.read(size)
+                    if len(record) != size or record[:len(RECORD_MAGIC)] != RECORD_MAGIC:
+                        raise DetailStoreError(f"详情记录已损坏: {locator}")
+                    _, record_item_id, _, codec = RECORD_HEADER.unpack_from(record)
+                    if record_item_id != item_id:
+                        raise DetailStoreError(f"详情记录属于子任务 {record_item_id}，而不是 {item_id}: {locator}")
+                    new_offset = target.tell()
+                    target.write(record)
+                    index.write(INDEX_ENTRY.pack(item_id, new_offset, size, codec))
+                    relocated[item_id] = self._locator(task_id, generation, new_offset, size)
+        finally:
+            for source in sources.values():
+                source.close()
+        return relocated
+
+    def train_dictionary(self, engine_type: str, samples: List[bytes]) -> Optional[int]:
+        return self.codec.train(engine_type, samples)
+
+    def encode(self, detail: Dict, engine_type: Optional[str] = None) -> Tuple[int, bytes]:
+        raw = json.dumps(detail, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self.codec.encode(raw, engine_type)
+
+    def decode(self, codec: int, payload: bytes) -> Dict:
+        try:
+            raw = self.codec.decode(codec, payload)
+        except (ValueError, zlib.error) as exc:
+            raise DetailStoreError(f"详情记录解码失败: {exc}") from exc
+        return json.loads(raw.decode("utf-8"))
+
+    def invalidate(self, task_id: Optional[int] = None):
+        with self._cache_lock:
+            if task_id is None:
+                self._cache.clear()
+                return
+            prefix = f"{LOCATOR_PREFIX}task_{task_id}/"
+            for locator in [key for key in self._cache if key.startswith(prefix)]:
+                self._cache.pop(locator, None)
+        with self._task_locks_guard:
+            if task_id is None:
+                self._generations.clear()
+            else:
+                self._generations.pop(task_id, None)
+
+    def _task_dir(self, task_id: int) -> Path:
+        return self.root_dir / f"task_{task_id}"
+
+    def _generation(self, task_id: int) -> int:
+        """当前代号：目录中最大的 details.<n>.seg，只有 details.seg 或尚无文件时为 0。"""
+        with self._task_locks_guard:
+            generation = self._generations.get(task_id)
+            if generation is None:
+                generation = max(
+                    (int(match.group(1) or 0) for match in map(GENERATION_PATTERN.match, self._task_filenames(task_id)) if match),
+                    default=0,
+                )
+                self._generations[task_id] = generation
+            return generation
+
+    def _generation_files(self, task_id: int) -> List[Path]:
+        task_dir = self._task_dir(task_id)
+        return [task_dir / name for name in self._task_filenames(task_id) if GENERATION_PATTERN.match(name)]
+
+    def _task_filenames(self, task_id: int) -> List[str]:
+        task_dir = self._task_dir(task_id)
+        return [entry.name for entry in task_dir.iterdir()] if task_dir.is_dir() else []
+
+    def _locator(self, task_id: int, generation: int, offset: int, record_size: int) -> str:
+        filename = _generation_filename(SEGMENT_FILENAME, generation)
+        return f"{LOCATOR_PREFIX}task_{task_id}/{filename}:{offset}:{record_size}"
+
+    def _decode_record(self, record: bytes) -> Tuple[int, Dict]:
+        if len(record) < RECORD_HEADER.size:
+            raise DetailStoreError("详情记录不完整")
+        magic, item_id, length, codec = RECORD_HEADER.unpack_from(record)
+        payload = record[RECORD_HEADER.size:RECORD_HEADER.size + length]
+        if magic != RECORD_MAGIC or len(payload) != length:
+            raise DetailStoreError("详情记录已损坏")
+        return item_id, self.decode(codec, payload)
+
+    def _task_lock(self, task_id: int) -> threading.Lock:
+        with self._task_locks_guard:
+            lock = self._task_locks.get(task_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._task_locks[task_id] = lock
+            return lock
+
+    def _cache_get(self, locator: str) -> Optional[Tuple[int, Dict]]:
+        with self._cache_lock:
+            detail = self._cache.get(locator)
+            if detail is not None:
+                self._cache.move_to_end(locator)
+            return detail
+
+    def _cache_put(self, locator: str, entry: Tuple[int, Dict]):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[locator] = entry
+            self._cache.move_to_end(locator)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+_stores: Dict[str, DetailSegmentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_detail_store(root_dir: Path) -> DetailSegmentStore:
+    """按根目录复用存储实例，保证同一目录的追加锁与缓存只有一份。"""
+    key = str(Path(root_dir).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = DetailSegmentStore(Path(root_dir))
+            _stores[key] = store
+        return store
@@ -0,0 +1,104 @@
+"""
+批量任务提前终止规则
+
+面向排查类扫描，命中后即可停止的子任务不再占用并发槽位：
+1. 单主机首个命中：该主机（host:port）剩余子任务跳过
+2. 单 POC 首个命中：该 POC/模板在其他目标上的剩余子任务跳过
+3. 全局命中预算：命中数达到上限后整个任务停止派发
+4. 时间预算：开始派发后超过预算时间，整个任务停止派发
+已派发的子任务照常执行完成，结果照常记录。
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from services.host_health import extract_host_key
+
+
+def item_poc_key(item: Dict) -> Tuple[str, int, str]:
+    return (item.get("engine_type") or "poc", int(item.get("poc_id") or 0), item.get("template_path") or "")
+
+
+class EarlyStopController:
+    """
+    提前终止状态跟踪
+
+    仅在批量任务调度线程内使用，不做加锁。record() 返回本次命中新触发的规则，
+    调度器据此批量跳过数据库中的待执行子任务；blocks() 用于过滤已预取到内存队列的子任务。
+    """
+
+    def __init__(
+        self,
+        stop_on_host_hit: bool = False,
+        stop_on_poc_hit: bool = False,
+        max_hits: Optional[int] = None,
+        time_budget_seconds: Optional[float] = None,
+        clock: Optional[Callable[[], float]] = None,
+    ):
+        self.stop_on_host_hit = bool(stop_on_host_hit)
+        self.stop_on_poc_hit = bool(stop_on_poc_hit)
+        self.max_hits = int(max_hits) if max_hits else None
+        self.time_budget_seconds = float(time_budget_seconds) if time_budget_seconds else None
+        self.clock = clock or time.monotonic
+        self.hits = 0
+        self.stopped_hosts: Set[str] = set()
+        self.stopped_pocs: Set[Tuple[str, int, str]] = set()
+        self.stop_reason: Optional[str] = None
+        self.stop_code: Optional[str] = None
+        self._started_at: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.stop_on_host_hit or self.stop_on_poc_hit or self.max_hits or self.time_budget_seconds)
+
+    def start(self):
+        if self._started_at is None:
+            self._started_at = self.clock()
+
+    def record(self, item: Dict, vulnerable: bool) -> Dict[str, object]:
+        """记录一条执行结果，返回新触发的规则：{"host": ..., "poc": ..., "task": ...}。"""
+        triggered: Dict[str, object] = {}
+        if not vulnerable:
+            return triggered
+        self.hits += 1
+
+        host = extract_host_key(item["target_url"])
+        if self.stop_on_host_hit and host not in self.stopped_hosts:
+            self.stopped_hosts.add(host)
+            triggered["host"] = host
+
+        poc_key = item_poc_key(item)
+        if self.stop_on_poc_hit and poc_key not in self.stopped_pocs:
+            self.stopped_pocs.add(poc_key)
+            triggered["poc"] = poc_key
+
+        if self.max_hits and self.hits >= self.max_hits and self.stop_reason is None:
+            self._stop("hit_budget", f"命中数达到预算 {self.max_hits}，任务提前终止")
+            triggered["task"] = self.stop_reason
+        return triggered
+
+    def check_time_budget(self) -> bool:
+        """时间预算耗尽时触发全局停止，仅在首次触发时返回 True。"""
+        if self.stop_reason is not None or not self.time_budget_seconds or self._started_at is None:
+            return False
+        if self.clock() - self._started_at < self.time_budget_seconds:
+            return False
+        self._stop("time_budget", f"执行时间超过预算 {self.time_budget_seconds:g} 秒，任务提前终止")
+        return True
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_reason is not None
+
+    def blocks(self, item: Dict) -> bool:
+        if self.stopped:
+            return True
+        if self.stopped_hosts and extract_host_key(item["target_url"]) in self.stopped_hosts:
+            return True
+        return bool(self.stopped_pocs) and item_poc_key(item) in self.stopped_pocs
+
+    def _stop(self, code: str, reason: str):
+        self.stop_code = code
+        self.stop_reason = reason
@@ -0,0 +1,130 @@
+"""
+POC 单次执行资源统计
+
+围绕 scan 调用记录：
+1. 墙钟耗时与调用线程 CPU 时间（异步 POC 在事件循环线程上消耗的 CPU 不计入）
+2. 经平台 HTTP 运行时（requests 会话、HTTPRuntimeClient、异步客户端、原始报文）发出的请求数与收发字节
+3. OOB 轮询等待时间
+4. 可选的峰值内存（tracemalloc 采样，tracemalloc 为进程级统计，并发执行时仅作近似参考）
+
+统计对象通过 contextvar 绑定到当前执行上下文，POC 自建线程中的请求不计入。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+_current_metrics: ContextVar[Optional["ExecutionMetrics"]] = ContextVar("poc_execution_metrics", default=None)
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+@dataclass
+class ExecutionMetrics:
+    wall_ms: float = 0.0
+    cpu_ms: float = 0.0
+    http_requests: int = 0
+    http_bytes_sent: int = 0
+    http_bytes_received: int = 0
+    oob_wait_ms: float = 0.0
+    peak_memory_kb: Optional[int] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add_http(self, sent: int, received: int):
+        with self._lock:
+            self.http_requests += 1
+            self.http_bytes_sent += max(int(sent or 0), 0)
+            self.http_bytes_received += max(int(received or 0), 0)
+
+    def add_oob_wait(self, seconds: float):
+        with self._lock:
+            self.oob_wait_ms += max(seconds, 0) * 1000
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "wall_ms": round(self.wall_ms, 2),
+            "cpu_ms": round(self.cpu_ms, 2),
+            "http_requests": self.http_requests,
+            "http_bytes_sent": self.http_bytes_sent,
+            "http_bytes_received": self.http_bytes_received,
+            "oob_wait_ms": round(self.oob_wait_ms, 2),
+            "peak_memory_kb": self.peak_memory_kb,
+        }
+
+
+def record_http_exchange(sent: int, received: int):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.add_http(sent, received)
+
+
+@contextmanager
+def oob_wait_timer() -> Iterator[None]:
+    """计入 OOB 轮询等待时间。"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            metrics.add_oob_wait(time.monotonic() - started)
+
+
+def payload_size(payload) -> int:
+    """请求/响应体字节数，无法确定长度（生成器、文件对象）时按 0 计。"""
+    if payload is None:
+        return 0
+    if isinstance(payload, str):
+        return len(payload.encode("utf-8", errors="replace"))
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        return len(payload)
+    return 0
+
+
+@contextmanager
+def measure_execution(trace_memory: bool = False) -> Iterator[ExecutionMetrics]:
+    """统计 with 块内的执行资源，退出时填充耗时字段。"""
+    metrics = ExecutionMetrics()
+    token = _current_metrics.set(metrics)
+    baseline = _start_tracemalloc() if trace_memory else None
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
+    try:
+        yield metrics
+    finally:
+        metrics.cpu_ms = (time.thread_time() - cpu_started) * 1000
+        metrics.wall_ms = (time.perf_counter() - wall_started) * 1000
+        if baseline is not None:
+            metrics.peak_memory_kb = _stop_tracemalloc(baseline)
+        _current_metrics.reset(token)
+
+
+def _start_tracemalloc() -> int:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        if _tracemalloc_users == 0:
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_tracemalloc(baseline: int) -> int:
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            # 只停止由本模块启动的追踪，外部已开启的 tracemalloc 保持不变
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+    return max(peak - baseline, 0) // 1024
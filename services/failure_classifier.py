@@ -44,6 +44,11 @@ def _build_classification(
     }
 
 
+def build_skip_classification(category: str, code: str, retryable: bool = True) -> Dict[str, Any]:
+    """调度阶段主动跳过（未实际执行）的子任务分类。"""
+    return _build_classification(category, code, "scheduling", retryable=retryable)
+
+
 def classify_execution_outcome(outcome: Dict[str, Any]) -> Dict[str, Any]:
     """
     将单条执行结果转为最小结构化分类。
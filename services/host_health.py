@@ -0,0 +1,144 @@
+"""
+目标主机健康度跟踪（批量任务熔断）
+
+按主机统计连续网络异常次数：
+1. 达到阈值后熔断，该主机剩余子任务不再占用并发槽位
+2. 可选在冷却时间后放行一个探测子任务，成功则恢复，失败则继续熔断
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+
+def extract_host_key(url: str) -> str:
+    """将目标URL归一为 host:port，作为熔断与调度的主机维度。"""
+    cleaned = (url or "").strip()
+    if not cleaned.startswith(("http://", "https://")):
+        cleaned = "http://" + cleaned
+
+    parsed = urlparse(cleaned)
+    host = (parsed.hostname or "").lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        return parsed.netloc.lower()
+    if not port:
+        port = 443 if parsed.scheme == "https" else 80
+    return f"{host}:{port}"
+
+
+@dataclass
+class HostState:
+    state: str = "closed"
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    probes_used: int = 0
+    last_failure_code: Optional[str] = None
+
+
+class HostCircuitBreaker:
+    """
+    主机级熔断器
+
+    状态流转：closed -> open（连续网络异常达到阈值）-> half_open（放行探测）
+    -> closed（探测成功）/ open（探测失败）。
+    仅在批量任务调度线程内使用，不做加锁。
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        recovery_probe: bool = True,
+        recovery_interval: float = 30.0,
+        max_recovery_probes: int = 1,
+        clock: Optional[Callable[[], float]] = None,
+    ):
+        self.failure_threshold = max(int(failure_threshold or 0), 0)
+        self.recovery_probe = bool(recovery_probe)
+        self.recovery_interval = max(float(recovery_interval or 0), 0)
+        self.max_recovery_probes = max(int(max_recovery_probes or 0), 0)
+        self.clock = clock or time.monotonic
+        self._hosts: Dict[str, HostState] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def _get_state(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = HostState()
+            self._hosts[host] = state
+        return state
+
+    def allows(self, host: str) -> bool:
+        """主机是否处于可正常派发状态。"""
+        if not self.enabled:
+            return True
+        return self._get_state(host).state == "closed"
+
+    def can_recover(self, host: str) -> bool:
+        """熔断后是否仍有恢复探测机会（决定子任务是延后还是直接跳过）。"""
+        if not self.enabled or not self.recovery_probe:
+            return False
+        state = self._get_state(host)
+        if state.state == "half_open":
+            return True
+        return state.probes_used < self.max_recovery_probes
+
+    def seconds_until_probe(self, host: str) -> float:
+        state = self._get_state(host)
+        if state.state != "open":
+            return self.recovery_interval
+        return max(state.opened_at + self.recovery_interval - self.clock(), 0.0)
+
+    def try_acquire_probe(self, host: str) -> bool:
+        """冷却时间已到且仍有探测次数时，切换到 half_open 并放行一个探测子任务。"""
+        state = self._get_state(host)
+        if state.state != "open" or not self.can_recover(host):
+            return False
+        if self.seconds_until_probe(host) > 0:
+            return False
+        state.state = "half_open"
+        state.probes_used += 1
+        return True
+
+    def record(self, host: str, classification: Optional[Dict]) -> str:
+        """记录一次执行结果并返回主机最新状态。"""
+        if not self.enabled:
+            return "closed"
+
+        state = self._get_state(host)
+        classification = classification or {}
+        if classification.get("failure_category") != "network_error":
+            state.state = "closed"
+            state.consecutive_failures = 0
+            state.probes_used = 0
+            return state.state
+
+        state.consecutive_failures += 1
+        state.last_failure_code = classification.get("failure_code")
+        if state.state == "half_open" or state.consecutive_failures >= self.failure_threshold:
+            state.state = "open"
+            state.opened_at = self.clock()
+        return state.state
+
+    def skip_reason(self, host: str) -> str:
+        state = self._get_state(host)
+        detail = f"（最近错误: {state.last_failure_code}）" if state.last_failure_code else ""
+        return f"目标主机 {host} 连续 {state.consecutive_failures} 次网络异常，已熔断跳过{detail}"
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            host: {
+                "state": state.state,
+                "consecutive_failures": state.consecutive_failures,
+                "probes_used": state.probes_used,
+                "last_failure_code": state.last_failure_code,
+            }
+            for host, state in self._hosts.items()
+        }
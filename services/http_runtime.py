@@ -5,22 +5,47 @@
 1. 给新生成 POC 提供统一 HTTP helper
 2. 保持旧 requests 脚本继续兼容
 3. 预留原始 HTTP 报文重放能力
+4. 批量任务可为当前执行上下文绑定共享 keep-alive 会话，同一主机的多个 POC 复用连接
+5. 任务取消时主动关闭进行中的连接，阻塞在收发上的请求立即返回
+6. 异步 POC 使用 AsyncHTTPRuntimeClient（基于 httpx，可选依赖），同一事件循环共享连接池
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import socket
 import ssl
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass, field
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from services.cancellation import on_cancel, raise_if_cancelled
+from services.execution_metrics import record_http_exchange
 
 
 DEFAULT_HEADERS = {
     "User-Agent": "AI-POC/1.0",
 }
+KEEPALIVE_POOL_SIZE = 4
+ASYNC_MAX_CONNECTIONS = 1000
+ASYNC_MAX_KEEPALIVE_CONNECTIONS = 200
+
+_bound_session: ContextVar[Optional[requests.Session]] = ContextVar("http_runtime_bound_session", default=None)
+# 事件循环 -> {verify: httpx.AsyncClient}，事件循环被回收后对应连接池一并释放
+_shared_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[bool, object]]" = weakref.WeakKeyDictionary()
 
 
 @dataclass
@@ -32,6 +57,7 @@ class HTTPRuntimeClient:
     session: requests.Session = field(default_factory=requests.Session)
 
     def request(self, method: str, url: str, **kwargs):
+        raise_if_cancelled()
         headers = dict(self.headers)
         headers.update(kwargs.pop("headers", {}) or {})
         kwargs.setdefault("timeout", self.timeout)
@@ -74,10 +100,191 @@ def create_http_client(
         verify=verify,
         allow_redirects=allow_redirects,
         headers=resolved_headers,
-        session=session or requests.Session(),
+        session=session or _bound_session.get() or requests.Session(),
     )
 
 
+@dataclass
+class AsyncHTTPRuntimeClient:
+    """HTTPRuntimeClient 的异步版本，供 async def scan 的 POC 并发发起大量探测。"""
+
+    timeout: float = 6
+    verify: bool = False
+    allow_redirects: bool = True
+    headers: Dict[str, str] = field(default_factory=lambda: dict(DEFAULT_HEADERS))
+    client: Optional[object] = None
+
+    async def request(self, method: str, url: str, **kwargs):
+        raise_if_cancelled()
+        headers = dict(self.headers)
+        headers.update(kwargs.pop("headers", {}) or {})
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("follow_redirects", kwargs.pop("allow_redirects", self.allow_redirects))
+        if kwargs.get("data") is not None and not isinstance(kwargs["data"], dict):
+            # httpx 的原始请求体使用 content 参数，兼容 requests 风格的 data=str/bytes 写法
+            kwargs["content"] = kwargs.pop("data")
+        kwargs["headers"] = headers
+        client = self.client or get_shared_async_client(self.verify)
+        response = await client.request(method.upper(), url, **kwargs)
+        record_http_exchange(len(response.request.content or b""), len(response.content or b""))
+        return response
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs):
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    async def raw_request(self, raw: str, use_ssl: bool = False, timeout: Optional[int] = None):
+        return await asyncio.to_thread(send_raw_http, raw=raw, use_ssl=use_ssl, timeout=timeout or self.timeout)
+
+
+def _require_httpx():
+    if httpx is None:
+        raise RuntimeError("异步 HTTP helper 依赖 httpx，请先安装 httpx")
+
+
+def get_shared_async_client(verify: bool = False):
+    """返回当前事件循环共享的 httpx.AsyncClient，同一循环内的异步 POC 复用连接池。"""
+    _require_httpx()
+    loop = asyncio.get_running_loop()
+    clients = _shared_async_clients.setdefault(loop, {})
+    client = clients.get(bool(verify))
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            verify=bool(verify),
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        clients[bool(verify)] = client
+    return client
+
+
+async def close_shared_async_clients():
+    """关闭当前事件循环的共享连接池。"""
+    clients = _shared_async_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def create_async_http_client(
+    timeout: float = 6,
+    verify: bool = False,
+    allow_redirects: bool = True,
+    headers: Optional[Dict[str, str]] = None,
+    client: Optional[object] = None,
+) -> AsyncHTTPRuntimeClient:
+    _require_httpx()
+    resolved_headers = dict(DEFAULT_HEADERS)
+    resolved_headers.update(headers or {})
+    return AsyncHTTPRuntimeClient(
+        timeout=timeout,
+        verify=verify,
+        allow_redirects=allow_redirects,
+        headers=resolved_headers,
+        client=client,
+    )
+
+
+async def async_http_request(method: str, url: str, **kwargs):
+    return await create_async_http_client().request(method, url, **kwargs)
+
+
+def _abort_socket(sock):
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class _CancellableConnectionMixin:
+    """
+    每次发起请求时向当前取消令牌登记连接，取消时直接 shutdown socket 打断阻塞的收发。
+
+    keep-alive 连接会被不同子任务复用，因此按请求而不是按建连登记。
+    """
+
+    _cancel_remove = None
+
+    def request(self, *args, **kwargs):
+        self._release_cancel()
+        connection = self
+        self._cancel_remove = on_cancel(lambda: _abort_socket(connection.sock))
+        return super().request(*args, **kwargs)
+
+    def close(self):
+        self._release_cancel()
+        super().close()
+
+    def _release_cancel(self):
+        if self._cancel_remove:
+            self._cancel_remove()
+            self._cancel_remove = None
+
+
+class _CancellableHTTPConnection(_CancellableConnectionMixin, HTTPConnection):
+    pass
+
+
+class _CancellableHTTPSConnection(_CancellableConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _CancellableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CancellableHTTPConnection
+
+
+class _CancellableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CancellableHTTPSConnection
+
+
+class CancellableHTTPAdapter(HTTPAdapter):
+    """连接可被批量任务取消令牌中断的 HTTPAdapter。"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CancellableHTTPConnectionPool,
+            "https": _CancellableHTTPSConnectionPool,
+        }
+
+
+def create_keepalive_session(pool_size: int = KEEPALIVE_POOL_SIZE, host_count: int = 1) -> requests.Session:
+    """
+    创建 keep-alive 会话，供批量任务按主机复用 TCP/TLS 连接；默认面向单一主机，
+    host_count 为会话同时保持连接池的主机数（scan_many 分块横跨多个主机）。
+    """
+    session = requests.Session()
+    adapter = CancellableHTTPAdapter(
+        pool_connections=max(int(host_count or 1), 1),
+        pool_maxsize=max(int(pool_size or 1), 1),
+        max_retries=0,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@contextmanager
+def bind_session(session: Optional[requests.Session]) -> Iterator[None]:
+    """在当前执行上下文内，让未显式传入 session 的 HTTP 客户端复用指定会话。"""
+    token = _bound_session.set(session)
+    try:
+        yield
+    finally:
+        _bound_session.reset(token)
+
+
 def get_http_client() -> HTTPRuntimeClient:
     return create_http_client()
 
@@ -156,6 +363,7 @@ def send_raw_http(raw: str, use_ssl: bool = False, timeout: int = 6) -> Dict[str
         raw_response = b"".join(chunks)
     finally:
         sock.close()
+    record_http_exchange(len(request_text.encode("utf-8")), len(raw_response))
 
     try:
         text = raw_response.decode("utf-8")
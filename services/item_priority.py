@@ -0,0 +1,143 @@
+"""
+批量子任务优先级评分
+
+派发前为每个待执行子任务打分，分数高的先执行，缩短大任务的首个命中时间。评分由五部分组成：
+1. 严重程度：Nuclei 模板 info.severity，POC 取 metadata/tags 中的 severity，缺失时按漏洞类型推断
+2. 威胁情报：EPSS 分数与是否收录于 CISA KEV（metadata 字段或 kev 标签）
+3. 历史命中率：该 POC/模板在以往任务中的命中比例（带先验平滑，样本少时接近先验）
+4. 目标指纹：存活探测得到的 Server 头与 POC 名称/标签/模板路径的关键字重合
+5. 执行开销：保存 POC 时静态估算的单次耗时，同等条件下便宜的 POC 先执行
+"""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set
+
+SEVERITY_WEIGHTS = {
+    "critical": 400,
+    "high": 300,
+    "medium": 200,
+    "low": 100,
+    "info": 0,
+    "unknown": 150,
+}
+KEV_BONUS = 200
+EPSS_WEIGHT = 200
+HIT_RATE_WEIGHT = 300
+FINGERPRINT_BONUS = 150
+# 每估算 1 秒扣分，封顶后不再区分，避免开销压过严重程度
+COST_PENALTY_PER_SECOND = 5
+COST_PENALTY_MAX_SECONDS = 30
+
+HIT_RATE_PRIOR = 0.05
+HIT_RATE_PRIOR_WEIGHT = 10
+
+TEMPLATE_HEADER_BYTES = 4096
+
+# 没有显式 severity 的 POC 按漏洞类型关键字推断，按顺序匹配
+VULN_TYPE_SEVERITY = (
+    (("rce", "命令执行", "代码执行", "反序列化", "deserializ", "command", "getshell"), "critical"),
+    (("sql", "注入", "upload", "上传", "xxe", "ssrf", "auth", "越权", "未授权", "bypass", "lfi", "rfi", "traversal", "文件读取", "文件包含"), "high"),
+    (("xss", "csrf", "redirect", "跳转", "泄露", "disclosure", "exposure"), "medium"),
+)
+
+_TEMPLATE_FIELD_PATTERNS = {
+    "severity": re.compile(r"^\s*severity:\s*['\"]?([A-Za-z]+)", re.MULTILINE),
+    "epss": re.compile(r"^\s*epss-score:\s*['\"]?([0-9.]+)", re.MULTILINE),
+    "tags": re.compile(r"^\s*tags:\s*(.+)$", re.MULTILINE),
+}
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9]{2,}")
+# 这些词在 Server 头里太常见，不作为指纹
+_GENERIC_TOKENS = {"http", "https", "server", "web", "www", "linux", "unix", "ubuntu", "debian", "centos", "win32", "win64"}
+
+
+def normalize_severity(value: Any) -> Optional[str]:
+    severity = str(value or "").strip().lower()
+    return severity if severity in SEVERITY_WEIGHTS else None
+
+
+def split_tags(tags: Any) -> Set[str]:
+    if isinstance(tags, (list, tuple, set)):
+        raw = tags
+    else:
+        raw = str(tags or "").split(",")
+    return {str(tag).strip().lower() for tag in raw if str(tag).strip()}
+
+
+def infer_severity(vuln_type: Optional[str], vuln_name: Optional[str] = None) -> str:
+    text = f"{vuln_type or ''} {vuln_name or ''}".lower()
+    for keywords, severity in VULN_TYPE_SEVERITY:
+        if any(keyword in text for keyword in keywords):
+            return severity
+    return "unknown"
+
+
+def poc_profile(poc: Optional[Dict]) -> Dict:
+    """从 POC 记录提取评分信息：severity/epss/kev/关键字。"""
+    poc = poc or {}
+    metadata = poc.get("metadata") if isinstance(poc.get("metadata"), dict) else {}
+    tags = split_tags(poc.get("tags")) | split_tags(metadata.get("tags"))
+    severity = normalize_severity(metadata.get("severity"))
+    if severity is None:
+        severity = next((tag for tag in tags if normalize_severity(tag)), None)
+    if severity is None:
+        severity = infer_severity(poc.get("vuln_type"), poc.get("vuln_name"))
+    return {
+        "severity": severity,
+        "epss": _safe_float(metadata.get("epss", metadata.get("epss_score"))),
+        "kev": bool(metadata.get("kev")) or "kev" in tags,
+        "keywords": _tokens(" ".join([poc.get("vuln_name") or "", poc.get("vuln_type") or "", *tags])),
+        "estimated_seconds": _safe_float(poc.get("estimated_seconds")),
+    }
+
+
+def template_profile(template_file: Path, template_path: str = "") -> Dict:
+    """只读取模板文件头部解析 severity/epss-score/tags，文件不可读时按 unknown 处理。"""
+    try:
+        with open(template_file, "r", encoding="utf-8", errors="ignore") as f:
+            header = f.read(TEMPLATE_HEADER_BYTES)
+    except OSError:
+        header = ""
+
+    fields = {name: pattern.search(header) for name, pattern in _TEMPLATE_FIELD_PATTERNS.items()}
+    tags = split_tags(fields["tags"].group(1).strip("'\"[]") if fields["tags"] else "")
+    return {
+        "severity": normalize_severity(fields["severity"].group(1) if fields["severity"] else None) or "unknown",
+        "epss": _safe_float(fields["epss"].group(1) if fields["epss"] else None),
+        "kev": "kev" in tags,
+        "keywords": _tokens(" ".join([template_path, *tags])),
+    }
+
+
+def smoothed_hit_rate(hits: int, runs: int) -> float:
+    return (hits + HIT_RATE_PRIOR * HIT_RATE_PRIOR_WEIGHT) / (runs + HIT_RATE_PRIOR_WEIGHT)
+
+
+def fingerprint_tokens(probe: Optional[Dict]) -> Set[str]:
+    server = (probe or {}).get("server") if isinstance(probe, dict) else None
+    return _tokens(server or "") - _GENERIC_TOKENS
+
+
+def score_item(profile: Dict, hit_rate: float, target_tokens: Iterable[str] = ()) -> int:
+    score = SEVERITY_WEIGHTS.get(profile.get("severity") or "unknown", SEVERITY_WEIGHTS["unknown"])
+    if profile.get("kev"):
+        score += KEV_BONUS
+    score += EPSS_WEIGHT * min(max(profile.get("epss") or 0.0, 0.0), 1.0)
+    score += HIT_RATE_WEIGHT * hit_rate
+    if set(target_tokens) & profile.get("keywords", set()):
+        score += FINGERPRINT_BONUS
+    estimated_seconds = profile.get("estimated_seconds")
+    if estimated_seconds:
+        score -= COST_PENALTY_PER_SECOND * min(estimated_seconds, COST_PENALTY_MAX_SECONDS)
+    return int(round(score))
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(_TOKEN_PATTERN.findall(str(text).lower()))
+
+
+def _safe_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
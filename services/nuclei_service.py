@@ -12,8 +12,11 @@ from pathlib import Path
 from typing import List, Dict, Optional, Generator, Tuple, AsyncGenerator
 from functools import lru_cache
 import os
+import signal
 import time
 
+from services.cancellation import get_current_token, on_cancel
+
 logger = logging.getLogger(__name__)
 
 # 全局线程池
@@ -344,13 +347,14 @@ class NucleiService:
 
             logger.info(f"执行 Nuclei 扫描: {' '.join(cmd)}")
 
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout + PROCESS_TIMEOUT_BUFFER,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-            )
+            result = self._run_scan_process(cmd, timeout + PROCESS_TIMEOUT_BUFFER)
+            token = get_current_token()
+            if token is not None and token.is_set():
+                return {
+                    "success": False,
+                    "target_url": target_url,
+                    "error": "扫描已取消，Nuclei 进程已终止"
+                }
 
             findings = []
             if result.stdout:
@@ -389,6 +393,51 @@ class NucleiService:
                 "error": str(e)
             }
 
+    def _run_scan_process(self, cmd: List[str], timeout: int) -> subprocess.CompletedProcess:
+        """
+        启动 Nuclei 子进程并等待结束
+
+        子进程放在独立进程组中，批量任务取消时整组终止（含 Nuclei 派生的子进程），
+        超时同样会终止整组而不是只结束直接子进程。
+        """
+        popen_kwargs = {}
+        if os.name == 'nt':
+            popen_kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            popen_kwargs["start_new_session"] = True
+
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            **popen_kwargs
+        )
+        remove_callback = on_cancel(lambda: self._kill_process_tree(process))
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill_process_tree(process)
+            process.communicate()
+            raise
+        finally:
+            remove_callback()
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def _kill_process_tree(self, process: subprocess.Popen):
+        if process.poll() is not None:
+            return
+        try:
+            if os.name == 'nt':
+                process.kill()
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
     def _format_finding(self, finding: Dict) -> Dict:
         """格式化扫描发现"""
         return {
@@ -5,23 +5,35 @@ OOB 外带验证服务
 1. 统一管理 Interactsh / CEye 配置
 2. 为 POC 脚本提供统一的 OOB client
 3. 统一返回命中/未命中/异常语义
+4. 进程内按提供商共享 OOB client：只注册一次，各 POC 通过 build_probe 拿到同一
+   correlation ID 下的唯一子域名；Interactsh 轮询到的交互按 flag 分发给等待中的 POC，
+   避免某个 POC 的轮询把其他 POC 的交互记录取走
+5. 每个共享 client 由一个后台轮询线程统一轮询：每个间隔只为全部未决 flag 轮询一次，
+   交互只解密一次，再按 flag 完成各自的 future；verify 仅等待 future，
+   async def scan 可使用 await client.verify_async(...)，轮询负载不随并发数增长
 """
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import concurrent.futures
 import importlib
 import json
 import logging
 import random
 import re
+import threading
 import time
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 import requests
 
+from services.cancellation import TaskCancelledError, on_cancel
+from services.execution_metrics import oob_wait_timer
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_OOB_CONFIG = {
@@ -35,16 +47,162 @@ DEFAULT_OOB_CONFIG = {
     "max_polls": 3,
 }
 
+# 共享 client 的最长复用时间，超过后重新注册，避免长期运行的进程沿用已被服务端淘汰的会话
+SHARED_CLIENT_TTL_SECONDS = 1800
+# 共享 Interactsh client 上登记的 flag 保留时间，超时未 verify 的 flag 不再接收交互
+FLAG_RETENTION_SECONDS = 900
+# 单次轮询请求的超时，verify 等待上限按 max_polls * (poll_interval + 该值) 计算
+POLL_REQUEST_TIMEOUT = 10
+
+
+def _unmatched_result(error: Optional[str] = None) -> Dict[str, object]:
+    return {"matched": False, "events": [], "error": error}
+
+
+class OOBPoller:
+    """
+    单个 OOB client 的后台轮询线程。
+
+    有未决 flag 时线程存活，每轮调用一次 client._poll_flags 取回全部 flag 的交互；
+    命中的 flag 立即完成，未命中的 flag 在用完 max_polls 轮后以未命中完成。没有未决 flag 时线程退出，
+    下次 watch 时再拉起。
+    """
+
+    def __init__(self, client: "BaseOOBClient"):
+        self.client = client
+        self._lock = threading.Lock()
+        self._watches: Dict[str, Dict[str, object]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, flag: str, protocol: str = "http") -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        flag = flag.lower()
+        self.client._track_flag(flag)
+        # 其他 POC 的轮询可能已经取回了该 flag 的交互
+        events = self.client._claim_events(flag)
+        if events:
+            self.client._forget_flag(flag)
+            future.set_result({"matched": True, "events": events, "error": None})
+            return future
+
+        with self._lock:
+            watch = self._watches.get(flag)
+            if watch is None:
+                watch = {"protocol": protocol, "remaining": self.client.max_polls, "futures": []}
+                self._watches[flag] = watch
+            watch["futures"].append(future)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="oob-poller", daemon=True)
+                self._thread.start()
+        return future
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._watches)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                for flag, watch in list(self._watches.items()):
+                    watch["futures"] = [future for future in watch["futures"] if not future.cancelled()]
+                    if not watch["futures"]:
+                        # 等待方均已放弃（任务取消 / 超时），不再为该 flag 轮询
+                        del self._watches[flag]
+                        self.client._forget_flag(flag)
+                if not self._watches:
+                    self._thread = None
+                    return
+                pending = {flag: watch["protocol"] for flag, watch in self._watches.items()}
+
+            try:
+                found = self.client._poll_flags(pending)
+            except Exception as exc:
+                logger.warning("OOB 轮询失败: %s", exc)
+                found = {}
+
+            finished = []
+            with self._lock:
+                for flag in pending:
+                    watch = self._watches.get(flag)
+                    if watch is None:
+                        continue
+                    events = found.get(flag)
+                    if events:
+                        result = {"matched": True, "events": events, "error": None}
+                    else:
+                        watch["remaining"] -= 1
+                        if watch["remaining"] > 0:
+                            continue
+                        result = _unmatched_result()
+                    del self._watches[flag]
+                    finished.append((flag, watch["futures"], result))
+                idle = not self._watches
+
+            for flag, futures, result in finished:
+                self.client._forget_flag(flag)
+                for future in futures:
+                    try:
+                        future.set_result(dict(result))
+                    except concurrent.futures.InvalidStateError:
+                        # 等待方已因任务取消放弃该 future
+                        pass
+
+            if not idle:
+                self.client.sleep_func(self.client.poll_interval)
+
 
 class BaseOOBClient:
-    """统一 OOB client 接口。"""
+    """统一 OOB client 接口，verify / verify_async 均由后台轮询线程完成。"""
+
+    poll_interval: float = 1.0
+    max_polls: int = 3
 
     def build_probe(self, protocol: str = "http", length: int = 10, value: str = "") -> Dict[str, str]:
         raise NotImplementedError
 
-    def verify(self, flag: str, protocol: str = "http") -> Dict[str, object]:
+    def _poll_flags(self, flags: Dict[str, str]) -> Dict[str, List[Dict[str, object]]]:
+        """轮询一次，返回 flag -> 命中交互；flags 为 flag -> 协议。"""
         raise NotImplementedError
 
+    def _track_flag(self, flag: str):
+        pass
+
+    def _claim_events(self, flag: str) -> List[Dict[str, object]]:
+        return []
+
+    def _forget_flag(self, flag: str):
+        pass
+
+    def watch(self, flag: str, protocol: str = "http") -> concurrent.futures.Future:
+        """登记待验证的 flag，返回在命中或轮询次数用完时完成的 future。"""
+        return self._poller.watch(flag, protocol)
+
+    def _wait_timeout(self) -> float:
+        return self.max_polls * (self.poll_interval + POLL_REQUEST_TIMEOUT) + POLL_REQUEST_TIMEOUT
+
+    def verify(self, flag: str, protocol: str = "http") -> Dict[str, object]:
+        with oob_wait_timer():
+            future = self.watch(flag, protocol)
+            remove_callback = on_cancel(future.cancel)
+            try:
+                return future.result(self._wait_timeout())
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                return _unmatched_result("OOB 轮询超时")
+            except concurrent.futures.CancelledError:
+                raise TaskCancelledError("任务已取消")
+            finally:
+                remove_callback()
+
+    async def verify_async(self, flag: str, protocol: str = "http") -> Dict[str, object]:
+        """供 async def scan 使用，等待期间不占用事件循环。"""
+        with oob_wait_timer():
+            future = self.watch(flag, protocol)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), self._wait_timeout())
+            except asyncio.TimeoutError:
+                return _unmatched_result("OOB 轮询超时")
+
 
 class CEyeClient(BaseOOBClient):
     def __init__(
@@ -66,6 +224,9 @@ class CEyeClient(BaseOOBClient):
         self.session = session or requests.Session()
         self.sleep_func = sleep_func or time.sleep
         self.identify = self._load_identify()
+        # build_probe 生成的 flag 共用该前缀，后台轮询按前缀一次取回全部 flag 的记录
+        self.flag_prefix = uuid4().hex[:6]
+        self._poller = OOBPoller(self)
 
     def _load_identify(self) -> str:
         response = self.session.get(
@@ -81,7 +242,7 @@ class CEyeClient(BaseOOBClient):
         return identify
 
     def build_probe(self, protocol: str = "http", length: int = 10, value: str = "") -> Dict[str, str]:
-        flag = uuid4().hex[: max(length, 4)].lower()
+        flag = f"{self.flag_prefix}{uuid4().hex[: max(length, 4)]}".lower()
         domain = f"{self.identify}.ceye.io"
 
         if protocol in ("request", "http"):
@@ -95,25 +256,30 @@ class CEyeClient(BaseOOBClient):
 
         return {"url": url, "flag": flag}
 
-    def verify(self, flag: str, protocol: str = "http") -> Dict[str, object]:
-        record_type = "dns" if protocol == "dns" else "request"
-        query_url = f"{self.base_url}/records?token={self.token}&type={record_type}&filter={flag}"
-        events: List[Dict[str, object]] = []
-
-        for _ in range(self.max_polls):
+    def _poll_flags(self, flags: Dict[str, str]) -> Dict[str, List[Dict[str, object]]]:
+        # 按记录类型分组：本 client 生成的 flag 按公共前缀一次查询，外部传入的 flag 单独查询
+        queries: Dict[Tuple[str, str], List[str]] = {}
+        for flag, protocol in flags.items():
+            record_type = "dns" if protocol == "dns" else "request"
+            query_filter = self.flag_prefix if flag.startswith(self.flag_prefix) else flag
+            queries.setdefault((record_type, query_filter), []).append(flag)
+
+        found: Dict[str, List[Dict[str, object]]] = {}
+        for (record_type, query_filter), query_flags in queries.items():
+            query_url = f"{self.base_url}/records?token={self.token}&type={record_type}&filter={query_filter}"
             try:
-                response = self.session.get(query_url, timeout=10)
+                response = self.session.get(query_url, timeout=POLL_REQUEST_TIMEOUT)
                 response.raise_for_status()
-                payload = response.json()
-                events = payload.get("data") or []
-                if any(flag.lower() in json.dumps(item, ensure_ascii=False).lower() for item in events):
-                    return {"matched": True, "events": events, "error": None}
+                records = response.json().get("data") or []
             except Exception as exc:
                 logger.warning("CEye 轮询失败: %s", exc)
-                events = []
-            self.sleep_func(self.poll_interval)
-
-        return {"matched": False, "events": events, "error": None}
+                continue
+            serialized = [(record, json.dumps(record, ensure_ascii=False).lower()) for record in records]
+            for flag in query_flags:
+                matched = [record for record, text in serialized if flag in text]
+                if matched:
+                    found[flag] = matched
+        return found
 
 
 class InteractshClient(BaseOOBClient):
@@ -139,6 +305,7 @@ class InteractshClient(BaseOOBClient):
         rsa = RSA.generate(2048)
         self.public_key = rsa.publickey().exportKey()
         self.private_key = rsa.exportKey()
+        self._cipher = PKCS1_OAEP.new(rsa, hashAlgo=SHA256)
 
         self.server = (server or "oast.me").lstrip(".")
         self.token = token
@@ -158,6 +325,12 @@ class InteractshClient(BaseOOBClient):
         self.domain = f"{guid}.{self.server}"
         self.correlation_id = self.domain[:20]
 
+        # 同一 client 被多个 POC 共享：flag -> 登记时间，以及轮询后按 flag 分发的交互
+        self._state_lock = threading.Lock()
+        self._flags: Dict[str, float] = {}
+        self._events_by_flag: Dict[str, List[Dict[str, object]]] = {}
+        self._poller = OOBPoller(self)
+
         self._register()
 
     def _register(self):
@@ -184,12 +357,58 @@ class InteractshClient(BaseOOBClient):
             url = host
         else:
             raise ValueError(f"不支持的Interactsh协议类型: {protocol}")
+        self._track_flag(flag)
         return {"url": url, "flag": flag}
 
-    def _decrypt_data(self, aes_key: str, data: str) -> Dict[str, object]:
-        private_key = self._RSA.importKey(self.private_key)
-        cipher = self._PKCS1_OAEP.new(private_key, hashAlgo=self._SHA256)
-        aes_plain_key = cipher.decrypt(base64.b64decode(aes_key))
+    def _track_flag(self, flag: str):
+        now = time.monotonic()
+        with self._state_lock:
+            expired = [item for item, created_at in self._flags.items() if now - created_at > FLAG_RETENTION_SECONDS]
+            for item in expired:
+                self._flags.pop(item, None)
+                self._events_by_flag.pop(item, None)
+            self._flags.setdefault(flag.lower(), now)
+
+    def _forget_flag(self, flag: str):
+        with self._state_lock:
+            self._flags.pop(flag.lower(), None)
+            self._events_by_flag.pop(flag.lower(), None)
+
+    def _claim_events(self, flag: str) -> List[Dict[str, object]]:
+        with self._state_lock:
+            return self._events_by_flag.pop(flag.lower(), [])
+
+    def _route_events(self, events: List[Dict[str, object]]):
+        """把一次轮询拿到的交互分发到对应 flag；不属于任何已登记 flag 的交互直接丢弃。"""
+        with self._state_lock:
+            for event in events:
+                serialized = json.dumps(event, ensure_ascii=False).lower()
+                for flag in self._flags:
+                    if flag in serialized:
+                        self._events_by_flag.setdefault(flag, []).append(event)
+
+    def _poll_flags(self, flags: Dict[str, str]) -> Dict[str, List[Dict[str, object]]]:
+        # 一次 /poll 取回整个 correlation ID 的交互，先分发到各 flag 再认领本轮等待的 flag
+        self._poll()
+        found = {flag: self._claim_events(flag) for flag in flags}
+        return {flag: events for flag, events in found.items() if events}
+
+    def _poll(self):
+        poll_url = f"http://{self.server}/poll?id={self.correlation_id}&secret={self.secret}"
+        response = self.session.get(poll_url, headers=self.headers, timeout=POLL_REQUEST_TIMEOUT, verify=False)
+        response.raise_for_status()
+        payload = response.json() or {}
+        encrypted_items = payload.get("data") or []
+        if not isinstance(encrypted_items, list):
+            encrypted_items = [encrypted_items] if encrypted_items else []
+
+        aes_key = payload.get("aes_key")
+        if aes_key and encrypted_items:
+            # AES 会话密钥每轮只做一次 RSA 解密
+            aes_plain_key = self._cipher.decrypt(base64.b64decode(aes_key))
+            self._route_events([self._decrypt_data(aes_plain_key, item) for item in encrypted_items if item])
+
+    def _decrypt_data(self, aes_plain_key: bytes, data: str) -> Dict[str, object]:
         decoded = base64.b64decode(data)
         block_size = self._AES.block_size
         iv = decoded[:block_size]
@@ -197,36 +416,6 @@ class InteractshClient(BaseOOBClient):
         plain_text = cryptor.decrypt(decoded)
         return json.loads(plain_text[16:])
 
-    def verify(self, flag: str, protocol: str = "http") -> Dict[str, object]:
-        events: List[Dict[str, object]] = []
-        for _ in range(self.max_polls):
-            try:
-                poll_url = f"http://{self.server}/poll?id={self.correlation_id}&secret={self.secret}"
-                response = self.session.get(poll_url, headers=self.headers, timeout=10, verify=False)
-                response.raise_for_status()
-                payload = response.json() or {}
-                encrypted_items = payload.get("data") or []
-                if not isinstance(encrypted_items, list):
-                    encrypted_items = [encrypted_items] if encrypted_items else []
-
-                aes_key = payload.get("aes_key")
-                decrypted = []
-                if aes_key and encrypted_items:
-                    decrypted = [
-                        self._decrypt_data(aes_key, item)
-                        for item in encrypted_items
-                        if item
-                    ]
-                events = decrypted
-                if any(flag.lower() in json.dumps(item, ensure_ascii=False).lower() for item in decrypted):
-                    return {"matched": True, "events": events, "error": None}
-            except Exception as exc:
-                logger.warning("Interactsh 轮询失败: %s", exc)
-                events = []
-            self.sleep_func(self.poll_interval)
-
-        return {"matched": False, "events": events, "error": None}
-
 
 def load_interactsh_crypto_backend():
     """兼容 Crypto / Cryptodome 两种命名空间。"""
@@ -262,6 +451,8 @@ class OOBService:
             "ceye": self._create_ceye_client,
         }
         self.config = self._load_config_from_file()
+        self._shared_clients: Dict[str, Tuple[BaseOOBClient, float]] = {}
+        self._shared_lock = threading.Lock()
 
     def _load_config_from_file(self) -> Dict[str, object]:
         config = dict(DEFAULT_OOB_CONFIG)
@@ -307,6 +498,7 @@ class OOBService:
             }
         )
         self._save_config_to_file()
+        self.release_shared_clients()
 
     def get_current_config(self) -> Dict[str, object]:
         runtime_status = self.get_runtime_status()
@@ -391,13 +583,30 @@ class OOBService:
             raise RuntimeError(status["runtime_error"] or "OOB 运行环境不可用")
         return status
 
-    def create_client(self, provider: Optional[str] = None) -> BaseOOBClient:
+    def create_client(self, provider: Optional[str] = None, shared: bool = True) -> BaseOOBClient:
+        """返回 OOB client；默认复用进程内按提供商共享的 client，只在首次或过期时注册。"""
         resolved_provider = (provider or self.config.get("provider") or "interactsh").lower()
         self.ensure_runtime_ready(provider=resolved_provider)
         factory = self.provider_factories.get(resolved_provider)
         if not factory:
             raise RuntimeError(f"不支持的 OOB 提供商: {resolved_provider}")
-        return factory()
+        if not shared:
+            return factory()
+
+        # 持锁创建：并发的首批 POC 等待同一次注册，而不是各自注册一遍
+        with self._shared_lock:
+            cached = self._shared_clients.get(resolved_provider)
+            if cached and time.monotonic() - cached[1] < SHARED_CLIENT_TTL_SECONDS:
+                return cached[0]
+            client = factory()
+            self._shared_clients[resolved_provider] = (client, time.monotonic())
+            logger.info("已注册共享 OOB client: %s", resolved_provider)
+            return client
+
+    def release_shared_clients(self):
+        """丢弃共享 client，下次使用时按当前配置重新注册。"""
+        with self._shared_lock:
+            self._shared_clients.clear()
 
 
 oob_service = OOBService()
@@ -0,0 +1,132 @@
+"""
+Python POC 编译缓存
+
+批量任务中同一个 POC 会对大量目标重复执行，按 (路径, 内容哈希) 缓存：
+1. 编译后的代码对象，每次执行只需新建模块命名空间并执行代码对象
+2. import 提取结果与依赖预检结论；预检通过直接复用，存在缺失依赖时只重新检查可用性（环境可能已补装）
+3. 顶层 scan / scan_many 入口的调用方式（按函数代码对象解析参数），执行时不必每次 inspect.signature
+先按 (mtime, 大小) 判断文件是否变化，未变化时不读取文件；内容变化后自动重新编译。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import threading
+import types
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from services.dependency_checker import check_import_roots, check_python_code_dependencies
+
+ENTRY_POINT_NAMES = ("scan", "scan_many")
+
+
+@dataclass(frozen=True)
+class CompiledPoc:
+    path: str
+    content_hash: str
+    code: types.CodeType
+    dependency_check: Dict[str, Any]
+    has_scan_many: bool = False
+    # 入口函数代码对象 -> 调用方式，见 code_call_style
+    call_styles: Dict[types.CodeType, str] = field(default_factory=dict)
+
+
+class PocCodeCache:
+    """线程安全的 POC 代码对象 LRU 缓存。"""
+
+    DEFAULT_MAX_ENTRIES = 256
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max(int(max_entries or self.DEFAULT_MAX_ENTRIES), 1)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], CompiledPoc]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: Path) -> CompiledPoc:
+        """返回 POC 文件的编译结果，语法错误时抛出 SyntaxError（不缓存）。"""
+        key = str(path)
+        stat = Path(path).stat()
+        stat_key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat_key:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        source = Path(path).read_bytes()
+        digest = hashlib.sha256(source).hexdigest()
+        if entry is not None and entry[1].content_hash == digest:
+            # 仅 mtime 变化（例如被重新写入相同内容），沿用已编译结果
+            compiled = entry[1]
+            hit = True
+        else:
+            compiled = self._compile(key, source, digest)
+            hit = False
+
+        with self._lock:
+            self._entries[key] = (stat_key, compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return compiled
+
+    def check_dependencies(self, compiled: CompiledPoc) -> Dict[str, Any]:
+        check = compiled.dependency_check
+        if check.get("ok") or check.get("parse_error"):
+            return dict(check)
+        return check_import_roots(check.get("imports") or [])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _compile(self, path: str, source: bytes, digest: str) -> CompiledPoc:
+        dependency_check = check_python_code_dependencies(source.decode("utf-8", errors="replace"))
+        # 直接编译字节串，与 import 机制一致地处理 BOM 与编码声明
+        code = compile(source, path, "exec", dont_inherit=True)
+        entry_codes = [
+            const for const in code.co_consts
+            if isinstance(const, types.CodeType) and const.co_name in ENTRY_POINT_NAMES
+        ]
+        return CompiledPoc(
+            path=path,
+            content_hash=digest,
+            code=code,
+            dependency_check=dependency_check,
+            has_scan_many=any(entry.co_name == "scan_many" for entry in entry_codes),
+            call_styles={entry: code_call_style(entry) for entry in entry_codes},
+        )
+
+
+def code_call_style(code: types.CodeType) -> str:
+    """
+    按函数参数决定入口的调用方式，与 inspect.signature 的判断一致：
+    no_args / runtime_params（关键字传参）/ params（关键字传参）/ positional（两个位置参数）/ url_only
+    """
+    has_varargs = bool(code.co_flags & inspect.CO_VARARGS)
+    has_varkw = bool(code.co_flags & inspect.CO_VARKEYWORDS)
+    names = code.co_varnames[:code.co_argcount + code.co_kwonlyargcount + int(has_varargs) + int(has_varkw)]
+    if not names:
+        return "no_args"
+    if "runtime_params" in names:
+        return "runtime_params"
+    if "params" in names:
+        return "params"
+    if code.co_argcount >= 2 or has_varargs:
+        return "positional"
+    return "url_only"
+
+
+poc_code_cache = PocCodeCache()
@@ -13,33 +13,35 @@ import hashlib
 import json
 import importlib.util
 import inspect
+import random
 import sys
-import time
 import logging
-import types
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Iterator, Optional, Any, Tuple
 from urllib.parse import urlparse
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
 from services.nuclei_service import nuclei_service
-from services.http_runtime import (
-    HTTPRuntimeClient,
-    create_http_client,
-    get_http_client,
-    http_request,
-    send_raw_http,
-)
-from services.dependency_checker import check_python_code_dependencies, check_python_file_dependencies
+from services.dependency_checker import check_python_code_dependencies
+from services.execution_metrics import measure_execution
 from services.failure_classifier import classify_execution_outcome
 from services.oob_service import oob_service
+from services.poc_code_cache import poc_code_cache
+from services.poc_linter import lint_python_poc
+from services.poc_process_pool import poc_process_pool
+from services.poc_runtime import async_poc_runner, default_helpers, new_module_name, poc_runtime_context
 
 class PocLibraryService:
     DEFAULT_HTTP_TIMEOUT = 6
+    # 按比例抽样开启 tracemalloc 统计峰值内存，0 表示不统计
+    MEMORY_PROFILE_SAMPLE_RATE = 0.0
+    # 执行超时 = 静态估算耗时 × 倍数，且不低于下限
+    EXECUTION_TIMEOUT_FACTOR = 3
+    MIN_EXECUTION_TIMEOUT = 30
     NETWORK_ERROR_KEYWORDS = (
         "connection refused",
         "name or service not known",
@@ -146,6 +148,14 @@ class PocLibraryService:
             cursor.execute("ALTER TABLE poc_records ADD COLUMN input_schema TEXT")
             logger.info("Migration: 添加 input_schema 字段")
 
+        if 'lint_report' not in columns:
+            cursor.execute("ALTER TABLE poc_records ADD COLUMN lint_report TEXT")
+            cursor.execute("ALTER TABLE poc_records ADD COLUMN estimated_requests INTEGER")
+            cursor.execute("ALTER TABLE poc_records ADD COLUMN estimated_seconds REAL")
+            logger.info("Migration: 添加 lint_report/estimated_requests/estimated_seconds 字段")
+
+        self._backfill_poc_lint(cursor)
+
         # 创建索引
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_vuln_type ON poc_records(vuln_type)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_poc_type ON poc_records(poc_type)")
@@ -157,6 +167,26 @@ class PocLibraryService:
 
         logger.info(f"POC库数据库初始化完成: {self.db_path}")
 
+    def _backfill_poc_lint(self, cursor: sqlite3.Cursor):
+        """为尚未做过静态检查的 Python POC 补充检查结果与开销估算。"""
+        cursor.execute("SELECT id, poc_file_path FROM poc_records WHERE poc_type = 'python' AND lint_report IS NULL")
+        rows = cursor.fetchall()
+        for poc_id, poc_file_path in rows:
+            try:
+                report = lint_python_poc(Path(poc_file_path).read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError) as e:
+                report = {"ok": False, "findings": [], "cost": None, "parse_error": f"读取POC文件失败: {e}"}
+            cursor.execute(
+                "UPDATE poc_records SET lint_report = ?, estimated_requests = ?, estimated_seconds = ? WHERE id = ?",
+                (json.dumps(report, ensure_ascii=False), *self._lint_cost_columns(report), poc_id),
+            )
+        if rows:
+            logger.info(f"Migration: 补充 {len(rows)} 个 Python POC 的静态检查结果")
+
+    def _lint_cost_columns(self, report: Optional[Dict]) -> Tuple[Optional[int], Optional[float]]:
+        cost = (report or {}).get("cost") or {}
+        return cost.get("estimated_requests"), cost.get("estimated_seconds")
+
     def save_poc(self,
                  vuln_type: str,
                  vuln_info: str,
@@ -190,6 +220,7 @@ class PocLibraryService:
         """
         normalized_vuln_name = self._normalize_vuln_name(vuln_name, vuln_type, vuln_info)
         file_stem = self._build_file_stem(normalized_vuln_name)
+        lint_report = None
         resolved_execution_mode = execution_mode or ("url_only" if verifiable else "manual_guide")
         resolved_verification_method = verification_method or ("direct" if verifiable else "manual")
 
@@ -203,6 +234,7 @@ class PocLibraryService:
                 raise ValueError("可验证的POC必须提供poc_code")
 
             if poc_type == "python":
+                lint_report = lint_python_poc(poc_code)
                 file_name = f"{file_stem}_{timestamp}_{hash_suffix}.py"
                 poc_file_path = self.pocs_dir / "python" / file_name
 
@@ -267,8 +299,9 @@ class PocLibraryService:
 
         cursor.execute("""
             INSERT INTO poc_records
-            (vuln_type, vuln_name, vuln_description, poc_type, poc_file_path, tags, metadata, verifiable, manual_steps, explanation, execution_mode, verification_method, input_schema)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (vuln_type, vuln_name, vuln_description, poc_type, poc_file_path, tags, metadata, verifiable, manual_steps, explanation, execution_mode, verification_method, input_schema,
+             lint_report, estimated_requests, estimated_seconds)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             vuln_type,
             normalized_vuln_name,
@@ -283,6 +316,8 @@ class PocLibraryService:
             resolved_execution_mode,
             resolved_verification_method,
             json.dumps(input_schema, ensure_ascii=False) if input_schema else None,
+            json.dumps(lint_report, ensure_ascii=False) if lint_report else None,
+            *self._lint_cost_columns(lint_report),
         ))
 
         poc_id = cursor.lastrowid
@@ -463,6 +498,12 @@ class PocLibraryService:
         else:
             row["input_schema"] = None
 
+        if row.get("lint_report"):
+            try:
+                row["lint_report"] = json.loads(row["lint_report"])
+            except json.JSONDecodeError:
+                pass
+
         if not row.get("execution_mode"):
             row["execution_mode"] = "url_only" if row.get("verifiable") else "manual_guide"
 
@@ -488,21 +529,9 @@ class PocLibraryService:
             result["classification"] = classify_execution_outcome(result)
             return result
 
-        verification_method = (poc_record.get("verification_method") or "").lower()
-        if verification_method == "oob":
-            runtime_status = oob_service.get_runtime_status()
-            if not runtime_status["runtime_ready"]:
-                result = {
-                    "success": False,
-                    "error": runtime_status["runtime_error"] or "OOB 运行环境不可用",
-                    "result": {
-                        "vulnerable": False,
-                        "reason": "OOB 运行环境不可用",
-                        "details": runtime_status,
-                    },
-                }
-                result["classification"] = classify_execution_outcome(result)
-                return result
+        oob_failure = self._check_oob_runtime(poc_record)
+        if oob_failure:
+            return oob_failure
 
         # 更新最后使用时间
         self._update_last_used(poc_id)
@@ -514,6 +543,7 @@ class PocLibraryService:
                     poc_record['poc_file_path'],
                     target_url,
                     runtime_params=runtime_params,
+                    timeout=self._resolve_execution_timeout(poc_record),
                 )
             elif poc_record['poc_type'] == 'nuclei':
                 status = nuclei_service.check_nuclei_available()
@@ -533,6 +563,70 @@ class PocLibraryService:
             result["classification"] = classify_execution_outcome(result)
             return result
 
+    def execute_poc_many(
+        self,
+        poc_id: int,
+        target_urls: List[str],
+        runtime_params: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        通过 scan_many 批量入口对一组目标执行POC，按 POC 产出顺序逐个返回 (target_url, 执行结果)
+
+        每个目标恰好返回一条结果；POC 未提供 scan_many 时逐目标调用 execute_poc。
+
+        Args:
+            poc_id: POC记录ID
+            target_urls: 目标URL列表
+
+        Returns:
+            Iterator[Tuple[str, Dict]]: 与 execute_poc 结构一致的逐目标执行结果
+        """
+        poc_record = self.get_poc_by_id(poc_id)
+        if not poc_supports_scan_many(poc_record):
+            for target_url in target_urls:
+                yield target_url, self.execute_poc(poc_id, target_url, runtime_params)
+            return
+
+        oob_failure = self._check_oob_runtime(poc_record)
+        if oob_failure:
+            for target_url in target_urls:
+                yield target_url, dict(oob_failure)
+            return
+
+        self._update_last_used(poc_id)
+        outcomes = self._execute_python_poc_many(
+            poc_record["poc_file_path"],
+            target_urls,
+            runtime_params=runtime_params,
+            timeout=self._resolve_execution_timeout(poc_record),
+        )
+        try:
+            for target_url, result in outcomes:
+                result["classification"] = classify_execution_outcome(result)
+                yield target_url, result
+        finally:
+            outcomes.close()
+
+    def _check_oob_runtime(self, poc_record: Dict) -> Optional[Dict]:
+        """OOB 验证类 POC 在运行环境不可用时返回失败结果，否则返回 None。"""
+        verification_method = (poc_record.get("verification_method") or "").lower()
+        if verification_method != "oob":
+            return None
+        runtime_status = oob_service.get_runtime_status()
+        if runtime_status["runtime_ready"]:
+            return None
+        result = {
+            "success": False,
+            "error": runtime_status["runtime_error"] or "OOB 运行环境不可用",
+            "result": {
+                "vulnerable": False,
+                "reason": "OOB 运行环境不可用",
+                "details": runtime_status,
+            },
+        }
+        result["classification"] = classify_execution_outcome(result)
+        return result
+
     def _normalize_nuclei_result(self, nuclei_result: Dict) -> Dict:
         """
         将 Nuclei 扫描结果转换为 POC 库统一返回结构
@@ -567,22 +661,54 @@ class PocLibraryService:
             }
         }
 
+    def _resolve_execution_timeout(self, poc_record: Dict) -> Optional[float]:
+        """按静态估算的耗时给出执行超时，未做过估算的 POC 返回 None（沿用默认超时）。"""
+        estimated_seconds = poc_record.get("estimated_seconds")
+        if estimated_seconds is None:
+            return None
+        return max(float(estimated_seconds) * self.EXECUTION_TIMEOUT_FACTOR, self.MIN_EXECUTION_TIMEOUT)
+
     def _execute_python_poc(
         self,
         poc_file_path: str,
         target_url: str,
         runtime_params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
     ) -> Dict:
         """
-        执行Python POC
+        执行Python POC，启用隔离进程池时交给工作进程执行
 
         Args:
             poc_file_path: POC文件路径
             target_url: 目标URL
+            timeout: 执行超时（秒），隔离进程与异步 POC 据此中断执行
 
         Returns:
             Dict: 执行结果
         """
+        if poc_process_pool.enabled:
+            return poc_process_pool.execute(poc_file_path, target_url, runtime_params, timeout=timeout)
+        return self._execute_python_poc_inline(poc_file_path, target_url, runtime_params, timeout=timeout)
+
+    def _execute_python_poc_inline(
+        self,
+        poc_file_path: str,
+        target_url: str,
+        runtime_params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """
+        在当前进程内执行Python POC
+
+        Args:
+            poc_file_path: POC文件路径
+            target_url: 目标URL
+            timeout: 异步 POC 的执行超时（秒），同步 POC 无法在进程内强制中断
+
+        Returns:
+            Dict: 执行结果
+        """
+        metrics = None
         try:
             # 标准化URL
             normalized_url = self._normalize_url(target_url)
@@ -594,7 +720,9 @@ class PocLibraryService:
 
             runtime_params = runtime_params or {}
 
-            dependency_check = check_python_file_dependencies(poc_path)
+            # 同一 POC 文件只在内容变化时重新解析与编译
+            compiled_poc = poc_code_cache.get(poc_path)
+            dependency_check = poc_code_cache.check_dependencies(compiled_poc)
             if dependency_check.get("missing"):
                 missing_modules = ", ".join(dependency_check["missing"])
                 return {
@@ -608,89 +736,112 @@ class PocLibraryService:
                     }
                 }
 
-            # 动态导入POC模块
-            module_name = f"poc_module_{int(time.time() * 1000)}"
-            spec = importlib.util.spec_from_file_location(module_name, poc_path)
-            poc_module = importlib.util.module_from_spec(spec)
+            # 动态导入POC模块，helper 与默认超时只绑定到当前执行上下文
+            module_name, poc_module, helpers = self._new_poc_module(poc_path, runtime_params)
             sys.modules[module_name] = poc_module
-
-            helper_module = types.ModuleType("oob_runtime")
-            helper_module.create_client = oob_service.create_client
-            helper_module.get_oob_client = oob_service.create_client
-            sys.modules["oob_runtime"] = helper_module
-
-            http_helper_module = types.ModuleType("http_runtime")
-            http_helper_module.HTTPRuntimeClient = HTTPRuntimeClient
-            http_helper_module.create_http_client = create_http_client
-            http_helper_module.get_http_client = get_http_client
-            http_helper_module.http_request = http_request
-            http_helper_module.send_raw_http = send_raw_http
-            sys.modules["http_runtime"] = http_helper_module
-
-            poc_module.create_oob_client = oob_service.create_client
-            poc_module.get_oob_client = oob_service.create_client
-            poc_module.HTTPRuntimeClient = HTTPRuntimeClient
-            poc_module.create_http_client = create_http_client
-            poc_module.get_http_client = get_http_client
-            poc_module.http_request = http_request
-            poc_module.send_raw_http = send_raw_http
-            poc_module.runtime_params = runtime_params
-            poc_module.runtime_input = runtime_params
-            poc_module.input_params = runtime_params
-            poc_module.get_runtime_param = lambda name, default=None: runtime_params.get(name, default)
-            spec.loader.exec_module(poc_module)
-
             try:
-                # 检查scan函数是否存在
-                if not hasattr(poc_module, 'scan'):
-                    raise AttributeError("POC脚本中未找到scan函数")
-
-                # 执行scan函数
-                scan = poc_module.scan
-                timeout_restore = self._patch_requests_timeout()
-                try:
-                    result = self._invoke_scan(scan, normalized_url, runtime_params)
-                finally:
-                    timeout_restore()
+                with poc_runtime_context(default_timeout=self.DEFAULT_HTTP_TIMEOUT, helpers=helpers):
+                    exec(compiled_poc.code, poc_module.__dict__)
+
+                    # 检查scan函数是否存在
+                    if not hasattr(poc_module, 'scan'):
+                        raise AttributeError("POC脚本中未找到scan函数")
+
+                    # 执行scan函数，同时统计耗时、HTTP 与 OOB 开销
+                    trace_memory = random.random() < self.MEMORY_PROFILE_SAMPLE_RATE
+                    with measure_execution(trace_memory=trace_memory) as metrics:
+                        result = self._invoke_scan(
+                            poc_module.scan,
+                            normalized_url,
+                            runtime_params,
+                            timeout=timeout,
+                            call_styles=compiled_poc.call_styles,
+                        )
             finally:
-                # 清理模块（避免内存泄漏）
-                if module_name in sys.modules:
-                    del sys.modules[module_name]
-                if "oob_runtime" in sys.modules:
-                    del sys.modules["oob_runtime"]
-                if "http_runtime" in sys.modules:
-                    del sys.modules["http_runtime"]
-
-            # 验证返回格式
-            if not isinstance(result, dict):
-                result = {
+                # 只清理本次执行注册的模块（避免内存泄漏）
+                sys.modules.pop(module_name, None)
+
+            return self._build_scan_outcome(result, normalized_url, metrics.to_dict())
+
+        except Exception as e:
+            outcome = {
+                "success": False,
+                "target_url": target_url,
+                "error": f"{type(e).__name__}: {str(e)}",
+                "result": {
                     "vulnerable": False,
-                    "reason": "扫描函数返回格式不正确",
-                    "details": str(result)
+                    "reason": "执行POC时发生错误",
+                    "details": str(e)
                 }
+            }
+            if metrics is not None:
+                outcome["metrics"] = metrics.to_dict()
+            return outcome
 
-            if self._is_network_failure_result(result):
-                return {
+    def _execute_python_poc_many(
+        self,
+        poc_file_path: str,
+        target_urls: List[str],
+        runtime_params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        在当前进程内加载一次POC模块，把整组目标交给 scan_many，结果产出一条就返回一条
+
+        scan_many 返回的目标按标准化URL对应回原始目标；未返回结果或执行中途出错的目标补一条失败结果。
+        每条结果的 metrics 为产出该结果期间的开销，先产出的结果承担模块初始化开销。
+        """
+        runtime_params = runtime_params or {}
+        targets_by_url: Dict[str, List[str]] = {}
+        for target_url in target_urls:
+            targets_by_url.setdefault(self._normalize_url(target_url), []).append(target_url)
+
+        failure = None
+        try:
+            poc_path = Path(poc_file_path)
+            compiled_poc = poc_code_cache.get(poc_path)
+            dependency_check = poc_code_cache.check_dependencies(compiled_poc)
+            if dependency_check.get("missing"):
+                missing_modules = ", ".join(dependency_check["missing"])
+                failure = {
                     "success": False,
-                    "target_url": normalized_url,
-                    "error": result.get("reason") or self._extract_network_error_message(result),
+                    "error": f"缺少依赖: {missing_modules}",
                     "result": {
                         "vulnerable": False,
-                        "reason": result.get("reason") or "目标不可达或请求超时",
-                        "details": result.get("details")
+                        "reason": "执行环境缺少依赖",
+                        "details": dependency_check,
                     }
                 }
-
-            return {
-                "success": True,
-                "target_url": normalized_url,
-                "result": result
-            }
-
+            else:
+                module_name, poc_module, helpers = self._new_poc_module(poc_path, runtime_params)
+                sys.modules[module_name] = poc_module
+                try:
+                    with poc_runtime_context(default_timeout=self.DEFAULT_HTTP_TIMEOUT, helpers=helpers):
+                        exec(compiled_poc.code, poc_module.__dict__)
+                        produced = self._iter_scan_many(
+                            poc_module.scan_many,
+                            list(targets_by_url),
+                            runtime_params,
+                            timeout,
+                            call_styles=compiled_poc.call_styles,
+                        )
+                        try:
+                            for url, result, metrics in produced:
+                                normalized_url = self._normalize_url(str(url))
+                                targets = targets_by_url.pop(normalized_url, None)
+                                if not targets:
+                                    logger.warning(f"scan_many 返回了未请求的目标，已忽略: {url}")
+                                    continue
+                                outcome = self._build_scan_outcome(result, normalized_url, metrics)
+                                for target_url in targets:
+                                    yield target_url, dict(outcome)
+                        finally:
+                            produced.close()
+                finally:
+                    sys.modules.pop(module_name, None)
         except Exception as e:
-            return {
+            failure = {
                 "success": False,
-                "target_url": target_url,
                 "error": f"{type(e).__name__}: {str(e)}",
                 "result": {
                     "vulnerable": False,
@@ -699,24 +850,221 @@ class PocLibraryService:
                 }
             }
 
+        for normalized_url, targets in targets_by_url.items():
+            outcome = failure or {
+                "success": False,
+                "error": "scan_many 未返回该目标的结果",
+                "result": {
+                    "vulnerable": False,
+                    "reason": "scan_many 未返回该目标的结果",
+                    "details": None
+                }
+            }
+            for target_url in targets:
+                yield target_url, {**outcome, "target_url": normalized_url}
+
+    def _iter_scan_many(
+        self,
+        scan_many,
+        urls: List[str],
+        runtime_params: Dict[str, Any],
+        timeout: Optional[float] = None,
+        call_styles: Optional[Dict] = None,
+    ) -> Iterator[Tuple[Any, Any, Dict]]:
+        """
+        调用 scan_many 并逐个产出 (url, result, metrics)
+
+        scan_many 可以是生成器（逐个 yield (url, result)）、返回 {url: result} 或 (url, result) 列表的函数，
+        也可以是 async def（返回值同上）或异步生成器。timeout 为单目标超时：异步生成器逐项生效，
+        一次返回整组结果的 async def 按目标数放大。
+        """
+        iterator = None
+        try:
+            while True:
+                with measure_execution() as metrics:
+                    if iterator is None:
+                        iterator = self._open_scan_many(scan_many, urls, runtime_params, timeout, call_styles)
+                    try:
+                        url, result = next(iterator)
+                    except StopIteration:
+                        return
+                yield url, result, metrics.to_dict()
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def _open_scan_many(
+        self,
+        scan_many,
+        urls: List[str],
+        runtime_params: Dict[str, Any],
+        timeout: Optional[float],
+        call_styles: Optional[Dict] = None,
+    ) -> Iterator:
+        produced = self._call_scan(scan_many, urls, runtime_params, call_styles)
+        if inspect.isawaitable(produced):
+            # 一次返回整组结果的 async scan_many：timeout 是单目标超时，按目标数放大
+            produced = async_poc_runner.run(produced, timeout * max(len(urls), 1) if timeout else timeout)
+        if inspect.isasyncgen(produced):
+            return async_poc_runner.iterate(produced, timeout)
+        if isinstance(produced, dict):
+            return iter(produced.items())
+        if produced is None:
+            raise TypeError("scan_many 未返回任何结果")
+        return iter(produced)
+
+    def _new_poc_module(self, poc_path: Path, runtime_params: Dict[str, Any]):
+        """新建注入了平台 helper 与运行时参数的POC模块，返回 (模块名, 模块, helper)。"""
+        module_name = new_module_name()
+        spec = importlib.util.spec_from_file_location(module_name, poc_path)
+        poc_module = importlib.util.module_from_spec(spec)
+        helpers = default_helpers()
+        oob_helpers = helpers["oob_runtime"]
+        http_helpers = helpers["http_runtime"]
+
+        poc_module.create_oob_client = oob_helpers["create_client"]
+        poc_module.get_oob_client = oob_helpers["get_oob_client"]
+        for name, helper in http_helpers.items():
+            setattr(poc_module, name, helper)
+        poc_module.runtime_params = runtime_params
+        poc_module.runtime_input = runtime_params
+        poc_module.input_params = runtime_params
+        poc_module.get_runtime_param = lambda name, default=None: runtime_params.get(name, default)
+        return module_name, poc_module, helpers
+
+    def _build_scan_outcome(self, result: Any, normalized_url: str, metrics: Dict) -> Dict:
+        """把 scan/scan_many 对单个目标的返回值整理为统一的执行结果。"""
+        # 验证返回格式
+        if not isinstance(result, dict):
+            result = {
+                "vulnerable": False,
+                "reason": "扫描函数返回格式不正确",
+                "details": str(result)
+            }
+
+        if self._is_network_failure_result(result):
+            return {
+                "success": False,
+                "target_url": normalized_url,
+                "error": result.get("reason") or self._extract_network_error_message(result),
+                "result": {
+                    "vulnerable": False,
+                    "reason": result.get("reason") or "目标不可达或请求超时",
+                    "details": result.get("details")
+                },
+                "metrics": metrics,
+            }
+
+        return {
+            "success": True,
+            "target_url": normalized_url,
+            "result": result,
+            "metrics": metrics,
+        }
+
+    def _prepare_python_poc(self, poc_file_path: str) -> Optional[Dict]:
+        """
+        预检 Python POC：编译并写入编译缓存（含入口调用方式）、检查依赖、确认定义了 scan 入口
+
+        Returns:
+            Optional[Dict]: 预检失败时返回与 execute_poc 结构一致的失败结果，通过时返回 None
+        """
+        poc_path = Path(poc_file_path)
+        if not poc_path.exists():
+            return self._preparation_failure(f"POC文件不存在: {poc_file_path}", "POC文件不存在")
+        try:
+            compiled_poc = poc_code_cache.get(poc_path)
+        except (SyntaxError, ValueError) as e:
+            return self._preparation_failure(f"{type(e).__name__}: {str(e)}", "POC脚本无法编译")
+        except OSError as e:
+            return self._preparation_failure(f"读取POC文件失败: {e}", "POC文件不可读")
+
+        dependency_check = poc_code_cache.check_dependencies(compiled_poc)
+        if dependency_check.get("missing"):
+            missing_modules = ", ".join(dependency_check["missing"])
+            return self._preparation_failure(f"缺少依赖: {missing_modules}", "执行环境缺少依赖", dependency_check)
+
+        if "scan" not in compiled_poc.code.co_names:
+            return self._preparation_failure("AttributeError: POC脚本中未找到scan函数", "执行POC时发生错误")
+        return None
+
+    def _preparation_failure(self, error: str, reason: str, details: Any = None) -> Dict:
+        result = {
+            "success": False,
+            "error": error,
+            "result": {
+                "vulnerable": False,
+                "reason": reason,
+                "details": details if details is not None else error,
+            }
+        }
+        result["classification"] = classify_execution_outcome(result)
+        return result
+
     def check_poc_dependencies(self, code: str) -> Dict[str, Any]:
         """对生成后的 Python POC 做最小依赖预检。"""
         return check_python_code_dependencies(code)
 
-    def _invoke_scan(self, scan, normalized_url: str, runtime_params: Optional[Dict[str, Any]] = None):
-        """兼容旧版 scan(url) 与新版 scan(url, runtime_params) 调用方式。"""
+    def lint_poc_code(self, code: str) -> Dict[str, Any]:
+        """对生成后的 Python POC 做性能隐患静态检查与开销估算。"""
+        return lint_python_poc(code)
+
+    def _invoke_scan(
+        self,
+        scan,
+        normalized_url: str,
+        runtime_params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        call_styles: Optional[Dict] = None,
+    ):
+        """调用 scan 函数，async def scan 返回的协程交给共享事件循环执行。"""
+        result = self._call_scan(scan, normalized_url, runtime_params, call_styles)
+        if inspect.isawaitable(result):
+            result = async_poc_runner.run(result, timeout)
+        return result
+
+    def _call_scan(
+        self,
+        scan,
+        normalized_url: str,
+        runtime_params: Optional[Dict[str, Any]] = None,
+        call_styles: Optional[Dict] = None,
+    ):
+        """
+        兼容旧版 scan(url) 与新版 scan(url, runtime_params) 调用方式
+
+        call_styles 为编译缓存中按入口代码对象预先解析的调用方式，scan 被装饰器替换等未命中时再 inspect。
+        """
         runtime_params = runtime_params or {}
+        call_style = (call_styles or {}).get(getattr(scan, "__code__", None)) or self._scan_call_style(scan)
+
+        if call_style == "no_args":
+            return scan()
+
+        if call_style == "runtime_params":
+            return scan(normalized_url, runtime_params=runtime_params)
+
+        if call_style == "params":
+            return scan(normalized_url, params=runtime_params)
+
+        if call_style == "positional":
+            return scan(normalized_url, runtime_params)
+
+        return scan(normalized_url)
+
+    def _scan_call_style(self, scan) -> str:
         signature = inspect.signature(scan)
         parameters = list(signature.parameters.values())
 
         if not parameters:
-            return scan()
+            return "no_args"
 
         if "runtime_params" in signature.parameters:
-            return scan(normalized_url, runtime_params=runtime_params)
+            return "runtime_params"
 
         if "params" in signature.parameters:
-            return scan(normalized_url, params=runtime_params)
+            return "params"
 
         positional_params = [
             parameter for parameter in parameters
@@ -725,30 +1073,9 @@ class PocLibraryService:
         has_varargs = any(parameter.kind == inspect.Parameter.VAR_POSITIONAL for parameter in parameters)
 
         if len(positional_params) >= 2 or has_varargs:
-            return scan(normalized_url, runtime_params)
-
-        return scan(normalized_url)
-
-    def _patch_requests_timeout(self):
-        """为未显式设置 timeout 的 requests 调用注入默认超时。"""
-        try:
-            import requests
-        except ImportError:
-            return lambda: None
+            return "positional"
 
-        original_request = requests.sessions.Session.request
-        default_timeout = self.DEFAULT_HTTP_TIMEOUT
-
-        def request_with_timeout(session, method, url, **kwargs):
-            kwargs.setdefault("timeout", default_timeout)
-            return original_request(session, method, url, **kwargs)
-
-        requests.sessions.Session.request = request_with_timeout
-
-        def restore():
-            requests.sessions.Session.request = original_request
-
-        return restore
+        return "url_only"
 
     def _is_network_failure_result(self, result: Dict) -> bool:
         if result.get("vulnerable"):
@@ -865,3 +1192,34 @@ class PocLibraryService:
 
 # 创建全局实例
 poc_library_service = PocLibraryService()
+
+
+def poc_supports_scan_many(poc_record: Optional[Dict]) -> bool:
+    """POC 是否可走 scan_many 批量入口；启用隔离进程池时仍逐目标在工作进程中执行。"""
+    if not poc_record or poc_record.get("poc_type") != "python" or not poc_record.get("poc_file_path"):
+        return False
+    if poc_process_pool.enabled:
+        return False
+    try:
+        return poc_code_cache.get(Path(poc_record["poc_file_path"])).has_scan_many
+    except (OSError, SyntaxError, ValueError):
+        return False
+
+
+def prepare_python_poc(poc_record: Optional[Dict]) -> Optional[Dict]:
+    """批量任务派发前预检 Python POC，失败时返回各子任务共用的失败结果；非 Python POC 不做预检。"""
+    if not poc_record or poc_record.get("poc_type") != "python" or not poc_record.get("poc_file_path"):
+        return None
+    return poc_library_service._prepare_python_poc(poc_record["poc_file_path"])
+
+
+def run_python_poc_request(request: Dict[str, Any]) -> Dict:
+    """隔离进程池工作进程的执行入口，preload 请求只预检并编译 POC，供后续执行直接命中编译缓存。"""
+    if "preload" in request:
+        failures = [path for path in request["preload"] if poc_library_service._prepare_python_poc(path)]
+        return {"success": True, "prepared": len(request["preload"]) - len(failures), "failed": failures}
+    return poc_library_service._execute_python_poc_inline(
+        request["poc_file_path"],
+        request["target_url"],
+        request.get("runtime_params"),
+    )
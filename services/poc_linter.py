@@ -0,0 +1,266 @@
+"""
+Python POC 静态检查与开销估算
+
+保存 POC 时基于 AST 分析：
+1. 标记性能隐患：缺少超时、循环内 sleep、无退出条件的循环、递归、循环内逐次 requests 调用、
+   超大 payload 构造、阻塞式 DNS 解析
+2. 按请求调用点与循环次数粗略估算单次执行的请求数与耗时，供批量任务排序与超时使用
+
+估算只用于相对比较，不追求准确：无法静态确定次数的循环按固定倍数计算。
+"""
+
+from __future__ import annotations
+
+import ast
+from typing import Any, Dict, List, Optional, Set
+
+HTTP_METHODS = {"get", "post", "put", "delete", "head", "options", "patch", "request"}
+HTTP_HELPER_FUNCTIONS = {"http_request", "send_raw_http", "async_http_request"}
+HTTP_CLIENT_FACTORIES = {"create_http_client", "get_http_client", "create_async_http_client", "Session", "Client", "AsyncClient"}
+TIMEOUT_REQUIRED_CALLS = {
+    ("urllib.request", "urlopen"),
+    ("request", "urlopen"),
+    ("socket", "create_connection"),
+}
+BLOCKING_DNS_CALLS = {
+    ("socket", "gethostbyname"),
+    ("socket", "gethostbyname_ex"),
+    ("socket", "getaddrinfo"),
+    ("resolver", "resolve"),
+    ("resolver", "query"),
+    ("dns.resolver", "resolve"),
+    ("dns.resolver", "query"),
+}
+
+UNKNOWN_LOOP_FACTOR = 5
+WHILE_LOOP_FACTOR = 10
+MAX_LOOP_FACTOR = 1000
+LARGE_PAYLOAD_BYTES = 1024 * 1024
+ASSUMED_REQUEST_SECONDS = 0.5
+OOB_VERIFY_SECONDS = 3.0
+COST_LEVELS = ((5.0, "low"), (30.0, "medium"))
+
+
+def _dotted_name(node: ast.AST) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted_name(node.value)
+        return f"{base}.{node.attr}" if base else ""
+    return ""
+
+
+def _split_call(node: ast.Call):
+    """返回 (接收者, 方法名)，如 requests.get -> ("requests", "get")，scan() -> ("", "scan")。"""
+    name = _dotted_name(node.func)
+    if not name:
+        if isinstance(node.func, ast.Attribute):
+            return "", node.func.attr
+        return "", ""
+    if "." not in name:
+        return "", name
+    receiver, method = name.rsplit(".", 1)
+    return receiver, method
+
+
+def _has_keyword(node: ast.Call, name: str) -> bool:
+    return any(keyword.arg == name or keyword.arg is None for keyword in node.keywords)
+
+
+def _constant_length(node: ast.AST) -> Optional[int]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, (str, bytes)):
+        return len(node.value)
+    return None
+
+
+def _constant_int(node: ast.AST) -> Optional[int]:
+    """整数常量，支持 2 * 1024 * 1024 这类常量乘加表达式。"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Mult, ast.Add)):
+        left, right = _constant_int(node.left), _constant_int(node.right)
+        if left is not None and right is not None:
+            return left * right if isinstance(node.op, ast.Mult) else left + right
+    return None
+
+
+def _loop_factor(node: ast.AST) -> int:
+    """估算循环次数：字面量容器取长度，range(常量) 取区间长度，其余按固定倍数。"""
+    if isinstance(node, ast.While):
+        return WHILE_LOOP_FACTOR
+    iterable = getattr(node, "iter", None)
+    if isinstance(iterable, (ast.List, ast.Tuple, ast.Set)):
+        return max(len(iterable.elts), 1)
+    if isinstance(iterable, ast.Call) and _dotted_name(iterable.func) == "range":
+        bounds = [_constant_int(arg) for arg in iterable.args]
+        if bounds and all(bound is not None for bound in bounds):
+            if len(bounds) == 1:
+                count = bounds[0]
+            else:
+                step = bounds[2] if len(bounds) > 2 and bounds[2] else 1
+                count = (bounds[1] - bounds[0]) // step
+            return min(max(count, 1), MAX_LOOP_FACTOR)
+    return UNKNOWN_LOOP_FACTOR
+
+
+def _contains_break(loop: ast.AST) -> bool:
+    """循环体内（不含嵌套循环与函数）是否存在 break / return / raise。"""
+    stack = list(loop.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.Break, ast.Return, ast.Raise)):
+            return True
+        if isinstance(node, (ast.For, ast.AsyncFor, ast.While, ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        stack.extend(ast.iter_child_nodes(node))
+    return False
+
+
+class _PocAnalyzer(ast.NodeVisitor):
+    def __init__(self):
+        self.findings: List[Dict[str, Any]] = []
+        self.http_clients: Set[str] = set()
+        self.estimated_requests = 0.0
+        self.sleep_seconds = 0.0
+        self.uses_oob = False
+        self._loop_stack: List[int] = []
+        self._function_stack: List[str] = []
+
+    @property
+    def _multiplier(self) -> int:
+        multiplier = 1
+        for factor in self._loop_stack:
+            multiplier = min(multiplier * factor, MAX_LOOP_FACTOR)
+        return multiplier
+
+    def add(self, code: str, node: ast.AST, message: str, severity: str = "warning"):
+        self.findings.append({"code": code, "severity": severity, "line": getattr(node, "lineno", None), "message": message})
+
+    def visit_Assign(self, node: ast.Assign):
+        if isinstance(node.value, ast.Call) and _split_call(node.value)[1] in HTTP_CLIENT_FACTORIES:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.http_clients.add(target.id)
+        self.generic_visit(node)
+
+    def visit_With(self, node: ast.With):
+        for item in node.items:
+            if isinstance(item.context_expr, ast.Call) and _split_call(item.context_expr)[1] in HTTP_CLIENT_FACTORIES:
+                if isinstance(item.optional_vars, ast.Name):
+                    self.http_clients.add(item.optional_vars.id)
+        self.generic_visit(node)
+
+    visit_AsyncWith = visit_With
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self._function_stack.append(node.name)
+        # 函数体按被调用一次估算，不继承定义处的循环倍数
+        saved_loops, self._loop_stack = self._loop_stack, []
+        self.generic_visit(node)
+        self._loop_stack = saved_loops
+        self._function_stack.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _visit_loop(self, node: ast.AST):
+        if isinstance(node, ast.While):
+            test = node.test
+            if isinstance(test, ast.Constant) and test.value and not _contains_break(node):
+                self.add("unbounded_loop", node, "while True 循环体内没有 break/return，可能永不结束", "error")
+        self._loop_stack.append(_loop_factor(node))
+        self.generic_visit(node)
+        self._loop_stack.pop()
+
+    visit_For = visit_AsyncFor = visit_While = _visit_loop
+
+    def visit_BinOp(self, node: ast.BinOp):
+        if isinstance(node.op, ast.Mult):
+            for unit, count in ((node.left, node.right), (node.right, node.left)):
+                length, repeat = _constant_length(unit), _constant_int(count)
+                if length is not None and repeat is not None and length * repeat >= LARGE_PAYLOAD_BYTES:
+                    self.add(
+                        "large_payload",
+                        node,
+                        f"构造约 {length * repeat // 1024}KB 的 payload，注意内存与传输开销",
+                    )
+                    break
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        receiver, method = _split_call(node)
+        in_loop = bool(self._loop_stack)
+
+        if method == "sleep" and receiver in ("time", "", "asyncio"):
+            seconds = node.args[0].value if node.args and isinstance(node.args[0], ast.Constant) else 1
+            if isinstance(seconds, (int, float)):
+                self.sleep_seconds += float(seconds) * self._multiplier
+            if in_loop:
+                self.add("sleep_in_loop", node, "循环内调用 sleep，批量执行时会成倍放大耗时")
+
+        if self._function_stack and receiver == "" and method == self._function_stack[-1]:
+            self.add("recursion", node, f"函数 {method} 递归调用自身，注意终止条件与调用深度")
+
+        if (receiver, method) in BLOCKING_DNS_CALLS or (receiver.endswith("resolver") and method in ("resolve", "query")):
+            self.add("blocking_dns", node, "同步 DNS 解析不受 HTTP 超时控制，可能长时间阻塞")
+
+        is_requests_call = receiver == "requests" and method in HTTP_METHODS
+        is_http_call = (
+            is_requests_call
+            or (receiver in self.http_clients and method in HTTP_METHODS | {"raw_request"})
+            or (receiver == "" and method in HTTP_HELPER_FUNCTIONS)
+        )
+        if is_http_call:
+            self.estimated_requests += self._multiplier
+        if is_requests_call and in_loop:
+            self.add(
+                "requests_without_session",
+                node,
+                "循环内逐次调用 requests.%s 不复用连接，建议使用 create_http_client() 或 Session" % method,
+            )
+
+        if not _has_keyword(node, "timeout"):
+            if is_requests_call:
+                self.add("missing_timeout", node, f"requests.{method} 未显式设置 timeout，将使用平台默认超时", "info")
+            elif (receiver, method) in TIMEOUT_REQUIRED_CALLS:
+                self.add("missing_timeout", node, f"{receiver}.{method} 未设置 timeout，可能无限期阻塞")
+
+        if method == "verify" and receiver not in ("", "requests"):
+            self.uses_oob = True
+
+        self.generic_visit(node)
+
+
+def lint_python_poc(code: str) -> Dict[str, Any]:
+    """静态检查 POC 源码，返回隐患列表与开销估算；无法解析时 ok=False。"""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as exc:
+        return {
+            "ok": False,
+            "findings": [],
+            "cost": None,
+            "parse_error": f"{type(exc).__name__}: {exc}",
+        }
+
+    analyzer = _PocAnalyzer()
+    analyzer.visit(tree)
+    # 没有可识别的请求调用点（例如自行封装的客户端）时按一次请求计
+    estimated_requests = max(int(round(analyzer.estimated_requests)), 1)
+    estimated_seconds = round(
+        estimated_requests * ASSUMED_REQUEST_SECONDS
+        + analyzer.sleep_seconds
+        + (OOB_VERIFY_SECONDS if analyzer.uses_oob else 0),
+        2,
+    )
+    level = next((name for limit, name in COST_LEVELS if estimated_seconds <= limit), "high")
+    findings = sorted(analyzer.findings, key=lambda finding: (finding["line"] or 0, finding["code"]))
+    return {
+        "ok": not any(finding["severity"] == "error" for finding in findings),
+        "findings": findings,
+        "cost": {
+            "estimated_requests": estimated_requests,
+            "estimated_seconds": estimated_seconds,
+            "uses_oob": analyzer.uses_oob,
+            "level": level,
+        },
+    }
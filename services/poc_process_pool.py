@@ -0,0 +1,365 @@
+"""
+Python POC 隔离执行进程池
+
+启用后 Python POC 不再在批量任务线程内执行，而是交给预先启动的工作进程：
+1. 每个工作进程通过管道接收一次执行请求、返回执行结果，CPU 密集或阻塞的 POC 不再占用 API 进程的 GIL
+2. 每次执行有硬超时，超时、任务取消（注册到取消令牌）时直接终止工作进程并补充新进程
+3. 工作进程启动时通过 resource.setrlimit 限制可用内存（Windows 上不可用时跳过）
+4. 工作进程执行 N 次后回收重建，避免 POC 遗留的全局状态与内存泄漏累积
+5. 批量任务开始前下发预热列表，空闲与之后新建的工作进程先行编译任务涉及的 POC
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from services.cancellation import get_current_token, on_cancel
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROCESS_POOL_CONFIG = {
+    "enabled": False,
+    "pool_size": 2,
+    "max_runs_per_worker": 50,
+    "memory_limit_mb": 512,
+    "timeout_seconds": 120,
+}
+
+ACQUIRE_POLL_SECONDS = 0.5
+PRELOAD_TIMEOUT_SECONDS = 30
+MAX_PRELOAD_PATHS = 200
+STOP_GRACE_SECONDS = 2
+
+
+def _apply_memory_limit(memory_limit_mb: int):
+    """限制工作进程的虚拟内存为启动时占用加上 memory_limit_mb，超出时 POC 内分配内存抛出 MemoryError。"""
+    if resource is None or not memory_limit_mb:
+        return
+    baseline = 0
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            baseline = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    limit = baseline + int(memory_limit_mb) * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError) as exc:
+        logger.warning(f"设置 POC 工作进程内存限制失败: {exc}")
+
+
+def _worker_main(conn, handler: Callable[[Dict], Dict], memory_limit_mb: int):
+    _apply_memory_limit(memory_limit_mb)
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        try:
+            outcome = handler(request)
+        except MemoryError:
+            outcome = _failure_outcome(request, f"POC 执行超出内存限制（{memory_limit_mb}MB）", "POC 执行超出内存限制")
+        except BaseException as exc:
+            outcome = _failure_outcome(request, f"{type(exc).__name__}: {exc}", "执行POC时发生错误")
+        try:
+            # 执行结果可能含不可序列化对象，统一转成 JSON 兼容结构再回传
+            conn.send(json.loads(json.dumps(outcome, ensure_ascii=False, default=str)))
+        except (EOFError, OSError):
+            break
+
+
+def _failure_outcome(request: Dict, error: str, reason: str) -> Dict:
+    return {
+        "success": False,
+        "target_url": request.get("target_url"),
+        "error": error,
+        "result": {"vulnerable": False, "reason": reason, "details": error},
+    }
+
+
+def _default_handler() -> Callable[[Dict], Dict]:
+    from services.poc_library_service import run_python_poc_request
+
+    return run_python_poc_request
+
+
+class _PoolWorker:
+    def __init__(self, context, handler: Callable[[Dict], Dict], memory_limit_mb: int, generation: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, handler, memory_limit_mb),
+            name="poc-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.generation = generation
+        self.runs = 0
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(STOP_GRACE_SECONDS)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self.process.join(STOP_GRACE_SECONDS)
+        self.kill()
+        self.conn.close()
+
+
+class PocProcessPool:
+    """Python POC 隔离执行进程池，配置持久化在 pocs/poc_process_pool_config.json。"""
+
+    def __init__(
+        self,
+        config_file: Optional[Path] = None,
+        handler: Optional[Callable[[Dict], Dict]] = None,
+        start_method: Optional[str] = None,
+    ):
+        self.base_dir = Path(__file__).parent.parent
+        self.config_file = config_file or (self.base_dir / "pocs" / "poc_process_pool_config.json")
+        self.config = self._load_config_from_file()
+        self._handler = handler
+        # forkserver 从干净的服务进程派生，避免在多线程的 API 进程中直接 fork
+        self.start_method = start_method or ("spawn" if sys.platform == "win32" else "forkserver")
+        self._context = multiprocessing.get_context(self.start_method)
+        self._idle: "queue.Queue[_PoolWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker_count = 0
+        self._generation = 0
+        self._preload_paths: List[str] = []
+        self.stats = {"executions": 0, "timeouts": 0, "crashes": 0, "killed_on_cancel": 0, "recycled": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.get("enabled"))
+
+    def _load_config_from_file(self) -> Dict[str, Any]:
+        config = dict(DEFAULT_PROCESS_POOL_CONFIG)
+        if self.config_file.exists():
+            try:
+                with open(self.config_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                config.update({k: v for k, v in saved.items() if k in DEFAULT_PROCESS_POOL_CONFIG and v is not None})
+            except Exception as exc:
+                logger.error("加载 POC 隔离进程池配置失败: %s", exc)
+        return config
+
+    def _save_config_to_file(self):
+        self.config_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.config_file, "w", encoding="utf-8") as f:
+            json.dump(self.config, f, ensure_ascii=False, indent=2)
+
+    def update_config(
+        self,
+        enabled: bool,
+        pool_size: int = 2,
+        max_runs_per_worker: int = 50,
+        memory_limit_mb: int = 512,
+        timeout_seconds: float = 120,
+        persist: bool = True,
+    ):
+        if int(pool_size) < 1:
+            raise ValueError("进程池大小必须大于 0")
+        if int(max_runs_per_worker) < 1:
+            raise ValueError("单个工作进程最大执行次数必须大于 0")
+        if int(memory_limit_mb) < 0:
+            raise ValueError("内存限制不能为负数，0 表示不限制")
+        if float(timeout_seconds) <= 0:
+            raise ValueError("执行超时必须大于 0 秒")
+
+        with self._lock:
+            self.config.update(
+                {
+                    "enabled": bool(enabled),
+                    "pool_size": int(pool_size),
+                    "max_runs_per_worker": int(max_runs_per_worker),
+                    "memory_limit_mb": int(memory_limit_mb),
+                    "timeout_seconds": float(timeout_seconds),
+                }
+            )
+            # 旧配置启动的工作进程在空闲或归还时回收
+            self._generation += 1
+        self._drain_idle()
+        if persist:
+            self._save_config_to_file()
+
+    def get_current_config(self) -> Dict[str, Any]:
+        with self._lock:
+            workers = self._worker_count
+            stats = dict(self.stats)
+        return {**self.config, "start_method": self.start_method, "workers": workers, "stats": stats}
+
+    def execute(
+        self,
+        poc_file_path: str,
+        target_url: str,
+        runtime_params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict:
+        """在隔离工作进程内执行 Python POC，返回与 _execute_python_poc 一致的结果结构；timeout 不超过配置上限。"""
+        request = {"poc_file_path": str(poc_file_path), "target_url": target_url, "runtime_params": runtime_params or {}}
+        timeout = float(self.config["timeout_seconds"]) if not timeout else min(float(timeout), float(self.config["timeout_seconds"]))
+        worker = self._acquire()
+        if worker is None:
+            return _failure_outcome(request, "任务已取消", "任务已取消")
+
+        remove_callback = on_cancel(worker.kill)
+        try:
+            worker.runs += 1
+            self._count("executions")
+            worker.conn.send(request)
+            if worker.conn.poll(timeout):
+                return worker.conn.recv()
+            worker.kill()
+            self._count("timeouts")
+            logger.warning(f"POC 执行超时，已终止隔离进程: file={poc_file_path}, url={target_url}, timeout={timeout:g}s")
+            return _failure_outcome(request, f"POC 执行超时（{timeout:g}秒），隔离进程已被终止", "POC 执行超时")
+        except (EOFError, OSError):
+            worker.kill()
+            token = get_current_token()
+            if token is not None and token.is_set():
+                self._count("killed_on_cancel")
+                return _failure_outcome(request, "任务已取消，POC 隔离进程已被终止", "任务已取消")
+            self._count("crashes")
+            exitcode = worker.process.exitcode
+            logger.warning(f"POC 隔离进程异常退出: file={poc_file_path}, exitcode={exitcode}")
+            return _failure_outcome(request, f"POC 隔离进程异常退出（exitcode={exitcode}）", "POC 隔离进程异常退出")
+        finally:
+            remove_callback()
+            self._release(worker)
+
+    def _count(self, name: str):
+        # execute 由多个批量任务线程并发调用，计数与其他进程池状态一样在锁内更新
+        with self._lock:
+            self.stats[name] += 1
+
+    def preload(self, poc_file_paths: List[str]):
+        """
+        设置预热列表（保留最近 MAX_PRELOAD_PATHS 个），当前空闲的工作进程立即预编译，之后新建的工作进程启动时预编译
+        """
+        paths = list(dict.fromkeys(str(path) for path in poc_file_paths))
+        with self._lock:
+            self._preload_paths = list(dict.fromkeys(self._preload_paths + paths))[-MAX_PRELOAD_PATHS:]
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in idle:
+            self._warm(worker, paths)
+            self._release(worker)
+
+    def _warm(self, worker: _PoolWorker, paths: List[str]):
+        if not paths:
+            return
+        try:
+            worker.conn.send({"preload": paths})
+            if worker.conn.poll(PRELOAD_TIMEOUT_SECONDS):
+                worker.conn.recv()
+                return
+            logger.warning(f"POC 工作进程预热超时，已终止: paths={len(paths)}")
+        except (EOFError, OSError) as exc:
+            logger.warning(f"POC 工作进程预热失败: {exc}")
+        worker.kill()
+
+    def start(self):
+        """预先启动 pool_size 个工作进程。"""
+        while True:
+            with self._lock:
+                if self._worker_count >= int(self.config["pool_size"]):
+                    return
+                self._worker_count += 1
+                generation = self._generation
+            self._idle.put(self._spawn(generation))
+
+    def shutdown(self):
+        with self._lock:
+            self._generation += 1
+        self._drain_idle()
+
+    def _acquire(self) -> Optional[_PoolWorker]:
+        token = get_current_token()
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                can_spawn = self._worker_count < int(self.config["pool_size"])
+                if can_spawn:
+                    self._worker_count += 1
+                generation = self._generation
+            if can_spawn:
+                return self._spawn(generation)
+            try:
+                return self._idle.get(timeout=ACQUIRE_POLL_SECONDS)
+            except queue.Empty:
+                if token is not None and token.is_set():
+                    return None
+
+    def _release(self, worker: _PoolWorker):
+        with self._lock:
+            stale = worker.generation != self._generation
+        if worker.alive() and not stale and worker.runs < int(self.config["max_runs_per_worker"]):
+            self._idle.put(worker)
+            return
+        if worker.alive() and not stale:
+            self._count("recycled")
+        worker.stop()
+        with self._lock:
+            self._worker_count -= 1
+
+    def _drain_idle(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
+            with self._lock:
+                self._worker_count -= 1
+
+    def _spawn(self, generation: int) -> _PoolWorker:
+        handler = self._handler or _default_handler()
+        try:
+            worker = _PoolWorker(self._context, handler, int(self.config["memory_limit_mb"]), generation)
+        except Exception:
+            with self._lock:
+                self._worker_count -= 1
+            raise
+        with self._lock:
+            paths = list(self._preload_paths)
+        self._warm(worker, paths)
+        return worker
+
+
+poc_process_pool = PocProcessPool()
@@ -0,0 +1,238 @@
+"""
+Python POC 运行时注入
+
+批量任务并发执行多个 POC 时，运行时不再修改全局状态：
+1. oob_runtime / http_runtime 由 meta path finder 提供，常驻 sys.modules 的是代理模块，
+   属性按当前执行上下文（contextvars）解析，单次执行可覆盖自己的 helper 而不影响其他线程
+2. requests 默认超时补丁只安装一次，超时值取自当前执行上下文，上下文之外的请求保持原行为；补丁同时统计请求数与收发字节
+3. 每次执行使用唯一的模块名，清理时只移除自己注册的模块
+4. async def scan 的 POC 在共享事件循环上执行，单个 POC 可并发发起大量探测；
+   异步 scan_many 生成器按项在同一事件循环上迭代
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import importlib.abc
+import importlib.util
+import itertools
+import sys
+import threading
+import types
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterator, Optional
+
+import requests
+
+from services.cancellation import TaskCancelledError, on_cancel
+from services.execution_metrics import payload_size, record_http_exchange
+from services.http_runtime import close_shared_async_clients
+
+HELPER_MODULE_NAMES = ("oob_runtime", "http_runtime")
+
+_current_helpers: ContextVar[Optional[Dict[str, Dict[str, Any]]]] = ContextVar("poc_runtime_helpers", default=None)
+_default_timeout: ContextVar[Optional[float]] = ContextVar("poc_runtime_default_timeout", default=None)
+_module_counter = itertools.count(1)
+_install_lock = threading.Lock()
+
+
+def default_helpers() -> Dict[str, Dict[str, Any]]:
+    """平台提供给 POC 的 helper，每次调用时读取，便于测试替换 oob_service 等实例属性。"""
+    from services.http_runtime import (
+        AsyncHTTPRuntimeClient,
+        HTTPRuntimeClient,
+        async_http_request,
+        create_async_http_client,
+        create_http_client,
+        get_http_client,
+        http_request,
+        send_raw_http,
+    )
+    from services.oob_service import oob_service
+
+    return {
+        "oob_runtime": {
+            "create_client": oob_service.create_client,
+            "get_oob_client": oob_service.create_client,
+        },
+        "http_runtime": {
+            "HTTPRuntimeClient": HTTPRuntimeClient,
+            "create_http_client": create_http_client,
+            "get_http_client": get_http_client,
+            "http_request": http_request,
+            "send_raw_http": send_raw_http,
+            "AsyncHTTPRuntimeClient": AsyncHTTPRuntimeClient,
+            "create_async_http_client": create_async_http_client,
+            "async_http_request": async_http_request,
+        },
+    }
+
+
+def _resolve_helpers(module_name: str) -> Dict[str, Any]:
+    helpers = _current_helpers.get()
+    if helpers is None:
+        # POC 自建线程不继承执行上下文，回退到平台默认 helper
+        helpers = default_helpers()
+    return helpers.get(module_name, {})
+
+
+class _HelperModule(types.ModuleType):
+    """属性按当前执行上下文解析的 helper 代理模块。"""
+
+    def __getattr__(self, name: str) -> Any:
+        helpers = _resolve_helpers(self.__name__)
+        if name in helpers:
+            return helpers[name]
+        raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(_resolve_helpers(self.__name__)))
+
+
+class PocRuntimeFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """为 import oob_runtime / http_runtime 提供代理模块。"""
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in HELPER_MODULE_NAMES:
+            return None
+        return importlib.util.spec_from_loader(fullname, self)
+
+    def create_module(self, spec):
+        return _HelperModule(spec.name)
+
+    def exec_module(self, module):
+        return None
+
+
+def install() -> None:
+    """安装 meta path finder 与 requests 默认超时补丁，可重复调用。"""
+    with _install_lock:
+        if not any(isinstance(finder, PocRuntimeFinder) for finder in sys.meta_path):
+            sys.meta_path.insert(0, PocRuntimeFinder())
+
+        original_request = requests.sessions.Session.request
+        if getattr(original_request, "_poc_runtime_timeout", False):
+            return
+
+        def request_with_timeout(session, method, url, **kwargs):
+            timeout = _default_timeout.get()
+            if timeout is not None:
+                kwargs.setdefault("timeout", timeout)
+            response = original_request(session, method, url, **kwargs)
+            # 流式响应不主动读取响应体，按 Content-Length 计入
+            received = (
+                int(response.headers.get("Content-Length") or 0)
+                if kwargs.get("stream")
+                else len(response.content or b"")
+            )
+            record_http_exchange(payload_size(getattr(response.request, "body", None)), received)
+            return response
+
+        request_with_timeout._poc_runtime_timeout = True
+        requests.sessions.Session.request = request_with_timeout
+
+
+@contextmanager
+def poc_runtime_context(
+    default_timeout: Optional[float] = None,
+    helpers: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[None]:
+    """在当前执行上下文内绑定 POC helper 与 requests 默认超时。"""
+    install()
+    helpers_token = _current_helpers.set(helpers if helpers is not None else default_helpers())
+    timeout_token = _default_timeout.set(default_timeout)
+    try:
+        yield
+    finally:
+        _default_timeout.reset(timeout_token)
+        _current_helpers.reset(helpers_token)
+
+
+def new_module_name() -> str:
+    """进程内唯一的 POC 模块名，避免同一毫秒内并发执行的模块互相覆盖。"""
+    return f"poc_module_{next(_module_counter)}"
+
+
+class AsyncPocRunner:
+    """
+    在共享事件循环上执行 async def scan 返回的协程。
+
+    事件循环运行在独立的守护线程中，调用线程阻塞等待结果；协程沿用调用线程的执行上下文
+    （取消令牌、helper 与默认超时），取消令牌置位时直接取消协程。
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(_run_in_context(coro, contextvars.copy_context()), loop)
+        remove_callback = on_cancel(future.cancel)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"异步 POC 执行超时（{timeout:g}秒）")
+        except concurrent.futures.CancelledError:
+            raise TaskCancelledError("任务已取消")
+        finally:
+            remove_callback()
+
+    def iterate(self, agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator[Any]:
+        """逐个取出异步生成器的产出，每一项都在共享事件循环上取得，timeout 作用于单项。"""
+        try:
+            while True:
+                try:
+                    yield self.run(_anext(agen), timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            aclose = getattr(agen, "aclose", None)
+            if aclose is not None:
+                self.run(_await(aclose()), timeout)
+
+    def shutdown(self):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(close_shared_async_clients(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="async-poc-loop", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+
+async def _anext(agen: AsyncIterator) -> Any:
+    return await agen.__anext__()
+
+
+async def _await(awaitable) -> Any:
+    return await awaitable
+
+
+async def _run_in_context(coro: Coroutine, context: contextvars.Context) -> Any:
+    # run_coroutine_threadsafe 创建的任务使用事件循环线程的上下文，这里改用调用线程的上下文副本
+    task = context.run(asyncio.get_running_loop().create_task, coro)
+    try:
+        return await task
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+async_poc_runner = AsyncPocRunner()
@@ -0,0 +1,80 @@
+"""
+跨任务 (目标, POC) 结果缓存键
+
+缓存键由三部分组成：
+1. 归一化目标 URL（协议/主机小写、去掉默认端口与末尾斜杠）
+2. POC 文件或 Nuclei 模板的内容哈希，POC 被修改后旧结果自动失效
+3. 运行参数哈希
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+FINGERPRINT_CACHE_SIZE = 1024
+
+_fingerprints: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_fingerprints_lock = threading.Lock()
+
+
+def normalize_cache_url(url: str) -> str:
+    """归一化目标 URL，等价写法（大小写、默认端口、末尾斜杠）映射到同一个缓存键。"""
+    raw = str(url or "").strip()
+    if "://" not in raw:
+        raw = "http://" + raw
+    parts = urlsplit(raw)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    host = f"[{host}]" if ":" in host else host
+    netloc = host if port in (None, DEFAULT_PORTS.get(scheme)) else f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+def file_fingerprint(path: Path) -> Optional[str]:
+    """文件内容 SHA-256，按 (路径, mtime, 大小) 记忆，文件不存在时返回 None。"""
+    try:
+        stat = Path(path).stat()
+    except OSError:
+        return None
+    memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+    with _fingerprints_lock:
+        digest = _fingerprints.get(memo_key)
+        if digest is not None:
+            _fingerprints.move_to_end(memo_key)
+            return digest
+
+    hasher = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                hasher.update(chunk)
+    except OSError:
+        return None
+    digest = hasher.hexdigest()
+
+    with _fingerprints_lock:
+        _fingerprints[memo_key] = digest
+        while len(_fingerprints) > FINGERPRINT_CACHE_SIZE:
+            _fingerprints.popitem(last=False)
+    return digest
+
+
+def params_fingerprint(runtime_params: Optional[Dict[str, Any]]) -> str:
+    canonical = json.dumps(runtime_params or {}, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def build_cache_key(target_url: str, engine_type: str, poc_ref: str, content_hash: str, params_hash: str) -> str:
+    raw = "\n".join([normalize_cache_url(target_url), engine_type, poc_ref, content_hash, params_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,319 @@
+"""
+批量任务结果保留与压实服务
+
+负责：
+1. 保留策略配置（保留天数、命中是否永久保留、未命中是否汇总）
+2. 把超期任务的子任务行汇总到 batch_task_summaries 后删除，并重写详情段文件
+3. 清理没有数据库引用的孤立详情文件与过期的跨任务结果缓存
+4. 执行增量 VACUUM 回收数据库空间
+5. 后台定时执行压实任务
+"""
+
+import json
+import logging
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.detail_store import DICTIONARY_DIRNAME
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETENTION_CONFIG = {
+    "enabled": False,
+    "keep_days": 30,
+    "keep_hits": True,
+    "summarize_misses": True,
+    "interval_hours": 24,
+    "vacuum_pages": 2000,
+}
+
+FINISHED_STATUSES = ("completed", "cancelled", "failed")
+TASK_DIR_PATTERN = re.compile(r"^task_(\d+)$")
+LEGACY_DETAIL_PATTERN = re.compile(r"^item_\d+\.json$")
+
+
+class RetentionService:
+    """批量任务结果保留策略与压实任务"""
+
+    def __init__(self, config_file: Optional[Path] = None, batch_service=None):
+        self.base_dir = Path(__file__).parent.parent
+        self.config_file = config_file or (self.base_dir / "pocs" / "retention_config.json")
+        self._batch_service = batch_service
+        self.config = self._load_config_from_file()
+        self._run_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._scheduler_thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict] = None
+
+    @property
+    def batch_service(self):
+        if self._batch_service is None:
+            from services.batch_task_service import batch_task_service
+
+            self._batch_service = batch_task_service
+        return self._batch_service
+
+    def _load_config_from_file(self) -> Dict[str, object]:
+        config = dict(DEFAULT_RETENTION_CONFIG)
+        if self.config_file.exists():
+            try:
+                with open(self.config_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                config.update({k: v for k, v in saved.items() if k in DEFAULT_RETENTION_CONFIG and v is not None})
+            except Exception as exc:
+                logger.error("加载结果保留配置失败: %s", exc)
+        return config
+
+    def _save_config_to_file(self):
+        self.config_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.config_file, "w", encoding="utf-8") as f:
+            json.dump(self.config, f, ensure_ascii=False, indent=2)
+
+    def update_config(
+        self,
+        enabled: bool,
+        keep_days: int = 30,
+        keep_hits: bool = True,
+        summarize_misses: bool = True,
+        interval_hours: float = 24,
+        vacuum_pages: int = 2000,
+    ):
+        keep_days = int(keep_days)
+        if keep_days < 1:
+            raise ValueError("保留天数必须大于 0")
+        if float(interval_hours) <= 0:
+            raise ValueError("压实间隔必须大于 0")
+
+        self.config.update(
+            {
+                "enabled": bool(enabled),
+                "keep_days": keep_days,
+                "keep_hits": bool(keep_hits),
+                "summarize_misses": bool(summarize_misses),
+                "interval_hours": float(interval_hours),
+                "vacuum_pages": max(int(vacuum_pages), 0),
+            }
+        )
+        self._save_config_to_file()
+
+    def get_current_config(self) -> Dict[str, object]:
+        return {**self.config, "last_run": self.last_run}
+
+    def run_compaction(self, dry_run: bool = False, now: Optional[datetime] = None) -> Dict:
+        """
+        按当前策略执行一次压实
+
+        超过保留天数的已结束任务：可移除的子任务按 (poc, 引擎, 状态, 失败分类) 汇总后删除，
+        幸存子任务的详情记录重写到新段文件。
+        dry_run 只统计将被处理的任务与子任务数量。
+        """
+        if not self._run_lock.acquire(blocking=False):
+            raise RuntimeError("压实任务正在执行中")
+        try:
+            started = time.time()
+            stats = {
+                "dry_run": dry_run,
+                "tasks_compacted": 0,
+                "items_summarized": 0,
+                "orphan_files_removed": 0,
+                "cache_entries_pruned": 0,
+                "pages_vacuumed": 0,
+            }
+            cutoff = (now or datetime.utcnow()) - timedelta(days=int(self.config["keep_days"]))
+            for task_id in self._find_expired_tasks(cutoff):
+                stats["items_summarized"] += self._compact_task(task_id, dry_run=dry_run)
+                stats["tasks_compacted"] += 1
+
+            if not dry_run:
+                stats["orphan_files_removed"] = self._remove_orphan_files()
+                stats["cache_entries_pruned"] = self._prune_result_cache(cutoff)
+                stats["pages_vacuumed"] = self._incremental_vacuum(int(self.config["vacuum_pages"]))
+
+            stats["duration_seconds"] = round(time.time() - started, 3)
+            if not dry_run:
+                self.last_run = {**stats, "finished_at": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")}
+            logger.info(f"批量任务结果压实完成: {stats}")
+            return stats
+        finally:
+            self._run_lock.release()
+
+    def _find_expired_tasks(self, cutoff: datetime) -> List[int]:
+        placeholders = ",".join("?" for _ in FINISHED_STATUSES)
+        with self.batch_service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                SELECT id FROM batch_tasks
+                WHERE status IN ({placeholders})
+                  AND compacted_at IS NULL
+                  AND COALESCE(finished_at, created_at) < ?
+                ORDER BY id ASC
+                """,
+                (*FINISHED_STATUSES, cutoff.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            return [row["id"] for row in cursor.fetchall()]
+
+    def _removable_condition(self) -> Optional[str]:
+        """未命中在 summarize_misses 时移除，命中在 keep_hits=False 时移除。"""
+        summarize_misses = bool(self.config["summarize_misses"])
+        drop_hits = not self.config["keep_hits"]
+        if summarize_misses and drop_hits:
+            return "1=1"
+        if summarize_misses:
+            return "vulnerable = 0"
+        if drop_hits:
+            return "vulnerable = 1"
+        return None
+
+    def _compact_task(self, task_id: int, dry_run: bool = False) -> int:
+        """压实单个任务，返回被汇总删除的子任务行数。"""
+        condition = self._removable_condition()
+        service = self.batch_service
+
+        with service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            removed = 0
+            if condition:
+                cursor.execute(f"SELECT COUNT(*) FROM batch_task_items WHERE task_id = ? AND {condition}", (task_id,))
+                removed = cursor.fetchone()[0]
+            if dry_run:
+                return removed
+
+            if condition:
+                cursor.execute(
+                    f"""
+                    INSERT INTO batch_task_summaries (
+                        task_id, poc_id, engine_type, status, failure_category,
+                        vulnerable, item_count, first_finished_at, last_finished_at
+                    )
+                    SELECT task_id, poc_id, engine_type, status, COALESCE(failure_category, ''),
+                           vulnerable, COUNT(*), MIN(finished_at), MAX(finished_at)
+                    FROM batch_task_items
+                    WHERE task_id = ? AND {condition}
+                    GROUP BY poc_id, engine_type, status, COALESCE(failure_category, ''), vulnerable
+                    """,
+                    (task_id,),
+                )
+                cursor.execute(f"DELETE FROM batch_task_items WHERE task_id = ? AND {condition}", (task_id,))
+
+            # 目标行同时是历史搜索索引，只清理探测明细
+            cursor.execute("UPDATE batch_task_targets SET probe_json = NULL WHERE task_id = ?", (task_id,))
+            cursor.execute(
+                "SELECT id, detail_file FROM batch_task_items WHERE task_id = ? AND detail_file LIKE 'seg:%'",
+                (task_id,),
+            )
+            keep_locators = {row["id"]: row["detail_file"] for row in cursor.fetchall()}
+
+            # 新定位串提交后才删除旧段文件；提交失败时回滚后的旧定位串仍指向原文件
+            with service._detail_store.compaction(task_id, keep_locators) as relocated:
+                cursor.executemany(
+                    "UPDATE batch_task_items SET detail_file = ? WHERE id = ?",
+                    [(locator, item_id) for item_id, locator in relocated.items()],
+                )
+                cursor.execute("UPDATE batch_tasks SET compacted_at = CURRENT_TIMESTAMP WHERE id = ?", (task_id,))
+                conn.commit()
+        return removed
+
+    def _remove_orphan_files(self) -> int:
+        """删除数据库已无引用的任务目录与旧版 JSON 详情文件，压缩字典目录始终保留。"""
+        results_dir = Path(self.batch_service.batch_results_dir)
+        if not results_dir.exists():
+            return 0
+
+        with self.batch_service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM batch_tasks")
+            task_ids = {row["id"] for row in cursor.fetchall()}
+            cursor.execute(
+                "SELECT detail_file FROM batch_task_items WHERE detail_file IS NOT NULL AND detail_file NOT LIKE 'seg:%'"
+            )
+            referenced = {str(Path(row["detail_file"]).resolve()) for row in cursor.fetchall()}
+
+        removed = 0
+        for entry in results_dir.iterdir():
+            if entry.name == DICTIONARY_DIRNAME or not entry.is_dir():
+                continue
+            match = TASK_DIR_PATTERN.match(entry.name)
+            if not match:
+                continue
+            if int(match.group(1)) not in task_ids:
+                removed += sum(1 for path in entry.rglob("*") if path.is_file())
+                shutil.rmtree(entry, ignore_errors=True)
+                self.batch_service._detail_store.invalidate(int(match.group(1)))
+                continue
+            for path in entry.iterdir():
+                if LEGACY_DETAIL_PATTERN.match(path.name) and str(path.resolve()) not in referenced:
+                    path.unlink()
+                    removed += 1
+            if not any(entry.iterdir()):
+                entry.rmdir()
+        return removed
+
+    def _prune_result_cache(self, cutoff: datetime) -> int:
+        """删除早于保留期的跨任务结果缓存。"""
+        with self.batch_service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM batch_result_cache WHERE cached_at < ?",
+                (cutoff.strftime("%Y-%m-%d %H:%M:%S"),),
+            )
+            return cursor.rowcount
+
+    def _incremental_vacuum(self, pages: int) -> int:
+        """
+        回收空闲页
+
+        数据库尚未开启 auto_vacuum=INCREMENTAL 时需要一次完整 VACUUM 才能切换，此后只做增量回收。
+        """
+        with self.batch_service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("PRAGMA auto_vacuum")
+            if cursor.fetchone()[0] != 2:
+                logger.info("数据库切换为增量 auto_vacuum 模式，执行一次完整 VACUUM")
+                cursor.execute("PRAGMA freelist_count")
+                free_pages = cursor.fetchone()[0]
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.commit()
+                cursor.execute("VACUUM")
+                return free_pages
+
+            cursor.execute("PRAGMA freelist_count")
+            free_pages = cursor.fetchone()[0]
+            if not free_pages or pages <= 0:
+                return 0
+            cursor.execute(f"PRAGMA incremental_vacuum({int(pages)})")
+            cursor.fetchall()
+            return min(free_pages, pages)
+
+    def start_scheduler(self):
+        """启动后台压实线程；未启用保留策略时线程只空转等待配置变化。"""
+        if self._scheduler_thread and self._scheduler_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._scheduler_thread = threading.Thread(
+            target=self._scheduler_loop,
+            name="batch-retention",
+            daemon=True,
+        )
+        self._scheduler_thread.start()
+
+    def stop_scheduler(self):
+        self._stop_event.set()
+
+    def _scheduler_loop(self):
+        while not self._stop_event.wait(max(float(self.config["interval_hours"]), 0.01) * 3600):
+            if not self.config["enabled"]:
+                continue
+            try:
+                self.run_compaction()
+            except Exception as exc:
+                logger.error(f"后台压实任务失败: {exc}")
+
+
+retention_service = RetentionService()
@@ -0,0 +1,222 @@
+"""
+目标存活预探测
+
+批量任务派发前的可选阶段：
+1. 按 scheme://host:port 去重后并发探测（asyncio，限制并发数）
+2. DNS 解析结果带 TTL 缓存，同一主机的并发解析只发起一次
+3. TCP 连接 + HEAD 请求判定存活，结果回填到每个 URL
+"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import ssl
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+DEFAULT_PROBE_CONCURRENCY = 50
+DEFAULT_CONNECT_TIMEOUT = 3.0
+DEFAULT_HEAD_TIMEOUT = 3.0
+DNS_CACHE_TTL = 300
+DNS_NEGATIVE_TTL = 30
+
+
+def split_probe_endpoint(url: str) -> Tuple[str, str, int]:
+    """解析出探测端点 (scheme, host, port)，缺省协议按 http 处理。"""
+    cleaned = (url or "").strip()
+    if not cleaned.startswith(("http://", "https://")):
+        cleaned = "http://" + cleaned
+    parsed = urlparse(cleaned)
+    scheme = parsed.scheme or "http"
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    return scheme, (parsed.hostname or "").lower(), port or (443 if scheme == "https" else 80)
+
+
+class DNSCache:
+    """异步 DNS 缓存：成功结果按 TTL 缓存，失败结果短暂负缓存。"""
+
+    def __init__(
+        self,
+        ttl: float = DNS_CACHE_TTL,
+        negative_ttl: float = DNS_NEGATIVE_TTL,
+        clock: Optional[Callable[[], float]] = None,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock or time.monotonic
+        self._entries: Dict[Tuple[str, int], Tuple[float, Optional[str], Optional[str]]] = {}
+        self._inflight: Dict[Tuple[str, int], asyncio.Future] = {}
+
+    async def resolve(self, host: str, port: int) -> str:
+        key = (host, port)
+        cached = self._entries.get(key)
+        if cached and cached[0] > self.clock():
+            _, address, error = cached
+            if error:
+                raise OSError(error)
+            return address
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            if not infos:
+                raise OSError(f"DNS 解析无结果: {host}")
+            address = infos[0][4][0]
+            self._entries[key] = (self.clock() + self.ttl, address, None)
+            future.set_result(address)
+            return address
+        except OSError as exc:
+            self._entries[key] = (self.clock() + self.negative_ttl, None, str(exc))
+            future.set_exception(exc)
+            # 避免无人等待时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+class TargetProber:
+    """批量目标存活探测器。"""
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_PROBE_CONCURRENCY,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        head_timeout: float = DEFAULT_HEAD_TIMEOUT,
+        dns_cache: Optional[DNSCache] = None,
+    ):
+        self.concurrency = max(int(concurrency or 1), 1)
+        self.connect_timeout = connect_timeout
+        self.head_timeout = head_timeout
+        self.dns_cache = dns_cache or DNSCache()
+
+    def probe_urls(self, urls: List[str]) -> Dict[str, Dict]:
+        """同步入口，供后台任务线程调用（不能在已运行的事件循环中调用）。"""
+        return asyncio.run(self.probe_urls_async(urls))
+
+    async def probe_urls_async(self, urls: List[str]) -> Dict[str, Dict]:
+        endpoints: Dict[Tuple[str, str, int], List[str]] = {}
+        for url in urls:
+            endpoints.setdefault(split_probe_endpoint(url), []).append(url)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(endpoint):
+            async with semaphore:
+                return endpoint, await self._probe_endpoint(*endpoint)
+
+        results: Dict[str, Dict] = {}
+        for endpoint, outcome in await asyncio.gather(*(run(endpoint) for endpoint in endpoints)):
+            for url in endpoints[endpoint]:
+                results[url] = dict(outcome)
+        return results
+
+    async def _probe_endpoint(self, scheme: str, host: str, port: int) -> Dict:
+        started = time.monotonic()
+        outcome: Dict = {
+            "alive": False,
+            "stage": "dns",
+            "host": host,
+            "port": port,
+            "address": None,
+            "status_code": None,
+            "server": None,
+            "error": None,
+            "latency_ms": None,
+        }
+
+        if not host:
+            outcome["error"] = "URL 缺少主机名"
+            return outcome
+
+        try:
+            outcome["address"] = await asyncio.wait_for(
+                self.dns_cache.resolve(host, port),
+                timeout=self.connect_timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as exc:
+            outcome["error"] = f"DNS 解析失败: {exc or type(exc).__name__}"
+            return self._finish(outcome, started)
+
+        outcome["stage"] = "connect"
+        ssl_context = None
+        if scheme == "https":
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(
+                    outcome["address"],
+                    port,
+                    ssl=ssl_context,
+                    server_hostname=host if ssl_context else None,
+                ),
+                timeout=self.connect_timeout,
+            )
+        except asyncio.TimeoutError:
+            outcome["error"] = "TCP 连接超时"
+            return self._finish(outcome, started)
+        except (OSError, ssl.SSLError) as exc:
+            outcome["error"] = f"TCP 连接失败: {exc}"
+            return self._finish(outcome, started)
+
+        outcome["stage"] = "head"
+        try:
+            request = (
+                f"HEAD / HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                "User-Agent: AI-POC/1.0\r\nAccept: */*\r\nConnection: close\r\n\r\n"
+            )
+            writer.write(request.encode("ascii", errors="ignore"))
+            await asyncio.wait_for(writer.drain(), timeout=self.head_timeout)
+            head = await asyncio.wait_for(reader.read(4096), timeout=self.head_timeout)
+            outcome.update(self._parse_head_response(head))
+            outcome["alive"] = True
+            outcome["stage"] = "ok"
+        except asyncio.TimeoutError:
+            outcome["error"] = "HEAD 请求超时"
+        except (OSError, ssl.SSLError) as exc:
+            # 连接已建立但 HEAD 被拒绝，仍视为主机存活
+            outcome["alive"] = True
+            outcome["stage"] = "ok"
+            outcome["error"] = f"HEAD 请求异常: {exc}"
+        finally:
+            writer.close()
+            try:
+                await asyncio.wait_for(writer.wait_closed(), timeout=1)
+            except (OSError, ssl.SSLError, asyncio.TimeoutError):
+                pass
+
+        return self._finish(outcome, started)
+
+    def _parse_head_response(self, raw: bytes) -> Dict:
+        text = raw.decode("latin1", errors="replace")
+        lines = text.split("\r\n")
+        status_code = None
+        parts = lines[0].split(" ", 2) if lines and lines[0] else []
+        if len(parts) >= 2 and parts[1].isdigit():
+            status_code = int(parts[1])
+
+        server = None
+        for line in lines[1:]:
+            if line.lower().startswith("server:"):
+                server = line.split(":", 1)[1].strip()[:200]
+                break
+        return {"status_code": status_code, "server": server}
+
+    def _finish(self, outcome: Dict, started: float) -> Dict:
+        outcome["latency_ms"] = int((time.monotonic() - started) * 1000)
+        return outcome
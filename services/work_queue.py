@@ -0,0 +1,91 @@
+"""
+批量子任务工作队列
+
+外部工作进程通过统一的队列接口领取、续约、回报子任务：
+1. sqlite：直接操作批量任务数据库，API 节点的 /api/workers/* 接口与进程内工作者使用
+2. http：经 API 节点的 /api/workers/* 接口访问，供其他进程/主机上的工作进程使用
+详情段文件只由 API 节点写入，独立进程的工作者应使用 http 后端。
+其他队列后端可通过 register_work_queue 注册。
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+
+class SQLiteWorkQueue:
+    """基于批量任务数据库的租约队列，逻辑由 BatchTaskService 实现。"""
+
+    def __init__(self, service=None):
+        self._service = service
+
+    @property
+    def service(self):
+        if self._service is None:
+            from services.batch_task_service import batch_task_service
+
+            self._service = batch_task_service
+        return self._service
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: Optional[float] = None) -> List[Dict]:
+        return self.service.lease_items(worker_id, limit, lease_seconds)
+
+    def heartbeat(self, worker_id: str, item_ids: List[int], lease_seconds: Optional[float] = None) -> List[int]:
+        return self.service.heartbeat_items(worker_id, item_ids, lease_seconds)
+
+    def complete(self, worker_id: str, item_id: int, outcome: Dict) -> bool:
+        return self.service.complete_leased_item(worker_id, item_id, outcome)
+
+    def release(self, worker_id: str, item_ids: List[int]) -> int:
+        return self.service.release_leased_items(worker_id, item_ids)
+
+
+class HTTPWorkQueue:
+    """通过 API 节点工作进程接口访问的租约队列。"""
+
+    def __init__(self, api_url: str, timeout: float = 30, session: Optional[requests.Session] = None):
+        if not api_url:
+            raise ValueError("HTTP 工作队列需要 API 地址")
+        self.api_url = api_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: Optional[float] = None) -> List[Dict]:
+        payload = self._post("lease", {"worker_id": worker_id, "limit": limit, "lease_seconds": lease_seconds})
+        return payload.get("items") or []
+
+    def heartbeat(self, worker_id: str, item_ids: List[int], lease_seconds: Optional[float] = None) -> List[int]:
+        payload = self._post("heartbeat", {"worker_id": worker_id, "item_ids": item_ids, "lease_seconds": lease_seconds})
+        return payload.get("item_ids") or []
+
+    def complete(self, worker_id: str, item_id: int, outcome: Dict) -> bool:
+        payload = self._post("complete", {"worker_id": worker_id, "item_id": item_id, "outcome": outcome})
+        return bool(payload.get("accepted"))
+
+    def release(self, worker_id: str, item_ids: List[int]) -> int:
+        payload = self._post("release", {"worker_id": worker_id, "item_ids": item_ids})
+        return int(payload.get("released") or 0)
+
+    def _post(self, action: str, body: Dict) -> Dict:
+        response = self.session.post(f"{self.api_url}/api/workers/{action}", json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+WORK_QUEUE_FACTORIES: Dict[str, Callable[..., object]] = {
+    "sqlite": SQLiteWorkQueue,
+    "http": HTTPWorkQueue,
+}
+
+
+def register_work_queue(name: str, factory: Callable[..., object]):
+    WORK_QUEUE_FACTORIES[name.lower().strip()] = factory
+
+
+def create_work_queue(backend: str, **options):
+    backend = (backend or "").lower().strip()
+    if backend not in WORK_QUEUE_FACTORIES:
+        raise ValueError(f"不支持的工作队列后端: {backend}")
+    return WORK_QUEUE_FACTORIES[backend](**options)
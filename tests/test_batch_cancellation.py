@@ -0,0 +1,176 @@
+import gc
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import requests
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.cancellation import CancellationToken, TaskCancelledError, bind_token
+from services.http_runtime import create_http_client, create_keepalive_session
+from services.nuclei_service import NucleiService
+from services.poc_library_service import PocLibraryService
+
+
+class BlockingPocLibraryService:
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        self.started.set()
+        self.release.wait(10)
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": False, "reason": "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    CANCEL_GRACE_SECONDS = 0.2
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class CancellationTokenTests(unittest.TestCase):
+    def test_callbacks_run_once_on_set(self):
+        token = CancellationToken()
+        calls = []
+        token.add_callback(lambda: calls.append("a"))
+        remove = token.add_callback(lambda: calls.append("b"))
+        remove()
+        token.set()
+        token.set()
+        self.assertEqual(calls, ["a"])
+        token.add_callback(lambda: calls.append("late"))
+        self.assertEqual(calls, ["a", "late"])
+
+    def test_child_follows_parent_until_closed(self):
+        parent = CancellationToken()
+        child = parent.child()
+        closed_child = parent.child()
+        closed_child.close()
+        parent.set()
+        self.assertTrue(child.is_set())
+        self.assertFalse(closed_child.is_set())
+
+    def test_http_client_refuses_requests_after_cancel(self):
+        token = CancellationToken()
+        token.set()
+        with bind_token(token):
+            with self.assertRaises(TaskCancelledError):
+                create_http_client().get("http://127.0.0.1:1/")
+
+
+class InFlightAbortTests(unittest.TestCase):
+    def test_cancel_aborts_blocked_http_request(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        accepted = []
+        threading.Thread(target=lambda: accepted.append(server.accept()), daemon=True).start()
+
+        token = CancellationToken()
+        threading.Timer(0.3, token.set).start()
+        client = create_http_client(timeout=10, session=create_keepalive_session())
+        started = time.monotonic()
+        try:
+            with bind_token(token):
+                with self.assertRaises(requests.RequestException):
+                    client.get(f"http://127.0.0.1:{server.getsockname()[1]}/slow")
+        finally:
+            server.close()
+            for connection, _ in accepted:
+                connection.close()
+        self.assertLess(time.monotonic() - started, 3)
+
+    @unittest.skipIf(sys.platform.startswith("win"), "进程组终止仅在 POSIX 上验证")
+    def test_cancel_kills_scan_process(self):
+        token = CancellationToken()
+        threading.Timer(0.3, token.set).start()
+        started = time.monotonic()
+        with bind_token(token):
+            result = NucleiService()._run_scan_process([sys.executable, "-c", "import time; time.sleep(30)"], timeout=30)
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertNotEqual(result.returncode, 0)
+
+
+class BatchForcedCancellationTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = BlockingPocLibraryService()
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        self.fake_poc_service.release.set()
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def test_cancel_does_not_wait_for_stuck_items(self):
+        task = self.batch_service.create_task(
+            target_urls=["http://a.test", "http://b.test"],
+            poc_ids=[1, 2],
+            concurrency=2,
+        )
+        self.assertTrue(self.fake_poc_service.started.wait(2))
+        started = time.monotonic()
+        self.batch_service.cancel_task(task["id"])
+
+        deadline = time.time() + 3
+        while time.time() < deadline and task["id"] in self.batch_service._worker_threads:
+            time.sleep(0.05)
+        self.assertLess(time.monotonic() - started, 3)
+
+        task = self.batch_service.get_task(task["id"])
+        items = self.batch_service.get_task_items(task["id"], limit=20)["items"]
+        self.assertEqual(task["status"], "cancelled")
+        self.assertTrue(all(item["status"] == "cancelled" for item in items))
+
+
+if __name__ == "__main__":
+    unittest.main()
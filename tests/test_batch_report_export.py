@@ -1,4 +1,8 @@
+import csv
 import gc
+import gzip
+import io
+import json
 import tempfile
 import time
 import unittest
@@ -92,6 +96,29 @@ class BatchReportExportTests(unittest.TestCase):
         else:
             self.fail("临时测试目录清理失败，数据库文件仍被占用")
 
+    def test_iter_task_items_pages_by_id_within_task(self):
+        with self.batch_service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO batch_tasks (mode, status, concurrency, config_json) VALUES ('multi_url_single_poc', 'pending', 1, '{}')"
+            )
+            other_task_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO batch_task_items (task_id, poc_id, target_url, status) VALUES (?, ?, ?, ?)",
+                [(task_id, self.poc_id, f"http://{task_id}-{index}.test", "pending") for index in range(3) for task_id in (self.task_id, other_task_id)],
+            )
+
+        items = list(self.batch_service.iter_task_items(self.task_id, page_size=2))
+        self.assertEqual(len(items), 5)
+        self.assertEqual([item["id"] for item in items], sorted(item["id"] for item in items))
+        self.assertTrue(all(item["task_id"] == self.task_id for item in items))
+        self.assertEqual(items[0]["vuln_name"], "测试 SSRF")
+
+        pending = list(self.batch_service.iter_task_items(self.task_id, status="pending", page_size=1, include_poc=False))
+        self.assertEqual(len(pending), 3)
+        self.assertNotIn("vuln_name", pending[0])
+        self.assertEqual(self.batch_service.count_task_items(self.task_id, status="pending"), 3)
+
     def test_build_task_report_payload_contains_summary_and_items(self):
         payload = self.batch_service.build_task_report_payload(self.task_id)
         self.assertEqual(payload["summary"]["total_items"], 2)
@@ -120,6 +147,29 @@ class BatchReportExportTests(unittest.TestCase):
         self.assertIn("text/plain", txt_type)
         self.assertIn("子任务结果", txt_content.decode("utf-8"))
 
+    def test_stream_jsonl_and_csv_reports(self):
+        _, jsonl_type, chunks = self.batch_service.stream_task_report(self.task_id, "jsonl")
+        lines = [json.loads(line) for line in b"".join(chunks).decode("utf-8").splitlines()]
+        self.assertIn("ndjson", jsonl_type)
+        self.assertEqual(lines[0]["type"], "summary")
+        self.assertEqual([line["item"]["target_url"] for line in lines[1:]], ["http://127.0.0.1:8000", "http://not-exists.local"])
+
+        _, csv_type, csv_content = self.batch_service.export_task_report(self.task_id, "csv")
+        rows = list(csv.DictReader(io.StringIO(csv_content.decode("utf-8-sig"))))
+        self.assertIn("text/csv", csv_type)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]["status_label"], "异常")
+
+    def test_stream_report_gzip_and_format_validation(self):
+        filename, content_type, chunks = self.batch_service.stream_task_report(self.task_id, "json", compress=True)
+        payload = json.loads(gzip.decompress(b"".join(chunks)).decode("utf-8"))
+        self.assertTrue(filename.endswith(".json.gz"))
+        self.assertEqual(content_type, "application/gzip")
+        self.assertEqual(len(payload["items"]), 2)
+
+        with self.assertRaises(ValueError):
+            self.batch_service.stream_task_report(self.task_id, "pdf")
+
 
 if __name__ == "__main__":
     unittest.main()
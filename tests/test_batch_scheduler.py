@@ -0,0 +1,175 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_scheduler import HostLaneScheduler
+from services.batch_task_service import BatchTaskService
+from services.http_runtime import get_http_client
+from services.poc_library_service import PocLibraryService
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _items(spec):
+    return [{"id": index, "target_url": url} for index, url in enumerate(spec, start=1)]
+
+
+class FakePocLibraryService:
+    def __init__(self):
+        self.sessions = []
+        self._lock = threading.Lock()
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        session = get_http_client().session
+        with self._lock:
+            self.sessions.append((target_url, id(session)))
+        time.sleep(0.01)
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": False, "reason": "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class HostLaneSchedulerTests(unittest.TestCase):
+    def test_each_lane_drains_one_host_before_claiming_next(self):
+        scheduler = HostLaneScheduler(
+            _items(["http://a", "http://b", "http://a", "http://c", "http://b", "http://a"]),
+            lane_count=2,
+            session_factory=FakeSession,
+        )
+
+        self.assertEqual(scheduler.pop_for_lane(0)["target_url"], "http://a")
+        self.assertEqual(scheduler.pop_for_lane(1)["target_url"], "http://b")
+        self.assertEqual([scheduler.pop_for_lane(0)["target_url"] for _ in range(2)], ["http://a", "http://a"])
+        self.assertEqual(scheduler.pop_for_lane(0)["target_url"], "http://c")
+        self.assertEqual(scheduler.pop_for_lane(1)["target_url"], "http://b")
+        self.assertIsNone(scheduler.pop_for_lane(1))
+        self.assertFalse(scheduler)
+
+    def test_idle_lane_shares_busiest_host_when_hosts_run_out(self):
+        scheduler = HostLaneScheduler(_items(["http://a"] * 4), lane_count=2, session_factory=FakeSession)
+        self.assertEqual(scheduler.pop_for_lane(0)["target_url"], "http://a")
+        self.assertEqual(scheduler.pop_for_lane(1)["target_url"], "http://a")
+        self.assertEqual(len(scheduler), 2)
+
+    def test_source_is_consumed_lazily_within_buffer(self):
+        consumed = []
+
+        def source():
+            for item in _items(["http://a"] * 10):
+                consumed.append(item["id"])
+                yield item
+
+        scheduler = HostLaneScheduler(source(), lane_count=1, session_factory=FakeSession, buffer_size=3)
+        self.assertEqual(len(consumed), 3)
+        self.assertEqual([scheduler.pop_for_lane(0)["id"] for _ in range(10)], list(range(1, 11)))
+        self.assertIsNone(scheduler.pop_for_lane(0))
+
+    def test_extendleft_requeues_at_front_of_host_queue(self):
+        items = _items(["http://a", "http://a"])
+        scheduler = HostLaneScheduler(items[1:], lane_count=1, session_factory=FakeSession)
+        scheduler.extendleft([items[0]])
+        self.assertEqual(scheduler.pop_for_lane(0)["id"], 1)
+
+    def test_session_reused_per_host_and_closed_on_switch(self):
+        scheduler = HostLaneScheduler([], lane_count=1, session_factory=FakeSession)
+        first = scheduler.session_for(0, "a:80")
+        self.assertIs(scheduler.session_for(0, "a:80"), first)
+        second = scheduler.session_for(0, "b:80")
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        scheduler.close()
+        self.assertTrue(second.closed)
+
+
+class BatchHostAffinityTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = FakePocLibraryService()
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _wait_for_completion(self, task_id):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task_id)
+            if task["status"] == "completed":
+                return task
+            time.sleep(0.05)
+        self.fail("批量任务未在预期时间内完成")
+
+    def test_items_of_one_host_share_a_session(self):
+        task = self.batch_service.create_task(
+            target_urls=["http://a.test", "http://b.test", "http://c.test"],
+            poc_ids=[1, 2, 3, 4],
+            concurrency=3,
+        )
+        task = self._wait_for_completion(task["id"])
+
+        sessions_by_host = {}
+        for target_url, session_id in self.fake_poc_service.sessions:
+            sessions_by_host.setdefault(target_url, set()).add(session_id)
+        self.assertEqual(task["completed_items"], 12)
+        self.assertTrue(all(len(session_ids) == 1 for session_ids in sessions_by_host.values()))
+        self.assertEqual(len(set().union(*sessions_by_host.values())), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
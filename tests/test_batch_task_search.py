@@ -0,0 +1,126 @@
+import gc
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.poc_library_service import PocLibraryService
+
+
+class FakePocLibraryService:
+    NAMES = {1: "Struts2 远程代码执行", 2: "ThinkPHP SQL注入"}
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": self.NAMES.get(poc_id, f"POC-{poc_id}"),
+            "vuln_type": "RCE" if poc_id == 1 else "SQLi",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": False, "reason": "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class BatchTaskSearchTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = FakePocLibraryService()
+
+    def tearDown(self):
+        for thread in list(self.batch_service._worker_threads.values()):
+            thread.join(timeout=5)
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _search_ids(self, keyword):
+        return sorted(task["id"] for task in self.batch_service.list_tasks(keyword=keyword)["tasks"])
+
+    def test_task_history_search_by_target_poc_and_id(self):
+        first = self.batch_service.create_task(["http://shop.example.com"], [1])
+        second = self.batch_service.create_task(["http://10.0.0.8:8080"], [2])
+
+        self.assertEqual(self._search_ids("shop.example"), [first["id"]])
+        self.assertEqual(self._search_ids("SHOP.EXAMPLE"), [first["id"]])
+        self.assertEqual(self._search_ids("远程代码"), [first["id"]])
+        self.assertEqual(self._search_ids("10.0.0"), [second["id"]])
+        self.assertEqual(self._search_ids("sq"), [second["id"]])
+        self.assertIn(second["id"], self._search_ids(str(second["id"])))
+        self.assertEqual(self._search_ids("not-present"), [])
+
+    def test_item_keyword_filter_uses_normalized_tables(self):
+        task = self.batch_service.create_task(["http://a.test", "http://b.test"], [1, 2])
+
+        by_target = self.batch_service.get_task_items(task["id"], keyword="b.test")
+        self.assertEqual(by_target["total"], 2)
+        self.assertTrue(all(item["target_url"] == "http://b.test" for item in by_target["items"]))
+
+        by_poc = self.batch_service.get_task_items(task["id"], keyword="ThinkPHP")
+        self.assertEqual(sorted(item["poc_id"] for item in by_poc["items"]), [2, 2])
+
+    def test_legacy_tasks_are_backfilled_into_search_index(self):
+        with self.batch_service.get_db_connection() as conn:
+            conn.execute(
+                "INSERT INTO batch_tasks (task_type, mode, status, config_json) VALUES ('nuclei_scan', 'batch', 'completed', ?)",
+                (json.dumps({"target_urls": ["http://legacy.test"], "template_paths": ["cves/2021/CVE-2021-44228.yaml"]}),),
+            )
+        self.batch_service.init_database()
+
+        self.assertEqual(self._search_ids("CVE-2021-44228"), [1])
+        self.assertEqual(self.batch_service.get_task_targets(1)[0]["target_url"], "http://legacy.test")
+
+    def test_status_filter_uses_composite_index(self):
+        with self.batch_service.get_db_connection() as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM batch_task_items WHERE task_id = ? AND status = ? AND id > ? ORDER BY id LIMIT 10",
+                (1, "failed", 0),
+            ).fetchall()
+        self.assertIn("idx_batch_task_items_task_status_id", " ".join(row["detail"] for row in plan))
+
+
+if __name__ == "__main__":
+    unittest.main()
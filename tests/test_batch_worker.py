@@ -0,0 +1,261 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.batch_worker import BatchWorker
+from services.poc_library_service import PocLibraryService
+from services.work_queue import SQLiteWorkQueue, create_work_queue
+
+
+class FakePocLibraryService:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        with self._lock:
+            self.calls.append((poc_id, target_url, threading.current_thread().name))
+        vulnerable = poc_id == 1
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": vulnerable, "reason": "命中" if vulnerable else "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    WORKER_POLL_INTERVAL = 0.05
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+OUTCOME = {"success": True, "result": {"vulnerable": False, "reason": "未发现漏洞", "details": None}}
+NETWORK_FAILURE = {"success": False, "error": "connect timeout", "result": {"vulnerable": False, "reason": "目标不可达", "details": None}}
+
+
+class BatchWorkerTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = FakePocLibraryService()
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        for task_id in list(self.batch_service._worker_threads):
+            self.batch_service.cancel_task(task_id)
+        for thread in list(self.batch_service._worker_threads.values()):
+            thread.join(timeout=5)
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _create_open_task(self, urls, poc_ids, **kwargs):
+        task = self.batch_service.create_task(urls, poc_ids, dispatch_mode="workers", **kwargs)
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task["id"])
+            if task["leases_open"]:
+                return task
+            time.sleep(0.02)
+        self.fail("批量任务未开放租约")
+
+    def _wait_finished(self, task_id):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task_id)
+            if task["status"] in ("completed", "cancelled"):
+                return task
+            time.sleep(0.05)
+        self.fail("批量任务未在预期时间内完成")
+
+    def test_external_workers_execute_all_items(self):
+        task = self._create_open_task(["http://a.test", "http://b.test"], [1, 2])
+        queue = SQLiteWorkQueue(self.batch_service)
+        workers = [
+            BatchWorker(
+                queue,
+                worker_id=f"w{index}",
+                concurrency=2,
+                poll_interval=0.02,
+                executor=self.batch_service.execute_item,
+                session_factory=lambda: None,
+            )
+            for index in range(2)
+        ]
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+        for thread in threads:
+            thread.start()
+        try:
+            task = self._wait_finished(task["id"])
+        finally:
+            for worker in workers:
+                worker.stop()
+            for thread in threads:
+                thread.join(timeout=5)
+
+        self.assertEqual(task["status"], "completed")
+        self.assertEqual((task["success_items"], task["vulnerable_items"]), (4, 2))
+        self.assertEqual(len(self.fake_poc_service.calls), 4)
+        self.assertTrue(all(name.startswith("batch-worker") for _, _, name in self.fake_poc_service.calls))
+        self.assertFalse(self.batch_service.get_task(task["id"])["leases_open"])
+
+    def test_expired_lease_is_reclaimed_and_late_result_rejected(self):
+        task = self._create_open_task(["http://a.test"], [1, 2])
+        leased = self.batch_service.lease_items("w1", limit=10)
+        self.assertEqual(len(leased), 2)
+        self.assertEqual(self.batch_service.lease_items("w2", limit=10), [])
+
+        self.assertEqual(self.batch_service.reclaim_expired_leases(task["id"], now=time.time() + 3600), 2)
+        relet = self.batch_service.lease_items("w2", limit=1)
+        self.assertEqual(len(relet), 1)
+        self.assertFalse(self.batch_service.complete_leased_item("w1", relet[0]["id"], OUTCOME))
+        self.assertTrue(self.batch_service.complete_leased_item("w2", relet[0]["id"], OUTCOME))
+
+        with self.batch_service.get_db_connection() as conn:
+            conn.execute("UPDATE batch_task_items SET lease_attempts = 2 WHERE task_id = ?", (task["id"],))
+        poison = self.batch_service.lease_items("w3", limit=1)
+        self.batch_service.reclaim_expired_leases(task["id"], now=time.time() + 3600)
+
+        task = self._wait_finished(task["id"])
+        item = next(i for i in self.batch_service.get_task_items(task["id"])["items"] if i["id"] == poison[0]["id"])
+        self.assertEqual((item["status"], item["failure_code"]), ("failed", "worker_lease_expired"))
+        self.assertEqual((task["success_items"], task["failed_items"]), (1, 1))
+
+    def test_result_racing_reclaim_does_not_overwrite_new_lease(self):
+        task = self._create_open_task(["http://a.test"], [2])
+        item_id = self.batch_service.lease_items("w1", limit=1)[0]["id"]
+        stale = {"success": True, "result": {"vulnerable": False, "reason": "过期结果"}, "metrics": {"wall_ms": 5}}
+        fresh = {"success": True, "result": {"vulnerable": False, "reason": "新结果"}, "metrics": {"wall_ms": 7}}
+
+        original = self.batch_service._should_preserve_cancelled
+        relet = []
+
+        def reclaim_between_check_and_store(checked_id):
+            if not relet:
+                self.batch_service.reclaim_expired_leases(task["id"], now=time.time() + 3600)
+                relet.extend(self.batch_service.lease_items("w2", limit=1))
+            return original(checked_id)
+
+        self.batch_service._should_preserve_cancelled = reclaim_between_check_and_store
+        self.assertFalse(self.batch_service.complete_leased_item("w1", item_id, stale))
+        self.assertEqual([item["id"] for item in relet], [item_id])
+        with self.batch_service.get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT status, lease_owner, lease_expires_at FROM batch_task_items WHERE id = ?", (item_id,)
+            ).fetchone()
+        self.assertEqual((row["status"], row["lease_owner"]), ("running", "w2"))
+        self.assertIsNotNone(row["lease_expires_at"])
+
+        self.assertTrue(self.batch_service.complete_leased_item("w2", item_id, fresh))
+        with self.batch_service.get_db_connection() as conn:
+            row = conn.execute("SELECT status, reason FROM batch_task_items WHERE id = ?", (item_id,)).fetchone()
+        self.assertEqual((row["status"], row["reason"]), ("success", "新结果"))
+        self.assertEqual(self.batch_service.get_poc_performance(2)["executions"], 1)
+
+    def test_leases_respect_concurrency_liveness_and_host_breaker(self):
+        task = self._create_open_task(
+            ["http://dead.test", "http://a.test", "http://b.test"],
+            [1, 2],
+            concurrency=1,
+            host_failure_threshold=1,
+            host_recovery_probe=False,
+        )
+        with self.batch_service.get_db_connection() as conn:
+            conn.execute(
+                "UPDATE batch_task_targets SET alive = 0 WHERE task_id = ? AND target_url = 'http://dead.test'",
+                (task["id"],),
+            )
+
+        first = self.batch_service.lease_items("w1", limit=10)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(self.batch_service.lease_items("w2", limit=10), [])
+        failed_url = first[0]["target_url"]
+        self.assertNotEqual(failed_url, "http://dead.test")
+        self.batch_service.complete_leased_item("w1", first[0]["id"], NETWORK_FAILURE)
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            pending = self.batch_service.get_task_items(task["id"], status="pending")["items"]
+            if all(item["target_url"] != failed_url for item in pending):
+                break
+            time.sleep(0.02)
+
+        leased_urls = []
+        while True:
+            leased = self.batch_service.lease_items("w1", limit=10)
+            if not leased:
+                break
+            self.assertEqual(len(leased), 1)
+            for item in leased:
+                leased_urls.append(item["target_url"])
+                self.batch_service.complete_leased_item("w1", item["id"], OUTCOME)
+
+        self.assertNotIn(failed_url, leased_urls)
+        # 失活目标排在其余目标之后领取
+        self.assertEqual(leased_urls[-2:], ["http://dead.test", "http://dead.test"])
+        task = self._wait_finished(task["id"])
+        skipped = self.batch_service.get_task_items(task["id"], status="skipped")["items"]
+        self.assertTrue(skipped)
+        self.assertTrue(all(item["failure_code"] == "host_circuit_open" for item in skipped))
+
+    def test_heartbeat_stops_reporting_cancelled_items(self):
+        task = self._create_open_task(["http://a.test"], [1])
+        leased = [item["id"] for item in self.batch_service.lease_items("w1", limit=5)]
+        self.assertEqual(self.batch_service.heartbeat_items("w1", leased), leased)
+        self.assertEqual(self.batch_service.heartbeat_items("w2", leased), [])
+
+        self.batch_service.cancel_task(task["id"])
+        self.assertEqual(self.batch_service.heartbeat_items("w1", leased), [])
+        self.assertFalse(self.batch_service.complete_leased_item("w1", leased[0], OUTCOME))
+
+    def test_unknown_queue_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            create_work_queue("redis")
+        with self.assertRaises(ValueError):
+            self.batch_service.create_task(["http://a.test"], [1], dispatch_mode="cluster")
+
+
+if __name__ == "__main__":
+    unittest.main()
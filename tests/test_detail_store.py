@@ -0,0 +1,216 @@
+import gc
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.detail_codec import CODEC_RAW, CODEC_ZLIB, CODEC_ZLIB_DICT, DetailCodec
+from services.detail_migration import migrate_detail_storage
+from services.detail_store import DICTIONARY_DIRNAME, DetailSegmentStore, DetailStoreError, is_segment_locator
+from services.poc_library_service import PocLibraryService
+
+
+class FailingPocLibraryService:
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": True, "reason": "命中", "details": {"poc": poc_id, "body": "x" * 1024}},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class DetailSegmentStoreTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_append_and_read_round_trip_without_cache(self):
+        store = DetailSegmentStore(self.root, cache_size=0)
+        small = store.append(1, 10, {"success": False, "error": "超时"})
+        large = store.append(1, 11, {"success": True, "body": "漏洞证据" * 200})
+
+        self.assertTrue(is_segment_locator(small))
+        self.assertEqual(store.read(small)["error"], "超时")
+        self.assertEqual(store.read(large)["body"], "漏洞证据" * 200)
+        self.assertEqual(list(store.iter_index(1)), [(10, small), (11, large)])
+        self.assertEqual(len(list((self.root / "task_1").iterdir())), 2)
+
+    def test_read_through_cache_avoids_disk(self):
+        writer = DetailSegmentStore(self.root, cache_size=0)
+        locator = writer.append(2, 20, {"success": True})
+        reader = DetailSegmentStore(self.root, cache_size=4)
+        self.assertEqual(reader.read(locator), {"success": True})
+
+        writer.segment_path(2).unlink()
+        self.assertEqual(reader.read(locator), {"success": True})
+        reader.invalidate(2)
+        with self.assertRaises(OSError):
+            reader.read(locator)
+
+    def test_read_rejects_locator_of_another_item(self):
+        store = DetailSegmentStore(self.root, cache_size=4)
+        first = store.append(3, 30, {"success": True, "item": 30})
+        store.append(3, 31, {"success": True, "item": 31})
+
+        self.assertEqual(store.read(first, 30)["item"], 30)
+        with self.assertRaises(DetailStoreError):
+            store.read(first, 31)
+        store.invalidate(3)
+        with self.assertRaises(DetailStoreError):
+            store.read(first, 31)
+
+
+def _nuclei_sample(index):
+    finding = {
+        "template-id": f"cve-2024-{index:04d}",
+        "info": {"name": "Apache Struts RCE", "severity": "critical", "tags": ["cve", "rce", "apache"]},
+        "matcher-status": True,
+        "matched-at": f"http://host-{index}.test/index.action",
+        "request": "GET /index.action HTTP/1.1\r\nHost: host.test\r\nUser-Agent: Mozilla/5.0\r\n\r\n",
+    }
+    return json.dumps({"success": True, "findings": [finding]}, separators=(",", ":")).encode("utf-8")
+
+
+class DetailCodecTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_small_records_stay_raw_and_large_records_compress(self):
+        codec = DetailCodec(use_zstd=False)
+        self.assertEqual(codec.encode(b'{"error":"x"}')[0], CODEC_RAW)
+        codec_id, payload = codec.encode(_nuclei_sample(1))
+        self.assertEqual(codec_id, CODEC_ZLIB)
+        self.assertEqual(codec.decode(codec_id, payload), _nuclei_sample(1))
+
+    def test_trained_dictionary_shrinks_records_and_survives_retraining(self):
+        codec = DetailCodec(self.root, use_zstd=False)
+        plain_size = len(codec.encode(_nuclei_sample(999), "nuclei")[1])
+        self.assertIsNotNone(codec.train("nuclei", [_nuclei_sample(index) for index in range(64)]))
+
+        codec_id, payload = codec.encode(_nuclei_sample(999), "nuclei")
+        self.assertEqual(codec_id, CODEC_ZLIB_DICT)
+        self.assertLess(len(payload), plain_size)
+
+        codec.train("nuclei", [b'{"replacement":"dictionary","with":"other fragments"}'] * 8)
+        reopened = DetailCodec(self.root, use_zstd=False)
+        self.assertEqual(reopened.decode(codec_id, payload), _nuclei_sample(999))
+        self.assertFalse(reopened.has_dictionary("poc"))
+
+
+class BatchDetailStorageTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = FailingPocLibraryService()
+
+    def tearDown(self):
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def test_hit_details_are_appended_to_one_segment(self):
+        task = self.batch_service.create_task(
+            target_urls=["http://a.test", "http://b.test"],
+            poc_ids=[1, 2],
+            concurrency=2,
+        )
+        deadline = time.time() + 5
+        while time.time() < deadline and self.batch_service.get_task(task["id"])["status"] != "completed":
+            time.sleep(0.05)
+
+        items = self.batch_service.get_task_items(task["id"], limit=20)["items"]
+        self.assertTrue(all(is_segment_locator(item["detail_file"]) for item in items))
+        task_dir = self.base_dir / "pocs" / "batch_results" / f"task_{task['id']}"
+        self.assertEqual(sorted(path.name for path in task_dir.iterdir()), ["details.idx", "details.seg"])
+
+        detail = self.batch_service.get_task_item_detail(task["id"], items[-1]["id"])
+        self.assertEqual(detail["detail"]["result"]["details"]["body"], "x" * 1024)
+
+    def test_migration_moves_legacy_files_and_inline_json_into_segments(self):
+        legacy_dir = self.base_dir / "pocs" / "batch_results" / "task_1"
+        legacy_dir.mkdir(parents=True)
+        legacy_file = legacy_dir / "item_1.json"
+        legacy_file.write_text(json.dumps({"success": True, "body": "旧版详情" * 100}), encoding="utf-8")
+        with self.batch_service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO batch_tasks (mode, status, total_items) VALUES ('batch', 'completed', 2)")
+            cursor.execute(
+                "INSERT INTO batch_task_items (task_id, poc_id, target_url, status, detail_file) VALUES (1, 1, 'http://a', 'success', ?)",
+                (str(legacy_file),),
+            )
+            cursor.execute(
+                "INSERT INTO batch_task_items (task_id, poc_id, target_url, status, result_json) VALUES (1, 2, 'http://b', 'failed', ?)",
+                (json.dumps({"success": False, "error": "连接超时"}),),
+            )
+
+        dry_run = migrate_detail_storage(self.batch_service, dry_run=True)
+        self.assertEqual(dry_run["migrated"], 2)
+        self.assertTrue(legacy_file.exists())
+
+        stats = migrate_detail_storage(self.batch_service)
+        self.assertEqual((stats["legacy_files"], stats["result_json"]), (1, 1))
+        self.assertLess(stats["bytes_after"], stats["bytes_before"])
+        self.assertFalse(legacy_file.exists())
+        self.assertFalse((self.base_dir / "pocs" / "batch_results" / DICTIONARY_DIRNAME).exists())
+
+        first = self.batch_service.get_task_item_detail(1, 1)
+        second = self.batch_service.get_task_item_detail(1, 2)
+        self.assertEqual(first["detail"]["body"], "旧版详情" * 100)
+        self.assertEqual(second["detail"]["error"], "连接超时")
+        self.assertEqual(migrate_detail_storage(self.batch_service)["migrated"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.early_stop import EarlyStopController
+from services.poc_library_service import PocLibraryService
+
+
+class HitOnFirstPocLibraryService:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        with self._lock:
+            self.calls.append((poc_id, target_url))
+        vulnerable = poc_id == 1
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": vulnerable, "reason": "命中" if vulnerable else "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class EarlyStopControllerTests(unittest.TestCase):
+    def test_time_budget_triggers_once(self):
+        now = [100.0]
+        controller = EarlyStopController(time_budget_seconds=5, clock=lambda: now[0])
+        controller.start()
+        self.assertFalse(controller.check_time_budget())
+        now[0] += 5
+        self.assertTrue(controller.check_time_budget())
+        self.assertFalse(controller.check_time_budget())
+        self.assertEqual(controller.stop_code, "time_budget")
+        self.assertTrue(controller.blocks({"target_url": "http://a.test", "poc_id": 1}))
+
+    def test_disabled_controller_never_blocks(self):
+        controller = EarlyStopController()
+        self.assertFalse(controller.enabled)
+        self.assertEqual(controller.record({"target_url": "http://a.test", "poc_id": 1}, True), {})
+        self.assertFalse(controller.blocks({"target_url": "http://a.test", "poc_id": 1}))
+
+
+class EarlyStopSchedulingTests(unittest.TestCase):
+    URLS = ["http://a.test", "http://b.test"]
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = HitOnFirstPocLibraryService()
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _run(self, **kwargs):
+        task = self.batch_service.create_task(self.URLS, [1, 2, 3], concurrency=1, **kwargs)
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task["id"])
+            if task["status"] == "completed":
+                return task
+            time.sleep(0.05)
+        self.fail("批量任务未在预期时间内完成")
+
+    def test_host_first_hit_skips_rest_of_host(self):
+        task = self._run(stop_on_host_hit=True)
+        self.assertEqual(sorted(self.fake_poc_service.calls), [(1, "http://a.test"), (1, "http://b.test")])
+        skipped = self.batch_service.get_task_items(task["id"], status="skipped")["items"]
+        self.assertEqual(len(skipped), 4)
+        self.assertTrue(all(item["failure_code"] == "host_hit" for item in skipped))
+        self.assertEqual((task["completed_items"], task["vulnerable_items"]), (6, 2))
+
+    def test_poc_first_hit_skips_other_hosts(self):
+        self._run(stop_on_poc_hit=True)
+        executed = sorted(self.fake_poc_service.calls)
+        self.assertEqual([call for call in executed if call[0] == 1], [(1, "http://a.test")])
+        self.assertEqual(len(executed), 5)
+
+    def test_hit_budget_stops_task(self):
+        task = self._run(max_hits=1)
+        self.assertEqual(self.fake_poc_service.calls, [(1, "http://a.test")])
+        self.assertIn("命中数达到预算", task["stop_reason"])
+        self.assertEqual(self.batch_service.count_task_items(task["id"], status="skipped"), 5)
+
+    def test_rejects_invalid_budgets(self):
+        with self.assertRaises(ValueError):
+            self.batch_service.create_task(self.URLS, [1], max_hits=0)
+        with self.assertRaises(ValueError):
+            self.batch_service.create_task(self.URLS, [1], time_budget_seconds=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
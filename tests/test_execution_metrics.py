@@ -0,0 +1,156 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.execution_metrics import measure_execution, oob_wait_timer
+from services.poc_library_service import PocLibraryService
+
+
+class _PayloadHandler(BaseHTTPRequestHandler):
+    BODY = b"x" * 2048
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.BODY)))
+        self.end_headers()
+        self.wfile.write(self.BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MeteredPocLibraryService:
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        wall_ms = 500.0 if target_url.endswith("slow.test") else 20.0
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": False, "reason": "未发现漏洞", "details": None},
+            "metrics": {
+                "wall_ms": wall_ms,
+                "cpu_ms": 5.0,
+                "http_requests": 2,
+                "http_bytes_sent": 100,
+                "http_bytes_received": 900,
+                "oob_wait_ms": 0.0,
+                "peak_memory_kb": None,
+            },
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class ExecutionMetricsTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        self.poc_service = TestPocLibraryService(self.base_dir)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _PayloadHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.poc_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def test_python_poc_outcome_carries_metrics(self):
+        poc_path = self.poc_service.pocs_dir / "python" / "metered.py"
+        poc_path.write_text(
+            "import requests\n\n"
+            "def scan(url):\n"
+            "    total = sum(i * i for i in range(200000))\n"
+            "    first = create_http_client().get(url)\n"
+            "    second = requests.get(url)\n"
+            "    return {'vulnerable': False, 'reason': str(len(first.content) + len(second.content) + total % 2)}\n",
+            encoding="utf-8",
+        )
+
+        outcome = self.poc_service._execute_python_poc(str(poc_path), self.url)
+
+        self.assertTrue(outcome["success"], outcome.get("error"))
+        metrics = outcome["metrics"]
+        self.assertEqual(metrics["http_requests"], 2)
+        self.assertEqual(metrics["http_bytes_received"], 4096)
+        self.assertGreater(metrics["cpu_ms"], 0)
+        self.assertGreaterEqual(metrics["wall_ms"], metrics["cpu_ms"] * 0.5)
+        self.assertIsNone(metrics["peak_memory_kb"])
+
+    def test_oob_wait_and_sampled_memory(self):
+        with measure_execution(trace_memory=True) as metrics:
+            with oob_wait_timer():
+                time.sleep(0.05)
+            buffer = bytearray(4 * 1024 * 1024)
+
+        self.assertGreaterEqual(metrics.oob_wait_ms, 40)
+        self.assertGreaterEqual(metrics.peak_memory_kb, 4000)
+        self.assertEqual(len(buffer), 4 * 1024 * 1024)
+
+    def test_batch_items_aggregate_per_poc(self):
+        batch_service = TestBatchTaskService(self.base_dir)
+        original = batch_module.poc_library_service
+        batch_module.poc_library_service = MeteredPocLibraryService()
+        try:
+            task = batch_service.create_task(["http://fast.test", "http://slow.test"], [7])
+            deadline = time.time() + 5
+            while batch_service.get_task(task["id"])["status"] != "completed" and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            batch_module.poc_library_service = original
+
+        performance = batch_service.get_poc_performance(7)
+        self.assertEqual(performance["executions"], 2)
+        self.assertEqual(performance["max_wall_ms"], 500.0)
+        self.assertEqual(performance["avg_wall_ms"], 260.0)
+        self.assertEqual(performance["total_http_bytes"], 2000)
+        self.assertEqual(performance["slowest_items"][0]["target_url"], "http://slow.test")
+        items = batch_service.get_task_items(task["id"])["items"]
+        self.assertTrue(all(item["metrics"]["http_requests"] == 2 for item in items))
+        self.assertEqual(batch_service.get_poc_performance(99)["executions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
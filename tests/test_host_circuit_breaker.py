@@ -0,0 +1,196 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.host_health import HostCircuitBreaker, extract_host_key
+from services.poc_library_service import PocLibraryService
+
+
+NETWORK_ERROR = {
+    "failure_category": "network_error",
+    "failure_code": "connection_refused",
+    "failure_stage": "request_send",
+    "retryable": True,
+}
+NOT_VULNERABLE = {
+    "failure_category": "not_vulnerable",
+    "failure_code": "no_evidence_found",
+    "failure_stage": "result_judgement",
+    "retryable": False,
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePocLibraryService:
+    def __init__(self, dead_host: str):
+        self.dead_host = dead_host
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        with self._lock:
+            self.calls.append((poc_id, target_url))
+        if self.dead_host in target_url:
+            return {
+                "success": False,
+                "error": "Connection refused",
+                "target_url": target_url,
+                "result": {"vulnerable": False, "reason": "Connection refused", "details": None},
+            }
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": False, "reason": "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class HostCircuitBreakerTests(unittest.TestCase):
+    def test_extract_host_key_normalizes_scheme_and_port(self):
+        self.assertEqual(extract_host_key("example.com"), "example.com:80")
+        self.assertEqual(extract_host_key("https://Example.com/a"), "example.com:443")
+        self.assertEqual(extract_host_key("http://example.com:8080/"), "example.com:8080")
+
+    def test_breaker_opens_after_consecutive_network_errors(self):
+        breaker = HostCircuitBreaker(failure_threshold=2, recovery_probe=False)
+        self.assertEqual(breaker.record("a:80", NETWORK_ERROR), "closed")
+        self.assertEqual(breaker.record("a:80", NETWORK_ERROR), "open")
+        self.assertFalse(breaker.allows("a:80"))
+        self.assertFalse(breaker.can_recover("a:80"))
+        self.assertIn("连续 2 次网络异常", breaker.skip_reason("a:80"))
+
+    def test_non_network_outcome_resets_failure_count(self):
+        breaker = HostCircuitBreaker(failure_threshold=2)
+        breaker.record("a:80", NETWORK_ERROR)
+        breaker.record("a:80", NOT_VULNERABLE)
+        self.assertEqual(breaker.record("a:80", NETWORK_ERROR), "closed")
+
+    def test_recovery_probe_after_interval(self):
+        clock = FakeClock()
+        breaker = HostCircuitBreaker(failure_threshold=1, recovery_interval=10, clock=clock)
+        breaker.record("a:80", NETWORK_ERROR)
+
+        self.assertFalse(breaker.try_acquire_probe("a:80"))
+        clock.now += 10
+        self.assertTrue(breaker.try_acquire_probe("a:80"))
+        self.assertFalse(breaker.try_acquire_probe("a:80"))
+        self.assertEqual(breaker.record("a:80", NOT_VULNERABLE), "closed")
+        self.assertTrue(breaker.allows("a:80"))
+
+    def test_failed_probe_exhausts_recovery(self):
+        clock = FakeClock()
+        breaker = HostCircuitBreaker(failure_threshold=1, recovery_interval=0, max_recovery_probes=1, clock=clock)
+        breaker.record("a:80", NETWORK_ERROR)
+        self.assertTrue(breaker.try_acquire_probe("a:80"))
+        self.assertEqual(breaker.record("a:80", NETWORK_ERROR), "open")
+        self.assertFalse(breaker.can_recover("a:80"))
+
+
+class BatchHostCircuitBreakerTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = FakePocLibraryService(dead_host="dead.test")
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _wait_for_completion(self, task_id):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task_id)
+            if task["status"] == "completed":
+                return task
+            time.sleep(0.05)
+        self.fail("批量任务未在预期时间内完成")
+
+    def test_dead_host_items_are_skipped_after_threshold(self):
+        task = self.batch_service.create_task(
+            target_urls=["http://dead.test", "http://alive.test"],
+            poc_ids=[1, 2, 3, 4, 5],
+            concurrency=1,
+            host_failure_threshold=2,
+            host_recovery_probe=False,
+        )
+        task = self._wait_for_completion(task["id"])
+        items = self.batch_service.get_task_items(task["id"], limit=20)["items"]
+
+        dead_items = [item for item in items if "dead.test" in item["target_url"]]
+        alive_items = [item for item in items if "alive.test" in item["target_url"]]
+        self.assertEqual([item["status"] for item in dead_items].count("failed"), 2)
+        self.assertEqual([item["status"] for item in dead_items].count("skipped"), 3)
+        self.assertTrue(all(item["failure_code"] == "host_circuit_open" for item in dead_items if item["status"] == "skipped"))
+        self.assertTrue(all(item["retryable"] for item in dead_items if item["status"] == "skipped"))
+        self.assertTrue(all(item["status"] == "success" for item in alive_items))
+        self.assertEqual(len([call for call in self.fake_poc_service.calls if "dead.test" in call[1]]), 2)
+        self.assertEqual(task["completed_items"], 10)
+
+    def test_zero_threshold_disables_breaker(self):
+        task = self.batch_service.create_task(
+            target_urls=["http://dead.test"],
+            poc_ids=[1, 2, 3, 4],
+            concurrency=2,
+            host_failure_threshold=0,
+        )
+        task = self._wait_for_completion(task["id"])
+        self.assertEqual(task["failed_items"], 4)
+        self.assertEqual(len(self.fake_poc_service.calls), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
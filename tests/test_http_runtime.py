@@ -5,7 +5,7 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-from services.http_runtime import create_http_client, send_raw_http
+from services.http_runtime import bind_session, create_http_client, get_http_client, send_raw_http
 from services.poc_library_service import PocLibraryService
 
 
@@ -50,6 +50,14 @@ class HTTPRuntimeTests(unittest.TestCase):
         self.assertEqual(kwargs["headers"]["X-Test"], "1")
         self.assertIn("User-Agent", kwargs["headers"])
 
+    def test_bind_session_shares_session_within_context(self):
+        session = FakeSession()
+        with bind_session(session):
+            get_http_client().get("http://example.com/a")
+            create_http_client(timeout=3).get("http://example.com/b")
+        self.assertEqual([call[1] for call in session.calls], ["http://example.com/a", "http://example.com/b"])
+        self.assertIsNot(get_http_client().session, session)
+
     def test_send_raw_http_parses_response(self):
         class FakeSocket:
             def __init__(self):
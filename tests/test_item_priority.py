@@ -0,0 +1,155 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.item_priority import fingerprint_tokens, poc_profile, score_item, smoothed_hit_rate, template_profile
+from services.poc_library_service import PocLibraryService
+
+
+class RecordingPocLibraryService:
+    POCS = {
+        1: {"vuln_name": "后台目录列表", "vuln_type": "信息泄露", "tags": "info"},
+        2: {"vuln_name": "Apache Struts2 S2-045", "vuln_type": "RCE", "tags": ""},
+        3: {"vuln_name": "登录页 XSS", "vuln_type": "XSS", "tags": ""},
+        4: {"vuln_name": "Tomcat 弱口令", "vuln_type": "弱口令", "tags": "tomcat", "metadata": {"kev": True}},
+        5: {"vuln_name": "搜索框 XSS", "vuln_type": "XSS", "tags": ""},
+    }
+
+    def __init__(self):
+        self.calls = []
+        self.hits = set()
+        self._lock = threading.Lock()
+
+    def get_poc_by_id(self, poc_id):
+        poc = dict(self.POCS[poc_id])
+        poc.update({"id": poc_id, "verifiable": 1, "poc_type": "python", "execution_mode": "url_only"})
+        return poc
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        with self._lock:
+            self.calls.append((poc_id, target_url))
+        vulnerable = poc_id in self.hits
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": vulnerable, "reason": "命中" if vulnerable else "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class ItemPriorityScoreTests(unittest.TestCase):
+    def test_severity_kev_and_fingerprint_raise_score(self):
+        rce = poc_profile({"vuln_name": "Struts2 远程代码执行", "vuln_type": "RCE"})
+        xss = poc_profile({"vuln_name": "反射型 XSS", "vuln_type": "XSS"})
+        kev = poc_profile({"vuln_name": "Tomcat 弱口令", "vuln_type": "弱口令", "tags": "tomcat,kev"})
+        self.assertEqual((rce["severity"], xss["severity"], kev["severity"]), ("critical", "medium", "unknown"))
+        self.assertTrue(kev["kev"])
+
+        base = score_item(rce, smoothed_hit_rate(0, 0))
+        self.assertGreater(base, score_item(xss, smoothed_hit_rate(0, 0)))
+        self.assertGreater(score_item(rce, smoothed_hit_rate(5, 10)), base)
+
+        tokens = fingerprint_tokens({"server": "Apache-Coyote/1.1 Tomcat"})
+        self.assertGreater(score_item(kev, 0.0, tokens), score_item(kev, 0.0))
+
+    def test_template_profile_reads_severity_epss_and_kev_tag(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            template = Path(temp_dir) / "CVE-2021-44228.yaml"
+            template.write_text(
+                "id: CVE-2021-44228\n"
+                "info:\n"
+                "  name: Log4j RCE\n"
+                "  severity: critical\n"
+                "  classification:\n"
+                "    epss-score: 0.97\n"
+                "  tags: cve,rce,log4j,kev\n",
+                encoding="utf-8",
+            )
+            profile = template_profile(template, "cves/2021/CVE-2021-44228.yaml")
+            missing = template_profile(Path(temp_dir) / "missing.yaml")
+
+        self.assertEqual((profile["severity"], profile["epss"], profile["kev"]), ("critical", 0.97, True))
+        self.assertIn("log4j", profile["keywords"])
+        self.assertEqual(missing["severity"], "unknown")
+
+
+class PriorityDispatchTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = RecordingPocLibraryService()
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _run(self, poc_ids, **kwargs):
+        task = self.batch_service.create_task(["http://a.test"], poc_ids, concurrency=1, **kwargs)
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task["id"])
+            if task["status"] == "completed":
+                return task
+            time.sleep(0.05)
+        self.fail("批量任务未在预期时间内完成")
+
+    def test_high_severity_items_dispatch_first(self):
+        self._run([1, 2, 3])
+        self.assertEqual([poc_id for poc_id, _ in self.fake_poc_service.calls], [2, 3, 1])
+
+    def test_prioritize_can_be_disabled(self):
+        self._run([1, 2, 3], prioritize=False)
+        self.assertEqual([poc_id for poc_id, _ in self.fake_poc_service.calls], [1, 2, 3])
+
+    def test_historical_hits_move_poc_ahead(self):
+        self.fake_poc_service.hits = {5}
+        for _ in range(3):
+            self._run([5])
+        self.fake_poc_service.calls.clear()
+
+        task = self._run([3, 5])
+        self.assertEqual([poc_id for poc_id, _ in self.fake_poc_service.calls], [5, 3])
+        priorities = {item["poc_id"]: item["priority"] for item in self.batch_service.get_task_items(task["id"])["items"]}
+        self.assertGreater(priorities[5], priorities[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,16 @@
+import asyncio
 import gc
 import importlib
+import json
 import tempfile
+import threading
 import time
 import unittest
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import patch
 
+from services.cancellation import CancellationToken, TaskCancelledError, bind_token
 from services.oob_service import CEyeClient, InteractshClient, OOBService, load_interactsh_crypto_backend
 from services.poc_library_service import PocLibraryService
 
@@ -41,6 +46,19 @@ class FakeSession:
         return self.responses.pop(0)
 
 
+class GatedSession(FakeSession):
+    """首个 records 查询阻塞到 gate 置位，便于在轮询进行中登记更多 flag。"""
+
+    def __init__(self, responses, gate):
+        super().__init__(responses)
+        self.gate = gate
+
+    def get(self, url, **kwargs):
+        if "/records" in url and not any("/records" in call[1] for call in self.calls):
+            self.gate.wait(5)
+        return super().get(url, **kwargs)
+
+
 class FakeOOBClient:
     def build_probe(self, protocol="http", length=10, value=""):
         return {"url": "http://unit.test", "flag": "flag1234"}
@@ -154,6 +172,111 @@ class OOBServiceTests(unittest.TestCase):
         self.assertFalse(result["matched"])
         self.assertEqual(result["events"], [])
 
+    def test_shared_interactsh_client_routes_events_by_flag(self):
+        try:
+            load_interactsh_crypto_backend()
+        except ImportError:
+            self.skipTest("Interactsh 依赖未安装")
+
+        session = FakeSession([FakeResponse({})])
+        client = InteractshClient(server="oast.me", session=session, sleep_func=lambda _: None, max_polls=2)
+        first = client.build_probe(protocol="dns")["flag"]
+        second = client.build_probe(protocol="dns")["flag"]
+        session.responses.extend([
+            FakeResponse({
+                "aes_key": "a2V5",
+                "data": [
+                    json.dumps({"full-id": f"{first}.{client.domain}"}),
+                    json.dumps({"full-id": f"{second}.{client.domain}"}),
+                    json.dumps({"full-id": f"other.{client.domain}"}),
+                ],
+            }),
+            FakeResponse({"aes_key": "a2V5", "data": []}),
+        ])
+
+        with patch.object(client, "_cipher", SimpleNamespace(decrypt=lambda _: b"key")), \
+                patch.object(client, "_decrypt_data", side_effect=lambda _, item: json.loads(item)):
+            first_result = client.verify(first, protocol="dns")
+            second_result = client.verify(second, protocol="dns")
+
+        # 一次轮询取走的交互按 flag 分发，第二个 POC 无需再次轮询即可命中
+        self.assertTrue(first_result["matched"])
+        self.assertEqual(len(first_result["events"]), 1)
+        self.assertTrue(second_result["matched"])
+        self.assertEqual([method for method, _, _ in session.calls], ["POST", "GET"])
+        self.assertEqual(client._flags, {})
+
+    def test_poller_polls_once_per_interval_for_all_flags(self):
+        gate = threading.Event()
+        session = GatedSession([FakeResponse({"data": {"identify": "demoid"}})], gate)
+        client = CEyeClient(token="token123", session=session, sleep_func=lambda _: None)
+        probes = [client.build_probe(protocol="dns") for _ in range(3)]
+        session.responses.extend([
+            FakeResponse({"data": []}),
+            FakeResponse({"data": [{"name": f"{probe['flag']}.demoid.ceye.io"} for probe in probes]}),
+        ])
+
+        futures = [client.watch(probe["flag"], protocol="dns") for probe in probes]
+        gate.set()
+        results = [future.result(5) for future in futures]
+
+        self.assertTrue(all(result["matched"] and len(result["events"]) == 1 for result in results))
+        record_queries = [url for _, url, _ in session.calls if "/records" in url]
+        # 第一轮只有首个 flag，第二轮一次查询覆盖全部 flag
+        self.assertEqual(len(record_queries), 2)
+        self.assertTrue(all(url.endswith(f"filter={client.flag_prefix}") for url in record_queries))
+        self.assertEqual(client._poller.pending_count(), 0)
+
+        flag = client.build_probe(protocol="http")["flag"]
+        session.responses.append(FakeResponse({"data": [{"name": f"http://{flag}.demoid.ceye.io"}]}))
+        self.assertTrue(asyncio.run(client.verify_async(flag))["matched"])
+
+    def test_verify_returns_when_task_is_cancelled(self):
+        session = FakeSession([FakeResponse({"data": {"identify": "demoid"}})])
+        client = CEyeClient(token="token123", session=session, max_polls=1000, sleep_func=lambda _: time.sleep(0.01))
+        session.get = lambda url, **kwargs: FakeResponse({"data": []})
+        token = CancellationToken()
+        outcome = {}
+
+        def run():
+            with bind_token(token):
+                try:
+                    client.verify(client.build_probe()["flag"])
+                except TaskCancelledError as exc:
+                    outcome["error"] = exc
+
+        worker = threading.Thread(target=run)
+        worker.start()
+        time.sleep(0.05)
+        token.set()
+        worker.join(2)
+
+        self.assertFalse(worker.is_alive())
+        self.assertIsInstance(outcome.get("error"), TaskCancelledError)
+        # 被放弃的 flag 在下一轮轮询前移除，轮询线程随即退出
+        deadline = time.time() + 2
+        while client._poller.pending_count() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(client._poller.pending_count(), 0)
+
+    def test_create_client_registers_once_per_provider(self):
+        created = []
+
+        def factory():
+            created.append(FakeOOBClient())
+            return created[-1]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            service = OOBService(config_file=Path(temp_dir) / "oob.json", provider_factories={"ceye": factory})
+            service.update_config(enabled=True, provider="ceye", ceye_token="token123")
+
+            self.assertIs(service.create_client(), service.create_client())
+            self.assertIsNot(service.create_client(shared=False), created[0])
+
+            service.update_config(enabled=True, provider="ceye", ceye_token="token456")
+            self.assertIsNot(service.create_client(), created[0])
+            self.assertEqual(len(created), 3)
+
     def test_get_runtime_status_reports_interactsh_dependency_state(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             service = OOBService(config_file=Path(temp_dir) / "oob.json")
@@ -0,0 +1,94 @@
+import gc
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from services.poc_code_cache import PocCodeCache
+from services.poc_library_service import PocLibraryService
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class PocCodeCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        self.service = TestPocLibraryService(self.base_dir)
+        self.cache = PocCodeCache()
+        self._patcher = patch("services.poc_library_service.poc_code_cache", self.cache)
+        self._patcher.start()
+
+    def tearDown(self):
+        self._patcher.stop()
+        self.service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _write_python_poc(self, name: str, code: str) -> Path:
+        path = self.service.pocs_dir / "python" / name
+        path.write_text(code, encoding="utf-8")
+        return path
+
+    def test_repeated_execution_compiles_once_with_fresh_namespace(self):
+        poc_path = self._write_python_poc(
+            "counter.py",
+            "CALLS = []\n\ndef scan(url):\n    CALLS.append(url)\n    return {'vulnerable': False, 'reason': f'v1:{len(CALLS)}'}\n",
+        )
+
+        reasons = [
+            self.service._execute_python_poc(str(poc_path), f"http://t{index}.test")["result"]["reason"]
+            for index in range(3)
+        ]
+
+        self.assertEqual(reasons, ["v1:1", "v1:1", "v1:1"])
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 2))
+
+    def test_changed_content_is_recompiled(self):
+        poc_path = self._write_python_poc("changing.py", "def scan(url):\n    return {'vulnerable': False, 'reason': 'v1'}\n")
+        self.service._execute_python_poc(str(poc_path), "http://a.test")
+
+        poc_path.write_text("def scan(url):\n    return {'vulnerable': True, 'reason': 'v2'}\n", encoding="utf-8")
+        stat = poc_path.stat()
+        os.utime(poc_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        result = self.service._execute_python_poc(str(poc_path), "http://a.test")
+
+        self.assertEqual(result["result"]["reason"], "v2")
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_missing_dependency_is_rechecked_not_cached_as_failure(self):
+        poc_path = self._write_python_poc("missing_dep.py", "import fake_missing_lib_xyz\n\ndef scan(url):\n    return {}\n")
+        first = self.service._execute_python_poc(str(poc_path), "http://a.test")
+        self.assertFalse(first["success"])
+        self.assertIn("fake_missing_lib_xyz", first["error"])
+
+        compiled = self.cache.get(poc_path)
+        with patch("services.dependency_checker._is_module_available", return_value=True):
+            self.assertTrue(self.cache.check_dependencies(compiled)["ok"])
+
+    def test_syntax_error_is_reported_and_not_cached(self):
+        poc_path = self._write_python_poc("broken.py", "def scan(url)\n    return {}\n")
+        result = self.service._execute_python_poc(str(poc_path), "http://a.test")
+        self.assertFalse(result["success"])
+        self.assertIn("SyntaxError", result["error"])
+        self.assertEqual(self.cache.misses, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
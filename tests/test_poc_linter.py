@@ -0,0 +1,128 @@
+import gc
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from services.item_priority import poc_profile, score_item
+from services.poc_library_service import PocLibraryService
+from services.poc_linter import lint_python_poc
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+HEAVY_POC = """
+import socket
+import time
+import requests
+
+def probe(url, depth):
+    if depth:
+        return probe(url, depth - 1)
+    return requests.get(url)
+
+def scan(url):
+    socket.gethostbyname("example.com")
+    body = "A" * (2 * 1024 * 1024)
+    for path in ["/a", "/b", "/c", "/d"]:
+        requests.post(url + path, data=body, timeout=5)
+        time.sleep(1)
+    while True:
+        requests.get(url, timeout=5)
+    return {"vulnerable": False, "reason": ""}
+"""
+
+LIGHT_POC = """
+def scan(url):
+    client = create_http_client()
+    response = client.get(url)
+    return {"vulnerable": response.status_code == 200, "reason": ""}
+"""
+
+
+class PocLinterTests(unittest.TestCase):
+    def test_findings_and_cost_estimate(self):
+        report = lint_python_poc(HEAVY_POC)
+        codes = {finding["code"] for finding in report["findings"]}
+
+        self.assertFalse(report["ok"])
+        self.assertTrue(
+            {"recursion", "blocking_dns", "large_payload", "sleep_in_loop", "requests_without_session", "unbounded_loop", "missing_timeout"}
+            <= codes
+        )
+        # probe 内 1 次 + for 循环 4 次 + while 循环按 10 次
+        self.assertEqual(report["cost"]["estimated_requests"], 15)
+        self.assertEqual(report["cost"]["estimated_seconds"], 11.5)
+        self.assertEqual(report["cost"]["level"], "medium")
+
+        light = lint_python_poc(LIGHT_POC)
+        self.assertTrue(light["ok"])
+        self.assertEqual(light["findings"], [])
+        self.assertEqual(light["cost"]["estimated_requests"], 1)
+        self.assertEqual(light["cost"]["level"], "low")
+
+        broken = lint_python_poc("def scan(url:\n")
+        self.assertFalse(broken["ok"])
+        self.assertIsNone(broken["cost"])
+        self.assertIn("SyntaxError", broken["parse_error"])
+
+    def test_cost_lowers_priority(self):
+        cheap = poc_profile({"vuln_name": "SQL 注入", "vuln_type": "SQL", "estimated_seconds": 0.5})
+        costly = poc_profile({"vuln_name": "SQL 注入", "vuln_type": "SQL", "estimated_seconds": 120})
+
+        self.assertGreater(score_item(cheap, 0.0), score_item(costly, 0.0))
+        self.assertEqual(score_item(poc_profile({"vuln_name": "SQL 注入"}), 0.0) - score_item(costly, 0.0), 150)
+
+
+class PocLintStorageTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.service = TestPocLibraryService(Path(self._temp_dir.name))
+
+    def tearDown(self):
+        self.service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def test_save_poc_stores_report_and_derives_timeout(self):
+        poc_id = self.service.save_poc(vuln_type="SQL", vuln_info="heavy", poc_code=HEAVY_POC, vuln_name="heavy")
+        record = self.service.get_poc_by_id(poc_id)
+
+        self.assertEqual(record["estimated_requests"], 15)
+        self.assertEqual(record["estimated_seconds"], 11.5)
+        self.assertIn("unbounded_loop", {finding["code"] for finding in record["lint_report"]["findings"]})
+        self.assertEqual(self.service._resolve_execution_timeout(record), 34.5)
+        self.assertEqual(self.service._resolve_execution_timeout({"estimated_seconds": 1}), 30)
+        self.assertIsNone(self.service._resolve_execution_timeout({}))
+
+    def test_existing_python_pocs_are_backfilled(self):
+        poc_id = self.service.save_poc(vuln_type="SQL", vuln_info="light", poc_code=LIGHT_POC, vuln_name="light")
+        conn = sqlite3.connect(self.service.db_path)
+        conn.execute("UPDATE poc_records SET lint_report = NULL, estimated_seconds = NULL WHERE id = ?", (poc_id,))
+        conn.commit()
+        conn.close()
+
+        self.service.init_database()
+
+        record = self.service.get_poc_by_id(poc_id)
+        self.assertTrue(record["lint_report"]["ok"])
+        self.assertEqual(record["estimated_seconds"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.poc_code_cache import poc_code_cache
+from services.poc_library_service import PocLibraryService, prepare_python_poc
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class PocPreparationTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        self.poc_service = TestPocLibraryService(self.base_dir)
+
+    def tearDown(self):
+        self.poc_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _save(self, code, name):
+        return self.poc_service.save_poc(vuln_type="test", vuln_info=name, poc_code=code, vuln_name=name)
+
+    def test_prepare_reports_broken_pocs(self):
+        broken = self.poc_service.get_poc_by_id(self._save("def scan(url:\n    pass\n", "broken"))
+        missing_dep = self.poc_service.get_poc_by_id(self._save("import not_a_real_module_xyz\n\ndef scan(url):\n    pass\n", "dep"))
+        no_scan = self.poc_service.get_poc_by_id(self._save("def check(url):\n    return {}\n", "noscan"))
+        good = self.poc_service.get_poc_by_id(self._save("def scan(url, runtime_params=None):\n    return {}\n", "good"))
+
+        self.assertEqual(prepare_python_poc(broken)["classification"]["failure_code"], "syntax_error")
+        self.assertEqual(prepare_python_poc(missing_dep)["classification"]["failure_code"], "missing_dependency")
+        self.assertIn("scan", prepare_python_poc(no_scan)["error"])
+        self.assertIsNone(prepare_python_poc(good))
+        self.assertIsNone(prepare_python_poc({"poc_type": "nuclei", "poc_file_path": "x.yaml"}))
+
+        compiled = poc_code_cache.get(Path(good["poc_file_path"]))
+        self.assertEqual(list(compiled.call_styles.values()), ["runtime_params"])
+
+    def test_prepared_call_style_skips_signature_inspection(self):
+        poc_id = self._save("def scan(target, options):\n    return {'vulnerable': False, 'reason': options.get('k')}\n", "styled")
+        record = self.poc_service.get_poc_by_id(poc_id)
+        self.assertIsNone(prepare_python_poc(record))
+
+        with patch("services.poc_library_service.inspect.signature", side_effect=AssertionError("inspected")):
+            outcome = self.poc_service.execute_poc(poc_id, "http://a.test", {"k": "v"})
+
+        self.assertTrue(outcome["success"], outcome.get("error"))
+        self.assertEqual(outcome["result"]["reason"], "v")
+
+    def test_batch_fails_broken_poc_items_without_executing(self):
+        batch_service = TestBatchTaskService(self.base_dir)
+        broken_id = self._save("def scan(url:\n    pass\n", "broken")
+        good_id = self._save("def scan(url):\n    return {'vulnerable': False, 'reason': 'ok'}\n", "good")
+        original = batch_module.poc_library_service
+        batch_module.poc_library_service = self.poc_service
+        try:
+            with patch.object(self.poc_service, "_execute_python_poc", wraps=self.poc_service._execute_python_poc) as execute:
+                task = batch_service.create_task([f"http://t{index}.test" for index in range(4)], [broken_id, good_id])
+                deadline = time.time() + 10
+                while batch_service.get_task(task["id"])["status"] != "completed" and time.time() < deadline:
+                    time.sleep(0.05)
+        finally:
+            batch_module.poc_library_service = original
+
+        self.assertEqual(execute.call_count, 4)
+        broken_items = [item for item in batch_service.get_task_items(task["id"])["items"] if item["poc_id"] == broken_id]
+        self.assertEqual(len(broken_items), 4)
+        self.assertTrue(all(item["status"] == "failed" and item["failure_code"] == "syntax_error" for item in broken_items))
+        detail = batch_service.get_task_item_detail(task["id"], broken_items[0]["id"])
+        self.assertIn("SyntaxError", detail["detail"]["error"])
+        self.assertEqual(batch_service.get_task(task["id"])["completed_items"], 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
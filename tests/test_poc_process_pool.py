@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from services.cancellation import CancellationToken, bind_token
+from services.poc_process_pool import PocProcessPool
+
+
+def _pid_handler(request):
+    return {"success": True, "target_url": request["target_url"], "result": {"vulnerable": False, "reason": str(os.getpid())}}
+
+
+def _sleep_handler(request):
+    time.sleep(float(request["runtime_params"].get("sleep", 0)))
+    return _pid_handler(request)
+
+
+def _preload_handler(request):
+    if "preload" in request:
+        os.environ["PRELOADED"] = ",".join(request["preload"])
+        return {"success": True}
+    return {"success": True, "target_url": request["target_url"], "result": {"vulnerable": False, "reason": os.environ.get("PRELOADED", "")}}
+
+
+def _crash_handler(request):
+    os._exit(3)
+
+
+def _memory_handler(request):
+    blocks = [bytearray(32 * 1024 * 1024) for _ in range(16)]
+    return {"success": True, "target_url": request["target_url"], "result": {"vulnerable": False, "reason": str(len(blocks))}}
+
+
+class PocProcessPoolTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.config_file = Path(self._temp_dir.name) / "poc_process_pool_config.json"
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.shutdown()
+        self._temp_dir.cleanup()
+
+    def _pool(self, handler, **config):
+        pool = PocProcessPool(config_file=self.config_file, handler=handler)
+        options = {"enabled": True, "pool_size": 1, "max_runs_per_worker": 50, "memory_limit_mb": 0, "timeout_seconds": 10}
+        options.update(config)
+        pool.update_config(persist=False, **options)
+        self.pools.append(pool)
+        return pool
+
+    def test_executes_in_child_and_recycles_after_max_runs(self):
+        pool = self._pool(_pid_handler, max_runs_per_worker=2)
+        pids = [pool.execute("poc.py", f"http://t{index}.test")["result"]["reason"] for index in range(3)]
+
+        self.assertNotIn(str(os.getpid()), pids)
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(pool.stats["recycled"], 1)
+
+    def test_preload_warms_idle_and_new_workers(self):
+        pool = self._pool(_preload_handler, max_runs_per_worker=1)
+        pool.start()
+        pool.preload(["a.py", "b.py", "a.py"])
+
+        self.assertEqual(pool.execute("poc.py", "http://t1.test")["result"]["reason"], "a.py,b.py")
+        # 回收后新建的工作进程同样先预热
+        self.assertEqual(pool.execute("poc.py", "http://t2.test")["result"]["reason"], "a.py,b.py")
+        self.assertEqual(pool.stats["recycled"], 2)
+
+    def test_stats_are_counted_across_concurrent_callers(self):
+        pool = self._pool(_pid_handler, pool_size=4, max_runs_per_worker=5)
+
+        def run():
+            for index in range(10):
+                pool.execute("poc.py", f"http://t{index}.test")
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = pool.get_current_config()["stats"]
+        self.assertEqual(stats["executions"], 80)
+        self.assertEqual(stats["recycled"], 16)
+
+    def test_hard_timeout_kills_worker_and_pool_recovers(self):
+        pool = self._pool(_sleep_handler, timeout_seconds=0.5)
+        started = time.monotonic()
+        result = pool.execute("poc.py", "http://slow.test", {"sleep": 30})
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertFalse(result["success"])
+        self.assertIn("超时", result["error"])
+        self.assertEqual(pool.stats["timeouts"], 1)
+        self.assertTrue(pool.execute("poc.py", "http://fast.test")["success"])
+
+    def test_cancel_token_kills_running_worker(self):
+        pool = self._pool(_sleep_handler)
+        token = CancellationToken()
+        threading.Timer(0.5, token.set).start()
+        started = time.monotonic()
+        with bind_token(token):
+            result = pool.execute("poc.py", "http://slow.test", {"sleep": 30})
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(result["result"]["reason"], "任务已取消")
+        self.assertEqual(pool.stats["killed_on_cancel"], 1)
+
+    def test_crash_is_reported_and_memory_limit_enforced(self):
+        crash_pool = self._pool(_crash_handler)
+        crashed = crash_pool.execute("poc.py", "http://a.test")
+        self.assertIn("exitcode=3", crashed["error"])
+
+        memory_pool = self._pool(_memory_handler, memory_limit_mb=128)
+        limited = memory_pool.execute("poc.py", "http://a.test")
+        self.assertFalse(limited["success"])
+        self.assertIn("内存限制", limited["error"])
+
+    def test_invalid_config_is_rejected(self):
+        pool = PocProcessPool(config_file=self.config_file, handler=_pid_handler)
+        with self.assertRaises(ValueError):
+            pool.update_config(enabled=True, pool_size=0, persist=False)
+        with self.assertRaises(ValueError):
+            pool.update_config(enabled=True, timeout_seconds=0, persist=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import asyncio
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import requests
+
+from services.cancellation import CancellationToken, TaskCancelledError, bind_token
+from services.http_runtime import create_async_http_client
+from services.poc_library_service import PocLibraryService
+from services.poc_runtime import async_poc_runner, new_module_name, poc_runtime_context
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+CONCURRENT_POC = """
+import time
+import http_runtime
+from oob_runtime import get_oob_client
+
+def scan(url):
+    time.sleep(0.05)
+    import http_runtime as again
+    return {"vulnerable": False, "reason": f"{again.http_request is http_runtime.http_request}:{callable(get_oob_client)}"}
+"""
+
+
+class PocRuntimeTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.service = TestPocLibraryService(Path(self._temp_dir.name))
+
+    def tearDown(self):
+        self.service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def test_concurrent_executions_keep_helper_modules(self):
+        poc_path = self.service.pocs_dir / "python" / "concurrent.py"
+        poc_path.write_text(CONCURRENT_POC, encoding="utf-8")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(
+                pool.map(lambda i: self.service._execute_python_poc(str(poc_path), f"http://t{i}.test"), range(24))
+            )
+
+        self.assertTrue(all(result["success"] for result in results), [r.get("error") for r in results])
+        self.assertEqual({result["result"]["reason"] for result in results}, {"True:True"})
+
+    def test_default_timeout_only_applies_inside_context(self):
+        seen = []
+
+        def fake_send(session, request, **kwargs):
+            seen.append(kwargs.get("timeout"))
+            response = requests.Response()
+            response.status_code = 200
+            response.request = request
+            return response
+
+        with patch.object(requests.Session, "send", fake_send):
+            with poc_runtime_context(default_timeout=3):
+                requests.Session().get("http://a.test")
+                requests.Session().get("http://a.test", timeout=9)
+            requests.Session().get("http://a.test")
+
+        self.assertEqual(seen, [3, 9, None])
+
+    def test_helpers_resolve_per_thread_context(self):
+        import http_runtime
+
+        barrier = threading.Barrier(2)
+        seen = {}
+
+        def run(label):
+            with poc_runtime_context(helpers={"http_runtime": {"marker": label}}):
+                barrier.wait()
+                seen[label] = http_runtime.marker
+
+        threads = [threading.Thread(target=run, args=(label,)) for label in ("a", "b")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(seen, {"a": "a", "b": "b"})
+        self.assertNotEqual(new_module_name(), new_module_name())
+
+    def test_async_scan_runs_on_shared_loop(self):
+        poc_path = self.service.pocs_dir / "python" / "async_probe.py"
+        poc_path.write_text(
+            """
+import asyncio
+import threading
+
+async def scan(url, runtime_params=None):
+    async def probe(path):
+        await asyncio.sleep(0.05)
+        return path
+    paths = await asyncio.gather(*(probe(f"/p{i}") for i in range(200)))
+    return {"vulnerable": True, "reason": f"{len(paths)}:{get_runtime_param('mark')}:{threading.current_thread().name}"}
+""",
+            encoding="utf-8",
+        )
+        started = time.monotonic()
+        result = self.service._execute_python_poc(str(poc_path), "http://a.test", {"mark": "m"})
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertEqual(result["result"]["reason"], "200:m:async-poc-loop")
+
+    def test_async_client_and_cancellation(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, text=request.headers["User-Agent"]))
+
+        async def fetch():
+            async with httpx.AsyncClient(transport=transport) as client:
+                response = await create_async_http_client(client=client).get("http://a.test/", data="raw")
+                return response.text
+
+        self.assertEqual(async_poc_runner.run(fetch()), "AI-POC/1.0")
+
+        token = CancellationToken()
+        threading.Timer(0.2, token.set).start()
+        with bind_token(token), self.assertRaises(TaskCancelledError):
+            async_poc_runner.run(asyncio.sleep(30))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.poc_library_service import PocLibraryService
+from services.result_cache import normalize_cache_url
+
+# 派发前会预检 POC 文件，桩文件需要定义 scan 入口
+SCAN_STUB = "def scan(url):\n    return {}\n"
+
+
+class CountingPocLibraryService:
+    def __init__(self, poc_dir: Path):
+        self.poc_dir = poc_dir
+        self.calls = []
+        self.failing_urls = set()
+        self._lock = threading.Lock()
+        for poc_id in (1, 2):
+            (poc_dir / f"poc_{poc_id}.py").write_text(f"# poc {poc_id}\n{SCAN_STUB}", encoding="utf-8")
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+            "poc_file_path": str(self.poc_dir / f"poc_{poc_id}.py"),
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        with self._lock:
+            self.calls.append((poc_id, target_url))
+        if target_url in self.failing_urls:
+            return {"success": False, "error": "连接超时", "target_url": target_url}
+        vulnerable = poc_id == 1
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {
+                "vulnerable": vulnerable,
+                "reason": "命中" if vulnerable else "未发现漏洞",
+                "details": {"evidence": "uid=0(root)"} if vulnerable else None,
+            },
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class NormalizeCacheUrlTests(unittest.TestCase):
+    def test_equivalent_urls_share_a_key(self):
+        self.assertEqual(normalize_cache_url("HTTP://Example.COM:80/"), "http://example.com")
+        self.assertEqual(normalize_cache_url("example.com"), "http://example.com")
+        self.assertEqual(normalize_cache_url("https://a.test:443/admin/?x=1"), "https://a.test/admin?x=1")
+        self.assertNotEqual(normalize_cache_url("http://a.test:8080"), normalize_cache_url("http://a.test"))
+
+
+class BatchResultCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = CountingPocLibraryService(self.base_dir / "pocs")
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _run(self, urls, **kwargs):
+        task = self.batch_service.create_task(target_urls=urls, poc_ids=[1, 2], **kwargs)
+        return self._wait(task)
+
+    def _wait(self, task):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task["id"])
+            if task["status"] == "completed":
+                return task
+            time.sleep(0.05)
+        self.fail("批量任务未在预期时间内完成")
+
+    def test_repeat_scan_reuses_fresh_results(self):
+        self._run(["http://a.test"])
+        self.assertEqual(len(self.fake_poc_service.calls), 2)
+
+        task = self._run(["http://A.test/", "http://b.test"], use_result_cache=True)
+        self.assertEqual(sorted(self.fake_poc_service.calls[2:]), [(1, "http://b.test"), (2, "http://b.test")])
+        self.assertEqual((task["cached_items"], task["success_items"], task["vulnerable_items"]), (2, 4, 2))
+
+        items = self.batch_service.get_task_items(task["id"])["items"]
+        cached = [item for item in items if item["status"] == "cached"]
+        self.assertEqual(len(cached), 2)
+        hit = next(item for item in cached if item["vulnerable"])
+        detail = self.batch_service.get_task_item_detail(task["id"], hit["id"])["detail"]
+        self.assertEqual(detail["result"]["details"]["evidence"], "uid=0(root)")
+        self.assertEqual(detail["cached_from"]["task_id"], 1)
+
+    def test_changed_poc_or_stale_entry_is_executed_again(self):
+        self._run(["http://a.test"])
+        (self.base_dir / "pocs" / "poc_1.py").write_text(f"# poc 1 v2\n{SCAN_STUB}", encoding="utf-8")
+        with self.batch_service.get_db_connection() as conn:
+            conn.execute("UPDATE batch_result_cache SET cached_at = datetime('now', '-2 hours') WHERE poc_id = 2")
+
+        task = self._run(["http://a.test"], use_result_cache=True, result_cache_max_age_hours=1)
+        self.assertEqual(len(self.fake_poc_service.calls), 4)
+        self.assertEqual(task["cached_items"], 0)
+
+    def test_cache_is_opt_in(self):
+        self._run(["http://a.test"])
+        task = self._run(["http://a.test"])
+        self.assertEqual(len(self.fake_poc_service.calls), 4)
+        self.assertEqual(task["cached_items"], 0)
+
+    def test_rescan_runs_only_new_targets_changed_pocs_and_failures(self):
+        self.fake_poc_service.failing_urls = {"http://down.test"}
+        previous = self._run(["http://a.test", "http://down.test"])
+        self.assertEqual(len(self.fake_poc_service.calls), 4)
+
+        self.fake_poc_service.failing_urls = set()
+        (self.base_dir / "pocs" / "poc_2.py").write_text(f"# poc 2 v2\n{SCAN_STUB}", encoding="utf-8")
+        rescan = self._wait(
+            self.batch_service.create_rescan_task(
+                previous["id"],
+                target_urls=["http://a.test", "http://down.test", "http://new.test"],
+            )
+        )
+
+        executed = sorted(self.fake_poc_service.calls[4:])
+        self.assertEqual(
+            executed,
+            [
+                (1, "http://down.test"),
+                (1, "http://new.test"),
+                (2, "http://a.test"),
+                (2, "http://down.test"),
+                (2, "http://new.test"),
+            ],
+        )
+        self.assertEqual((rescan["total_items"], rescan["cached_items"]), (6, 1))
+        self.assertEqual(rescan["config_json"]["rescan_of"], previous["id"])
+        carried = self.batch_service.get_task_items(rescan["id"], status="cached")["items"][0]
+        detail = self.batch_service.get_task_item_detail(rescan["id"], carried["id"])["detail"]
+        self.assertEqual(detail["cached_from"]["task_id"], previous["id"])
+
+    def test_rescan_rejects_running_task(self):
+        with self.batch_service.get_db_connection() as conn:
+            conn.execute("INSERT INTO batch_tasks (mode, status) VALUES ('batch', 'running')")
+        with self.assertRaises(ValueError):
+            self.batch_service.create_rescan_task(1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import gc
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from services.batch_task_service import BatchTaskService
+from services.detail_store import DICTIONARY_DIRNAME
+from services.poc_library_service import PocLibraryService
+from services.retention_service import RetentionService
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class RetentionServiceTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.retention = RetentionService(
+            config_file=self.base_dir / "pocs" / "retention_config.json",
+            batch_service=self.batch_service,
+        )
+        self.retention.update_config(enabled=False, keep_days=30)
+
+    def tearDown(self):
+        self.batch_service = None
+        self.retention = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _create_finished_task(self, finished_at: str, results):
+        store = self.batch_service._detail_store
+        with self.batch_service.get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO batch_tasks (mode, status, total_items, finished_at) VALUES ('batch', 'completed', ?, ?)",
+                (len(results), finished_at),
+            )
+            task_id = cursor.lastrowid
+            item_ids = []
+            for index, (status, vulnerable) in enumerate(results):
+                cursor.execute(
+                    """
+                    INSERT INTO batch_task_items (task_id, poc_id, target_url, status, vulnerable, failure_category, finished_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (task_id, index % 2 + 1, f"http://t{index}.test", status, int(vulnerable),
+                     "network" if status == "failed" else None, finished_at),
+                )
+                item_ids.append(cursor.lastrowid)
+
+        for item_id, (status, vulnerable) in zip(item_ids, results):
+            if status == "failed" or vulnerable:
+                locator = store.append(task_id, item_id, {"item": item_id, "body": "证据" * 200})
+                with self.batch_service.get_db_connection() as conn:
+                    conn.execute("UPDATE batch_task_items SET detail_file = ? WHERE id = ?", (locator, item_id))
+        return task_id, item_ids
+
+    def test_expired_misses_are_summarized_and_hits_kept(self):
+        results = [("success", True), ("success", False), ("failed", False), ("failed", False), ("success", False)]
+        old_task, old_items = self._create_finished_task("2026-01-01 00:00:00", results)
+        new_task, _ = self._create_finished_task("2026-10-18 00:00:00", results)
+        segment = self.batch_service._detail_store.segment_path(old_task)
+        size_before = segment.stat().st_size
+
+        dry_run = self.retention.run_compaction(dry_run=True, now=datetime(2026, 10, 19))
+        self.assertEqual((dry_run["tasks_compacted"], dry_run["items_summarized"]), (1, 4))
+        self.assertEqual(self.batch_service.count_task_items(old_task), 5)
+
+        stats = self.retention.run_compaction(now=datetime(2026, 10, 19))
+        self.assertEqual((stats["tasks_compacted"], stats["items_summarized"]), (1, 4))
+        self.assertEqual(self.batch_service.count_task_items(new_task), 5)
+
+        remaining = list(self.batch_service.iter_task_items(old_task))
+        self.assertEqual([item["id"] for item in remaining], [old_items[0]])
+        self.assertFalse(segment.exists())
+        compacted = self.batch_service._detail_store.segment_path(old_task)
+        self.assertEqual(compacted.name, "details.1.seg")
+        self.assertLess(compacted.stat().st_size, size_before)
+        detail = self.batch_service.get_task_item_detail(old_task, old_items[0])
+        self.assertEqual(detail["detail"]["item"], old_items[0])
+
+        summaries = self.batch_service.get_task_item_summaries(old_task)
+        self.assertEqual(sum(row["item_count"] for row in summaries), 4)
+        failed = [row for row in summaries if row["status"] == "failed"]
+        self.assertEqual([(row["failure_category"], row["item_count"]) for row in failed], [("network", 1), ("network", 1)])
+        self.assertIsNotNone(self.batch_service.get_task(old_task)["compacted_at"])
+
+        self.assertEqual(self.retention.run_compaction(now=datetime(2026, 10, 19))["tasks_compacted"], 0)
+
+    def test_failed_commit_keeps_original_segment_readable(self):
+        results = [("success", True), ("failed", False), ("success", True), ("failed", False), ("success", True)]
+        task_id, item_ids = self._create_finished_task("2026-01-01 00:00:00", results)
+        store = self.batch_service._detail_store
+        segment = store.segment_path(task_id)
+        with self.batch_service.get_db_connection() as conn:
+            conn.execute(
+                """
+                CREATE TRIGGER fail_compaction BEFORE UPDATE OF compacted_at ON batch_tasks
+                BEGIN SELECT RAISE(ABORT, 'database is locked'); END
+                """
+            )
+
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.retention.run_compaction(now=datetime(2026, 10, 19))
+
+        self.assertTrue(segment.exists())
+        self.assertEqual(store.segment_path(task_id), segment)
+        self.assertEqual(sorted(path.name for path in segment.parent.iterdir()), ["details.idx", "details.seg"])
+        self.assertIsNone(self.batch_service.get_task(task_id)["compacted_at"])
+        for item_id in item_ids:
+            detail = self.batch_service.get_task_item_detail(task_id, item_id)
+            self.assertEqual(detail["detail"]["item"], item_id)
+
+        with self.batch_service.get_db_connection() as conn:
+            conn.execute("DROP TRIGGER fail_compaction")
+        self.assertEqual(self.retention.run_compaction(now=datetime(2026, 10, 19))["items_summarized"], 2)
+        self.assertFalse(segment.exists())
+        for item_id in item_ids[::2]:
+            detail = self.batch_service.get_task_item_detail(task_id, item_id)
+            self.assertEqual(detail["detail"]["item"], item_id)
+
+    def test_orphan_files_removed_but_dictionaries_kept(self):
+        results_dir = self.batch_service.batch_results_dir
+        task_id, _ = self._create_finished_task("2026-10-18 00:00:00", [("success", True)])
+        orphan_dir = results_dir / "task_999"
+        orphan_dir.mkdir()
+        (orphan_dir / "details.seg").write_bytes(b"stale")
+        stale_legacy = results_dir / f"task_{task_id}" / "item_12345.json"
+        stale_legacy.write_text("{}", encoding="utf-8")
+        dictionary_dir = results_dir / DICTIONARY_DIRNAME
+        dictionary_dir.mkdir()
+        (dictionary_dir / "manifest.json").write_text("{}", encoding="utf-8")
+
+        stats = self.retention.run_compaction(now=datetime(2026, 10, 19))
+
+        self.assertEqual(stats["orphan_files_removed"], 2)
+        self.assertFalse(orphan_dir.exists())
+        self.assertFalse(stale_legacy.exists())
+        self.assertTrue((dictionary_dir / "manifest.json").exists())
+        self.assertTrue(self.batch_service._detail_store.segment_path(task_id).exists())
+
+    def test_vacuum_switches_database_to_incremental_mode(self):
+        self.retention.run_compaction(now=datetime(2026, 10, 19))
+        with self.batch_service.get_db_connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+
+    def test_invalid_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.retention.update_config(enabled=True, keep_days=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,260 @@
+import gc
+import tempfile
+import threading
+import time
+import unittest
+from collections import deque
+from pathlib import Path
+from unittest.mock import patch
+
+import services.batch_task_service as batch_module
+from services.batch_scheduler import HostLaneScheduler
+from services.batch_task_service import BatchTaskService
+from services.host_health import HostCircuitBreaker
+from services.poc_library_service import PocLibraryService, poc_supports_scan_many
+
+GENERATOR_POC = """
+import re
+
+SETUP_CALLS = []
+
+def scan(url):
+    return {"vulnerable": False, "reason": "single"}
+
+def scan_many(urls, runtime_params=None):
+    SETUP_CALLS.append(len(urls))
+    pattern = re.compile(r"hit")
+    for url in urls:
+        if "missing" in url:
+            continue
+        yield url, {"vulnerable": bool(pattern.search(url)), "reason": f"batch:{len(urls)}:{len(SETUP_CALLS)}"}
+"""
+
+ASYNC_GENERATOR_POC = """
+import asyncio
+
+def scan(url):
+    return {"vulnerable": False, "reason": "single"}
+
+async def scan_many(urls, runtime_params=None):
+    for url in urls:
+        await asyncio.sleep(0)
+        yield url, {"vulnerable": True, "reason": get_runtime_param("mark", "")}
+"""
+
+DICT_POC = """
+def scan(url):
+    return {"vulnerable": False, "reason": "single"}
+
+def scan_many(urls):
+    results = {url: {"vulnerable": False, "reason": "dict"} for url in urls[:-1]}
+    raise_on = urls[-1]
+    return results if "boom" not in raise_on else 1 / 0
+"""
+
+ASYNC_DICT_POC = """
+import asyncio
+
+def scan(url):
+    return {"vulnerable": False, "reason": "single"}
+
+async def scan_many(urls):
+    results = {}
+    for url in urls:
+        await asyncio.sleep(0.1)
+        results[url] = {"vulnerable": False, "reason": "async-dict"}
+    return results
+"""
+
+SLOW_AFTER_HIT_POC = """
+import time
+
+def scan(url):
+    return {"vulnerable": False, "reason": "single"}
+
+def scan_many(urls):
+    for index, url in enumerate(urls):
+        if index:
+            time.sleep(0.3)
+        yield url, {"vulnerable": True, "reason": "hit"}
+"""
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class ScanManyTests(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        self.poc_service = TestPocLibraryService(self.base_dir)
+
+    def tearDown(self):
+        self.poc_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+
+    def _save(self, code, name):
+        return self.poc_service.save_poc(vuln_type="test", vuln_info=name, poc_code=code, vuln_name=name)
+
+    def test_generator_results_stream_per_target(self):
+        poc_id = self._save(GENERATOR_POC, "generator")
+        self.assertTrue(poc_supports_scan_many(self.poc_service.get_poc_by_id(poc_id)))
+
+        urls = ["http://a.test", "http://hit.test", "http://missing.test"]
+        outcomes = dict(self.poc_service.execute_poc_many(poc_id, urls))
+
+        self.assertEqual(set(outcomes), set(urls))
+        self.assertEqual(outcomes["http://a.test"]["result"]["reason"], "batch:3:1")
+        self.assertTrue(outcomes["http://hit.test"]["result"]["vulnerable"])
+        self.assertIn("wall_ms", outcomes["http://hit.test"]["metrics"])
+        self.assertFalse(outcomes["http://missing.test"]["success"])
+        self.assertIn("scan_many", outcomes["http://missing.test"]["error"])
+        self.assertIn("classification", outcomes["http://missing.test"])
+        # 单目标验证仍走 scan
+        self.assertEqual(self.poc_service.execute_poc(poc_id, "http://a.test")["result"]["reason"], "single")
+
+    def test_async_generator_and_errors_fill_remaining_targets(self):
+        async_id = self._save(ASYNC_GENERATOR_POC, "async")
+        outcomes = dict(self.poc_service.execute_poc_many(async_id, ["http://a.test", "http://b.test"], {"mark": "m"}))
+        self.assertEqual({outcome["result"]["reason"] for outcome in outcomes.values()}, {"m"})
+
+        dict_id = self._save(DICT_POC, "dict")
+        outcomes = dict(self.poc_service.execute_poc_many(dict_id, ["http://a.test", "http://boom.test"]))
+        self.assertTrue(all(not outcome["success"] for outcome in outcomes.values()))
+        self.assertIn("ZeroDivisionError", outcomes["http://a.test"]["error"])
+
+        outcomes = dict(self.poc_service.execute_poc_many(dict_id, ["http://a.test", "http://b.test"]))
+        self.assertEqual(outcomes["http://a.test"]["result"]["reason"], "dict")
+        self.assertFalse(outcomes["http://b.test"]["success"])
+
+    def test_async_scan_many_timeout_scales_with_targets(self):
+        poc_id = self._save(ASYNC_DICT_POC, "async-dict")
+        urls = [f"http://t{index}.test" for index in range(4)]
+        record = self.poc_service.get_poc_by_id(poc_id)
+
+        # 单目标超时 0.15 秒，整组 4 个目标共约 0.4 秒，按目标数放大后不应超时
+        outcomes = dict(self.poc_service._execute_python_poc_many(record["poc_file_path"], urls, timeout=0.15))
+
+        self.assertTrue(all(outcome["success"] for outcome in outcomes.values()), outcomes)
+        self.assertEqual({outcome["result"]["reason"] for outcome in outcomes.values()}, {"async-dict"})
+
+    def test_batch_task_hands_pocs_chunks_of_targets(self):
+        batch_service = TestBatchTaskService(self.base_dir)
+        batch_service.SCAN_MANY_CHUNK_SIZE = 2
+        poc_id = self._save(GENERATOR_POC, "generator")
+        single_id = self._save("def scan(url):\n    return {'vulnerable': False, 'reason': 'single'}\n", "single")
+        original = batch_module.poc_library_service
+        batch_module.poc_library_service = self.poc_service
+        try:
+            task = batch_service.create_task(
+                ["http://a.test", "http://b.test", "http://c.test"],
+                [poc_id, single_id],
+                concurrency=2,
+            )
+            deadline = time.time() + 10
+            while batch_service.get_task(task["id"])["status"] != "completed" and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            batch_module.poc_library_service = original
+
+        items = batch_service.get_task_items(task["id"])["items"]
+        self.assertEqual(len(items), 6)
+        self.assertTrue(all(item["status"] == "success" for item in items))
+        reasons = sorted(item["reason"] for item in items if item["poc_id"] == poc_id)
+        self.assertEqual(reasons[0].split(":")[:2], ["batch", "1"])
+        self.assertEqual([reason.split(":")[1] for reason in reasons[1:]], ["2", "2"])
+        self.assertTrue(all(item["reason"] == "single" for item in items if item["poc_id"] == single_id))
+
+    def test_chunks_follow_priority_stream_and_host_breaker(self):
+        batch_service = TestBatchTaskService(self.base_dir)
+        batch_service.SCAN_MANY_CHUNK_SIZE = 2
+        urls = ["http://a.test", "http://b.test", "http://dead1.test", "http://c.test", "http://dead2.test"]
+        items = []
+        for url in urls:
+            for poc_id in (1, 2):
+                items.append({"id": len(items) + 1, "poc_id": poc_id, "engine_type": "poc", "target_url": url, "priority": 0})
+        fake_library = type("FakeLibrary", (), {"get_poc_by_id": lambda self, poc_id: {"id": poc_id}})()
+
+        ready_chunks = deque()
+        with patch.object(batch_module, "poc_library_service", fake_library), \
+                patch.object(batch_module, "poc_supports_scan_many", lambda record: record["id"] == 1), \
+                patch.object(batch_service, "_iter_pending_by_priority", lambda task_id: iter(items)):
+            stream = batch_service._iter_dispatch_units(1, {"http://dead1.test", "http://dead2.test"}, ready_chunks)
+            first_single = next(stream)
+            # 分块随优先级流推进而形成，而不是在逐项派发前整体执行
+            self.assertEqual(first_single["target_url"], "http://a.test")
+            self.assertEqual(len(ready_chunks), 0)
+            singles = [first_single] + list(stream)
+
+        self.assertEqual([item["poc_id"] for item in singles], [2] * 5)
+        self.assertEqual(
+            [[item["target_url"] for item in chunk] for chunk in ready_chunks],
+            [["http://a.test", "http://b.test"], ["http://c.test"], ["http://dead1.test", "http://dead2.test"]],
+        )
+
+        breaker = HostCircuitBreaker(failure_threshold=1, recovery_probe=False)
+        breaker.record("b.test:80", {"failure_category": "network_error"})
+        lanes = HostLaneScheduler([], 1, session_factory=lambda: None)
+        early_stop = batch_service._build_early_stop({"config_json": {}})
+
+        chunk = batch_service._next_dispatchable_chunk(ready_chunks, lanes, breaker, early_stop)
+
+        self.assertEqual([item["target_url"] for item in chunk], ["http://a.test"])
+        # 熔断主机的子任务交回逐项派发，由熔断逻辑延后或跳过
+        self.assertEqual([item["target_url"] for item in lanes], ["http://b.test"])
+
+    def test_poc_hit_stops_running_chunk(self):
+        batch_service = TestBatchTaskService(self.base_dir)
+        poc_id = self._save(SLOW_AFTER_HIT_POC, "slow")
+        original = batch_module.poc_library_service
+        batch_module.poc_library_service = self.poc_service
+        started = time.monotonic()
+        try:
+            task = batch_service.create_task(
+                [f"http://t{index}.test" for index in range(6)],
+                [poc_id],
+                stop_on_poc_hit=True,
+            )
+            deadline = time.time() + 10
+            while batch_service.get_task(task["id"])["status"] != "completed" and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            batch_module.poc_library_service = original
+
+        task = batch_service.get_task(task["id"])
+        # 命中后分块停止迭代，不等剩余目标逐个 sleep
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(task["vulnerable_items"], 1)
+        skipped = batch_service.get_task_items(task["id"], status="skipped")["items"]
+        self.assertEqual(len(skipped), 5)
+        self.assertTrue(all(item["failure_code"] == "poc_hit" for item in skipped))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+import gc
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import services.batch_task_service as batch_module
+from services.batch_task_service import BatchTaskService
+from services.poc_library_service import PocLibraryService
+from services.target_probe import TargetProber, split_probe_endpoint
+
+
+class _HeadHandler(BaseHTTPRequestHandler):
+    server_version = "probe-test"
+    sys_version = ""
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _closed_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class FakePocLibraryService:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_poc_by_id(self, poc_id):
+        return {
+            "id": poc_id,
+            "vuln_name": f"POC-{poc_id}",
+            "verifiable": 1,
+            "poc_type": "python",
+            "execution_mode": "url_only",
+        }
+
+    def execute_poc(self, poc_id, target_url, runtime_params=None):
+        with self._lock:
+            self.calls.append((poc_id, target_url))
+        return {
+            "success": True,
+            "target_url": target_url,
+            "result": {"vulnerable": False, "reason": "未发现漏洞", "details": None},
+        }
+
+
+class TestPocLibraryService(PocLibraryService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.pocs_dir = self.base_dir / "pocs"
+        self.db_path = self.pocs_dir / "poc_library.db"
+        self.init_storage()
+        self.init_database()
+
+
+class TestBatchTaskService(BatchTaskService):
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.db_path = self.base_dir / "pocs" / "poc_library.db"
+        self.batch_results_dir = self.base_dir / "pocs" / "batch_results"
+        self.batch_results_dir.mkdir(parents=True, exist_ok=True)
+        self._cancel_events = {}
+        self._worker_threads = {}
+        self._lock = threading.Lock()
+        self.init_database()
+
+
+class TargetProbeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _HeadHandler)
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        self.alive_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.dead_url = f"http://127.0.0.1:{_closed_port()}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TargetProberTests(TargetProbeTestCase):
+    def test_split_probe_endpoint_defaults(self):
+        self.assertEqual(split_probe_endpoint("Example.com/a"), ("http", "example.com", 80))
+        self.assertEqual(split_probe_endpoint("https://example.com"), ("https", "example.com", 443))
+
+    def test_probe_marks_alive_and_dead_targets(self):
+        results = TargetProber(connect_timeout=1, head_timeout=1).probe_urls(
+            [self.alive_url, self.alive_url + "/admin", self.dead_url]
+        )
+
+        self.assertTrue(results[self.alive_url]["alive"])
+        self.assertEqual(results[self.alive_url]["status_code"], 200)
+        self.assertEqual(results[self.alive_url]["server"], "probe-test")
+        self.assertTrue(results[self.alive_url + "/admin"]["alive"])
+        self.assertFalse(results[self.dead_url]["alive"])
+        self.assertEqual(results[self.dead_url]["stage"], "connect")
+
+
+class BatchPreProbeTests(TargetProbeTestCase):
+    def setUp(self):
+        super().setUp()
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = Path(self._temp_dir.name)
+        TestPocLibraryService(self.base_dir)
+        self.batch_service = TestBatchTaskService(self.base_dir)
+        self.fake_poc_service = FakePocLibraryService()
+        self._original_poc_service = batch_module.poc_library_service
+        batch_module.poc_library_service = self.fake_poc_service
+
+    def tearDown(self):
+        batch_module.poc_library_service = self._original_poc_service
+        self.batch_service = None
+        gc.collect()
+        for _ in range(5):
+            try:
+                self._temp_dir.cleanup()
+                break
+            except PermissionError:
+                time.sleep(0.1)
+        else:
+            self.fail("临时测试目录清理失败，数据库文件仍被占用")
+        super().tearDown()
+
+    def _wait_for_completion(self, task_id):
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            task = self.batch_service.get_task(task_id)
+            if task["status"] == "completed":
+                return task
+            time.sleep(0.05)
+        self.fail("批量任务未在预期时间内完成")
+
+    def test_dead_targets_are_skipped_before_dispatch(self):
+        task = self.batch_service.create_task(
+            target_urls=[self.dead_url, self.alive_url],
+            poc_ids=[1, 2],
+            concurrency=1,
+            pre_probe=True,
+        )
+        task = self._wait_for_completion(task["id"])
+        items = self.batch_service.get_task_items(task["id"], limit=20)["items"]
+
+        dead_items = [item for item in items if item["target_url"] == self.dead_url]
+        self.assertTrue(all(item["status"] == "skipped" for item in dead_items))
+        self.assertTrue(all(item["failure_code"] == "target_unreachable" for item in dead_items))
+        self.assertEqual({call[1] for call in self.fake_poc_service.calls}, {self.alive_url})
+        self.assertEqual(task["completed_items"], 4)
+
+        targets = {target["target_url"]: target for target in self.batch_service.get_task_targets(task["id"])}
+        self.assertTrue(targets[self.alive_url]["alive"])
+        self.assertFalse(targets[self.dead_url]["alive"])
+        self.assertEqual(targets[self.dead_url]["probe"]["stage"], "connect")
+
+    def test_deprioritize_runs_dead_targets_last(self):
+        task = self.batch_service.create_task(
+            target_urls=[self.dead_url, self.alive_url],
+            poc_ids=[1, 2],
+            concurrency=1,
+            pre_probe=True,
+            dead_target_policy="deprioritize",
+            host_failure_threshold=0,
+        )
+        self._wait_for_completion(task["id"])
+
+        called_urls = [call[1] for call in self.fake_poc_service.calls]
+        self.assertEqual(called_urls, [self.alive_url, self.alive_url, self.dead_url, self.dead_url])
+
+    def test_invalid_dead_target_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.batch_service.create_task(
+                target_urls=[self.alive_url],
+                poc_ids=[1],
+                pre_probe=True,
+                dead_target_policy="drop",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()